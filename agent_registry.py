@@ -0,0 +1,80 @@
+import importlib
+import threading
+from typing import Callable, Dict, List, Optional
+
+from config import config
+
+# --- Lazy Agent Registry ---
+# Agents are built on first use instead of at import time. Each name maps to
+# a "module:factory" path that is only imported when the agent is first
+# requested; the built agent gets its routed, policy-bound models, the metrics,
+# span and context-compaction callbacks and is shared by every later caller in the process.
+
+_FACTORIES: Dict[str, str] = {
+    "orchestrator": "main_agent:build_orchestrator_agent",
+    "pipeline": "pipeline:build_pipeline_agent",
+    "content_fetcher": "sub_agents.content_fetcher_agent:build_content_fetcher_agent",
+    "topic_analyzer_agent": "sub_agents.topic_analyzer_agent:build_topic_analyzer_agent",
+    "newsletter_planner": "sub_agents.newsletter_planner_agent:build_newsletter_planner_agent",
+    "newsletter_writer": "sub_agents.newsletter_writer_agent:build_newsletter_writer_agent",
+}
+
+_agents: Dict[str, object] = {}
+_lock = threading.RLock()
+
+
+def register(name: str, factory: str):
+    """Adds (or replaces) the "module:function" factory for an agent name."""
+    with _lock:
+        _FACTORIES[name] = factory
+        _agents.pop(name, None)
+
+
+def _resolve(factory: str) -> Callable:
+    module_name, _, attribute = factory.partition(":")
+    return getattr(importlib.import_module(module_name), attribute)
+
+
+def _instrument(agent):
+    from call_policy import install_call_policy
+    from context_compaction import attach_context_compaction
+    from instrumentation import attach_instrumentation
+    from model_router import install_model_router
+    from run_metrics import instrument_agent_tree
+
+    # Per-stage model tiers with fallback on timeouts and rate limits.
+    if config.model_routing:
+        install_model_router(agent)
+    # Per-stage deadlines, backoff retries and (optionally) hedged requests around every model call.
+    install_call_policy(agent)
+
+    # Count LLM/tool calls per run so both execution modes can be compared.
+    instrument_agent_tree(agent)
+    # Per-agent/model/tool spans (JSONL + sidebar table) from callbacks, at no LLM cost.
+    attach_instrumentation(agent)
+    # Keep rework rounds from re-sending every earlier draft and stage output.
+    attach_context_compaction(agent)
+    return agent
+
+
+def get_agent(name: str):
+    """Returns the shared, instrumented agent registered under name, building it on first use."""
+    agent = _agents.get(name)
+    if agent is not None:
+        return agent
+    with _lock:
+        if name not in _agents:
+            if name not in _FACTORIES:
+                raise KeyError(f"Unknown agent '{name}'. Registered: {', '.join(sorted(_FACTORIES))}")
+            _agents[name] = _instrument(_resolve(_FACTORIES[name])())
+        return _agents[name]
+
+
+def get_root_agent(mode: Optional[str] = None):
+    """The root agent for an execution mode ("orchestrator" or "pipeline"; default from config)."""
+    return get_agent(mode or config.execution_mode)
+
+
+def built_agents() -> List[str]:
+    """Names of the agents built so far in this process."""
+    return list(_agents)
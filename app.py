@@ -1,12 +1,24 @@
 
 import streamlit as st
 import asyncio
+import time
 import uuid
 from google.adk.runners import Runner
-from google.adk.sessions import InMemorySessionService
-from main_agent import root_agent
+from config import config
+from agent_registry import get_root_agent
 from google.genai import types as genai_types
 from tools import save_draft_as_pdf # Import the function to generate HTML
+from pdf_renderer import render_pdf
+from stage_cache import get_stage_cache
+from run_metrics import finish_run, metrics_for
+from ui_render import BufferedMarkdownRenderer, TraceRingBuffer
+from instrumentation import format_span, get_span_collector
+from session_store import get_session_service
+from model_router import get_model_router
+from call_policy import get_call_policy
+from story_index import get_story_index, publish_issue
+from pregenerate import get_pregenerator, serve_pregenerated
+from pipeline import draft_markdown
 
 from dotenv import load_dotenv
 load_dotenv()
@@ -20,31 +32,54 @@ st.set_page_config(
 # ------------- Setup Agent + Session Layer ---------------- #
 @st.cache_resource
 def get_services():
-    """Initialize agent runner and session storage once."""
-    session_service = InMemorySessionService()
-
-    session_id = "sess_" + str(uuid.uuid4())
-    user_id = "user_streamlit"
-
-    # create session asynchronously
-    asyncio.run(
-        session_service.create_session(
-            app_name="app",
-            user_id=user_id,
-            session_id=session_id
-        )
-    )
-
+    """Initialize the agent runner and the shared session store once per process."""
     runner = Runner(
-        agent=root_agent,
+        agent=get_root_agent(),  # built on first use (agent_registry.py)
         app_name="app",
-        session_service=session_service,
+        session_service=get_session_service(),  # SQLite, per-user sessions (session_store.py)
     )
+    return runner
+
+
+def get_user_session():
+    """
+    Each browser session gets its own ADK user and session. Their ids are kept
+    in the URL, so a reload (or a restarted server) resumes the same session.
+    """
+    if "adk_session" not in st.session_state:
+        user_id = st.query_params.get("user")
+        session_id = st.query_params.get("session")
+        session = None
+        if user_id and session_id:
+            session = asyncio.run(
+                runner.session_service.get_session(app_name="app", user_id=user_id, session_id=session_id)
+            )
+        if session is None:
+            user_id = "user_" + uuid.uuid4().hex
+            session = asyncio.run(
+                runner.session_service.create_session(
+                    app_name="app", user_id=user_id, session_id="sess_" + str(uuid.uuid4())
+                )
+            )
+            st.query_params.update({"user": user_id, "session": session.id})
+        elif draft_markdown(session.state) and "newsletter_draft" not in st.session_state:
+            # Resumed session: show its latest draft for review again.
+            st.session_state.newsletter_draft = draft_markdown(session.state)
+            st.session_state.messages = [("assistant", st.session_state.newsletter_draft)]
+            st.session_state.app_state = "AWAITING_APPROVAL"
+        st.session_state.adk_session = (user_id, session.id)
+    return st.session_state.adk_session
 
-    return runner, session_id, user_id
+
+@st.cache_resource
+def start_pregeneration():
+    """Starts the background pre-generation thread once per process (pregenerate.py)."""
+    return get_pregenerator().start_background() if config.pregenerate else None
 
 
-runner, session_id, user_id = get_services()
+runner = get_services()
+start_pregeneration()
+user_id, session_id = get_user_session()
 
 
 # ---------------- Streamlit UI ---------------- #
@@ -66,7 +101,65 @@ if "app_state" not in st.session_state:
 if "newsletter_draft" not in st.session_state:
     st.session_state.newsletter_draft = ""
 
+# LLM call counts and wall-clock time of each run (orchestrator vs pipeline mode)
+if "run_metrics" not in st.session_state:
+    st.session_state.run_metrics = []
 
+# Per-stage span totals (wall time, time to first token, tokens, retries) of the latest run
+if "stage_timings" not in st.session_state:
+    st.session_state.stage_timings = []
+
+
+
+# Stage cache hit/miss counters (sub-agent stages served without an LLM call)
+with st.sidebar.expander("🗄 Stage Cache", expanded=False):
+    cache_stats = get_stage_cache().stats()
+    if cache_stats:
+        st.table([{"stage": stage, **counters} for stage, counters in cache_stats.items()])
+    else:
+        st.caption("No stage cache activity yet.")
+
+# Learned latency/cost profile and cooldown state of each stage's model tiers
+with st.sidebar.expander("🔀 Model Routing", expanded=False):
+    if not config.model_routing:
+        st.caption("Routing is off; every stage uses the worker model.")
+    elif get_model_router().snapshot():
+        st.table([
+            {key: row[key] for key in ("stage", "tier", "model", "calls", "failures", "latency_s", "cost_usd", "cooling_down_s")}
+            for row in get_model_router().snapshot()
+        ])
+    else:
+        st.caption("No model calls yet.")
+
+# Retries, hedged requests and deadline misses per stage (call_policy.py)
+with st.sidebar.expander("⏳ Call Policy", expanded=False):
+    policy_stats = get_call_policy().stats()
+    if policy_stats:
+        st.table([{"stage": stage, **counters} for stage, counters in policy_stats.items()])
+    else:
+        st.caption("No model calls yet.")
+
+# Approved issues and stories the published-story filter checks candidates against
+with st.sidebar.expander("🗂 Published Stories", expanded=False):
+    if not config.published_filter:
+        st.caption("The published-story filter is off.")
+    else:
+        index_counts = get_story_index().counts()
+        st.caption(f"{index_counts['issues']} approved issues, {index_counts['stories']} indexed stories.")
+        if get_story_index().counters["checked"]:
+            st.table([get_story_index().counters])
+
+with st.sidebar.expander(f"📊 Run Metrics ({config.execution_mode} mode)", expanded=False):
+    if st.session_state.run_metrics:
+        st.table(st.session_state.run_metrics)
+    else:
+        st.caption("No runs yet.")
+
+with st.sidebar.expander("⏱ Stage Timings (latest run)", expanded=False):
+    if st.session_state.stage_timings:
+        st.table(st.session_state.stage_timings)
+    else:
+        st.caption("No runs yet.")
 
 # Display past conversation
 for role, message in st.session_state.messages:
@@ -98,9 +191,13 @@ async def run_agent(user_input: str):
         final_text = ""  # To accumulate the full response
 
         trace_area = st.sidebar.expander("🛠 Execution Trace", expanded=True)
-        trace_box = trace_area.empty()
-
-        trace_logs = ""
+        # Bounded and redrawn at most NEWSLETTER_UI_FPS times per second (see ui_render.py)
+        trace_log = TraceRingBuffer(trace_area.empty())
+        renderer = None  # replaces the status message once content arrives
+        invocation_id = None
+        run_started = time.perf_counter()
+        spans = get_span_collector()
+        spans_shown = 0
 
         async for event in runner.run_async(
             user_id=user_id,
@@ -110,38 +207,38 @@ async def run_agent(user_input: str):
                 parts=[genai_types.Part.from_text(text=user_input)]
             ),
         ):
+            invocation_id = invocation_id or event.invocation_id
 
             # ---------- 1. Content Stream ----------
             if event.content and event.content.parts:
                 text = event.content.parts[0].text or ""   # ensure it's a string
-                # TRACE detection (safe check)
-                if isinstance(text, str) and "[TRACE]" in text:
-                    trace_logs += text + "\n"
-                    trace_box.markdown(f"```\n{trace_logs}\n```")
-                else: # Only update main display if it's not a trace
+                if text:
                     final_text += text
-                    stream_area.markdown(final_text)
-
-            # ---------- 2. Tool Events ----------
-            if hasattr(event, "tool_event"):
-                tool_name = event.tool_event.tool_name
-                status = event.tool_event.status
-                msg = f"[TRACE] Tool `{tool_name}` is {status}"
-
-                trace_logs += msg + "\n"
-                trace_box.markdown(f"```\n{trace_logs}\n```")
-
-            # ---------- 3. Metadata Events ----------
-            if hasattr(event, "metadata"):
-                meta_text = str(event.metadata)
-
-                if "[TRACE]" in meta_text or "agent" in meta_text.lower():
-                    trace_logs += meta_text + "\n"
-                    trace_box.markdown(f"```\n{trace_logs}\n```")
+                    if renderer is None:
+                        renderer = BufferedMarkdownRenderer(stream_area.container())
+                    renderer.append(text)
+
+            # ---------- 2. Execution Trace (spans finished since the last event) ----------
+            finished = spans.spans(invocation_id)
+            for span in finished[spans_shown:]:
+                trace_log.append(format_span(span))
+            spans_shown = len(finished)
+
+        trace_log.flush()
+
+        # The streamed text mixes stage outputs with the draft; the draft itself is
+        # read from session state, where the writer keeps it in both execution modes.
+        session = await runner.session_service.get_session(
+            app_name="app", user_id=user_id, session_id=session_id
+        )
+        if session and draft_markdown(session.state):
+            final_text = draft_markdown(session.state)
 
-            # ---------- 4. Final Output (from output_key) ----------
-            if hasattr(event, "metadata") and "output" in event.metadata:
-                final_text = event.metadata["output"]
+        if invocation_id:
+            metrics_for(invocation_id).started_at = run_started
+            metrics = finish_run(invocation_id, config.execution_mode)
+            st.session_state.run_metrics.append(metrics.as_dict())
+            st.session_state.stage_timings = spans.stage_table(invocation_id)
 
         # --- Post-Execution State Update ---
         st.session_state.newsletter_draft = final_text
@@ -156,6 +253,22 @@ async def run_agent(user_input: str):
 # --- 1. Initial State: Show Start Button ---
 if st.session_state.app_state == "INITIAL":
     if st.button("🚀 Start Newsletter Creation"):
+        # A fresh pre-generated draft is shown at once; in pipeline mode fresh
+        # fetch and analysis results are seeded so the run only plans and writes.
+        served = asyncio.run(serve_pregenerated(
+            runner.session_service, "app", user_id, session_id,
+            seed_analysis=config.execution_mode == "pipeline",
+        ))
+        if served == "draft":
+            session = asyncio.run(
+                runner.session_service.get_session(app_name="app", user_id=user_id, session_id=session_id)
+            )
+            st.session_state.newsletter_draft = draft_markdown(session.state)
+            st.session_state.messages += [
+                ("user", "Create today's newsletter."), ("assistant", st.session_state.newsletter_draft)
+            ]
+            st.session_state.app_state = "AWAITING_APPROVAL"
+            st.rerun()
         asyncio.run(run_agent("Create today's newsletter."))
 
 # --- 2. Awaiting Approval State: Show Buttons and Feedback Input ---
@@ -169,6 +282,12 @@ elif st.session_state.app_state == "AWAITING_APPROVAL":
     with col1:
         # Approval Button & Download Logic
         if st.button("✅ Approve and Download", use_container_width=True):
+            # Remember the issue's stories so later runs skip them (story_index.py).
+            session = asyncio.run(
+                runner.session_service.get_session(app_name="app", user_id=user_id, session_id=session_id)
+            )
+            if session:
+                publish_issue(session.state, st.session_state.newsletter_draft)
             st.session_state.app_state = "APPROVED"
             st.rerun()
 
@@ -179,9 +298,12 @@ elif st.session_state.app_state == "AWAITING_APPROVAL":
     # Feedback/Rework Input
     feedback = st.chat_input("Provide feedback for rework...")
     if feedback:
+        # The draft itself is not repeated here: it is already the latest newsletter
+        # in the session and is kept in the `final_newsletter_draft_markdown` state key.
         rework_prompt = (
             "Please rework the previous newsletter draft based on the following feedback: "
-            f"'{feedback}'. The original draft is:\n\n{st.session_state.newsletter_draft}"
+            f"'{feedback}'. The original draft is the latest newsletter in this conversation "
+            "(session state key `final_newsletter_draft_markdown`)."
         )
         asyncio.run(run_agent(rework_prompt))
 
@@ -198,6 +320,12 @@ elif st.session_state.app_state == "APPROVED":
         file_name=html_file["filename"],
         mime="text/html",
     )
+    st.download_button(
+        label="📥 Download Newsletter as PDF",
+        data=render_pdf(st.session_state.newsletter_draft),
+        file_name="newsletter_draft.pdf",
+        mime="application/pdf",
+    )
 
 # --- 4. Generating/Reworking States: Show a spinner ---
 elif st.session_state.app_state in ["GENERATING", "REWORKING"]:
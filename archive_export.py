@@ -0,0 +1,229 @@
+"""
+Bulk export of the newsletter archive (every issue approved in the app, as
+recorded by story_index.py) to one HTML and one PDF file per issue, plus a
+shared index.html linking them all.
+
+Usage: python archive_export.py [--out archive] [--workers 4] [--formats html pdf] [--force]
+
+Issues are rendered on a process pool. A manifest in the output directory
+records the content hash each issue was last rendered from, so a re-run only
+renders new or changed issues (and removes the files of deleted ones).
+"""
+import argparse
+import datetime
+import hashlib
+import html
+import json
+import logging
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, Iterable, List, Sequence
+
+from markdown_renderer import iter_html_bytes
+from pdf_renderer import render_pdf
+# story_index (and with it the agent layer) is imported in main() only, so
+# pool workers started with "spawn" import just the two renderers.
+
+# --- Export Configuration ---
+DEFAULT_ARCHIVE_DIR = os.getenv("NEWSLETTER_ARCHIVE_DIR", "archive")
+DEFAULT_WORKERS = int(os.getenv("NEWSLETTER_ARCHIVE_WORKERS", str(os.cpu_count() or 1)))
+FORMATS = ("html", "pdf")
+MANIFEST_NAME = "manifest.json"
+INDEX_NAME = "index.html"
+# Part of every content hash: bump it when the rendered output changes so
+# the next export re-renders the whole archive once.
+RENDER_VERSION = "1"
+
+INDEX_HEAD = """<!DOCTYPE html>
+<html>
+<head>
+    <meta charset="utf-8">
+    <title>Newsletter Archive</title>
+    <style>
+        body { font-family: Arial, sans-serif; line-height: 1.6; padding: 30px; margin: 0; }
+        h1 { color: #2C3E50; border-bottom: 2px solid #ECF0F1; padding-bottom: 5px; }
+        li { margin-bottom: 6px; }
+        .date { color: #7F8C8D; margin-right: 10px; font-variant-numeric: tabular-nums; }
+    </style>
+</head>
+<body>
+    <h1>Newsletter Archive</h1>
+"""
+
+
+def content_hash(issue: Dict[str, Any]) -> str:
+    payload = "\0".join([RENDER_VERSION, issue.get("title") or "", issue.get("markdown") or ""])
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def issue_slug(issue: Dict[str, Any]) -> str:
+    """File name stem of an issue: its publication date and id."""
+    date = datetime.datetime.fromtimestamp(issue.get("published_at") or 0, datetime.timezone.utc)
+    return f"{date:%Y-%m-%d}-{issue['id']}"
+
+
+def _write_atomic(path: str, data: bytes):
+    tmp = f"{path}.tmp{os.getpid()}"
+    with open(tmp, "wb") as fh:
+        fh.write(data)
+    os.replace(tmp, path)
+
+
+def render_issue(job: Dict[str, Any]) -> Dict[str, Any]:
+    """Renders one issue to the requested formats. Runs in a pool worker."""
+    started = time.perf_counter()
+    files, size = {}, 0
+    for fmt in job["formats"]:
+        if fmt == "html":
+            data = b"".join(iter_html_bytes(job["markdown"]))
+        else:
+            data = render_pdf(job["markdown"], title=job["title"])
+        name = f"{job['slug']}.{fmt}"
+        _write_atomic(os.path.join(job["out_dir"], name), data)
+        files[fmt] = name
+        size += len(data)
+    return {"id": job["id"], "files": files, "bytes": size, "seconds": time.perf_counter() - started}
+
+
+def render_index(entries: Sequence[Dict[str, Any]]) -> bytes:
+    """The shared index page: every issue, newest first, with links to its files."""
+    parts = [INDEX_HEAD, f"    <p>{len(entries)} issues</p>\n    <ul>\n"]
+    for entry in sorted(entries, key=lambda e: (-e["published_at"], e["slug"])):
+        date = datetime.datetime.fromtimestamp(entry["published_at"], datetime.timezone.utc)
+        links = " · ".join(
+            f'<a href="{html.escape(name, quote=True)}">{fmt.upper()}</a>' for fmt, name in sorted(entry["files"].items())
+        )
+        title = html.escape(entry["title"] or entry["slug"], quote=False)
+        parts.append(f'        <li><span class="date">{date:%Y-%m-%d}</span>{title} — {links}</li>\n')
+    parts.append("    </ul>\n</body>\n</html>\n")
+    return "".join(parts).encode("utf-8")
+
+
+# --- Exporter ---
+
+class ArchiveExporter:
+    """
+    Renders issues into out_dir on up to `workers` processes. Issues whose
+    content hash and output files match the manifest are skipped.
+    """
+
+    def __init__(self, out_dir: str = DEFAULT_ARCHIVE_DIR, workers: int = DEFAULT_WORKERS,
+                 formats: Sequence[str] = FORMATS):
+        unknown = set(formats) - set(FORMATS)
+        if unknown:
+            raise ValueError(f"Unknown export formats: {sorted(unknown)}")
+        self.out_dir = out_dir
+        self.workers = max(1, workers)
+        self.formats = tuple(formats)
+
+    @property
+    def manifest_path(self) -> str:
+        return os.path.join(self.out_dir, MANIFEST_NAME)
+
+    def load_manifest(self) -> Dict[str, Dict[str, Any]]:
+        try:
+            with open(self.manifest_path, encoding="utf-8") as fh:
+                return json.load(fh).get("issues", {})
+        except (OSError, ValueError):
+            return {}
+
+    def _up_to_date(self, entry: Dict[str, Any], digest: str) -> bool:
+        return (
+            entry.get("hash") == digest
+            and set(entry.get("files", {})) == set(self.formats)
+            and all(os.path.exists(os.path.join(self.out_dir, name)) for name in entry["files"].values())
+        )
+
+    def _render_all(self, jobs: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        if self.workers == 1 or len(jobs) <= 1:
+            return [render_issue(job) for job in jobs]
+        workers = min(self.workers, len(jobs))
+        # A few chunks per worker: fewer round trips than one issue per task,
+        # while a slow chunk still cannot hold up the others for long.
+        chunksize = max(1, len(jobs) // (workers * 4))
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            return list(pool.map(render_issue, jobs, chunksize=chunksize))
+
+    def export(self, issues: Iterable[Dict[str, Any]], force: bool = False) -> Dict[str, Any]:
+        started = time.perf_counter()
+        os.makedirs(self.out_dir, exist_ok=True)
+        previous = {} if force else self.load_manifest()
+        manifest: Dict[str, Dict[str, Any]] = {}
+        jobs = []
+        skipped = 0
+        for issue in issues:
+            if not issue.get("markdown"):
+                # Approved before the index kept each issue's markdown.
+                skipped += 1
+                continue
+            digest = content_hash(issue)
+            entry = previous.get(issue["id"], {})
+            if self._up_to_date(entry, digest):
+                manifest[issue["id"]] = entry
+                continue
+            slug = issue_slug(issue)
+            manifest[issue["id"]] = {"hash": digest, "slug": slug, "title": issue.get("title") or "",
+                                     "published_at": issue.get("published_at") or 0, "files": {}}
+            jobs.append({"id": issue["id"], "slug": slug, "title": issue.get("title") or "",
+                         "markdown": issue.get("markdown") or "", "formats": self.formats, "out_dir": self.out_dir})
+
+        removed = 0
+        for issue_id, entry in previous.items():
+            stale = set(entry.get("files", {}).values())
+            if issue_id in manifest:
+                stale -= {f"{manifest[issue_id]['slug']}.{fmt}" for fmt in self.formats}
+            for name in stale:
+                try:
+                    os.remove(os.path.join(self.out_dir, name))
+                except FileNotFoundError:
+                    pass
+            removed += issue_id not in manifest
+
+        results = self._render_all(jobs)
+        for result in results:
+            manifest[result["id"]]["files"] = result["files"]
+        _write_atomic(os.path.join(self.out_dir, INDEX_NAME), render_index(list(manifest.values())))
+        _write_atomic(self.manifest_path, json.dumps({"issues": manifest}, indent=1).encode("utf-8"))
+
+        wall = time.perf_counter() - started
+        summary = {
+            "issues": len(manifest),
+            "rendered": len(jobs),
+            "unchanged": len(manifest) - len(jobs),
+            "removed": removed,
+            "skipped": skipped,
+            "workers": self.workers,
+            "formats": list(self.formats),
+            "bytes_written": sum(result["bytes"] for result in results),
+            "render_seconds": round(sum(result["seconds"] for result in results), 3),
+            "wall_seconds": round(wall, 3),
+            "issues_per_second": round(len(jobs) / wall, 2) if wall else 0.0,
+        }
+        logging.info(f"[TRACE] Archive export: {summary}")
+        return summary
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Export every approved issue to HTML and PDF.")
+    parser.add_argument("--out", default=DEFAULT_ARCHIVE_DIR, help="Directory for the issue files, index.html and manifest.json.")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help="Render processes.")
+    parser.add_argument("--formats", nargs="+", choices=FORMATS, default=list(FORMATS))
+    parser.add_argument("--force", action="store_true", help="Re-render every issue, ignoring the manifest.")
+    args = parser.parse_args(argv)
+
+    from story_index import get_story_index
+
+    summary = ArchiveExporter(args.out, args.workers, args.formats).export(get_story_index().iter_issues(), force=args.force)
+    print(
+        f"{summary['issues']} issues: {summary['rendered']} rendered, {summary['unchanged']} unchanged, "
+        f"{summary['removed']} removed in {summary['wall_seconds']:.2f} s "
+        f"({summary['issues_per_second']:.1f} issues/s on {summary['workers']} workers)"
+    )
+    print(f"Index: {os.path.join(args.out, INDEX_NAME)}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,371 @@
+import asyncio
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import time
+from html.parser import HTMLParser
+from typing import Any, AsyncGenerator, Dict, Iterable, List, Optional
+
+import httpx
+from google.adk.agents import BaseAgent
+from google.adk.agents.invocation_context import InvocationContext
+from google.adk.events import Event, EventActions
+
+from config import config
+from story_index import attach_published_filter
+from topic_engine import normalize_url, parse_article_list
+
+# --- Full-Article Fetch Stage ---
+# Downloads the pages behind the fetched article URLs so later stages work
+# from the article text instead of search snippets:
+#   * one pooled httpx.AsyncClient per batch, bounded by `concurrency`;
+#   * a SQLite store keyed by normalized URL (ETag, Last-Modified, content
+#     hash) plus the extracted text keyed by its SHA-256, so identical pages
+#     at different URLs are stored once;
+#   * a URL checked within `fresh_seconds` is served from the store without
+#     a request; after that it is revalidated with If-None-Match /
+#     If-Modified-Since, and a 304 reuses the stored text;
+#   * main-text extraction with the standard library HTML parser: paragraph,
+#     heading and list blocks inside <article>/<main> when those hold enough
+#     text, minus navigation, scripts, link lists and short boilerplate.
+# ArticleFetchAgent runs this between content_fetcher and topic_analyzer_agent
+# and stores excerpts under ARTICLE_TEXTS_KEY for the writer.
+
+DEFAULT_ARTICLE_STORE = os.getenv(
+    "NEWSLETTER_ARTICLE_STORE", os.path.join(".newsletter_cache", "articles.sqlite3")
+)
+DEFAULT_CONCURRENCY = int(os.getenv("NEWSLETTER_ARTICLE_CONCURRENCY", "8"))
+DEFAULT_TIMEOUT = float(os.getenv("NEWSLETTER_ARTICLE_TIMEOUT", "15"))
+DEFAULT_FRESH_SECONDS = int(os.getenv("NEWSLETTER_ARTICLE_FRESH_TTL", str(6 * 3600)))
+# Characters of article text kept in session state per article.
+DEFAULT_EXCERPT_CHARS = int(os.getenv("NEWSLETTER_ARTICLE_MAX_CHARS", "4000"))
+MAX_DOWNLOAD_BYTES = 2 * 1024 * 1024
+USER_AGENT = "NewsletterAgent/1.0 (+article fetch)"
+
+# Session state key: {normalized url: {"url", "title", "text", "hash"}}.
+ARTICLE_TEXTS_KEY = "article_texts"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS pages (
+    url TEXT PRIMARY KEY,
+    etag TEXT,
+    last_modified TEXT,
+    content_hash TEXT,
+    fetched_at REAL NOT NULL,
+    checked_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS contents (
+    hash TEXT PRIMARY KEY,
+    title TEXT NOT NULL,
+    text TEXT NOT NULL,
+    created_at REAL NOT NULL
+);
+"""
+
+
+# --- Main-text extraction ---
+_SKIP_TAGS = {"script", "style", "noscript", "nav", "header", "footer", "aside", "form", "svg", "iframe", "button", "template"}
+_BLOCK_TAGS = {"p", "h1", "h2", "h3", "h4", "h5", "h6", "li", "blockquote", "pre"}
+_MAIN_TAGS = {"article", "main"}
+MIN_BLOCK_CHARS = 40
+MIN_MAIN_CHARS = 200
+MAX_LINK_SHARE = 0.5
+
+
+class _TextExtractor(HTMLParser):
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.skip_depth = 0
+        self.main_depth = 0
+        self.in_title = False
+        self.title = ""
+        self.meta_title = ""
+        self.blocks: List[Dict[str, Any]] = []
+        self.block: Optional[Dict[str, Any]] = None
+        self.link_depth = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in _SKIP_TAGS:
+            self.skip_depth += 1
+        elif tag in _MAIN_TAGS:
+            self.main_depth += 1
+        elif tag == "title":
+            self.in_title = True
+        elif tag == "meta":
+            attributes = dict(attrs)
+            if attributes.get("property") == "og:title" and attributes.get("content"):
+                self.meta_title = attributes["content"].strip()
+        elif tag == "a":
+            self.link_depth += 1
+        elif tag in _BLOCK_TAGS and not self.skip_depth:
+            self._close_block()
+            self.block = {"tag": tag, "parts": [], "link_chars": 0, "main": self.main_depth > 0}
+        elif tag == "br" and self.block is not None:
+            self.block["parts"].append(" ")
+
+    def handle_endtag(self, tag):
+        if tag in _SKIP_TAGS:
+            self.skip_depth = max(0, self.skip_depth - 1)
+        elif tag in _MAIN_TAGS:
+            self.main_depth = max(0, self.main_depth - 1)
+        elif tag == "title":
+            self.in_title = False
+        elif tag == "a":
+            self.link_depth = max(0, self.link_depth - 1)
+        elif tag in _BLOCK_TAGS:
+            self._close_block()
+
+    def handle_data(self, data):
+        if self.in_title:
+            self.title += data
+        elif self.block is not None and not self.skip_depth:
+            self.block["parts"].append(data)
+            if self.link_depth:
+                self.block["link_chars"] += len(data.strip())
+
+    def _close_block(self):
+        block, self.block = self.block, None
+        if block is None:
+            return
+        text = " ".join("".join(block["parts"]).split())
+        if text:
+            self.blocks.append({"tag": block["tag"], "text": text, "main": block["main"],
+                                "link_share": block["link_chars"] / len(text)})
+
+
+def extract_main_text(html: str) -> Dict[str, str]:
+    """The page title and its main text (blocks separated by blank lines)."""
+    parser = _TextExtractor()
+    parser.feed(html)
+    parser.close()
+    parser._close_block()
+
+    def keep(block) -> bool:
+        if block["link_share"] > MAX_LINK_SHARE:
+            return False
+        return block["tag"].startswith("h") or len(block["text"]) >= MIN_BLOCK_CHARS
+
+    blocks = [block for block in parser.blocks if keep(block)]
+    main = [block for block in blocks if block["main"]]
+    if sum(len(block["text"]) for block in main if not block["tag"].startswith("h")) >= MIN_MAIN_CHARS:
+        blocks = main
+    # Headings only count if body text follows them.
+    while blocks and blocks[-1]["tag"].startswith("h"):
+        blocks.pop()
+    title = parser.meta_title or " ".join(parser.title.split())
+    if not title:
+        title = next((block["text"] for block in parser.blocks if block["tag"] == "h1"), "")
+    return {"title": title, "text": "\n\n".join(block["text"] for block in blocks)}
+
+
+def content_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+# --- Store ---
+class ArticleStore:
+    """
+    SQLite store of fetched pages (by normalized URL, with their validators)
+    and extracted texts (by content hash).
+    """
+
+    def __init__(self, path: str = DEFAULT_ARTICLE_STORE):
+        self.path = path
+        self._lock = threading.Lock()
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(_SCHEMA)
+
+    def lookup(self, url: str) -> Optional[Dict[str, Any]]:
+        """The stored page for url (etag, last_modified, checked_at, title, text, hash), if any."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT p.etag, p.last_modified, p.checked_at, c.title, c.text, c.hash FROM pages p "
+                "JOIN contents c ON c.hash = p.content_hash WHERE p.url = ?",
+                (normalize_url(url),),
+            ).fetchone()
+        if row is None:
+            return None
+        keys = ("etag", "last_modified", "checked_at", "title", "text", "hash")
+        return dict(zip(keys, row))
+
+    def save(self, url: str, title: str, text: str, etag: Optional[str], last_modified: Optional[str]) -> str:
+        """Stores a downloaded page; returns its content hash."""
+        digest = content_hash(text)
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR IGNORE INTO contents (hash, title, text, created_at) VALUES (?, ?, ?, ?)",
+                (digest, title, text, now),
+            )
+            self._conn.execute(
+                "INSERT OR REPLACE INTO pages (url, etag, last_modified, content_hash, fetched_at, checked_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (normalize_url(url), etag, last_modified, digest, now, now),
+            )
+        return digest
+
+    def touch(self, url: str):
+        """Marks a stored page as revalidated now (after a 304)."""
+        with self._lock:
+            self._conn.execute("UPDATE pages SET checked_at = ? WHERE url = ?", (time.time(), normalize_url(url)))
+
+    def counts(self) -> Dict[str, int]:
+        with self._lock:
+            pages = self._conn.execute("SELECT COUNT(*) FROM pages").fetchone()[0]
+            contents = self._conn.execute("SELECT COUNT(*) FROM contents").fetchone()[0]
+        return {"pages": pages, "contents": contents}
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM pages")
+            self._conn.execute("DELETE FROM contents")
+
+
+# --- Fetcher ---
+class ArticleFetcher:
+    """Concurrent, conditional article downloads into an ArticleStore."""
+
+    def __init__(
+        self,
+        store: Optional[ArticleStore] = None,
+        concurrency: int = DEFAULT_CONCURRENCY,
+        timeout: float = DEFAULT_TIMEOUT,
+        fresh_seconds: int = DEFAULT_FRESH_SECONDS,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+    ):
+        self.store = store or ArticleStore()
+        self.concurrency = max(1, concurrency)
+        self.timeout = timeout
+        self.fresh_seconds = fresh_seconds
+        self.transport = transport
+        self.counters = {"store_hits": 0, "not_modified": 0, "downloaded": 0, "errors": 0, "bytes": 0}
+
+    def _client(self) -> httpx.AsyncClient:
+        return httpx.AsyncClient(
+            limits=httpx.Limits(max_connections=self.concurrency, max_keepalive_connections=self.concurrency),
+            timeout=self.timeout,
+            follow_redirects=True,
+            headers={"User-Agent": USER_AGENT, "Accept": "text/html,application/xhtml+xml"},
+            transport=self.transport,
+        )
+
+    async def _fetch_one(self, client: httpx.AsyncClient, url: str) -> Optional[Dict[str, str]]:
+        stored = self.store.lookup(url)
+        if stored and time.time() - stored["checked_at"] < self.fresh_seconds:
+            self.counters["store_hits"] += 1
+            return {"url": url, "title": stored["title"], "text": stored["text"], "hash": stored["hash"]}
+
+        headers = {}
+        if stored and stored["etag"]:
+            headers["If-None-Match"] = stored["etag"]
+        if stored and stored["last_modified"]:
+            headers["If-Modified-Since"] = stored["last_modified"]
+        try:
+            async with client.stream("GET", url, headers=headers) as response:
+                if response.status_code == 304 and stored:
+                    await response.aread()  # an unread response cannot go back to the pool
+                    self.counters["not_modified"] += 1
+                    self.store.touch(url)
+                    return {"url": url, "title": stored["title"], "text": stored["text"], "hash": stored["hash"]}
+                response.raise_for_status()
+                content_type = response.headers.get("content-type", "")
+                if "html" not in content_type and not content_type.startswith("text/"):
+                    raise ValueError(f"unsupported content type {content_type!r}")
+                body = bytearray()
+                async for chunk in response.aiter_bytes():
+                    body.extend(chunk)
+                    if len(body) > MAX_DOWNLOAD_BYTES:
+                        break
+                html = bytes(body).decode(response.encoding or "utf-8", errors="replace")
+                etag, last_modified = response.headers.get("etag"), response.headers.get("last-modified")
+        except (httpx.HTTPError, ValueError) as error:
+            self.counters["errors"] += 1
+            logging.warning(f"[TRACE] Article fetch failed for {url}: {error}")
+            if stored:
+                return {"url": url, "title": stored["title"], "text": stored["text"], "hash": stored["hash"]}
+            return None
+
+        self.counters["downloaded"] += 1
+        self.counters["bytes"] += len(body)
+        extracted = extract_main_text(html)
+        if not extracted["text"]:
+            return None
+        digest = self.store.save(url, extracted["title"], extracted["text"], etag, last_modified)
+        return {"url": url, "title": extracted["title"], "text": extracted["text"], "hash": digest}
+
+    async def fetch_all(self, urls: Iterable[str]) -> Dict[str, Dict[str, str]]:
+        """
+        Fetches every distinct URL (by normalized form) concurrently. Returns
+        {normalized url: {"url", "title", "text", "hash"}} for the pages that
+        yielded text; failures are logged and left out.
+        """
+        unique: Dict[str, str] = {}
+        for url in urls:
+            if url and url.startswith(("http://", "https://")):
+                unique.setdefault(normalize_url(url), url)
+        if not unique:
+            return {}
+        semaphore = asyncio.Semaphore(self.concurrency)
+        async with self._client() as client:
+
+            async def bounded(url: str):
+                async with semaphore:
+                    return await self._fetch_one(client, url)
+
+            results = await asyncio.gather(*(bounded(url) for url in unique.values()))
+        return {key: result for key, result in zip(unique, results) if result}
+
+
+_default_fetcher: Optional[ArticleFetcher] = None
+
+
+def get_article_fetcher() -> ArticleFetcher:
+    """Process-wide fetcher on the store at DEFAULT_ARTICLE_STORE."""
+    global _default_fetcher
+    if _default_fetcher is None:
+        _default_fetcher = ArticleFetcher()
+    return _default_fetcher
+
+
+def excerpts(pages: Dict[str, Dict[str, str]], max_chars: int = DEFAULT_EXCERPT_CHARS) -> Dict[str, Dict[str, str]]:
+    """Pages trimmed to max_chars of text, as kept in session state."""
+    return {key: {**page, "text": page["text"][:max_chars]} for key, page in pages.items()}
+
+
+# --- Pipeline stage ---
+class ArticleFetchAgent(BaseAgent):
+    """
+    Non-LLM stage that fetches the full text of the articles in
+    `raw_fetched_articles` and stores excerpts under ARTICLE_TEXTS_KEY.
+    Does nothing when config.article_fetch is off.
+    """
+
+    fetcher: Any = None
+
+    async def _run_async_impl(self, ctx: InvocationContext) -> AsyncGenerator[Event, None]:
+        if not config.article_fetch:
+            return
+        articles = parse_article_list(ctx.session.state.get("raw_fetched_articles"))
+        fetcher = self.fetcher or get_article_fetcher()
+        pages = await fetcher.fetch_all(article.get("url", "") for article in articles)
+        logging.info(f"[TRACE] Article fetch: {len(pages)}/{len(articles)} articles with text ({fetcher.counters})")
+        yield Event(
+            invocation_id=ctx.invocation_id,
+            author=self.name,
+            branch=ctx.branch,
+            actions=EventActions(state_delta={ARTICLE_TEXTS_KEY: excerpts(pages)}),
+        )
+
+
+def build_article_fetch_agent() -> ArticleFetchAgent:
+    agent = ArticleFetchAgent(
+        name="article_fetcher",
+        description="Downloads and extracts the full text of the fetched articles.",
+    )
+    # Stories an earlier issue covered are dropped before they are downloaded.
+    return attach_published_filter(agent)
@@ -0,0 +1,302 @@
+"""
+Headless batch runner: generates one newsletter per spec in a job file,
+without the Streamlit UI.
+
+Usage: python batch_cli.py jobs.json [--out batch_output] [--concurrency 4] [--timeout 600]
+
+The job file is a JSON list (or JSON Lines) of specs such as
+    {"id": "ml-platform", "audience": "ML platform engineers", "topics": ["ML", "LLM"],
+     "extra_queries": ["vector databases"], "instructions": "Keep it under 600 words."}
+Only "id" and "topics" are required; see fixtures/batch_jobs.example.json.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import re
+import sys
+import time
+import uuid
+from typing import Dict, List, Optional
+
+from google.adk.agents import BaseAgent
+from google.adk.runners import Runner
+from google.adk.sessions import InMemorySessionService
+from google.genai import types as genai_types
+
+from agent_registry import get_agent
+from markdown_renderer import iter_html_bytes
+from pipeline import DRAFT_KEY, FINAL_OUTPUT_KEY, START_STAGE_KEY
+from run_metrics import metrics_for
+from schemas import dump_payload
+from search_backends import normalize_query
+from stage_cache import STAGE_DIRECTIVES_KEY
+from topic_engine import parse_article_list
+
+# --- Batch Configuration ---
+DEFAULT_CONCURRENCY = int(os.getenv("NEWSLETTER_BATCH_CONCURRENCY", "4"))
+DEFAULT_TIMEOUT_SECONDS = float(os.getenv("NEWSLETTER_BATCH_TIMEOUT", "600"))
+APP_NAME = "newsletter_batch"
+USER_ID = "batch"
+FETCHED_KEY = "raw_fetched_articles"
+_UNSAFE_FILE_CHARS = re.compile(r"[^A-Za-z0-9._-]+")
+
+
+# --- Job Specs ---
+
+def load_jobs(path: str) -> List[Dict]:
+    """Reads a JSON list or JSON Lines file of job specs and checks ids are unique."""
+    with open(path, encoding="utf-8") as fh:
+        text = fh.read().strip()
+    if text.startswith("["):
+        jobs = json.loads(text)
+    else:
+        jobs = [json.loads(line) for line in text.splitlines() if line.strip()]
+    seen = set()
+    for index, job in enumerate(jobs):
+        job.setdefault("id", f"job_{index + 1}")
+        # Output files are named after the id, so ids must stay distinct once made file-safe.
+        if job_slug(job["id"]) in seen:
+            raise ValueError(f"Duplicate job id: {job['id']}")
+        seen.add(job_slug(job["id"]))
+        job["topics"] = list(job.get("topics") or ["AI", "ML", "LLM"])
+        job["extra_queries"] = list(job.get("extra_queries") or [])
+    return jobs
+
+
+def topic_keys(job: Dict) -> set:
+    return {normalize_query(topic) for topic in job["topics"] + job["extra_queries"]}
+
+
+def group_overlapping_jobs(jobs: List[Dict]) -> List[List[Dict]]:
+    """
+    Groups each job with a job whose topic set contains its own; each group
+    shares one fetch for the topics of its widest job. Overlap alone does not
+    merge groups, so chains of partly overlapping jobs do not collapse into
+    one fetch wider than any job needs.
+    """
+    keys = [topic_keys(job) for job in jobs]
+    anchors: List[int] = []
+    group_of: Dict[int, int] = {}
+    # Widest jobs first, so they become the anchors; ties keep file order.
+    for index in sorted(range(len(jobs)), key=lambda i: (-len(keys[i]), i)):
+        anchor = next((a for a in anchors if keys[index] <= keys[a]), None)
+        if anchor is None:
+            anchors.append(index)
+            anchor = index
+        group_of[index] = anchor
+    groups: Dict[int, List[Dict]] = {}
+    for index, job in enumerate(jobs):
+        groups.setdefault(group_of[index], []).append(job)
+    return list(groups.values())
+
+
+def job_slug(job_id) -> str:
+    """File name stem for a job id: path separators and other unsafe characters become "-"."""
+    return _UNSAFE_FILE_CHARS.sub("-", str(job_id)).strip(".-") or "job"
+
+
+def _unique(values: List[str]) -> List[str]:
+    seen, result = set(), []
+    for value in values:
+        if normalize_query(value) not in seen:
+            seen.add(normalize_query(value))
+            result.append(value)
+    return result
+
+
+def job_prompt(job: Dict) -> str:
+    prompt = f"Create today's newsletter covering {', '.join(job['topics'])}."
+    if job.get("audience"):
+        prompt += f" The audience is {job['audience']}."
+    if job["extra_queries"]:
+        prompt += f" Give extra attention to: {', '.join(job['extra_queries'])}."
+    if job.get("instructions"):
+        prompt += f" {job['instructions']}"
+    return prompt
+
+
+# Stages whose output depends on the job brief. The brief is their stage
+# directive, so it is part of their stage cache keys (jobs on the same topics
+# for different audiences never share an analysis or plan) and reaches the
+# section writers, which see no user message.
+BRIEF_STAGES = ("content_fetcher", "topic_analyzer_agent", "newsletter_planner", "newsletter_writer")
+
+
+def job_state(job: Dict, fetched=None) -> Dict:
+    """Initial pipeline session state for a job, resuming after the shared fetch when there is one."""
+    state = {STAGE_DIRECTIVES_KEY: {stage: job_prompt(job) for stage in BRIEF_STAGES}}
+    if fetched is not None:
+        state.update({FETCHED_KEY: articles_for_job(fetched, job), START_STAGE_KEY: "article_fetcher"})
+    return state
+
+
+def articles_for_job(fetched, job: Dict):
+    """Narrows a shared fetch result to the job's domains; keeps everything if nothing matches."""
+    articles = parse_article_list(fetched)
+    wanted = {topic.upper() for topic in job["topics"]}
+    selected = [a for a in articles if str(a.get("domain", "")).upper() in wanted]
+    return dump_payload(selected) if selected else fetched
+
+
+# --- Batch Runner ---
+
+class BatchRunner:
+    """
+    Runs newsletter jobs concurrently (at most `concurrency` at a time, each
+    bounded by `timeout` seconds). Jobs whose topics one job of the group
+    covers share one content_fetcher run: the first job of a group starts it, the others await
+    the same future, and every job then starts the pipeline at the analyzer.
+    """
+
+    def __init__(
+        self,
+        out_dir: str,
+        concurrency: int = DEFAULT_CONCURRENCY,
+        timeout: float = DEFAULT_TIMEOUT_SECONDS,
+        pipeline_agent: Optional[BaseAgent] = None,
+        fetcher_agent: Optional[BaseAgent] = None,
+    ):
+        self.out_dir = out_dir
+        self.concurrency = max(1, concurrency)
+        self.timeout = timeout
+        self.session_service = InMemorySessionService()
+        # The batch always uses pipeline mode, which can resume after a shared fetch.
+        pipeline_agent = pipeline_agent or get_agent("pipeline")
+        fetcher_agent = fetcher_agent or get_agent("content_fetcher")
+        self.pipeline_runner = Runner(agent=pipeline_agent, app_name=APP_NAME, session_service=self.session_service)
+        self.fetch_runner = Runner(agent=fetcher_agent, app_name=APP_NAME, session_service=self.session_service)
+        self._fetches: Dict[int, asyncio.Future] = {}
+        self.fetch_runs = 0
+
+    async def _run(self, runner: Runner, prompt: str, state: Dict) -> tuple:
+        session = await self.session_service.create_session(
+            app_name=APP_NAME, user_id=USER_ID, session_id=f"batch_{uuid.uuid4().hex}", state=state
+        )
+        invocation_id = None
+        async for event in runner.run_async(
+            user_id=USER_ID,
+            session_id=session.id,
+            new_message=genai_types.Content(role="user", parts=[genai_types.Part.from_text(text=prompt)]),
+        ):
+            invocation_id = invocation_id or event.invocation_id
+        session = await self.session_service.get_session(app_name=APP_NAME, user_id=USER_ID, session_id=session.id)
+        return session.state, invocation_id
+
+    async def _shared_fetch(self, group: List[Dict]):
+        topics = _unique([t for job in group for t in job["topics"]])
+        extra = _unique([q for job in group for q in job["extra_queries"]])
+        prompt = f"Fetch candidate articles for the domains {', '.join(topics)}."
+        if extra:
+            prompt += f" Also pass these extra_queries: {', '.join(extra)}."
+        # The directive is part of the fetcher's stage cache key, so different topic sets never collide.
+        state = {STAGE_DIRECTIVES_KEY: {"content_fetcher": prompt}}
+        self.fetch_runs += 1
+        logging.info(f"[TRACE] Batch shared fetch for {[job['id'] for job in group]}: {prompt}")
+        fetched_state, _ = await self._run(self.fetch_runner, prompt, state)
+        if not fetched_state.get(FETCHED_KEY):
+            raise RuntimeError("content_fetcher produced no articles")
+        return fetched_state[FETCHED_KEY]
+
+    def _fetch_for(self, group_id: int, group: List[Dict]) -> asyncio.Future:
+        if group_id not in self._fetches:
+            self._fetches[group_id] = asyncio.ensure_future(self._shared_fetch(group))
+        return self._fetches[group_id]
+
+    async def _run_job(self, job: Dict, group_id: int, group: List[Dict]) -> Dict:
+        state = job_state(job)
+        try:
+            # Shielded: a job timing out must not cancel the fetch other jobs wait on.
+            fetched = await asyncio.shield(self._fetch_for(group_id, group))
+            state = job_state(job, fetched)
+        except Exception as error:
+            logging.warning(f"[TRACE] Shared fetch failed for job {job['id']} ({error}); fetching on its own")
+        final_state, invocation_id = await self._run(self.pipeline_runner, job_prompt(job), state)
+        markdown = final_state.get(FINAL_OUTPUT_KEY) or final_state.get(DRAFT_KEY) or ""
+        if not markdown:
+            raise RuntimeError("pipeline produced no draft")
+        return {"markdown": markdown, "invocation_id": invocation_id}
+
+    def _write_outputs(self, job: Dict, markdown: str) -> Dict[str, str]:
+        md_path = os.path.join(self.out_dir, f"{job_slug(job['id'])}.md")
+        html_path = os.path.join(self.out_dir, f"{job_slug(job['id'])}.html")
+        with open(md_path, "w", encoding="utf-8") as fh:
+            fh.write(markdown)
+        with open(html_path, "wb") as fh:
+            for chunk in iter_html_bytes(markdown):
+                fh.write(chunk)
+        return {"markdown": md_path, "html": html_path}
+
+    async def run(self, jobs: List[Dict]) -> Dict:
+        os.makedirs(self.out_dir, exist_ok=True)
+        groups = group_overlapping_jobs(jobs)
+        group_of = {job["id"]: (gid, group) for gid, group in enumerate(groups) for job in group}
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def run_one(job: Dict) -> Dict:
+            async with semaphore:
+                started = time.perf_counter()
+                record = {"id": job["id"], "status": "ok", "error": None}
+                try:
+                    result = await asyncio.wait_for(self._run_job(job, *group_of[job["id"]]), self.timeout)
+                    record["outputs"] = self._write_outputs(job, result["markdown"])
+                    if result["invocation_id"]:
+                        metrics = metrics_for(result["invocation_id"])
+                        record.update(llm_calls=metrics.llm_calls, prompt_tokens=metrics.prompt_tokens,
+                                      output_tokens=metrics.output_tokens)
+                except asyncio.TimeoutError:
+                    record.update(status="timeout", error=f"exceeded {self.timeout:.0f}s")
+                except Exception as error:
+                    record.update(status="error", error=str(error))
+                record["seconds"] = round(time.perf_counter() - started, 3)
+                logging.info(f"[TRACE] Batch job {job['id']}: {record['status']} in {record['seconds']}s")
+                return record
+
+        started = time.perf_counter()
+        records = await asyncio.gather(*(run_one(job) for job in jobs))
+        wall = time.perf_counter() - started
+        succeeded = sum(record["status"] == "ok" for record in records)
+        summary = {
+            "jobs": len(jobs),
+            "succeeded": succeeded,
+            "failed": len(jobs) - succeeded,
+            "concurrency": self.concurrency,
+            "fetch_groups": len(groups),
+            "fetch_runs": self.fetch_runs,
+            "wall_seconds": round(wall, 3),
+            "jobs_per_minute": round(succeeded / wall * 60, 2) if wall else 0.0,
+            "job_records": records,
+        }
+        with open(os.path.join(self.out_dir, "summary.json"), "w", encoding="utf-8") as fh:
+            json.dump(summary, fh, indent=2)
+        return summary
+
+
+def print_summary(summary: Dict):
+    for record in summary["job_records"]:
+        detail = record["error"] or f"{record.get('llm_calls', 0)} LLM calls"
+        print(f"  {record['id']:<24} {record['status']:<8} {record['seconds']:8.2f} s  {detail}")
+    print(
+        f"{summary['succeeded']}/{summary['jobs']} jobs in {summary['wall_seconds']:.1f} s "
+        f"({summary['jobs_per_minute']:.2f} jobs/min, concurrency {summary['concurrency']}, "
+        f"{summary['fetch_runs']} shared fetches for {summary['jobs']} jobs)"
+    )
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Generate newsletters for every spec in a job file.")
+    parser.add_argument("jobs", help="JSON list or JSON Lines file of newsletter specs.")
+    parser.add_argument("--out", default="batch_output", help="Directory for <id>.md, <id>.html and summary.json (ids made file-safe).")
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY)
+    parser.add_argument("--timeout", type=float, default=DEFAULT_TIMEOUT_SECONDS, help="Per-job timeout in seconds.")
+    args = parser.parse_args(argv)
+
+    jobs = load_jobs(args.jobs)
+    summary = asyncio.run(BatchRunner(args.out, args.concurrency, args.timeout).run(jobs))
+    print_summary(summary)
+    return 0 if summary["failed"] == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
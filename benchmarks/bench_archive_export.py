@@ -0,0 +1,90 @@
+"""
+Throughput of the archive export (archive_export.py) against worker count.
+Builds --issues synthetic newsletter issues (title, intro and five sections
+of two paragraphs, a bullet list and a source link, ~900 words each) and, for
+each worker count in --workers, exports them to HTML and PDF into an empty
+directory. Reports wall time, issues/s and speedup over one worker. Then, on
+the last output directory, measures the incremental paths: a re-run with no
+changes, and a re-run after --changed issues were edited.
+
+Usage: python -m benchmarks.bench_archive_export [--issues 1000] [--workers 1 2 4 8] [--changed 10] [--json out.json]
+"""
+import argparse
+import json
+import logging
+import os
+import random
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from archive_export import ArchiveExporter  # noqa: E402
+
+WORDS = ("model training inference benchmark open weights research agents language reasoning release startup "
+         "chips safety compute evaluation enterprise robotics vision regulators cloud accuracy latency data "
+         "researchers engineers developers customers results scores costs energy privacy workloads").split()
+
+
+def make_issue(rng: random.Random, number: int) -> dict:
+    def sentence(words: int) -> str:
+        return " ".join(rng.choice(WORDS) for _ in range(words)).capitalize() + "."
+
+    def paragraph(sentences: int) -> str:
+        return " ".join(sentence(rng.randint(10, 18)) for _ in range(sentences))
+
+    lines = [f"# Weekly AI Digest #{number}", "", paragraph(3), ""]
+    for section in range(5):
+        lines += [f"## {sentence(5)[:-1]}", "", paragraph(4), "", paragraph(3), ""]
+        lines += [f"- **{rng.choice(WORDS).title()}:** {sentence(8)}" for _ in range(3)]
+        lines += ["", f"[Read more](https://news.example.com/{number}/{section})", ""]
+    lines += ["---", "", "*Thanks for reading.*"]
+    return {"id": f"issue{number:05d}", "title": f"Weekly AI Digest #{number}",
+            "published_at": 1_700_000_000 + number * 86400, "markdown": "\n".join(lines)}
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--issues", type=int, default=1000)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--changed", type=int, default=10, help="Issues edited before the incremental re-run.")
+    parser.add_argument("--seed", type=int, default=5)
+    parser.add_argument("--json", help="Optional path to write machine-readable results.")
+    args = parser.parse_args(argv)
+    logging.disable(logging.WARNING)
+
+    rng = random.Random(args.seed)
+    issues = [make_issue(rng, number) for number in range(args.issues)]
+    words = sum(len(issue["markdown"].split()) for issue in issues) / len(issues)
+    print(f"{args.issues} issues, ~{words:.0f} words each, {os.cpu_count()} CPUs")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        scaling = []
+        for workers in args.workers:
+            out_dir = os.path.join(tmp, f"workers_{workers}")
+            summary = ArchiveExporter(out_dir, workers).export(issues)
+            scaling.append(summary)
+        baseline = scaling[0]["wall_seconds"]
+        print(f"{'workers':>8}{'wall s':>9}{'issues/s':>10}{'speedup':>9}{'MB':>8}")
+        for row in scaling:
+            row["speedup"] = round(baseline / row["wall_seconds"], 2) if row["wall_seconds"] else 0.0
+            print(f"{row['workers']:>8}{row['wall_seconds']:>9.2f}{row['issues_per_second']:>10.1f}"
+                  f"{row['speedup']:>8.2f}x{row['bytes_written'] / 1e6:>8.1f}")
+
+        exporter = ArchiveExporter(out_dir, args.workers[-1])
+        unchanged = exporter.export(issues)
+        for issue in rng.sample(issues, args.changed):
+            issue["markdown"] += "\n\n*Correction: an earlier version misstated a benchmark score.*"
+        changed = exporter.export(issues)
+    print(f"re-run, nothing changed: {unchanged['rendered']} rendered in {unchanged['wall_seconds']:.3f} s")
+    print(f"re-run, {args.changed} issues edited: {changed['rendered']} rendered in {changed['wall_seconds']:.3f} s")
+
+    if args.json:
+        with open(args.json, "w") as fh:
+            json.dump({"benchmark": "archive_export", "issues": args.issues, "cpus": os.cpu_count(),
+                       "scaling": scaling, "incremental": {"unchanged": unchanged, "changed": changed}}, fh, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
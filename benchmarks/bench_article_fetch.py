@@ -0,0 +1,227 @@
+"""
+Benchmark for the full-article fetch stage (article_fetch.py) against a local
+HTTP server. The server generates --pages fixture article pages (navigation,
+scripts, share links, related-story lists and a footer around the article
+body), sends ETag and Last-Modified, answers conditional requests with 304
+and waits --latency seconds per request. Every 10th URL is an alias of an
+earlier page: alternately the same URL with tracking parameters (URL
+normalization) and a mirror path serving the same body (content-hash
+de-duplication). Reports for each phase the wall time, requests, 200/304
+responses, body bytes and TCP connections:
+
+  * sequential: concurrency 1, empty store;
+  * cold: --concurrency, empty store;
+  * warm: same URLs again within the freshness window (no requests expected);
+  * revalidate: freshness window 0, so every page is a conditional GET.
+
+Also reports extraction quality: the share of article paragraphs recovered
+and of boilerplate snippets leaked into the text.
+
+Usage: python -m benchmarks.bench_article_fetch [--pages 100] [--latency 0.05] [--concurrency 8] [--json out.json]
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from article_fetch import ArticleFetcher, ArticleStore  # noqa: E402
+
+LAST_MODIFIED = "Mon, 12 Oct 2026 08:00:00 GMT"
+BOILERPLATE = [
+    "Subscribe to our newsletter",
+    "Sign in to your account",
+    "Related: Ten more stories you might like",
+    "Copyright 2026 Example News Network. All rights reserved.",
+    "window.dataLayer",
+]
+
+
+def paragraphs(index: int) -> list:
+    return [
+        f"Story {index}, paragraph {n}: researchers describe how the new system changes training and evaluation, "
+        f"with results that hold across {n + 3} benchmark suites and several independent replications."
+        for n in range(6)
+    ]
+
+
+def page_html(index: int) -> str:
+    body = "".join(f"<p>{text}</p>" for text in paragraphs(index))
+    related = "".join(f'<li><a href="/article/{i}">Related: Ten more stories you might like</a></li>' for i in range(5))
+    return (
+        f"<!doctype html><html><head><title>Story {index} | Example News</title>"
+        f'<meta property="og:title" content="Story {index}: a new result">'
+        "<script>window.dataLayer = window.dataLayer || [];</script><style>p{margin:0}</style></head><body>"
+        '<header><nav><a href="/">Home</a><a href="/ai">AI</a><a href="/login">Sign in to your account</a></nav></header>'
+        f"<main><article><h1>Story {index}: a new result</h1><p>By Staff Writer</p>{body}"
+        '<p><a href="/share">Share</a> <a href="/tweet">Tweet</a></p></article>'
+        f"<aside><h3>Subscribe to our newsletter</h3></aside><ul>{related}</ul></main>"
+        "<footer><p>Copyright 2026 Example News Network. All rights reserved.</p></footer></body></html>"
+    )
+
+
+class FixtureServer:
+    """Threaded local server for the fixture pages, counting requests and connections."""
+
+    def __init__(self, latency: float):
+        self.latency = latency
+        self.lock = threading.Lock()
+        self.reset()
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                time.sleep(server.latency)
+                path = self.path.split("?")[0]
+                path = path.rstrip("/")
+                index = int(path.rsplit("/", 1)[-1]) if path.startswith(("/article/", "/mirror/")) else -1
+                if index < 0:
+                    self.send_response(404)
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+                body = page_html(index).encode("utf-8")
+                etag = '"' + hashlib.md5(body).hexdigest() + '"'
+                with server.lock:
+                    server.requests += 1
+                    server.connections.add(self.client_address)
+                if self.headers.get("If-None-Match") == etag:
+                    with server.lock:
+                        server.not_modified += 1
+                    self.send_response(304)
+                    self.send_header("ETag", etag)
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+                with server.lock:
+                    server.ok += 1
+                    server.bytes += len(body)
+                self.send_response(200)
+                self.send_header("Content-Type", "text/html; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.send_header("ETag", etag)
+                self.send_header("Last-Modified", LAST_MODIFIED)
+                self.end_headers()
+                self.wfile.write(body)
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.httpd.daemon_threads = True
+        self.base = f"http://127.0.0.1:{self.httpd.server_address[1]}"
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+
+    def reset(self):
+        self.requests = self.ok = self.not_modified = self.bytes = 0
+        self.connections = set()
+
+    def snapshot(self) -> dict:
+        return {"requests": self.requests, "ok_200": self.ok, "not_modified_304": self.not_modified,
+                "body_bytes": self.bytes, "connections": len(self.connections)}
+
+
+def fixture_urls(base: str, pages: int) -> list:
+    urls = []
+    for index in range(pages):
+        if index % 20 == 9:
+            # The same page with tracking parameters and a trailing slash.
+            urls.append(f"{base}/article/{index - 9}/?utm_source=feed&utm_medium=rss")
+        elif index % 20 == 19:
+            # Another URL serving the same article body.
+            urls.append(f"{base}/mirror/{index - 9}")
+        else:
+            urls.append(f"{base}/article/{index}")
+    return urls
+
+
+async def phase(server: FixtureServer, fetcher: ArticleFetcher, urls: list) -> tuple:
+    server.reset()
+    start = time.perf_counter()
+    pages = await fetcher.fetch_all(urls)
+    elapsed = time.perf_counter() - start
+    return pages, {"seconds": round(elapsed, 3), "pages_with_text": len(pages), **server.snapshot()}
+
+
+def extraction_quality(pages: dict) -> dict:
+    expected = found = leaked = 0
+    for page in pages.values():
+        index = int(page["url"].split("?")[0].rstrip("/").rsplit("/", 1)[-1])
+        for text in paragraphs(index):
+            expected += 1
+            found += text in page["text"]
+        leaked += sum(snippet in page["text"] for snippet in BOILERPLATE)
+    return {
+        "paragraph_recall": round(found / expected, 3) if expected else 0.0,
+        "boilerplate_leaked": leaked,
+        "boilerplate_checked": len(BOILERPLATE) * len(pages),
+    }
+
+
+async def bench(args) -> dict:
+    server = FixtureServer(args.latency)
+    urls = fixture_urls(server.base, args.pages)
+    results = {}
+
+    sequential = ArticleFetcher(store=ArticleStore(":memory:"), concurrency=1)
+    _, results["sequential"] = await phase(server, sequential, urls)
+
+    store = ArticleStore(":memory:")
+    fetcher = ArticleFetcher(store=store, concurrency=args.concurrency)
+    pages, results["cold"] = await phase(server, fetcher, urls)
+    _, results["warm"] = await phase(server, fetcher, urls)
+    fetcher.fresh_seconds = 0
+    _, results["revalidate"] = await phase(server, fetcher, urls)
+    server.httpd.shutdown()
+
+    return {
+        "urls": len(urls),
+        "phases": results,
+        "store": store.counts(),
+        "extraction": extraction_quality(pages),
+        "sample_chars": len(next(iter(pages.values()))["text"]) if pages else 0,
+        "page_chars": len(page_html(0)),
+    }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--pages", type=int, default=100)
+    parser.add_argument("--latency", type=float, default=0.05, help="Server latency per request in seconds.")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--json", help="Optional path to write machine-readable results.")
+    args = parser.parse_args(argv)
+    logging.disable(logging.WARNING)
+
+    result = asyncio.run(bench(args))
+    print(f"{result['urls']} URLs ({result['store']['pages']} distinct pages, {result['store']['contents']} stored texts)")
+    print(f"{'phase':<12}{'seconds':>9}{'requests':>10}{'200':>6}{'304':>6}{'bytes':>10}{'conns':>7}{'texts':>7}")
+    for name, row in result["phases"].items():
+        print(
+            f"{name:<12}{row['seconds']:>9.3f}{row['requests']:>10}{row['ok_200']:>6}{row['not_modified_304']:>6}"
+            f"{row['body_bytes']:>10}{row['connections']:>7}{row['pages_with_text']:>7}"
+        )
+    quality = result["extraction"]
+    print(
+        f"extraction: {quality['paragraph_recall']:.0%} of article paragraphs recovered, "
+        f"{quality['boilerplate_leaked']}/{quality['boilerplate_checked']} boilerplate snippets leaked, "
+        f"{result['sample_chars']} of {result['page_chars']} page chars kept"
+    )
+
+    if args.json:
+        with open(args.json, "w") as fh:
+            json.dump({"benchmark": "article_fetch", **result}, fh, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,137 @@
+"""
+End-to-end tail latency of pipeline runs with and without hedged model calls.
+Every model is a ReplayLlm whose recorded latencies are multiplied by a
+Pareto(--tail-alpha) draw, i.e. most calls are quick and a few are very slow,
+and every model is wrapped in a CallPolicy (call_policy.py). For each mode,
+--warmup runs teach the policy each stage's p95 time to first response, then
+--runs newsletter runs are measured. Reports p50/p95/p99/max end-to-end
+latency, extra model calls caused by hedging, hedges launched and won.
+
+Usage: python -m benchmarks.bench_call_policy [--runs 200] [--tail-alpha 1.5] [--time-scale 0.01] [--json out.json]
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import sys
+import time
+import uuid
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# Offline search and no stage cache, so concurrent runs never share stage outputs.
+os.environ.setdefault("NEWSLETTER_SEARCH_BACKEND", "fixture")
+os.environ.setdefault("NEWSLETTER_SEARCH_CACHE_ENABLED", "0")
+# Fixture article URLs are not reachable; the writer works from the snippets.
+os.environ.setdefault("NEWSLETTER_ARTICLE_FETCH", "0")
+os.environ.setdefault("NEWSLETTER_STAGE_CACHE", ":memory:")
+# Stories approved locally must not change which fixture articles reach the analyzer.
+os.environ.setdefault("NEWSLETTER_STORY_INDEX", ":memory:")
+os.environ.setdefault("NEWSLETTER_STAGE_CACHE_MAX_ENTRIES", "0")
+
+from google.adk.runners import Runner  # noqa: E402
+from google.adk.sessions import InMemorySessionService  # noqa: E402
+from google.genai import types as genai_types  # noqa: E402
+
+from call_policy import CallPolicy, install_call_policy  # noqa: E402
+from pipeline import FINAL_OUTPUT_KEY, build_pipeline_agent  # noqa: E402
+from replay_llm import DEFAULT_RECORDING_PATH, ReplayScript, install_replay_llm  # noqa: E402
+
+PROMPT = "Create today's newsletter."
+
+
+def _percentiles(samples: list) -> dict:
+    ordered = sorted(samples)
+    pick = lambda q: round(ordered[min(len(ordered) - 1, int(q * len(ordered)))], 3)  # noqa: E731
+    return {"p50_s": pick(0.50), "p95_s": pick(0.95), "p99_s": pick(0.99), "max_s": round(ordered[-1], 3)}
+
+
+async def one_run(runner: Runner) -> float:
+    session = await runner.session_service.create_session(app_name="bench", user_id="bench", session_id=uuid.uuid4().hex)
+    started = time.perf_counter()
+    async for _ in runner.run_async(
+        user_id="bench",
+        session_id=session.id,
+        new_message=genai_types.Content(role="user", parts=[genai_types.Part.from_text(text=PROMPT)]),
+    ):
+        pass
+    elapsed = time.perf_counter() - started
+    session = await runner.session_service.get_session(app_name="bench", user_id="bench", session_id=session.id)
+    if not session.state.get(FINAL_OUTPUT_KEY):
+        raise RuntimeError("run finished without a draft")
+    return elapsed
+
+
+async def run_many(runner: Runner, count: int, concurrency: int) -> list:
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def bounded():
+        async with semaphore:
+            return await one_run(runner)
+
+    return await asyncio.gather(*(bounded() for _ in range(count)))
+
+
+async def bench_mode(hedge: bool, args) -> dict:
+    root = build_pipeline_agent()
+    models = install_replay_llm(
+        root, ReplayScript.load(args.recording), time_scale=args.time_scale, tail_alpha=args.tail_alpha, seed=args.seed,
+    )
+    policy = CallPolicy(hedge=hedge, seed=args.seed)
+    install_call_policy(root, policy)
+    runner = Runner(agent=root, app_name="bench", session_service=InMemorySessionService())
+
+    await run_many(runner, args.warmup, args.concurrency)
+    calls_before = sum(model.calls for model in models.values())
+    policy_before = policy.stats()
+    latencies = await run_many(runner, args.runs, args.concurrency)
+    model_calls = sum(model.calls for model in models.values()) - calls_before
+
+    stages = {}
+    for stage, row in policy.stats().items():
+        before = policy_before.get(stage, {})
+        stages[stage] = {key: row[key] - before.get(key, 0) for key in ("calls", "hedges", "hedge_wins", "retries")}
+        stages[stage]["hedge_after_s"] = row["hedge_after_s"]
+    policy_calls = sum(row["calls"] for row in stages.values())
+    return {
+        "hedge": hedge,
+        **_percentiles(latencies),
+        "mean_s": round(sum(latencies) / len(latencies), 3),
+        "model_calls": model_calls,
+        "extra_calls_percent": round((model_calls / policy_calls - 1) * 100, 1) if policy_calls else 0.0,
+        "hedges": sum(row["hedges"] for row in stages.values()),
+        "hedge_wins": sum(row["hedge_wins"] for row in stages.values()),
+        "stages": stages,
+    }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--recording", default=DEFAULT_RECORDING_PATH)
+    parser.add_argument("--runs", type=int, default=200)
+    parser.add_argument("--warmup", type=int, default=20)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--tail-alpha", type=float, default=1.5, help="Pareto shape; smaller is heavier-tailed.")
+    parser.add_argument("--time-scale", type=float, default=0.01)
+    parser.add_argument("--seed", type=int, default=11)
+    parser.add_argument("--json", help="Optional path to write machine-readable results.")
+    args = parser.parse_args(argv)
+    logging.disable(logging.WARNING)
+
+    results = [asyncio.run(bench_mode(hedge, args)) for hedge in (False, True)]
+    print(f"{'mode':<12}{'p50 s':>8}{'p95 s':>8}{'p99 s':>8}{'max s':>8}{'mean s':>8}{'extra calls':>13}{'hedges':>8}{'won':>6}")
+    for row in results:
+        print(
+            f"{'hedged' if row['hedge'] else 'no hedging':<12}{row['p50_s']:>8.3f}{row['p95_s']:>8.3f}{row['p99_s']:>8.3f}"
+            f"{row['max_s']:>8.3f}{row['mean_s']:>8.3f}{row['extra_calls_percent']:>12.1f}%{row['hedges']:>8}{row['hedge_wins']:>6}"
+        )
+
+    if args.json:
+        with open(args.json, "w") as fh:
+            json.dump({"benchmark": "call_policy", "runs": args.runs, "tail_alpha": args.tail_alpha,
+                       "time_scale": args.time_scale, "results": results}, fh, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
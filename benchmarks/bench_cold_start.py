@@ -0,0 +1,131 @@
+"""
+Cold-start benchmark for the agent layer. Each sample is a fresh Python
+process that imports the ADK framework, then `main_agent` (the agent layer),
+then builds the root agent through the registry, timing each step.
+
+The agent layer's cost (import + first build, framework excluded) is checked
+against a budget and, optionally, against a previous result; the exit code is
+1 on a regression, so this can gate CI. Importing the agent layer must also
+not pull in Streamlit or scikit-learn.
+
+Usage: python -m benchmarks.bench_cold_start [--runs 5] [--budget-ms 250] [--baseline old.json] [--json out.json]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_BUDGET_MS = float(os.getenv("NEWSLETTER_COLD_START_BUDGET_MS", "250"))
+# Modules the agent layer must not import eagerly.
+FORBIDDEN_MODULES = ("streamlit", "sklearn")
+
+SAMPLE = r"""
+import json, sys, time, warnings
+warnings.simplefilter("ignore")
+t0 = time.perf_counter()
+import google.adk.agents, google.adk.runners, google.genai
+t1 = time.perf_counter()
+import main_agent
+t2 = time.perf_counter()
+loaded = [name for name in FORBIDDEN if name in sys.modules]
+from agent_registry import get_root_agent
+get_root_agent()
+t3 = time.perf_counter()
+print(json.dumps({
+    "framework_ms": (t1 - t0) * 1000,
+    "agent_import_ms": (t2 - t1) * 1000,
+    "first_build_ms": (t3 - t2) * 1000,
+    "forbidden_loaded": loaded,
+}))
+"""
+
+
+def run_sample(mode: str) -> dict:
+    env = dict(os.environ, NEWSLETTER_EXECUTION_MODE=mode, NEWSLETTER_SPANS_PATH="")
+    code = f"FORBIDDEN = {FORBIDDEN_MODULES!r}\n" + SAMPLE
+    completed = subprocess.run(
+        [sys.executable, "-c", code], cwd=ROOT, env=env, capture_output=True, text=True, check=True
+    )
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def slowest_modules(top: int) -> list:
+    """Cumulative import time of this repository's own modules (python -X importtime), framework excluded."""
+    code = "import google.adk.agents, google.adk.runners, google.genai; import main_agent"
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-W", "ignore", "-c", code],
+        cwd=ROOT, capture_output=True, text=True, check=True,
+    )
+    local = {name[:-3] for name in os.listdir(ROOT) if name.endswith(".py")} | {"sub_agents"}
+    rows = []
+    for line in completed.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|")
+        name = name.strip()
+        if name.split(".")[0] in local and cumulative.strip().isdigit():
+            rows.append({"module": name, "cumulative_ms": round(int(cumulative) / 1000, 1)})
+    return sorted(rows, key=lambda row: -row["cumulative_ms"])[:top]
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--warmup", type=int, default=1, help="Untimed runs to warm the OS file cache.")
+    parser.add_argument("--mode", default="orchestrator", choices=["orchestrator", "pipeline"])
+    parser.add_argument("--budget-ms", type=float, default=DEFAULT_BUDGET_MS,
+                        help="Maximum median agent-layer cold start (import + first build).")
+    parser.add_argument("--baseline", help="Previous --json output; fail if slower by more than --max-regression.")
+    parser.add_argument("--max-regression", type=float, default=0.25)
+    parser.add_argument("--top", type=int, default=8, help="Slowest local modules to list.")
+    parser.add_argument("--json", help="Optional path to write machine-readable results.")
+    args = parser.parse_args(argv)
+
+    for _ in range(args.warmup):
+        run_sample(args.mode)
+    samples = [run_sample(args.mode) for _ in range(args.runs)]
+    medians = {
+        key: round(statistics.median(sample[key] for sample in samples), 1)
+        for key in ("framework_ms", "agent_import_ms", "first_build_ms")
+    }
+    medians["agent_layer_ms"] = round(medians["agent_import_ms"] + medians["first_build_ms"], 1)
+    forbidden = sorted({name for sample in samples for name in sample["forbidden_loaded"]})
+
+    print(
+        f"framework {medians['framework_ms']:.0f} ms | agent layer {medians['agent_layer_ms']:.0f} ms "
+        f"(import {medians['agent_import_ms']:.0f} ms + first build {medians['first_build_ms']:.0f} ms), "
+        f"median of {args.runs}, {args.mode} mode"
+    )
+    modules = slowest_modules(args.top)
+    for row in modules:
+        print(f"  {row['module']:<40} {row['cumulative_ms']:8.1f} ms")
+
+    failures = []
+    if medians["agent_layer_ms"] > args.budget_ms:
+        failures.append(f"agent layer {medians['agent_layer_ms']:.0f} ms exceeds budget {args.budget_ms:.0f} ms")
+    if forbidden:
+        failures.append(f"importing main_agent loaded {', '.join(forbidden)}")
+    if args.baseline:
+        with open(args.baseline) as fh:
+            previous = json.load(fh)["results"]["agent_layer_ms"]
+        if medians["agent_layer_ms"] > previous * (1 + args.max_regression):
+            failures.append(
+                f"agent layer {medians['agent_layer_ms']:.0f} ms is more than "
+                f"{args.max_regression:.0%} slower than the baseline ({previous:.0f} ms)"
+            )
+
+    if args.json:
+        with open(args.json, "w") as fh:
+            json.dump({"benchmark": "cold_start", "mode": args.mode, "runs": args.runs,
+                       "budget_ms": args.budget_ms, "results": medians, "slowest_modules": modules,
+                       "failures": failures}, fh, indent=2)
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
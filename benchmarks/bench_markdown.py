@@ -0,0 +1,113 @@
+"""
+Benchmark for the streaming Markdown renderer on multi-megabyte archive
+documents. Reports throughput (should stay flat as size grows, i.e. linear
+time) and peak traced memory while streaming (should stay flat, i.e. bounded
+by the chunk size rather than the document).
+
+Usage: python -m benchmarks.bench_markdown [--sizes-mb 1 2 4 8] [--json out.json]
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from markdown_renderer import iter_html_bytes  # noqa: E402
+
+ISSUE_TEMPLATE = """## Issue {n}: Weekly AI and Tech Digest
+
+Welcome to **issue {n}**. This week covers *model releases*, `inference` costs and more.
+
+### Article {n}.1 - A [new model](https://example.com/articles/{n}/1) beats the benchmark
+
+The lab reported gains on reasoning tasks, with **2x** lower latency and _fewer_ tokens.
+It also released the weights under a permissive license.
+
+- Key point one with a [link](https://example.com/{n})
+- Key point two with `code`
+- Key point three
+
+1. First step
+2. Second step
+
+> Quote from the announcement about snake_case_names and 2 * 3.
+
+```python
+print("issue {n}")
+```
+
+---
+
+"""
+
+
+def write_archive(path: str, size_bytes: int) -> int:
+    written = n = 0
+    with open(path, "w", encoding="utf-8") as fh:
+        while written < size_bytes:
+            block = ISSUE_TEMPLATE.format(n=n)
+            fh.write(block)
+            written += len(block.encode("utf-8"))
+            n += 1
+    return written
+
+
+def _render(path: str) -> int:
+    out_bytes = 0
+    with open(path, encoding="utf-8") as fh, open(os.devnull, "wb") as sink:
+        for chunk in iter_html_bytes(fh):
+            sink.write(chunk)
+            out_bytes += len(chunk)
+    return out_bytes
+
+
+def bench_one(path: str) -> dict:
+    # Timing and memory are measured in separate passes; tracemalloc itself
+    # slows allocation-heavy code several-fold.
+    start = time.perf_counter()
+    out_bytes = _render(path)
+    elapsed = time.perf_counter() - start
+    tracemalloc.start()
+    _render(path)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {"seconds": elapsed, "output_bytes": out_bytes, "peak_traced_bytes": peak}
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes-mb", type=float, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--json", help="Optional path to write machine-readable results.")
+    args = parser.parse_args(argv)
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for size_mb in args.sizes_mb:
+            path = os.path.join(tmp, f"archive_{size_mb}.md")
+            size = write_archive(path, int(size_mb * 1024 * 1024))
+            stats = bench_one(path)
+            stats.update(input_bytes=size, mb_per_second=size / 1024 / 1024 / stats["seconds"])
+            results.append(stats)
+            print(
+                f"{size / 1024 / 1024:7.2f} MB  {stats['seconds']:7.3f} s  "
+                f"{stats['mb_per_second']:6.2f} MB/s  peak {stats['peak_traced_bytes'] / 1024:8.1f} KiB"
+            )
+
+    # Linear time: throughput of the largest document within 2x of the smallest.
+    # Bounded memory: peak does not grow with the input.
+    linear = results[-1]["mb_per_second"] >= results[0]["mb_per_second"] / 2
+    bounded = results[-1]["peak_traced_bytes"] <= 2 * results[0]["peak_traced_bytes"] + 256 * 1024
+    print(f"linear_time={linear} bounded_memory={bounded}")
+    if args.json:
+        with open(args.json, "w") as fh:
+            json.dump({"benchmark": "markdown_render", "results": results,
+                       "linear_time": linear, "bounded_memory": bounded}, fh, indent=2)
+    return 0 if linear and bounded else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,186 @@
+"""
+Benchmark for per-stage model routing (model_router.py) against stub models.
+Three ReplayLlm tiers stand in for flash-lite, flash and pro with their own
+latency (in model seconds, multiplied by --time-scale) and inject faults.
+Each scenario sends --calls requests per stage (fetcher, planner, writer) and
+reports failed calls, fallbacks, latency percentiles, modelled cost and the
+profiles the router learned:
+
+  * single_model: every stage on the standard tier, no fallback (as before);
+  * routed: each stage on its own tier chain;
+  * rate_limited: the fast and standard tiers answer 429 to --error-rate
+    of calls, with and without routing, and with the writer escalating to
+    the strong tier (the opt-in chain standard>strong>fast);
+  * stalls: the fast tier hangs on --stall-rate of calls (past the timeout);
+  * slowdown: the fast tier becomes --slowdown x slower halfway through, and
+    the router moves its stages to the next tier once it notices.
+
+Usage: python -m benchmarks.bench_model_router [--calls 200] [--time-scale 0.02] [--json out.json]
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from google.adk.models.llm_request import LlmRequest  # noqa: E402
+from google.genai import types as genai_types  # noqa: E402
+
+from model_router import ModelRouter  # noqa: E402
+from replay_llm import ReplayLlm, ReplayScript  # noqa: E402
+
+STAGES = ["content_fetcher", "newsletter_planner", "newsletter_writer"]
+STAGE_TIERS = {
+    "content_fetcher": ["fast", "standard"],
+    "newsletter_planner": ["fast", "standard"],
+    "newsletter_writer": ["standard", "fast"],
+}
+# Opt-in escalation to the strong tier, for the cost comparison.
+ESCALATING_STAGE_TIERS = dict(STAGE_TIERS, newsletter_writer=["standard", "strong", "fast"])
+# tier -> (model, latency in model seconds, output tokens)
+TIERS = {
+    "fast": ("gemini-2.5-flash-lite", 1.5, 600),
+    "standard": ("gemini-2.5-flash", 4.0, 900),
+    "strong": ("gemini-2.5-pro", 9.0, 1100),
+}
+
+
+def _percentiles(samples: list) -> dict:
+    ordered = sorted(samples)
+    if not ordered:
+        return {"p50_ms": 0.0, "p95_ms": 0.0, "p99_ms": 0.0}
+    pick = lambda q: round(ordered[min(len(ordered) - 1, int(q * len(ordered)))] * 1000, 1)  # noqa: E731
+    return {"p50_ms": pick(0.50), "p95_ms": pick(0.95), "p99_ms": pick(0.99)}
+
+
+def build_tiers(time_scale: float, seed: int, **faults) -> dict:
+    """Stub model per tier; faults maps a tier name to ReplayLlm fault options."""
+    script = ReplayScript(default_text="OK")
+    return {
+        tier: ReplayLlm(
+            model=model, script=script, agent_name=tier, latency=latency, jitter=latency * 0.3,
+            time_scale=time_scale, prompt_tokens=2000, output_tokens=output, stream_chunks=1,
+            seed=seed + index, **faults.get(tier, {}),
+        )
+        for index, (tier, (model, latency, output)) in enumerate(TIERS.items())
+    }
+
+
+async def run_calls(router: ModelRouter, calls: int, concurrency: int, on_half=None) -> dict:
+    """calls requests per stage, concurrency at a time; returns per-stage latencies and failures."""
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = {stage: [] for stage in STAGES}
+    failures = {stage: 0 for stage in STAGES}
+    done = 0
+
+    async def one(stage: str):
+        nonlocal done
+        async with semaphore:
+            request = LlmRequest(contents=[genai_types.Content(role="user", parts=[genai_types.Part(text="Write it.")])])
+            start = time.perf_counter()
+            try:
+                async for _ in router.generate(stage, request):
+                    pass
+                latencies[stage].append(time.perf_counter() - start)
+            except Exception:
+                failures[stage] += 1
+            done += 1
+            if on_half and done == calls * len(STAGES) // 2:
+                on_half()
+
+    # Interleave the stages, as concurrent newsletter runs would.
+    await asyncio.gather(*(one(stage) for _ in range(calls) for stage in STAGES))
+    return {"latencies": latencies, "failures": failures}
+
+
+def summarize(name: str, router: ModelRouter, outcome: dict, wall: float) -> dict:
+    profiles = router.snapshot()
+    stages = {}
+    for stage in STAGES:
+        rows = [row for row in profiles if row["stage"] == stage]
+        stages[stage] = {
+            "failed": outcome["failures"][stage],
+            **_percentiles(outcome["latencies"][stage]),
+            "calls_by_tier": {row["tier"]: row["calls"] for row in rows},
+            "fallbacks": sum(row["served_as_fallback"] for row in rows),
+        }
+    return {
+        "scenario": name,
+        "wall_seconds": round(wall, 3),
+        "failed_calls": sum(outcome["failures"].values()),
+        "cost_usd": round(sum(row["cost_usd"] for row in profiles), 4),
+        "stages": stages,
+        "profiles": profiles,
+    }
+
+
+async def scenario(name: str, args, single_model: bool = False, faults=None, slowdown: float = 0.0,
+                   stage_tiers=None) -> dict:
+    tiers = build_tiers(args.time_scale, args.seed, **(faults or {}))
+    stage_tiers = {stage: ["standard"] for stage in STAGES} if single_model else stage_tiers or STAGE_TIERS
+    router = ModelRouter(
+        tiers=tiers, stage_tiers=stage_tiers,
+        timeout=args.timeout * args.time_scale, cooldown=args.cooldown * args.time_scale,
+    )
+
+    def slow_down():
+        tiers["fast"].latency *= slowdown
+
+    start = time.perf_counter()
+    outcome = await run_calls(router, args.calls, args.concurrency, on_half=slow_down if slowdown else None)
+    return summarize(name, router, outcome, time.perf_counter() - start)
+
+
+async def bench(args) -> list:
+    rate_limit = {tier: {"error_rate": args.error_rate, "error_code": 429} for tier in ("fast", "standard")}
+    stalls = {"fast": {"stall_rate": args.stall_rate, "stall_latency": args.timeout * 4}}
+    return [
+        await scenario("single_model", args, single_model=True),
+        await scenario("routed", args),
+        await scenario("rate_limited_single_model", args, single_model=True, faults=rate_limit),
+        await scenario("rate_limited_routed", args, faults=rate_limit),
+        await scenario("rate_limited_escalating", args, faults=rate_limit, stage_tiers=ESCALATING_STAGE_TIERS),
+        await scenario("stalls_routed", args, faults=stalls),
+        await scenario("slowdown_routed", args, slowdown=args.slowdown),
+    ]
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--calls", type=int, default=200, help="Requests per stage and scenario.")
+    parser.add_argument("--concurrency", type=int, default=24)
+    parser.add_argument("--time-scale", type=float, default=0.02, help="Real seconds per model second.")
+    parser.add_argument("--timeout", type=float, default=20.0, help="First-response timeout in model seconds.")
+    parser.add_argument("--cooldown", type=float, default=30.0, help="Cooldown in model seconds.")
+    parser.add_argument("--error-rate", type=float, default=0.3)
+    parser.add_argument("--stall-rate", type=float, default=0.1)
+    parser.add_argument("--slowdown", type=float, default=5.0)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--json", help="Optional path to write machine-readable results.")
+    args = parser.parse_args(argv)
+    logging.disable(logging.WARNING)
+
+    results = asyncio.run(bench(args))
+    print(f"{'scenario':<27}{'failed':>7}{'cost $':>9}  per stage: p50 / p95 ms, calls by tier, fallbacks")
+    for result in results:
+        print(f"{result['scenario']:<27}{result['failed_calls']:>7}{result['cost_usd']:>9.3f}")
+        for stage, row in result["stages"].items():
+            tiers = " ".join(f"{tier}={calls}" for tier, calls in row["calls_by_tier"].items())
+            print(
+                f"    {stage:<20}{row['p50_ms']:>8.0f} /{row['p95_ms']:>6.0f}  {tiers:<34}"
+                f"fallbacks={row['fallbacks']} failed={row['failed']}"
+            )
+
+    if args.json:
+        with open(args.json, "w") as fh:
+            json.dump({"benchmark": "model_router", "calls": args.calls, "time_scale": args.time_scale,
+                       "results": results}, fh, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,124 @@
+"""
+Benchmark for typed stage payloads (schemas.py). Takes the recorded fetcher,
+analyzer and planner answers from fixtures/llm_replay.jsonl (pretty-printed,
+fenced JSON, as the models used to emit it) and reports:
+
+  * hand-off size before and after compaction (characters and ~tokens);
+  * parse time of json.loads vs the tolerant parser on clean, fenced and
+    malformed text;
+  * how many corrupted variants (trailing commas, missing commas, comments,
+    single quotes, Python literals, prose around the JSON, truncation) are
+    recovered with every record intact.
+
+Usage: python -m benchmarks.bench_payloads [--repeats 2000] [--json out.json]
+"""
+import argparse
+import json
+import os
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from replay_llm import DEFAULT_RECORDING_PATH, ReplayScript  # noqa: E402
+from schemas import (  # noqa: E402
+    compact_articles, compact_outline, compact_topics, load_outline, load_records, parse_json_payload, strip_fences,
+)
+
+STAGES = {
+    "content_fetcher": compact_articles,
+    "topic_analyzer_agent": compact_topics,
+    "newsletter_planner": compact_outline,
+}
+
+
+def corrupt(text: str) -> dict:
+    """Typical model mistakes applied to a fenced, pretty-printed JSON answer."""
+    body = strip_fences(text)
+    return {
+        "trailing_commas": re.sub(r"(\"|\d)(\s*\n\s*[}\]])", r"\1,\2", body),
+        "missing_commas": re.sub(r'",(\s*\n\s*")', r'"\1', body),
+        "comments": body.replace("\n", " // note\n", 3),
+        "single_quotes": body.replace("'", "").replace('"', "'"),
+        "python_literals": body.replace("}", ', "extra": None, "flag": True}', 1),
+        "prose": f"Sure! Here is the result:\n{text}\nLet me know if you need changes.",
+        "truncated": body[: int(len(body) * 0.97)],
+    }
+
+
+def record_count(stage: str, payload) -> int:
+    if stage == "newsletter_planner":
+        plan = load_outline(payload)
+        return len(plan.articles) if plan else 0
+    return len(load_records(payload))
+
+
+def time_per_call(func, value, repeats: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeats):
+        func(value)
+    return (time.perf_counter() - start) / repeats * 1e6
+
+
+def _strict(text: str):
+    try:
+        return json.loads(text)
+    except json.JSONDecodeError:
+        return None
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--recording", default=DEFAULT_RECORDING_PATH)
+    parser.add_argument("--repeats", type=int, default=2000)
+    parser.add_argument("--json", help="Optional path to write machine-readable results.")
+    args = parser.parse_args(argv)
+
+    script = ReplayScript.load(args.recording)
+    results = {}
+    for stage, compact in STAGES.items():
+        raw = script.step(stage, 99)["text"]
+        compacted = compact(raw)
+        expected = record_count(stage, raw)
+        variants = corrupt(raw)
+        recovered = {name: record_count(stage, text) == expected for name, text in variants.items()}
+        body = strip_fences(raw)
+        results[stage] = {
+            "records": expected,
+            "raw_chars": len(raw),
+            "compact_chars": len(compacted),
+            "raw_tokens": len(raw) // 4,
+            "compact_tokens": len(compacted) // 4,
+            "saved_percent": round((1 - len(compacted) / len(raw)) * 100, 1),
+            "json_loads_us": round(time_per_call(_strict, body, args.repeats), 2),
+            "tolerant_clean_us": round(time_per_call(parse_json_payload, compacted, args.repeats), 2),
+            "tolerant_fenced_us": round(time_per_call(parse_json_payload, raw, args.repeats), 2),
+            "tolerant_repair_us": round(
+                time_per_call(parse_json_payload, variants["missing_commas"], max(1, args.repeats // 10)), 2
+            ),
+            "strict_parse_failures": sum(_strict(text) is None for text in variants.values()),
+            "recovered": recovered,
+        }
+
+    print(f"{'stage':<22}{'chars':>14}{'~tokens':>14}{'saved':>8}{'loads':>9}{'fenced':>9}{'repair':>9}  recovered")
+    for stage, row in results.items():
+        ok = sum(row["recovered"].values())
+        print(
+            f"{stage:<22}{row['raw_chars']:>6} -> {row['compact_chars']:<5}{row['raw_tokens']:>6} -> "
+            f"{row['compact_tokens']:<5}{row['saved_percent']:>7.1f}%{row['json_loads_us']:>7.0f}us"
+            f"{row['tolerant_fenced_us']:>7.0f}us{row['tolerant_repair_us']:>7.0f}us  "
+            f"{ok}/{len(row['recovered'])} (json.loads: {len(row['recovered']) - row['strict_parse_failures']})"
+        )
+        failed = [name for name, good in row["recovered"].items() if not good]
+        if failed:
+            print(f"  not recovered: {', '.join(failed)}")
+
+    if args.json:
+        with open(args.json, "w") as fh:
+            json.dump({"benchmark": "payloads", "repeats": args.repeats, "results": results}, fh, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
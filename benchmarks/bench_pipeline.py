@@ -0,0 +1,227 @@
+"""
+Offline end-to-end benchmark of the pipeline-mode agent tree. Every model is
+replaced by a ReplayLlm answering from fixtures/llm_replay.jsonl (recorded
+latencies scaled by --time-scale) and search runs against the fixture corpus,
+so no network access or API key is needed.
+
+Measures, for a first run and a rework run: end-to-end and per-stage latency,
+LLM and tool call counts, prompt/output tokens and context tokens before and
+after compaction; plus the cost of markdown_to_html on the resulting draft.
+With --context-mode scoped, each stage's input tokens are also reported as
+they would be with the full history (before) and as actually sent (after).
+Results are written as JSON (with the git commit) and can be compared with a
+previous result file.
+
+Usage: python -m benchmarks.bench_pipeline [--iterations 3] [--time-scale 0.05] [--context-mode scoped]
+       [--json out.json] [--compare old.json]
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import statistics
+import subprocess
+import sys
+import time
+import uuid
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# Offline search and a throwaway stage cache; must be set before the modules read them.
+os.environ.setdefault("NEWSLETTER_SEARCH_BACKEND", "fixture")
+os.environ.setdefault("NEWSLETTER_SEARCH_CACHE_ENABLED", "0")
+# Fixture article URLs are not reachable; the writer works from the snippets.
+os.environ.setdefault("NEWSLETTER_ARTICLE_FETCH", "0")
+os.environ.setdefault("NEWSLETTER_STAGE_CACHE", ":memory:")
+# Stories approved locally must not change which fixture articles reach the analyzer.
+os.environ.setdefault("NEWSLETTER_STORY_INDEX", ":memory:")
+
+from google.adk.runners import Runner  # noqa: E402
+from google.adk.sessions import InMemorySessionService  # noqa: E402
+from google.genai import types as genai_types  # noqa: E402
+
+from config import config  # noqa: E402
+from context_compaction import attach_context_compaction  # noqa: E402
+from instrumentation import SpanCollector, attach_instrumentation  # noqa: E402
+from pipeline import FINAL_OUTPUT_KEY, build_pipeline_agent  # noqa: E402
+from replay_llm import DEFAULT_RECORDING_PATH, ReplayScript, install_replay_llm  # noqa: E402
+from run_metrics import instrument_agent_tree, metrics_for  # noqa: E402
+from stage_cache import get_stage_cache  # noqa: E402
+from tools import markdown_to_html  # noqa: E402
+
+PROMPTS = {
+    "initial": "Create today's newsletter.",
+    "rework": "Please rework the previous newsletter draft based on the following feedback: 'Make it shorter.'",
+}
+
+
+def build_root(recording: str, time_scale: float, jitter: float, spans: SpanCollector):
+    root = build_pipeline_agent()
+    instrument_agent_tree(root)
+    attach_instrumentation(root, spans)
+    attach_context_compaction(root)
+    install_replay_llm(root, ReplayScript.load(recording), time_scale=time_scale, jitter=jitter)
+    return root
+
+
+async def run_session(runner: Runner, spans: SpanCollector, stages: list) -> dict:
+    session_service = runner.session_service
+    session = await session_service.create_session(app_name="bench", user_id="bench", session_id=uuid.uuid4().hex)
+    runs = {}
+    for label, prompt in PROMPTS.items():
+        invocation_id = None
+        started = time.perf_counter()
+        async for event in runner.run_async(
+            user_id="bench",
+            session_id=session.id,
+            new_message=genai_types.Content(role="user", parts=[genai_types.Part.from_text(text=prompt)]),
+        ):
+            invocation_id = invocation_id or event.invocation_id
+        elapsed = time.perf_counter() - started
+        metrics = metrics_for(invocation_id)
+        table = {row["stage"]: row for row in spans.stage_table(invocation_id) if row["stage"] in stages}
+        runs[label] = {
+            "seconds": elapsed,
+            "stage_seconds": {stage: row["wall_s"] for stage, row in table.items()},
+            "stage_ttft_seconds": {stage: row["ttft_s"] or 0.0 for stage, row in table.items()},
+            "llm_calls": metrics.llm_calls,
+            "tool_calls": metrics.tool_calls,
+            "prompt_tokens": metrics.prompt_tokens,
+            "output_tokens": metrics.output_tokens,
+            "context_tokens_before": metrics.context_tokens_before,
+            "context_tokens_after": metrics.context_tokens_after,
+            "llm_calls_by_agent": dict(metrics.llm_calls_by_agent),
+            "stage_input_tokens_before": {a: row["before"] for a, row in metrics.stage_input_tokens.items()},
+            "stage_input_tokens_after": {a: row["after"] for a, row in metrics.stage_input_tokens.items()},
+        }
+    session = await session_service.get_session(app_name="bench", user_id="bench", session_id=session.id)
+    runs["draft"] = session.state.get(FINAL_OUTPUT_KEY) or ""
+    return runs
+
+
+def _median(values):
+    return round(statistics.median(values), 4)
+
+
+def summarize(samples: list) -> dict:
+    """Median of every numeric metric across iterations."""
+    summary = {}
+    for key, value in samples[0].items():
+        if isinstance(value, dict):
+            names = sorted({name for sample in samples for name in sample[key]})
+            summary[key] = {name: _median([sample[key].get(name, 0) for sample in samples]) for name in names}
+        else:
+            summary[key] = _median([sample[key] for sample in samples])
+    return summary
+
+
+def bench_markdown_to_html(draft: str, repeats: int) -> dict:
+    start = time.perf_counter()
+    for _ in range(repeats):
+        markdown_to_html(draft)
+    per_call = (time.perf_counter() - start) / repeats
+    large = draft * max(1, (1 << 20) // max(1, len(draft)))
+    start = time.perf_counter()
+    markdown_to_html(large)
+    large_seconds = time.perf_counter() - start
+    return {
+        "draft_chars": len(draft),
+        "draft_ms": round(per_call * 1000, 4),
+        "large_chars": len(large),
+        "large_mb_per_second": round(len(large) / large_seconds / 1e6, 2),
+    }
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ""
+
+
+def flatten(data: dict, prefix: str = "") -> dict:
+    flat = {}
+    for key, value in data.items():
+        name = f"{prefix}{key}"
+        if isinstance(value, dict):
+            flat.update(flatten(value, name + "."))
+        elif isinstance(value, (int, float)):
+            flat[name] = value
+    return flat
+
+
+def compare(current: dict, baseline_path: str):
+    with open(baseline_path) as fh:
+        baseline = json.load(fh)
+    old, new = flatten(baseline["results"]), flatten(current["results"])
+    print(f"\nvs {baseline_path} (commit {baseline.get('commit') or '?'}):")
+    for name in sorted(set(old) & set(new)):
+        if old[name] != new[name]:
+            change = f"{(new[name] - old[name]) / old[name] * 100:+7.1f}%" if old[name] else "    new"
+            print(f"  {name:<55} {old[name]:>12} -> {new[name]:>12}  {change}")
+
+
+async def bench(args) -> dict:
+    # Read when the sub-agents are built.
+    config.context_mode = args.context_mode
+    spans = SpanCollector()
+    root = build_root(args.recording, args.time_scale, args.jitter, spans)
+    runner = Runner(agent=root, app_name="bench", session_service=InMemorySessionService())
+    stages = [agent.name for agent in (root.rework_router, *root.stages)]
+    samples = []
+    for _ in range(args.iterations):
+        get_stage_cache().clear()
+        samples.append(await run_session(runner, spans, stages))
+    results = {label: summarize([sample[label] for sample in samples]) for label in PROMPTS}
+    results["markdown_to_html"] = bench_markdown_to_html(samples[-1]["draft"], args.html_repeats)
+    return results
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=3)
+    parser.add_argument("--time-scale", type=float, default=0.05, help="Multiplier for recorded model latencies.")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Extra uniform latency (seconds, before scaling).")
+    parser.add_argument("--recording", default=DEFAULT_RECORDING_PATH)
+    parser.add_argument("--html-repeats", type=int, default=200)
+    parser.add_argument("--context-mode", default=config.context_mode, choices=["full", "scoped"])
+    parser.add_argument("--json", help="Optional path to write machine-readable results.")
+    parser.add_argument("--compare", help="Previous --json output to compare against.")
+    args = parser.parse_args(argv)
+    logging.disable(logging.INFO)
+
+    results = asyncio.run(bench(args))
+    for label in PROMPTS:
+        run = results[label]
+        stages = ", ".join(f"{name} {seconds:.3f}s" for name, seconds in run["stage_seconds"].items())
+        print(
+            f"{label:8s} {run['seconds']:7.3f} s  {run['llm_calls']:3.0f} LLM calls  "
+            f"{run['prompt_tokens']:8.0f} prompt / {run['output_tokens']:6.0f} output tokens  [{stages}]"
+        )
+        for stage, after in run["stage_input_tokens_after"].items():
+            before = run["stage_input_tokens_before"][stage]
+            print(f"  {stage:<26} input ~{before:7.0f} -> ~{after:6.0f} tokens")
+    html = results["markdown_to_html"]
+    print(f"markdown_to_html: {html['draft_ms']:.3f} ms per draft, {html['large_mb_per_second']:.1f} MB/s on 1 MB")
+
+    report = {
+        "benchmark": "pipeline",
+        "commit": git_commit(),
+        "iterations": args.iterations,
+        "time_scale": args.time_scale,
+        "context_mode": args.context_mode,
+        "results": results,
+    }
+    if args.json:
+        with open(args.json, "w") as fh:
+            json.dump(report, fh, indent=2)
+    if args.compare:
+        compare(report, args.compare)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,120 @@
+"""
+Time-to-draft with and without background pre-generation (pregenerate.py).
+Runs the pipeline-mode agent tree offline (ReplayLlm models from
+fixtures/llm_replay.jsonl with latencies scaled by --time-scale, fixture
+search, stage cache disabled) and measures, from the start click to a draft
+in the session:
+
+  * cold: nothing pre-generated, the whole pipeline runs;
+  * warm-analysis: fetch and analysis were pre-generated, the session is
+    seeded and the pipeline runs from the planner;
+  * warm-draft: the draft was pre-generated and is served from the store.
+
+Also reports the background run that produced each warm snapshot.
+
+Usage: python -m benchmarks.bench_pregenerate [--iterations 3] [--time-scale 0.05] [--json out.json]
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import statistics
+import sys
+import time
+import uuid
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# Offline search, no article downloads, no published stories and no stage
+# cache, so every cold run does the full work; set before the modules read them.
+os.environ.setdefault("NEWSLETTER_SEARCH_BACKEND", "fixture")
+os.environ.setdefault("NEWSLETTER_SEARCH_CACHE_ENABLED", "0")
+os.environ.setdefault("NEWSLETTER_ARTICLE_FETCH", "0")
+os.environ.setdefault("NEWSLETTER_STAGE_CACHE", ":memory:")
+os.environ.setdefault("NEWSLETTER_STAGE_CACHE_MAX_ENTRIES", "0")
+os.environ.setdefault("NEWSLETTER_STORY_INDEX", ":memory:")
+
+from google.adk.runners import Runner  # noqa: E402
+from google.adk.sessions import InMemorySessionService  # noqa: E402
+from google.genai import types as genai_types  # noqa: E402
+
+from pipeline import FINAL_OUTPUT_KEY, build_pipeline_agent  # noqa: E402
+from pregenerate import DEFAULT_PROMPT, Pregenerator, PregenStore, serve_pregenerated  # noqa: E402
+from replay_llm import DEFAULT_RECORDING_PATH, ReplayScript, install_replay_llm  # noqa: E402
+
+SCENARIOS = ("cold", "warm-analysis", "warm-draft")
+
+
+def build_root(time_scale: float):
+    root = build_pipeline_agent()
+    install_replay_llm(root, ReplayScript.load(DEFAULT_RECORDING_PATH), time_scale=time_scale)
+    return root
+
+
+async def time_to_draft(scenario: str, time_scale: float) -> dict:
+    root = build_root(time_scale)
+    store = PregenStore(":memory:")
+    background = None
+    if scenario != "cold":
+        pregenerator = Pregenerator(store, draft=scenario == "warm-draft", pipeline_agent=root)
+        background = (await pregenerator.run_once())["seconds"]
+
+    runner = Runner(agent=root, app_name="bench", session_service=InMemorySessionService())
+    session = await runner.session_service.create_session(app_name="bench", user_id="bench", session_id=uuid.uuid4().hex)
+    started = time.perf_counter()
+    served = await serve_pregenerated(runner.session_service, "bench", "bench", session.id, store=store)
+    if served != "draft":
+        async for _ in runner.run_async(
+            user_id="bench",
+            session_id=session.id,
+            new_message=genai_types.Content(role="user", parts=[genai_types.Part.from_text(text=DEFAULT_PROMPT)]),
+        ):
+            pass
+    session = await runner.session_service.get_session(app_name="bench", user_id="bench", session_id=session.id)
+    elapsed = time.perf_counter() - started
+    if not session.state.get(FINAL_OUTPUT_KEY):
+        raise RuntimeError(f"{scenario}: no draft in the session")
+    return {"served": served, "seconds": elapsed, "background_seconds": background}
+
+
+async def bench(args) -> dict:
+    results = {}
+    for scenario in SCENARIOS:
+        runs = [await time_to_draft(scenario, args.time_scale) for _ in range(args.iterations)]
+        background = [run["background_seconds"] for run in runs if run["background_seconds"] is not None]
+        results[scenario] = {
+            "served": runs[0]["served"],
+            "median_ms": round(statistics.median(run["seconds"] for run in runs) * 1000, 2),
+            "max_ms": round(max(run["seconds"] for run in runs) * 1000, 2),
+            "background_ms": round(statistics.median(background) * 1000, 1) if background else None,
+        }
+    return results
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=3)
+    parser.add_argument("--time-scale", type=float, default=0.05, help="Multiplier on recorded LLM latencies.")
+    parser.add_argument("--json", help="Optional path to write machine-readable results.")
+    args = parser.parse_args(argv)
+    logging.disable(logging.WARNING)
+
+    results = asyncio.run(bench(args))
+    cold = results["cold"]["median_ms"]
+    print(f"time to draft, median of {args.iterations} (LLM latency x{args.time_scale})")
+    print(f"{'scenario':>14}{'served':>10}{'median ms':>11}{'max ms':>10}{'speedup':>9}{'background ms':>15}")
+    for scenario, row in results.items():
+        row["speedup"] = round(cold / row["median_ms"], 1) if row["median_ms"] else 0.0
+        background = f"{row['background_ms']:.1f}" if row["background_ms"] is not None else "-"
+        print(f"{scenario:>14}{str(row['served'] or '-'):>10}{row['median_ms']:>11.2f}{row['max_ms']:>10.2f}"
+              f"{row['speedup']:>8.1f}x{background:>15}")
+
+    if args.json:
+        with open(args.json, "w") as fh:
+            json.dump({"benchmark": "pregenerate", "iterations": args.iterations, "time_scale": args.time_scale,
+                       "scenarios": results}, fh, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,143 @@
+"""
+Rework cost with section-level rework (newsletter_writer_agent.py) against a
+full rewrite. Runs the pipeline-mode agent tree offline (ReplayLlm models
+from fixtures/llm_replay.jsonl with latencies scaled by --time-scale, fixture
+search), creates a first draft, then measures one rework turn for:
+
+  * single-section: feedback about one story, only its section is rewritten;
+  * single-section-full: the same feedback with NEWSLETTER_SECTION_REWORK=0,
+    every section is rewritten (the previous behavior);
+  * whole-newsletter: feedback about every article, every section is rewritten.
+
+Reports rework latency, LLM calls, prompt and output tokens, the sections
+rewritten and how many sections kept their previous text verbatim.
+
+Usage: python -m benchmarks.bench_rework [--iterations 3] [--time-scale 0.05] [--json out.json]
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import statistics
+import sys
+import time
+import uuid
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# Offline search and a throwaway stage cache; must be set before the modules read them.
+os.environ.setdefault("NEWSLETTER_SEARCH_BACKEND", "fixture")
+os.environ.setdefault("NEWSLETTER_SEARCH_CACHE_ENABLED", "0")
+os.environ.setdefault("NEWSLETTER_ARTICLE_FETCH", "0")
+os.environ.setdefault("NEWSLETTER_STAGE_CACHE", ":memory:")
+os.environ.setdefault("NEWSLETTER_STORY_INDEX", ":memory:")
+
+from google.adk.runners import Runner  # noqa: E402
+from google.adk.sessions import InMemorySessionService  # noqa: E402
+from google.genai import types as genai_types  # noqa: E402
+
+from config import config  # noqa: E402
+from pipeline import build_pipeline_agent  # noqa: E402
+from replay_llm import DEFAULT_RECORDING_PATH, ReplayScript, install_replay_llm  # noqa: E402
+from run_metrics import instrument_agent_tree, metrics_for  # noqa: E402
+from sub_agents.newsletter_writer_agent import DRAFT_SECTIONS_KEY  # noqa: E402
+
+REWORK_PROMPT = (
+    "Please rework the previous newsletter draft based on the following feedback: '{feedback}'. "
+    "The original draft is the latest newsletter in this conversation "
+    "(session state key `final_newsletter_draft_markdown`)."
+)
+# Scenario -> (feedback, section rework on).
+SCENARIOS = {
+    "single-section": ("The weather forecasting story should say which baseline it beat.", True),
+    "single-section-full": ("The weather forecasting story should say which baseline it beat.", False),
+    "whole-newsletter": ("Make every article shorter and more direct.", True),
+}
+
+
+async def run_turn(runner: Runner, session_id: str, prompt: str) -> dict:
+    invocation_id = None
+    started = time.perf_counter()
+    async for event in runner.run_async(
+        user_id="bench",
+        session_id=session_id,
+        new_message=genai_types.Content(role="user", parts=[genai_types.Part.from_text(text=prompt)]),
+    ):
+        invocation_id = invocation_id or event.invocation_id
+    elapsed = time.perf_counter() - started
+    metrics = metrics_for(invocation_id)
+    return {
+        "seconds": elapsed,
+        "llm_calls": metrics.llm_calls,
+        "prompt_tokens": metrics.prompt_tokens,
+        "output_tokens": metrics.output_tokens,
+        "rewritten": sorted(name[len("section_writer_"):] for name in metrics.llm_calls_by_agent
+                            if name.startswith("section_writer_")),
+    }
+
+
+async def rework(runner: Runner, feedback: str, section_rework: bool) -> dict:
+    service = runner.session_service
+    session = await service.create_session(app_name="bench", user_id="bench", session_id=uuid.uuid4().hex)
+    config.section_rework = True
+    await run_turn(runner, session.id, "Create today's newsletter.")
+    before = (await service.get_session(app_name="bench", user_id="bench", session_id=session.id)).state
+    config.section_rework = section_rework
+    result = await run_turn(runner, session.id, REWORK_PROMPT.format(feedback=feedback))
+    after = (await service.get_session(app_name="bench", user_id="bench", session_id=session.id)).state
+    sections = after[DRAFT_SECTIONS_KEY]
+    result["sections"] = len(sections)
+    result["reused_verbatim"] = sum(
+        key not in result["rewritten"] and entry["body"] == before[DRAFT_SECTIONS_KEY][key]["body"]
+        for key, entry in sections.items()
+    )
+    return result
+
+
+async def bench(args) -> dict:
+    root = build_pipeline_agent()
+    instrument_agent_tree(root)
+    install_replay_llm(root, ReplayScript.load(DEFAULT_RECORDING_PATH), time_scale=args.time_scale)
+    runner = Runner(agent=root, app_name="bench", session_service=InMemorySessionService())
+    results = {}
+    for scenario, (feedback, section_rework) in SCENARIOS.items():
+        runs = [await rework(runner, feedback, section_rework) for _ in range(args.iterations)]
+        results[scenario] = {
+            "feedback": feedback,
+            "section_rework": section_rework,
+            "median_ms": round(statistics.median(run["seconds"] for run in runs) * 1000, 1),
+            **{key: runs[-1][key] for key in
+               ("llm_calls", "prompt_tokens", "output_tokens", "sections", "rewritten", "reused_verbatim")},
+        }
+    return results
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=3)
+    parser.add_argument("--time-scale", type=float, default=0.05, help="Multiplier for recorded model latencies.")
+    parser.add_argument("--json", help="Optional path to write machine-readable results.")
+    args = parser.parse_args(argv)
+    logging.disable(logging.WARNING)
+
+    results = asyncio.run(bench(args))
+    full = results["single-section-full"]
+    print(f"rework turn, median of {args.iterations} (LLM latency x{args.time_scale})")
+    print(f"{'scenario':>20}{'ms':>9}{'vs full':>9}{'LLM calls':>11}{'prompt tok':>12}{'output tok':>12}"
+          f"{'rewritten':>11}{'reused':>8}")
+    for scenario, row in results.items():
+        ratio = row["median_ms"] / full["median_ms"] if full["median_ms"] else 0.0
+        print(f"{scenario:>20}{row['median_ms']:>9.1f}{ratio:>8.2f}x{row['llm_calls']:>11}{row['prompt_tokens']:>12}"
+              f"{row['output_tokens']:>12}{len(row['rewritten']):>8}/{row['sections']:<2}{row['reused_verbatim']:>8}")
+    for scenario, row in results.items():
+        print(f"{scenario}: rewrote {', '.join(row['rewritten']) or '-'}")
+
+    if args.json:
+        with open(args.json, "w") as fh:
+            json.dump({"benchmark": "rework", "iterations": args.iterations, "time_scale": args.time_scale,
+                       "scenarios": results}, fh, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
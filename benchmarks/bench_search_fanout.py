@@ -0,0 +1,66 @@
+"""
+Benchmark for the concurrent search fan-out used by the content fetcher.
+Runs growing numbers of queries against the local SimulatedSearchBackend
+(configurable per-query latency) and compares wall-clock time with the
+sequential cost (queries x latency).
+
+Usage: python -m benchmarks.bench_search_fanout [--latency 0.2] [--concurrency 6] [--json out.json]
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from search import fan_out_search  # noqa: E402
+from search_backends import SimulatedSearchBackend  # noqa: E402
+
+
+async def bench(query_counts, latency: float, jitter: float, concurrency: int) -> list:
+    results = []
+    for count in query_counts:
+        backend = SimulatedSearchBackend(latency=latency, jitter=jitter)
+        queries = [{"domain": "AI", "query": f"query {i}"} for i in range(count)]
+        start = time.perf_counter()
+        merged = await fan_out_search(queries, backend, concurrency=concurrency)
+        elapsed = time.perf_counter() - start
+        sequential = count * latency
+        results.append({
+            "queries": count,
+            "seconds": round(elapsed, 4),
+            "sequential_seconds": round(sequential, 4),
+            "speedup": round(sequential / elapsed, 2),
+            "unique_results": len(merged),
+            "backend_calls": backend.calls,
+        })
+        print(
+            f"{count:4d} queries  {elapsed:6.3f} s  (sequential {sequential:6.2f} s, "
+            f"x{sequential / elapsed:5.1f})  {len(merged):4d} unique"
+        )
+    return results
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--queries", type=int, nargs="+", default=[1, 3, 9, 18, 36, 72])
+    parser.add_argument("--latency", type=float, default=0.2)
+    parser.add_argument("--jitter", type=float, default=0.05)
+    parser.add_argument("--concurrency", type=int, default=6)
+    parser.add_argument("--json", help="Optional path to write machine-readable results.")
+    args = parser.parse_args(argv)
+    logging.disable(logging.INFO)
+
+    results = asyncio.run(bench(args.queries, args.latency, args.jitter, args.concurrency))
+    if args.json:
+        with open(args.json, "w") as fh:
+            json.dump({"benchmark": "search_fanout", "latency": args.latency,
+                       "concurrency": args.concurrency, "results": results}, fh, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
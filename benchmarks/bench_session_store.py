@@ -0,0 +1,226 @@
+"""
+Load test for the SQLite session store. Simulated Streamlit users (one thread
+and event loop each, like Streamlit script runs) create a session and append
+events with state deltas while reading their session back, all at once.
+
+Checks that every session ends with exactly its own events and state, that
+the store holds nothing in memory once users are done (compared with
+InMemorySessionService) and that eviction caps the store. Reports append/get
+latency percentiles and throughput. With --pipeline-users, that many users
+also run the replayed pipeline (see bench_pipeline.py) concurrently through
+one Runner and must each get their own draft.
+
+Usage: python -m benchmarks.bench_session_store [--users 200] [--events 20] [--pipeline-users 8] [--json out.json]
+"""
+import argparse
+import asyncio
+import gc
+import json
+import logging
+import os
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from google.adk.events import Event, EventActions  # noqa: E402
+from google.adk.sessions import InMemorySessionService  # noqa: E402
+from google.genai import types as genai_types  # noqa: E402
+
+from session_store import SqliteSessionService  # noqa: E402
+
+APP = "bench"
+
+
+def _percentiles(samples: list) -> dict:
+    ordered = sorted(samples)
+    if not ordered:
+        return {"p50_ms": 0.0, "p95_ms": 0.0, "p99_ms": 0.0}
+    pick = lambda q: round(ordered[min(len(ordered) - 1, int(q * len(ordered)))] * 1000, 3)  # noqa: E731
+    return {"p50_ms": pick(0.50), "p95_ms": pick(0.95), "p99_ms": pick(0.99)}
+
+
+async def simulate_user(service, user: int, events: int, payload: str, timings: dict) -> list:
+    """One user: create a session, then per turn read it back and append an event with a state delta."""
+    user_id = f"user_{user}"
+    session = await service.create_session(app_name=APP, user_id=user_id, state={"user:name": user_id})
+    errors = []
+    for turn in range(events):
+        started = time.perf_counter()
+        session = await service.get_session(app_name=APP, user_id=user_id, session_id=session.id)
+        timings["get"].append(time.perf_counter() - started)
+        event = Event(
+            author="user" if turn % 2 == 0 else "newsletter_writer",
+            invocation_id=f"inv_{user}_{turn // 2}",
+            content=genai_types.Content(role="user", parts=[genai_types.Part(text=f"{user_id} turn {turn}")]),
+            actions=EventActions(state_delta={"draft": f"{user_id}:{turn}:{payload}", "turns": turn + 1}),
+        )
+        started = time.perf_counter()
+        await service.append_event(session, event)
+        timings["append"].append(time.perf_counter() - started)
+
+    stored = await service.get_session(app_name=APP, user_id=user_id, session_id=session.id)
+    texts = [e.content.parts[0].text for e in stored.events]
+    if texts != [f"{user_id} turn {turn}" for turn in range(events)]:
+        errors.append(f"{user_id}: wrong events ({len(texts)} of {events})")
+    if stored.state.get("turns") != events or not stored.state.get("draft", "").startswith(f"{user_id}:{events - 1}:"):
+        errors.append(f"{user_id}: wrong state")
+    if stored.state.get("user:name") != user_id:
+        errors.append(f"{user_id}: wrong user-scoped state")
+    return errors
+
+
+def run_load(service, users: int, events: int, payload_chars: int, threads: int) -> dict:
+    timings = {"get": [], "append": []}
+    payload = "x" * payload_chars
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        futures = [
+            pool.submit(asyncio.run, simulate_user(service, user, events, payload, timings)) for user in range(users)
+        ]
+        errors = [error for future in futures for error in future.result()]
+    elapsed = time.perf_counter() - started
+    return {
+        "seconds": round(elapsed, 3),
+        "appends_per_second": round(len(timings["append"]) / elapsed, 1),
+        "append": _percentiles(timings["append"]),
+        "get": _percentiles(timings["get"]),
+        "errors": errors,
+    }
+
+
+def retained_bytes(make_service, users: int, events: int, payload_chars: int, threads: int) -> int:
+    """Python memory still allocated after every user has finished (the service is kept alive)."""
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    service = make_service()
+    run_load(service, users, events, payload_chars, threads)
+    gc.collect()
+    retained = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    del service
+    return retained
+
+
+def check_eviction(path: str, keep: int) -> dict:
+    service = SqliteSessionService(path, max_sessions=keep)
+    service.evict_idle()
+    capped = service.stats()["sessions"]
+    service = SqliteSessionService(path, idle_ttl_seconds=-1)
+    service.evict_idle()
+    return {"capped_sessions": capped, "after_idle_ttl": service.stats()["sessions"]}
+
+
+async def run_pipeline_users(service, users: int, time_scale: float) -> dict:
+    """Concurrent replayed pipeline runs, one session each, through a single Runner."""
+    from google.adk.runners import Runner
+
+    from benchmarks.bench_pipeline import PROMPTS, build_root
+    from instrumentation import SpanCollector
+    from pipeline import FINAL_OUTPUT_KEY
+    from replay_llm import DEFAULT_RECORDING_PATH
+
+    runner = Runner(
+        agent=build_root(DEFAULT_RECORDING_PATH, time_scale, 0.5, SpanCollector()),
+        app_name=APP, session_service=service,
+    )
+
+    async def one_user(user: int):
+        user_id = f"pipeline_user_{user}"
+        session = await service.create_session(app_name=APP, user_id=user_id, session_id=uuid.uuid4().hex)
+        invocations = set()
+        for prompt in PROMPTS.values():
+            async for event in runner.run_async(
+                user_id=user_id, session_id=session.id,
+                new_message=genai_types.Content(role="user", parts=[genai_types.Part.from_text(text=prompt)]),
+            ):
+                invocations.add(event.invocation_id)
+        stored = await service.get_session(app_name=APP, user_id=user_id, session_id=session.id)
+        foreign = {e.invocation_id for e in stored.events} - invocations
+        return bool(stored.state.get(FINAL_OUTPUT_KEY)) and not foreign, len(stored.events)
+
+    started = time.perf_counter()
+    results = await asyncio.gather(*(one_user(user) for user in range(users)))
+    return {
+        "seconds": round(time.perf_counter() - started, 3),
+        "users_with_own_draft": sum(ok for ok, _ in results),
+        "events_per_session": statistics.median(count for _, count in results),
+    }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--users", type=int, default=200, help="Simulated concurrent users (one session each).")
+    parser.add_argument("--events", type=int, default=20, help="Events appended per session.")
+    parser.add_argument("--payload-chars", type=int, default=4000, help="Size of the draft written per event.")
+    parser.add_argument("--threads", type=int, default=32, help="Concurrent Streamlit script threads.")
+    parser.add_argument("--pool-size", type=int, default=4)
+    parser.add_argument("--pipeline-users", type=int, default=8, help="Concurrent replayed pipeline runs (0 to skip).")
+    parser.add_argument("--time-scale", type=float, default=0.02)
+    parser.add_argument("--json", help="Optional path to write machine-readable results.")
+    args = parser.parse_args(argv)
+    logging.disable(logging.INFO)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "sessions.sqlite3")
+        service = SqliteSessionService(path, pool_size=args.pool_size)
+        load = run_load(service, args.users, args.events, args.payload_chars, args.threads)
+        results = {"load": load, "stats": service.stats()}
+        results["eviction"] = check_eviction(path, keep=args.users // 2)
+
+        memory_path = os.path.join(tmp, "memory.sqlite3")
+        results["retained_kb"] = {
+            "sqlite": retained_bytes(
+                lambda: SqliteSessionService(memory_path, pool_size=args.pool_size),
+                args.users, args.events, args.payload_chars, args.threads,
+            ) // 1024,
+            "in_memory": retained_bytes(
+                InMemorySessionService, args.users, args.events, args.payload_chars, args.threads
+            ) // 1024,
+        }
+        if args.pipeline_users:
+            pipeline_service = SqliteSessionService(os.path.join(tmp, "pipeline.sqlite3"), pool_size=args.pool_size)
+            results["pipeline"] = asyncio.run(run_pipeline_users(pipeline_service, args.pipeline_users, args.time_scale))
+
+    print(
+        f"{args.users} users x {args.events} events in {load['seconds']:.2f} s "
+        f"({load['appends_per_second']:.0f} appends/s)"
+    )
+    for op in ("append", "get"):
+        row = load[op]
+        print(f"  {op:<7} p50 {row['p50_ms']:7.2f} ms  p95 {row['p95_ms']:7.2f} ms  p99 {row['p99_ms']:7.2f} ms")
+    print(f"store: {results['stats']['sessions']} sessions, {results['stats']['events']} events; "
+          f"eviction: cap {args.users // 2} -> {results['eviction']['capped_sessions']}, "
+          f"idle TTL -> {results['eviction']['after_idle_ttl']}")
+    print(f"retained memory: sqlite {results['retained_kb']['sqlite']} KB vs in-memory "
+          f"{results['retained_kb']['in_memory']} KB")
+    if "pipeline" in results:
+        row = results["pipeline"]
+        print(f"pipeline: {row['users_with_own_draft']}/{args.pipeline_users} users got their own draft "
+              f"in {row['seconds']:.2f} s ({row['events_per_session']:.0f} events per session)")
+
+    failures = list(load["errors"])
+    if results["stats"] != {"sessions": args.users, "events": args.users * args.events}:
+        failures.append(f"store holds {results['stats']}")
+    if results["eviction"]["capped_sessions"] > args.users // 2 or results["eviction"]["after_idle_ttl"]:
+        failures.append(f"eviction left {results['eviction']}")
+    if "pipeline" in results and results["pipeline"]["users_with_own_draft"] != args.pipeline_users:
+        failures.append("a pipeline user did not get their own draft")
+
+    if args.json:
+        with open(args.json, "w") as fh:
+            json.dump({"benchmark": "session_store", "users": args.users, "events": args.events,
+                       "results": results, "failures": failures}, fh, indent=2)
+    for failure in failures[:20]:
+        print(f"FAIL: {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
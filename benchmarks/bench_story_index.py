@@ -0,0 +1,191 @@
+"""
+Benchmark for the published-story index (story_index.py). Builds an index of
+--years of daily issues (5 stories each) with synthetic ~25-word news
+summaries, stored in a temporary SQLite file, then
+checks a candidate set mixing:
+
+  * repeat-url: a published story's URL with tracking parameters added;
+  * repeat-title: a published title from another outlet (new URL);
+  * reworded: a published story with a new URL and title and its summary
+    lightly edited (--edits words replaced, one dropped);
+  * fresh: unpublished stories from the same vocabulary (false-positive check).
+
+Summary words follow a Zipf distribution over a 6,000-word vocabulary, so
+unrelated stories share their common terms as real news snippets do.
+
+Reports the index build and cold-load times, per-candidate lookup latency
+(p50/p95/p99) and, for each SimHash candidate distance in --distances, the
+share of each candidate class flagged as published.
+
+Usage: python -m benchmarks.bench_story_index [--years 5] [--candidates 5000] [--edits 1] [--json out.json]
+"""
+import argparse
+import json
+import logging
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from story_index import StoryIndex, filter_published  # noqa: E402
+
+STORIES_PER_ISSUE = 5
+# The most frequent content words; the long tail is generated. Summary words
+# are drawn from a Zipf distribution over the whole vocabulary, so unrelated
+# stories still share their common terms.
+HEAD_WORDS = ["model", "models", "training", "data", "inference", "benchmark", "open", "research", "agents",
+              "language", "reasoning", "release", "startup", "chips", "safety", "compute", "evaluation",
+              "enterprise", "robotics", "vision", "regulators", "cloud", "accuracy", "latency", "weights"]
+SYLLABLES = ["ka", "ro", "mi", "ten", "sor", "lu", "vex", "da", "qui", "pha", "zen", "tro", "nal", "bi", "cor"]
+TEMPLATE = "{0} {1} {2} and {3} {4} while {5} {6} for {7}; the {8} {9} {10} across {11} {12} {13} {14} {15}."
+SYNONYMS = {"model": "system", "training": "pretraining", "data": "datasets", "release": "launch",
+            "startup": "company", "accuracy": "quality", "latency": "speed", "open": "public"}
+
+
+def vocabulary(size: int = 6000) -> list:
+    words, seen = list(HEAD_WORDS), set(HEAD_WORDS)
+    rng = random.Random(0)
+    while len(words) < size:
+        word = "".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4)))
+        if word not in seen:
+            seen.add(word)
+            words.append(word)
+    return words
+
+
+VOCABULARY = vocabulary()
+ZIPF_WEIGHTS = [1.0 / (rank + 1) for rank in range(len(VOCABULARY))]
+
+
+def make_story(rng: random.Random, serial: int) -> dict:
+    words = rng.choices(VOCABULARY, weights=ZIPF_WEIGHTS, k=16)
+    return {
+        "title": " ".join(words[:6]).capitalize() + f" {serial}",
+        "summary": TEMPLATE.format(*words),
+        "url": f"https://news{serial % 17}.example.com/ai/story-{serial}",
+    }
+
+
+def reword(rng: random.Random, story: dict, serial: int, edits: int) -> dict:
+    words = story["summary"].split()
+    for _ in range(edits):
+        position = rng.randrange(len(words))
+        words[position] = SYNONYMS.get(words[position], rng.choice(VOCABULARY))
+    del words[rng.randrange(len(words))]
+    return {"title": f"Report: {story['title']} [{serial}]", "summary": " ".join(words),
+            "url": f"https://mirror.example.org/{serial}"}
+
+
+def build_index(path: str, issues: int, rng: random.Random) -> tuple:
+    index = StoryIndex(path)
+    published, serial = [], 0
+    started = time.perf_counter()
+    day = 86400.0
+    for issue in range(issues):
+        stories = []
+        for _ in range(STORIES_PER_ISSUE):
+            serial += 1
+            stories.append(make_story(rng, serial))
+        index.add_issue(f"issue-{issue}", stories, title=f"Issue {issue}", published_at=issue * day)
+        published.extend(stories)
+    return published, serial, time.perf_counter() - started
+
+
+def candidates(rng: random.Random, published: list, serial: int, count: int, edits: int) -> list:
+    rows = []
+    for n in range(count):
+        kind = ("repeat-url", "repeat-title", "reworded", "fresh")[n % 4]
+        serial += 1
+        story = rng.choice(published)
+        if kind == "repeat-url":
+            article = dict(story, url=story["url"].replace("https://", "https://www.") + "/?utm_source=rss")
+        elif kind == "repeat-title":
+            article = dict(story, url=f"https://other.example.net/{serial}", summary=make_story(rng, serial)["summary"])
+        elif kind == "reworded":
+            article = reword(rng, story, serial, edits)
+        else:
+            article = make_story(rng, serial)
+        rows.append((kind, article))
+    return rows
+
+
+def _percentiles(samples: list) -> dict:
+    ordered = sorted(samples)
+    pick = lambda q: round(ordered[min(len(ordered) - 1, int(q * len(ordered)))] * 1e6, 1)  # noqa: E731
+    return {"p50_us": pick(0.50), "p95_us": pick(0.95), "p99_us": pick(0.99), "max_us": round(ordered[-1] * 1e6, 1)}
+
+
+def bench(args) -> dict:
+    rng = random.Random(args.seed)
+    issues = args.years * 365
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "story_index.sqlite3")
+        published, serial, build_seconds = build_index(path, issues, rng)
+        rows = candidates(rng, published, serial, args.candidates, args.edits)
+
+        sweep = []
+        for distance in args.distances:
+            started = time.perf_counter()
+            index = StoryIndex(path, max_distance=distance)
+            index.counts()
+            index.match({"url": "https://warm.example.com/"})
+            load_seconds = time.perf_counter() - started
+            flagged, totals, latencies = {}, {}, []
+            for kind, article in rows:
+                started = time.perf_counter()
+                hit = index.match(article)
+                latencies.append(time.perf_counter() - started)
+                totals[kind] = totals.get(kind, 0) + 1
+                flagged[kind] = flagged.get(kind, 0) + (hit is not None)
+            # One fetch-sized batch (30 candidates) through the stage filter.
+            batch = [article for _, article in rows[:30]]
+            started = time.perf_counter()
+            filter_published(batch, index, min_candidates=0)
+            filter_ms = (time.perf_counter() - started) * 1000
+            sweep.append({
+                "max_distance": distance,
+                "load_seconds": round(load_seconds, 3),
+                **_percentiles(latencies),
+                "filter_30_ms": round(filter_ms, 3),
+                "flagged": {kind: round(flagged[kind] / totals[kind], 4) for kind in totals},
+                "reasons": dict(index.counters),
+            })
+        counts = index.counts()
+    return {"years": args.years, "edits": args.edits, "build_seconds": round(build_seconds, 3), **counts, "sweep": sweep}
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--years", type=int, default=5)
+    parser.add_argument("--candidates", type=int, default=5000)
+    parser.add_argument("--edits", type=int, default=1, help="Words replaced in each reworded summary.")
+    parser.add_argument("--distances", type=int, nargs="+", default=[6, 10, 14, 18])
+    parser.add_argument("--seed", type=int, default=3)
+    parser.add_argument("--json", help="Optional path to write machine-readable results.")
+    args = parser.parse_args(argv)
+    logging.disable(logging.WARNING)
+
+    result = bench(args)
+    print(f"{result['issues']} issues / {result['stories']} stories ({result['years']} years), "
+          f"built in {result['build_seconds']:.2f} s")
+    print(f"{'distance':>8}{'load s':>8}{'p50 us':>8}{'p99 us':>8}{'30 cands ms':>12}"
+          f"{'url':>7}{'title':>7}{'reword':>8}{'fresh (FP)':>12}")
+    for row in result["sweep"]:
+        flagged = row["flagged"]
+        print(
+            f"{row['max_distance']:>8}{row['load_seconds']:>8.3f}{row['p50_us']:>8.1f}{row['p99_us']:>8.1f}"
+            f"{row['filter_30_ms']:>12.3f}{flagged['repeat-url']:>7.1%}{flagged['repeat-title']:>7.1%}"
+            f"{flagged['reworded']:>8.1%}{flagged['fresh']:>12.2%}"
+        )
+
+    if args.json:
+        with open(args.json, "w") as fh:
+            json.dump({"benchmark": "story_index", **result}, fh, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,147 @@
+"""
+Latency and grouping quality of the topic engine (topic_engine.py) on a
+realistic fetch. Builds --articles synthetic news articles: distinct stories
+(company, action, product and detail drawn from news-like vocabularies), each
+covered by one to three outlets with reworded titles and summaries, as a
+multi-query fetch returns them. Reports analyze_articles() wall time
+(median of --repeats), the near-duplicate groups found against the true
+story count, and how many groups merged distinct stories (over-merging) or
+split one story (under-merging).
+
+Usage: python -m benchmarks.bench_topic_engine [--articles 3000] [--repeats 5] [--json out.json]
+"""
+import argparse
+import datetime
+import json
+import logging
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from topic_engine import analyze_articles, exact_dedup  # noqa: E402
+
+COMPANIES = ("OpenAI Google Meta Anthropic Microsoft Nvidia Apple Amazon Mistral Cohere DeepMind Baidu Alibaba "
+             "Samsung Intel AMD IBM Salesforce Databricks Snowflake Stability Perplexity xAI Tencent Hugging").split()
+ACTIONS = ["releases", "unveils", "launches", "open-sources", "tests", "delays", "prices", "expands", "acquires",
+           "partners on", "cuts costs of", "benchmarks", "pauses", "ships", "previews"]
+PRODUCTS = ["reasoning model", "coding assistant", "video generator", "speech model", "AI chip", "robotics stack",
+            "search agent", "vision model", "translation model", "data center", "safety framework",
+            "training cluster", "medical model", "weather model", "chat app", "embedding model", "agent SDK",
+            "inference service", "small language model", "music generator"]
+DETAILS = ["for enterprise customers", "with longer context", "on mobile devices", "in Europe", "for developers",
+           "after regulatory review", "with open weights", "for hospitals", "at lower prices", "for schools",
+           "with new safety tests", "across cloud regions", "for scientific research", "in limited preview"]
+REWORDS = {"releases": "rolls out", "unveils": "announces", "launches": "debuts", "tests": "trials",
+           "expands": "widens", "ships": "delivers", "previews": "teases", "customers": "clients",
+           "developers": "programmers", "lower": "reduced", "model": "system"}
+FILLER = ("the company said the update will reach users in the coming weeks while analysts expect competitors "
+          "to respond with similar features and pricing changes across the market this quarter").split()
+
+
+def make_story(rng: random.Random, number: int) -> dict:
+    company, action = rng.choice(COMPANIES), rng.choice(ACTIONS)
+    product, detail = rng.choice(PRODUCTS), rng.choice(DETAILS)
+    title = f"{company} {action} {product} {detail}"
+    facts = (f"{company} {action} a new {product} {detail}. It reports {rng.randint(5, 60)}% gains on "
+             f"{rng.choice(PRODUCTS)} tasks and costs ${rng.randint(1, 40)} per million tokens.")
+    return {"story": number, "title": title, "facts": facts}
+
+
+def coverage(rng: random.Random, story: dict, outlet: int, serial: int, now: datetime.datetime) -> dict:
+    words = story["title"].split()
+    if outlet:
+        words = [REWORDS.get(word, word) if rng.random() < 0.5 else word for word in words]
+    filler = " ".join(rng.sample(FILLER, 10))
+    return {
+        "story": story["story"],
+        "title": " ".join(words),
+        "summary": f"{story['facts']} {filler.capitalize()}.",
+        "url": f"https://outlet{outlet}.example.com/ai/{serial}",
+        "published": (now - datetime.timedelta(hours=rng.randint(1, 240))).isoformat(),
+    }
+
+
+def make_fetch(rng: random.Random, articles: int, now: datetime.datetime) -> list:
+    fetched, number = [], 0
+    while len(fetched) < articles:
+        story = make_story(rng, number)
+        for outlet in range(rng.choice((1, 1, 2, 3))):
+            fetched.append(coverage(rng, story, outlet, len(fetched), now))
+        number += 1
+    return fetched[:articles]
+
+
+def grouping_quality(fetched: list, groups: list) -> dict:
+    stories_per_group = [len({fetched[i]["story"] for i in group}) for group in groups]
+    groups_per_story = {}
+    for label, group in enumerate(groups):
+        for i in group:
+            groups_per_story.setdefault(fetched[i]["story"], set()).add(label)
+    return {
+        "stories": len(groups_per_story),
+        "groups": len(groups),
+        "over_merged_groups": sum(count > 1 for count in stories_per_group),
+        "split_stories": sum(len(labels) > 1 for labels in groups_per_story.values()),
+    }
+
+
+def near_duplicate_groups(fetched: list) -> list:
+    """Groups of fetch positions that collapsed into one representative, recovered from duplicate_count."""
+    from sklearn.feature_extraction.text import TfidfVectorizer
+    import numpy as np
+    from topic_engine import NEAR_DUPLICATE_THRESHOLD, _near_duplicate_groups
+
+    texts = [f"{a['title']}. {a['summary']}" for a in fetched]
+    matrix = TfidfVectorizer(stop_words="english", sublinear_tf=True, dtype=np.float32).fit_transform(texts)
+    labels = _near_duplicate_groups(matrix, NEAR_DUPLICATE_THRESHOLD)
+    groups = {}
+    for i, label in enumerate(labels.tolist()):
+        groups.setdefault(label, []).append(i)
+    return list(groups.values())
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--articles", type=int, default=3000)
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=11)
+    parser.add_argument("--json", help="Optional path to write machine-readable results.")
+    args = parser.parse_args(argv)
+    logging.disable(logging.WARNING)
+
+    now = datetime.datetime(2026, 10, 1, tzinfo=datetime.timezone.utc)
+    fetched = make_fetch(random.Random(args.seed), args.articles, now)
+    analyze_articles(fetched[:50], now=now)  # imports scikit-learn outside the timed runs
+
+    seconds, result = [], None
+    for _ in range(args.repeats):
+        started = time.perf_counter()
+        result = analyze_articles(fetched, now=now)
+        seconds.append(time.perf_counter() - started)
+    quality = grouping_quality(exact_dedup(fetched), near_duplicate_groups(exact_dedup(fetched)))
+    summary = {
+        "articles": args.articles,
+        "median_seconds": round(statistics.median(seconds), 3),
+        "max_seconds": round(max(seconds), 3),
+        **result["stats"],
+        **quality,
+    }
+    print(f"{args.articles} articles: analyze_articles median {summary['median_seconds']:.3f} s "
+          f"(max {summary['max_seconds']:.3f} s, {os.cpu_count()} CPUs)")
+    print(f"exact dedup -> {summary['after_exact_dedup']}, near-duplicate groups {summary['groups']} "
+          f"for {summary['stories']} true stories, {summary['clusters']} clusters")
+    print(f"groups merging distinct stories: {summary['over_merged_groups']}, "
+          f"stories split across groups: {summary['split_stories']}")
+
+    if args.json:
+        with open(args.json, "w") as fh:
+            json.dump({"benchmark": "topic_engine", **summary}, fh, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
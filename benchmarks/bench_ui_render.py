@@ -0,0 +1,155 @@
+"""
+Benchmark for the streaming UI renderer in app.py. Replays a synthetic stream
+of agent events (markdown chunks plus trace lines) through the old per-event
+full redraw and through the rate-limited BufferedMarkdownRenderer /
+TraceRingBuffer, and reports event-processing throughput, frames rendered
+and characters sent to the (simulated) frontend.
+
+Events are timestamped with a simulated clock (`--event-interval` seconds
+apart) so frame counts are those of a real run; processing time is measured
+with the wall clock.
+
+Usage: python -m benchmarks.bench_ui_render [--events 1000 5000 20000] [--fps 8] [--json out.json]
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ui_render import BufferedMarkdownRenderer, TraceRingBuffer  # noqa: E402
+
+
+class FakePlaceholder:
+    """Stands in for st.empty(): encodes each body as Streamlit would before sending it."""
+
+    def __init__(self, sink: "FakeContainer"):
+        self.sink = sink
+        self.body = ""
+
+    def markdown(self, body: str):
+        self.body = body
+        self.sink.bytes_sent += len(body.encode("utf-8"))
+        self.sink.updates += 1
+
+    def code(self, body: str, language=None):
+        self.markdown(body)
+
+
+class FakeContainer:
+    def __init__(self):
+        self.placeholders = []
+        self.bytes_sent = 0
+        self.updates = 0
+
+    def empty(self) -> FakePlaceholder:
+        placeholder = FakePlaceholder(self)
+        self.placeholders.append(placeholder)
+        return placeholder
+
+    def rendered(self) -> str:
+        return "".join(placeholder.body for placeholder in self.placeholders)
+
+
+class SimulatedClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def synthetic_events(count: int):
+    """Yields (kind, text): markdown chunks ending paragraphs every few events, and trace lines."""
+    for i in range(count):
+        if i % 4 == 3:
+            yield "trace", f"[TRACE] event {i}: agent newsletter_writer produced a chunk"
+        else:
+            chunk = f"Sentence {i} about a new **model release** and its [benchmark](https://example.com/{i}). "
+            if i % 10 == 9:
+                chunk += "\n\n"
+            if i % 200 == 199:
+                chunk += f"## Section {i // 200}\n\n"
+            yield "text", chunk
+
+
+def run_naive(events) -> dict:
+    main, trace = FakeContainer(), FakeContainer()
+    stream_area, trace_box = main.empty(), trace.empty()
+    final_text, trace_logs = "", ""
+    start = time.perf_counter()
+    for kind, text in events:
+        if kind == "trace":
+            trace_logs += text + "\n"
+            trace_box.markdown(f"```\n{trace_logs}\n```")
+        else:
+            final_text += text
+            stream_area.markdown(final_text)
+    elapsed = time.perf_counter() - start
+    return {"seconds": elapsed, "main": main, "trace": trace, "text": final_text}
+
+
+def run_buffered(events, fps: float, trace_lines: int, event_interval: float) -> dict:
+    main, trace = FakeContainer(), FakeContainer()
+    clock = SimulatedClock()
+    renderer = BufferedMarkdownRenderer(main, fps=fps, clock=clock)
+    trace_buffer = TraceRingBuffer(trace.empty(), capacity=trace_lines, fps=fps, clock=clock)
+    start = time.perf_counter()
+    for kind, text in events:
+        clock.now += event_interval
+        if kind == "trace":
+            trace_buffer.append(text)
+        else:
+            renderer.append(text)
+    renderer.flush()
+    trace_buffer.flush()
+    elapsed = time.perf_counter() - start
+    return {"seconds": elapsed, "main": main, "trace": trace, "text": renderer.text}
+
+
+def bench(event_counts, fps: float, trace_lines: int, event_interval: float) -> list:
+    results = []
+    for count in event_counts:
+        events = list(synthetic_events(count))
+        naive = run_naive(events)
+        buffered = run_buffered(events, fps, trace_lines, event_interval)
+        assert buffered["main"].rendered() == naive["text"], "buffered render differs from the full text"
+        row = {"events": count}
+        for label, run in (("naive", naive), ("buffered", buffered)):
+            row[label] = {
+                "seconds": round(run["seconds"], 4),
+                "events_per_second": round(count / run["seconds"]),
+                "updates": run["main"].updates + run["trace"].updates,
+                "bytes_sent": run["main"].bytes_sent + run["trace"].bytes_sent,
+            }
+        results.append(row)
+        print(
+            f"{count:6d} events  naive {row['naive']['events_per_second']:>9,d} ev/s "
+            f"{row['naive']['bytes_sent'] / 1e6:9.1f} MB {row['naive']['updates']:6d} updates | "
+            f"buffered {row['buffered']['events_per_second']:>9,d} ev/s "
+            f"{row['buffered']['bytes_sent'] / 1e6:7.2f} MB {row['buffered']['updates']:5d} updates"
+        )
+    return results
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--events", type=int, nargs="+", default=[1000, 5000, 20000])
+    parser.add_argument("--fps", type=float, default=8.0)
+    parser.add_argument("--trace-lines", type=int, default=200)
+    parser.add_argument("--event-interval", type=float, default=0.005, help="Simulated seconds between events.")
+    parser.add_argument("--json", help="Optional path to write machine-readable results.")
+    args = parser.parse_args(argv)
+
+    results = bench(args.events, args.fps, args.trace_lines, args.event_interval)
+    if args.json:
+        with open(args.json, "w") as fh:
+            json.dump({"benchmark": "ui_render", "fps": args.fps, "trace_lines": args.trace_lines,
+                       "event_interval": args.event_interval, "results": results}, fh, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
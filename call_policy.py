@@ -0,0 +1,258 @@
+import asyncio
+import logging
+import os
+import random
+import threading
+import time
+from collections import deque
+from typing import Any, AsyncGenerator, Callable, Deque, Dict, Optional
+
+from google.adk.agents import BaseAgent
+from google.adk.models.base_llm import BaseLlm
+from google.adk.models.llm_request import LlmRequest
+from google.adk.models.llm_response import LlmResponse
+from google.adk.models.registry import LLMRegistry
+
+from config import config
+from model_router import CALL_DEADLINE, failure_kind, parse_tiers
+
+# --- Model Call Policy ---
+# Every model call of a stage runs under that stage's policy:
+#   * a deadline (NEWSLETTER_CALL_DEADLINES, seconds per call of the stage)
+#     after which the call is abandoned with a TimeoutError. It is passed down
+#     as model_router.CALL_DEADLINE, so a routed model's per-tier timeout
+#     shrinks to fit and tier fallback still happens within the deadline;
+#   * retries with exponential backoff and jitter on timeouts, rate limits
+#     and 5xx errors (model_router.failure_kind), while the deadline allows;
+#   * with config.hedge_requests, a hedged duplicate request once the call
+#     has waited longer than the stage's observed p95 time to first response.
+#     The first attempt to answer wins; the other is cancelled.
+# Attempts run as tasks that pass their responses through a queue, so each
+# underlying stream is opened and closed in its own task. Retrying and
+# hedging stop once a response has been yielded.
+
+DEFAULT_DEADLINE = float(os.getenv("NEWSLETTER_CALL_DEADLINE", "120"))
+DEFAULT_DEADLINES = os.getenv(
+    "NEWSLETTER_CALL_DEADLINES",
+    "content_fetcher=60,topic_analyzer_agent=60,newsletter_planner=90,rework_router=30,newsletter_writer=180",
+)
+DEFAULT_MAX_ATTEMPTS = int(os.getenv("NEWSLETTER_CALL_MAX_ATTEMPTS", "3"))
+BACKOFF_BASE = float(os.getenv("NEWSLETTER_CALL_BACKOFF", "1.0"))
+BACKOFF_CAP = 30.0
+# Observed first-response times kept per stage, and how many are needed before hedging.
+LATENCY_WINDOW = 200
+MIN_HEDGE_SAMPLES = 20
+HEDGE_PERCENTILE = 0.95
+
+_DONE = object()
+
+
+class _StageStats:
+    def __init__(self):
+        self.first_response: Deque[float] = deque(maxlen=LATENCY_WINDOW)
+        self.calls = 0
+        self.retries = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+        self.deadline_exceeded = 0
+        self.failed = 0
+
+    def hedge_delay(self) -> Optional[float]:
+        """The stage's p95 time to first response, once enough calls have been observed."""
+        if len(self.first_response) < MIN_HEDGE_SAMPLES:
+            return None
+        ordered = sorted(self.first_response)
+        return ordered[min(len(ordered) - 1, int(HEDGE_PERCENTILE * len(ordered)))]
+
+    def as_dict(self) -> Dict[str, Any]:
+        delay = self.hedge_delay()
+        return {
+            "calls": self.calls,
+            "retries": self.retries,
+            "hedges": self.hedges,
+            "hedge_wins": self.hedge_wins,
+            "deadline_exceeded": self.deadline_exceeded,
+            "failed": self.failed,
+            "hedge_after_s": round(delay, 3) if delay is not None else None,
+        }
+
+
+class CallPolicy:
+    """Deadlines, retries and hedging for model calls (see the module comment)."""
+
+    def __init__(
+        self,
+        deadlines: Optional[Dict[str, float]] = None,
+        default_deadline: float = DEFAULT_DEADLINE,
+        max_attempts: int = DEFAULT_MAX_ATTEMPTS,
+        backoff_base: float = BACKOFF_BASE,
+        hedge: Optional[bool] = None,
+        seed: Optional[int] = None,
+    ):
+        if deadlines is None:
+            deadlines = {stage: float(seconds) for stage, seconds in parse_tiers(DEFAULT_DEADLINES).items()}
+        self.deadlines = deadlines
+        self.default_deadline = default_deadline
+        self.max_attempts = max(1, max_attempts)
+        self.backoff_base = backoff_base
+        self.hedge = config.hedge_requests if hedge is None else hedge
+        self._random = random.Random(seed)
+        self._stats: Dict[str, _StageStats] = {}
+        self._lock = threading.Lock()
+
+    def deadline(self, stage: str) -> float:
+        """The stage's per-call deadline; e.g. newsletter_writer_single uses newsletter_writer's."""
+        if stage in self.deadlines:
+            return self.deadlines[stage]
+        prefixes = [name for name in self.deadlines if stage.startswith(name)]
+        return self.deadlines[max(prefixes, key=len)] if prefixes else self.default_deadline
+
+    def _stage(self, stage: str) -> _StageStats:
+        stats = self._stats.get(stage)
+        if stats is None:
+            with self._lock:
+                stats = self._stats.setdefault(stage, _StageStats())
+        return stats
+
+    def backoff(self, retry: int) -> float:
+        """Seconds to wait before retry number `retry` (1-based): capped exponential, jittered."""
+        return min(BACKOFF_CAP, self.backoff_base * 2 ** (retry - 1)) * self._random.uniform(0.5, 1.0)
+
+    async def call(
+        self, stage: str, start_call: Callable[[bool], AsyncGenerator[LlmResponse, None]]
+    ) -> AsyncGenerator[LlmResponse, None]:
+        """
+        Runs one model call of stage under its policy. start_call(hedged)
+        starts an attempt and returns its response stream; hedged is True
+        for duplicates, which must not share mutable state with the original.
+        """
+        stats = self._stage(stage)
+        stats.calls += 1
+        deadline_at = time.monotonic() + self.deadline(stage)
+        for attempt in range(1, self.max_attempts + 1):
+            yielded = False
+            try:
+                async for response in self._attempt(stage, stats, start_call, deadline_at, attempt > 1):
+                    yielded = True
+                    yield response
+                return
+            except Exception as error:
+                delay = self.backoff(attempt)
+                retry = (
+                    not yielded and attempt < self.max_attempts and failure_kind(error) is not None
+                    and time.monotonic() + delay < deadline_at
+                )
+                if not retry:
+                    stats.failed += 1
+                    raise
+                stats.retries += 1
+                logging.warning(f"[TRACE] {stage} model call failed ({error}); retry {attempt} in {delay:.1f}s")
+                await asyncio.sleep(delay)
+
+    async def _attempt(self, stage, stats, start_call, deadline_at: float, retry: bool):
+        queue: asyncio.Queue = asyncio.Queue()
+
+        async def pump(index: int, hedged: bool):
+            # Each attempt runs in its own task, and so in its own context.
+            CALL_DEADLINE.set(deadline_at)
+            responses = start_call(hedged)
+            try:
+                async for response in responses:
+                    await queue.put((index, response))
+                await queue.put((index, _DONE))
+            except Exception as error:
+                await queue.put((index, error))
+            finally:
+                await responses.aclose()
+
+        started = time.monotonic()
+        tasks = [asyncio.create_task(pump(0, retry))]
+        hedge_delay = stats.hedge_delay() if self.hedge else None
+        winner: Optional[int] = None
+        failures = 0
+        try:
+            while True:
+                now = time.monotonic()
+                wake_at = deadline_at
+                can_hedge = winner is None and hedge_delay is not None and len(tasks) == 1
+                if can_hedge:
+                    wake_at = min(wake_at, started + hedge_delay)
+                try:
+                    index, item = await asyncio.wait_for(queue.get(), max(0.0, wake_at - now))
+                except asyncio.TimeoutError:
+                    if time.monotonic() >= deadline_at:
+                        stats.deadline_exceeded += 1
+                        raise asyncio.TimeoutError(f"{stage} model call exceeded its {self.deadline(stage):.0f}s deadline")
+                    stats.hedges += 1
+                    logging.info(f"[TRACE] Hedging {stage} model call after {hedge_delay:.2f}s")
+                    tasks.append(asyncio.create_task(pump(len(tasks), True)))
+                    continue
+                if winner is None:
+                    if isinstance(item, Exception):
+                        failures += 1
+                        if failures == len(tasks):
+                            raise item  # every attempt so far failed: back off and retry
+                        continue
+                    winner = index
+                    stats.hedge_wins += int(index > 0)
+                    stats.first_response.append(time.monotonic() - started)
+                    for other, task in enumerate(tasks):
+                        if other != winner:
+                            task.cancel()
+                if index != winner:
+                    continue
+                if item is _DONE:
+                    return
+                if isinstance(item, Exception):
+                    raise item
+                yield item
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """Per-stage counters and current hedge delay."""
+        return {stage: stats.as_dict() for stage, stats in sorted(self._stats.items())}
+
+
+class PolicyLlm(BaseLlm):
+    """BaseLlm that runs every call of one stage's model under a CallPolicy."""
+
+    inner: BaseLlm
+    stage: str
+    policy: Any
+
+    async def generate_content_async(
+        self, llm_request: LlmRequest, stream: bool = False
+    ) -> AsyncGenerator[LlmResponse, None]:
+        def start_call(hedged: bool):
+            request = llm_request.model_copy(deep=True) if hedged else llm_request
+            return self.inner.generate_content_async(request, stream=stream)
+
+        async for response in self.policy.call(self.stage, start_call):
+            yield response
+
+
+_default_policy: Optional[CallPolicy] = None
+
+
+def get_call_policy() -> CallPolicy:
+    """Process-wide policy configured from NEWSLETTER_CALL_* and config.hedge_requests."""
+    global _default_policy
+    if _default_policy is None:
+        _default_policy = CallPolicy()
+    return _default_policy
+
+
+def install_call_policy(root: BaseAgent, policy: Optional[CallPolicy] = None) -> BaseAgent:
+    """Wraps the model of every agent under root that has one in a PolicyLlm for the agent's stage."""
+    policy = policy or get_call_policy()
+    agents = [root]
+    while agents:
+        agent = agents.pop()
+        agents.extend(agent.sub_agents)
+        if getattr(agent, "model", None) and not isinstance(agent.model, PolicyLlm):
+            inner = LLMRegistry.new_llm(agent.model) if isinstance(agent.model, str) else agent.model
+            agent.model = PolicyLlm(model=inner.model, inner=inner, stage=agent.name, policy=policy)
+    return root
@@ -0,0 +1,40 @@
+import os
+
+from dotenv import load_dotenv
+load_dotenv()
+
+# --- Shared Configuration ---
+# One config for the agent layer (main_agent, pipeline, sub_agents). Every
+# setting can be overridden from the environment or a .env file.
+class Config:
+    worker_model = os.getenv("NEWSLETTER_WORKER_MODEL", "gemini-2.5-flash")
+    # "orchestrator": the LLM orchestrator in main_agent.py routes every stage.
+    # "pipeline": fixed fetch -> analyze -> plan -> write sequence (pipeline.py).
+    execution_mode = os.getenv("NEWSLETTER_EXECUTION_MODE", "orchestrator")
+    # Maximum number of newsletter sections written at the same time.
+    section_concurrency = int(os.getenv("NEWSLETTER_WRITER_CONCURRENCY", "4"))
+    # Attempts per section before it is given up on.
+    section_max_attempts = int(os.getenv("NEWSLETTER_WRITER_MAX_ATTEMPTS", "3"))
+    # On rework, rewrite only the draft sections the feedback refers to and reuse
+    # the rest verbatim (newsletter_writer_agent.py); "0" rewrites every section.
+    section_rework = os.getenv("NEWSLETTER_SECTION_REWORK", "1") != "0"
+    # "full": sub-agents see the whole conversation history.
+    # "scoped": each sub-agent sees only the user's request and its declared input
+    # state keys, injected into its instruction (scoped_context.py).
+    context_mode = os.getenv("NEWSLETTER_CONTEXT_MODE", "full")
+    # Route each stage to its own model tier with fallback (model_router.py).
+    # Opt-in: the default tiers move the fetcher, analyzer, planner and rework
+    # router to a cheaper model, so by default every stage runs on worker_model.
+    model_routing = os.getenv("NEWSLETTER_MODEL_ROUTING", "0") != "0"
+    # Send a duplicate model request once a call is slower than its stage's p95
+    # time to first response; the first answer wins (call_policy.py).
+    hedge_requests = os.getenv("NEWSLETTER_HEDGE_REQUESTS", "0") != "0"
+    # Download and extract the full text of fetched articles for the writer
+    # (article_fetch.py); "0" leaves the writer with search snippets only.
+    article_fetch = os.getenv("NEWSLETTER_ARTICLE_FETCH", "1") != "0"
+    # Drop fetched stories that an approved issue already covered (story_index.py).
+    published_filter = os.getenv("NEWSLETTER_PUBLISHED_FILTER", "1") != "0"
+    # Keep today's fetch, analysis and draft pre-generated in a background thread
+    # of the app, so the start button serves a warm result (pregenerate.py).
+    pregenerate = os.getenv("NEWSLETTER_PREGENERATE", "0") != "0"
+config = Config()
@@ -0,0 +1,161 @@
+import json
+import logging
+import os
+from typing import Iterable, List, Optional
+
+from google.adk.agents import BaseAgent, LlmAgent
+from google.adk.agents.callback_context import CallbackContext
+from google.adk.models.llm_request import LlmRequest
+from google.adk.models.llm_response import LlmResponse
+from google.genai import types as genai_types
+
+from run_metrics import metrics_for
+from schemas import dump_payload
+
+# --- Session History Compaction ---
+# Every rework turn runs in the same ADK session, so each model call would
+# otherwise re-send all earlier drafts, stage outputs and tool results. This
+# before_model_callback rewrites the request contents of earlier turns:
+#   * large text parts that are not the current value of a stage state key are
+#     replaced by a one-line summary (superseded drafts / stage outputs);
+#   * the current value is kept once (its latest occurrence) and earlier
+#     copies become references to the session state key;
+#   * tool results from earlier turns are replaced by a short summary;
+#   * if the request is still over the token budget, the oldest history is
+#     dropped behind a marker.
+# The current turn (from the latest user message on) is never modified.
+
+STAGE_STATE_KEYS = (
+    "raw_fetched_articles",
+    "clustered_ranked_topics",
+    "newsletter_outline_plan",
+    "final_newsletter_draft_markdown",
+    "final_content_markdown",
+)
+DEFAULT_TOKEN_BUDGET = int(os.getenv("NEWSLETTER_CONTEXT_TOKEN_BUDGET", "24000"))
+# Text parts shorter than this are never summarized.
+MIN_COMPACT_CHARS = 600
+
+_DROPPED_MARKER = "[Earlier conversation omitted to fit the context budget. Stage outputs are in session state.]"
+
+
+def estimate_tokens(contents: Iterable[genai_types.Content]) -> int:
+    """Rough token count (~4 characters per token) of request contents."""
+    chars = 0
+    for content in contents:
+        for part in content.parts or []:
+            if part.text:
+                chars += len(part.text)
+            elif part.function_call:
+                chars += len(json.dumps(part.function_call.args or {}, default=str))
+            elif part.function_response:
+                chars += len(json.dumps(part.function_response.response or {}, default=str))
+    return chars // 4
+
+
+def _summarize_text(text: str, reference: Optional[str]) -> str:
+    first_line = next((line.strip() for line in text.splitlines() if line.strip()), "")[:120]
+    if reference:
+        return f"{first_line} ... [{len(text)} chars omitted; current version is in session state key `{reference}`]"
+    return f"{first_line} ... [{len(text)} chars omitted; superseded by a later version]"
+
+
+def _summarize_response(response: dict) -> dict:
+    summary = {"omitted": "tool result from an earlier turn"}
+    for key, value in (response or {}).items():
+        if isinstance(value, (list, dict)):
+            summary[key] = f"{len(value)} items"
+        elif isinstance(value, str) and len(value) > 200:
+            summary[key] = value[:200] + "..."
+        else:
+            summary[key] = value
+    return summary
+
+
+def _current_turn_start(contents: List[genai_types.Content], user_text: str) -> int:
+    for index in range(len(contents) - 1, -1, -1):
+        content = contents[index]
+        if content.role == "user" and user_text and any(p.text == user_text for p in content.parts or []):
+            return index
+    return len(contents)
+
+
+def compact_contents(
+    contents: List[genai_types.Content],
+    user_text: str,
+    state_values: dict,
+    token_budget: int = DEFAULT_TOKEN_BUDGET,
+) -> List[genai_types.Content]:
+    """Returns compacted copies of contents; see the module comment for the rules."""
+    split = _current_turn_start(contents, user_text)
+    history, current = contents[:split], contents[split:]
+    current_values = {
+        key: dump_payload(value)
+        for key, value in state_values.items() if value
+    }
+    kept_values = set()
+    compacted: List[genai_types.Content] = []
+    # Walk history newest-first so the latest copy of each current value is the one kept.
+    for content in reversed(history):
+        parts = []
+        for part in content.parts or []:
+            if part.text and len(part.text) >= MIN_COMPACT_CHARS:
+                reference = next((k for k, v in current_values.items() if v and v in part.text), None)
+                if reference and reference not in kept_values:
+                    kept_values.add(reference)
+                    parts.append(part)
+                else:
+                    parts.append(genai_types.Part(text=_summarize_text(part.text, reference)))
+            elif part.function_response:
+                response = part.function_response
+                parts.append(genai_types.Part(function_response=genai_types.FunctionResponse(
+                    id=response.id, name=response.name, response=_summarize_response(response.response),
+                )))
+            else:
+                parts.append(part)
+        compacted.append(genai_types.Content(role=content.role, parts=parts))
+    compacted.reverse()
+
+    budget_left = token_budget - estimate_tokens(current)
+    dropped = False
+    while compacted and estimate_tokens(compacted) > budget_left:
+        compacted.pop(0)
+        dropped = True
+    if dropped:
+        # Never start on a tool result whose call was dropped.
+        while compacted and any(p.function_response for p in compacted[0].parts or []):
+            compacted.pop(0)
+        compacted.insert(0, genai_types.Content(role="user", parts=[genai_types.Part(text=_DROPPED_MARKER)]))
+    return compacted + list(current)
+
+
+def compact_llm_request(callback_context: CallbackContext, llm_request: LlmRequest) -> Optional[LlmResponse]:
+    """before_model_callback: compacts history and records token counts before/after."""
+    user_content = callback_context.user_content
+    user_text = "".join(p.text or "" for p in user_content.parts or []) if user_content else ""
+    state_values = {key: callback_context.state.get(key) for key in STAGE_STATE_KEYS}
+
+    before = estimate_tokens(llm_request.contents)
+    llm_request.contents = compact_contents(llm_request.contents, user_text, state_values)
+    after = estimate_tokens(llm_request.contents)
+
+    metrics = metrics_for(callback_context.invocation_id)
+    metrics.context_tokens_before += before
+    metrics.context_tokens_after += after
+    if before != after:
+        logging.info(f"[TRACE] Context compaction for {callback_context.agent_name}: ~{before} -> ~{after} tokens")
+    return None
+
+
+def attach_context_compaction(root: BaseAgent) -> BaseAgent:
+    """Adds compact_llm_request to every LlmAgent under root (once)."""
+    agents = [root]
+    while agents:
+        agent = agents.pop()
+        agents.extend(agent.sub_agents)
+        if not isinstance(agent, LlmAgent) or compact_llm_request in agent.canonical_before_model_callbacks:
+            continue
+        existing = agent.before_model_callback
+        existing = [] if existing is None else (list(existing) if isinstance(existing, list) else [existing])
+        agent.before_model_callback = [compact_llm_request] + existing
+    return root
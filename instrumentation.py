@@ -0,0 +1,285 @@
+import json
+import logging
+import os
+import re
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from dataclasses import asdict, dataclass, field
+from typing import Any, Dict, List, Optional
+
+from google.adk.agents import BaseAgent, LlmAgent
+from google.adk.agents.callback_context import CallbackContext
+from google.adk.models.llm_request import LlmRequest
+from google.adk.models.llm_response import LlmResponse
+from google.adk.tools.base_tool import BaseTool
+from google.adk.tools.tool_context import ToolContext
+from google.genai import types as genai_types
+
+# --- Structured Spans ---
+# Replaces the old `trace` FunctionTool (one model round trip per log line)
+# with agent/model/tool callbacks that make no LLM calls of their own. Every
+# agent run, model call and tool call becomes a Span with wall time; model
+# spans add time to first token and input/output tokens, and agent spans
+# roll those up together with tool calls and retries. Finished spans go to a
+# JSONL file (NEWSLETTER_SPANS_PATH, empty to disable) and to an in-memory
+# collector that the Streamlit sidebar aggregates into a per-stage table.
+
+DEFAULT_SPANS_PATH = os.getenv("NEWSLETTER_SPANS_PATH", os.path.join(".newsletter_cache", "spans.jsonl"))
+_MAX_TRACKED_RUNS = 64
+# Section writers re-run after a failure as `<name>_retry<attempt>`.
+_RETRY_SUFFIX = re.compile(r"_retry(\d+)$")
+
+
+@dataclass
+class Span:
+    kind: str  # "agent", "llm" or "tool"
+    name: str
+    agent: str
+    invocation_id: str
+    span_id: str = field(default_factory=lambda: uuid.uuid4().hex[:16])
+    parent_id: Optional[str] = None
+    start: float = field(default_factory=time.time)
+    duration_s: Optional[float] = None
+    ttft_s: Optional[float] = None
+    input_tokens: int = 0
+    output_tokens: int = 0
+    llm_calls: int = 0
+    tool_calls: int = 0
+    retries: int = 0
+    error: Optional[str] = None
+    _started: float = field(default_factory=time.perf_counter, repr=False)
+
+    def finish(self, error: Optional[str] = None):
+        self.duration_s = time.perf_counter() - self._started
+        self.error = error or self.error
+
+    def as_dict(self) -> Dict[str, Any]:
+        data = asdict(self)
+        data.pop("_started")
+        return data
+
+
+def stage_name(agent_name: str) -> str:
+    """Groups retries (and concurrent section writers) under one stage row."""
+    name = _RETRY_SUFFIX.sub("", agent_name)
+    return "section_writer" if name.startswith("section_writer_") else name
+
+
+def format_span(span: Span) -> str:
+    """One human-readable trace line for the UI."""
+    line = f"[{span.kind}] {span.name}"
+    if span.kind == "tool" or span.name != span.agent:
+        line += f" ({span.agent})"
+    line += f" {span.duration_s or 0:.2f}s"
+    if span.ttft_s is not None:
+        line += f" ttft {span.ttft_s:.2f}s"
+    if span.input_tokens or span.output_tokens:
+        line += f" tokens {span.input_tokens}->{span.output_tokens}"
+    if span.retries:
+        line += f" retries {span.retries}"
+    if span.error:
+        line += f" ERROR {span.error}"
+    return line
+
+
+class JsonlSpanSink:
+    """Appends finished spans to a JSON Lines file."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+
+    def write(self, span: Span):
+        line = json.dumps(span.as_dict(), ensure_ascii=False, default=str)
+        with self._lock, open(self.path, "a", encoding="utf-8") as fh:
+            fh.write(line + "\n")
+
+
+class SpanCollector:
+    """
+    Tracks open spans per (invocation, agent) and keeps finished spans for
+    the last few invocations. Sinks receive every finished span.
+    """
+
+    def __init__(self, sinks: Optional[List[Any]] = None):
+        self.sinks = list(sinks or [])
+        self._lock = threading.Lock()
+        self._runs: "OrderedDict[str, List[Span]]" = OrderedDict()
+        self._open_agents: Dict[tuple, Span] = {}
+        self._open_llm: Dict[tuple, Span] = {}
+        self._open_tools: Dict[str, Span] = {}
+
+    # --- span bookkeeping ---
+    def _finish(self, span: Span, error: Optional[str] = None):
+        span.finish(error)
+        with self._lock:
+            self._runs.setdefault(span.invocation_id, []).append(span)
+            self._runs.move_to_end(span.invocation_id)
+            while len(self._runs) > _MAX_TRACKED_RUNS:
+                self._runs.popitem(last=False)
+        for sink in self.sinks:
+            try:
+                sink.write(span)
+            except OSError as error:
+                logging.warning(f"[TRACE] Span sink failed: {error}")
+
+    def spans(self, invocation_id: str) -> List[Span]:
+        with self._lock:
+            return list(self._runs.get(invocation_id, []))
+
+    # --- agent callbacks ---
+    def before_agent(self, callback_context: CallbackContext) -> Optional[genai_types.Content]:
+        name = callback_context.agent_name
+        match = _RETRY_SUFFIX.search(name)
+        span = Span(kind="agent", name=name, agent=name, invocation_id=callback_context.invocation_id)
+        span.retries = int(match.group(1)) - 1 if match else 0
+        self._open_agents[(span.invocation_id, name)] = span
+        return None
+
+    def after_agent(self, callback_context: CallbackContext) -> Optional[genai_types.Content]:
+        key = (callback_context.invocation_id, callback_context.agent_name)
+        span = self._open_agents.pop(key, None)
+        stale = self._open_llm.pop(key, None)
+        if stale is not None:
+            self._finish(stale, error="no response")
+        if span is not None:
+            self._finish(span)
+        return None
+
+    # --- model callbacks ---
+    def before_model(self, callback_context: CallbackContext, llm_request: LlmRequest) -> Optional[LlmResponse]:
+        key = (callback_context.invocation_id, callback_context.agent_name)
+        parent = self._open_agents.get(key)
+        span = Span(
+            kind="llm", name=llm_request.model or "llm", agent=key[1], invocation_id=key[0],
+            parent_id=parent.span_id if parent else None,
+        )
+        previous = self._open_llm.get(key)
+        if previous is not None:
+            # The previous call never produced a response: this one is a retry.
+            self._finish(previous, error="no response")
+            span.retries = previous.retries + 1
+            if parent is not None:
+                parent.retries += 1
+        self._open_llm[key] = span
+        return None
+
+    def after_model(self, callback_context: CallbackContext, llm_response: LlmResponse) -> Optional[LlmResponse]:
+        key = (callback_context.invocation_id, callback_context.agent_name)
+        span = self._open_llm.get(key)
+        if span is None:
+            return None
+        parent = self._open_agents.get(key)
+        if span.ttft_s is None:
+            span.ttft_s = time.perf_counter() - span._started
+            if parent is not None and parent.ttft_s is None:
+                parent.ttft_s = time.perf_counter() - parent._started
+        if llm_response.partial:
+            return None
+        self._open_llm.pop(key, None)
+        usage = llm_response.usage_metadata
+        if usage is not None:
+            span.input_tokens = usage.prompt_token_count or 0
+            span.output_tokens = usage.candidates_token_count or 0
+        self._finish(span, error=llm_response.error_message)
+        if parent is not None:
+            parent.llm_calls += 1
+            parent.input_tokens += span.input_tokens
+            parent.output_tokens += span.output_tokens
+        return None
+
+    # --- tool callbacks ---
+    def before_tool(self, tool: BaseTool, args: Dict[str, Any], tool_context: ToolContext) -> Optional[Dict]:
+        parent = self._open_agents.get((tool_context.invocation_id, tool_context.agent_name))
+        span = Span(
+            kind="tool", name=tool.name, agent=tool_context.agent_name, invocation_id=tool_context.invocation_id,
+            parent_id=parent.span_id if parent else None,
+        )
+        self._open_tools[tool_context.function_call_id or span.span_id] = span
+        return None
+
+    def after_tool(
+        self, tool: BaseTool, args: Dict[str, Any], tool_context: ToolContext, tool_response: Any
+    ) -> Optional[Dict]:
+        self._close_tool(tool_context)
+        return None
+
+    def on_tool_error(
+        self, tool: BaseTool, args: Dict[str, Any], tool_context: ToolContext, error: Exception
+    ) -> Optional[Dict]:
+        self._close_tool(tool_context, error=f"{type(error).__name__}: {error}")
+        return None
+
+    def _close_tool(self, tool_context: ToolContext, error: Optional[str] = None):
+        span = self._open_tools.pop(tool_context.function_call_id, None)
+        if span is None:
+            return
+        self._finish(span, error=error)
+        parent = self._open_agents.get((tool_context.invocation_id, tool_context.agent_name))
+        if parent is not None:
+            parent.tool_calls += 1
+
+    # --- aggregation ---
+    def stage_table(self, invocation_id: str) -> List[Dict[str, Any]]:
+        """One row per stage: runs, wall time, first-token time, LLM/tool calls, tokens and retries."""
+        rows: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        for span in sorted(self.spans(invocation_id), key=lambda s: s.start):
+            if span.kind != "agent":
+                continue
+            row = rows.setdefault(stage_name(span.name), {
+                "stage": stage_name(span.name), "runs": 0, "wall_s": 0.0, "ttft_s": None,
+                "llm_calls": 0, "tool_calls": 0, "input_tokens": 0, "output_tokens": 0, "retries": 0,
+            })
+            row["runs"] += 1
+            # Concurrent runs of a stage (section writers) overlap: report the longest.
+            row["wall_s"] = max(row["wall_s"], round(span.duration_s or 0.0, 3))
+            if span.ttft_s is not None and row["ttft_s"] is None:
+                row["ttft_s"] = round(span.ttft_s, 3)
+            for key in ("llm_calls", "tool_calls", "input_tokens", "output_tokens", "retries"):
+                row[key] += getattr(span, key)
+        return list(rows.values())
+
+
+_default_collector: Optional[SpanCollector] = None
+
+
+def get_span_collector() -> SpanCollector:
+    """Process-wide collector; writes to DEFAULT_SPANS_PATH unless it is empty."""
+    global _default_collector
+    if _default_collector is None:
+        _default_collector = SpanCollector([JsonlSpanSink(DEFAULT_SPANS_PATH)] if DEFAULT_SPANS_PATH else [])
+    return _default_collector
+
+
+def _callbacks(existing) -> list:
+    if existing is None:
+        return []
+    return list(existing) if isinstance(existing, list) else [existing]
+
+
+def attach_instrumentation(root: BaseAgent, collector: Optional[SpanCollector] = None) -> BaseAgent:
+    """
+    Adds span callbacks to every agent under root (once): agent callbacks on
+    all agents, model and tool callbacks on LlmAgents. "before" callbacks go
+    last and "after" callbacks first, so a span only opens when the agent,
+    model or tool really runs (not on a stage cache hit) and always closes.
+    """
+    collector = collector or get_span_collector()
+    agents = [root]
+    while agents:
+        agent = agents.pop()
+        agents.extend(agent.sub_agents)
+        if collector.before_agent in _callbacks(agent.before_agent_callback):
+            continue
+        agent.before_agent_callback = _callbacks(agent.before_agent_callback) + [collector.before_agent]
+        agent.after_agent_callback = [collector.after_agent] + _callbacks(agent.after_agent_callback)
+        if isinstance(agent, LlmAgent):
+            agent.before_model_callback = _callbacks(agent.before_model_callback) + [collector.before_model]
+            agent.after_model_callback = [collector.after_model] + _callbacks(agent.after_model_callback)
+            agent.before_tool_callback = _callbacks(agent.before_tool_callback) + [collector.before_tool]
+            agent.after_tool_callback = [collector.after_tool] + _callbacks(agent.after_tool_callback)
+            agent.on_tool_error_callback = [collector.on_tool_error] + _callbacks(agent.on_tool_error_callback)
+    return root
@@ -0,0 +1,318 @@
+import html
+import re
+from typing import Iterable, Iterator, Optional, Tuple, Union
+
+# --- Single-Pass Streaming Markdown Renderer ---
+# Renders the subset of Markdown the writer agent produces (ATX headings,
+# paragraphs, bullet/numbered lists, block quotes, fenced code, horizontal
+# rules, links, emphasis and inline code). Input is consumed line by line and
+# HTML is yielded block by block, so memory stays bounded by the longest block
+# rather than the document.
+
+_HEADING = re.compile(r"^(#{1,6})[ \t]+(.*?)[ \t#]*$")
+_BULLET = re.compile(r"^[ \t]*[-*+][ \t]+(.*)$")
+_NUMBERED = re.compile(r"^[ \t]*\d{1,9}[.)][ \t]+(.*)$")
+_FENCE = re.compile(r"^[ \t]*(```|~~~)[ \t]*([\w+-]*)")
+_RULE = re.compile(r"^[ \t]*([-*_])([ \t]*\1){2,}[ \t]*$")
+_QUOTE = re.compile(r"^[ \t]*>[ \t]?(.*)$")
+
+# One alternation, scanned left to right: inline code wins over everything,
+# then links, then strong before emphasis. A single `*` delimiter never sits
+# next to another `*`, so emphasis cannot swallow half of a `**` run.
+# Underscore emphasis must sit on word boundaries so snake_case identifiers
+# survive.
+_INLINE = re.compile(
+    r"(?P<code>`+)(?P<code_text>.+?)(?P=code)"
+    r"|\[(?P<link_text>[^\]]+)\]\((?P<link_url>(?:[^()\s]|\([^()\s]*\))+)(?:[ \t]+\"(?P<link_title>[^\"]*)\")?\)"
+    r"|(?P<strong>\*\*|__)(?P<strong_text>.+?)(?P=strong)"
+    r"|(?<!\*)\*(?!\*)(?P<em_text>[^*\s](?:.*?[^*\s])?)\*(?!\*)"
+    r"|(?<!\w)_(?P<uem_text>[^_\s](?:.*?[^_\s])?)_(?!\w)"
+)
+_SAFE_SCHEMES = ("http://", "https://", "mailto:", "#", "/")
+
+HTML_HEAD = """<!DOCTYPE html>
+<html>
+<head>
+    <meta charset="utf-8">
+    <title>AI Newsletter Draft</title>
+    <style>
+        body { font-family: Arial, sans-serif; line-height: 1.6; padding: 30px; margin: 0; }
+        h1, h2, h3 { color: #2C3E50; border-bottom: 2px solid #ECF0F1; padding-bottom: 5px; }
+        .article { margin-bottom: 25px; padding-bottom: 15px; border-bottom: 1px dashed #BDC3C7; }
+        .source { font-size: 0.8em; color: #7F8C8D; margin-top: 20px; display: block; }
+        pre { background: #F4F6F7; padding: 10px; overflow-x: auto; }
+    </style>
+</head>
+<body>
+    <h1 style="text-align: center;">Weekly AI and Tech Digest</h1>
+"""
+
+HTML_FOOT = """    <span class="source">Note: This is simulated document content generated by the agent pipeline.</span>
+</body>
+</html>
+"""
+
+
+def iter_lines(text: str) -> Iterator[str]:
+    """Yields the lines of text (without line endings) without splitting it up front."""
+    start, length = 0, len(text)
+    while start < length:
+        end = text.find("\n", start)
+        if end == -1:
+            end = length
+        yield text[start:end].rstrip("\r")
+        start = end + 1
+
+
+def _safe_url(url: str) -> str:
+    lowered = url.strip().lower()
+    if lowered.startswith(_SAFE_SCHEMES) or "://" not in lowered and ":" not in lowered.split("/", 1)[0]:
+        return html.escape(url, quote=True)
+    return "#"
+
+
+def render_inline(text: str) -> str:
+    """Renders inline Markdown (code, links, strong, emphasis) in one scan."""
+    out = []
+    pos = 0
+    for match in _INLINE.finditer(text):
+        out.append(html.escape(text[pos:match.start()], quote=False))
+        if match.group("code"):
+            out.append(f"<code>{html.escape(match.group('code_text').strip(), quote=False)}</code>")
+        elif match.group("link_text") is not None:
+            title = match.group("link_title")
+            title_attr = f' title="{html.escape(title, quote=True)}"' if title else ""
+            out.append(
+                f'<a href="{_safe_url(match.group("link_url"))}"{title_attr}>'
+                f"{render_inline(match.group('link_text'))}</a>"
+            )
+        elif match.group("strong"):
+            out.append(f"<strong>{render_inline(match.group('strong_text'))}</strong>")
+        else:
+            em_text = match.group("em_text") or match.group("uem_text")
+            out.append(f"<em>{render_inline(em_text)}</em>")
+        pos = match.end()
+    out.append(html.escape(text[pos:], quote=False))
+    return "".join(out)
+
+
+def iter_markdown_html(lines: Iterable[str]) -> Iterator[str]:
+    """
+    Converts Markdown lines to HTML fragments in a single pass. Each yielded
+    fragment is one complete block (heading, paragraph, list item, code line...),
+    so consumers can write or encode it immediately.
+    """
+    paragraph: list = []
+    open_list: Optional[str] = None
+    in_quote = False
+    fence: Optional[str] = None
+
+    def flush_paragraph():
+        if paragraph:
+            body = "<br>\n".join(render_inline(line) for line in paragraph)
+            paragraph.clear()
+            return f"<p>{body}</p>\n"
+        return ""
+
+    def close_blocks():
+        nonlocal open_list, in_quote
+        out = flush_paragraph()
+        if open_list:
+            out += f"</{open_list}>\n"
+            open_list = None
+        if in_quote:
+            out += "</blockquote>\n"
+            in_quote = False
+        return out
+
+    for raw in lines:
+        line = raw.rstrip("\r\n")
+
+        if fence is not None:
+            if line.strip().startswith(fence):
+                fence = None
+                yield "</code></pre>\n"
+            else:
+                yield html.escape(line, quote=False) + "\n"
+            continue
+
+        fence_match = _FENCE.match(line)
+        if fence_match:
+            pending = close_blocks()
+            if pending:
+                yield pending
+            fence = fence_match.group(1)
+            language = fence_match.group(2)
+            css = f' class="language-{html.escape(language, quote=True)}"' if language else ""
+            yield f"<pre><code{css}>"
+            continue
+
+        if not line.strip():
+            pending = close_blocks()
+            if pending:
+                yield pending
+            continue
+
+        heading = _HEADING.match(line)
+        if heading:
+            pending = close_blocks()
+            if pending:
+                yield pending
+            level = len(heading.group(1))
+            yield f"<h{level}>{render_inline(heading.group(2))}</h{level}>\n"
+            continue
+
+        if _RULE.match(line):
+            pending = close_blocks()
+            if pending:
+                yield pending
+            yield "<hr>\n"
+            continue
+
+        quote = _QUOTE.match(line)
+        if quote:
+            if not in_quote:
+                pending = close_blocks()
+                if pending:
+                    yield pending
+                yield "<blockquote>\n"
+                in_quote = True
+            paragraph.append(quote.group(1))
+            continue
+
+        item = _BULLET.match(line)
+        kind = "ul"
+        if not item:
+            item = _NUMBERED.match(line)
+            kind = "ol"
+        if item:
+            pending = flush_paragraph()
+            if open_list != kind:
+                pending += close_blocks() + f"<{kind}>\n"
+                open_list = kind
+            yield pending + f"<li>{render_inline(item.group(1))}</li>\n"
+            continue
+
+        if open_list or in_quote:
+            # A plain line directly after a list or quote ends it.
+            pending = close_blocks()
+            if pending:
+                yield pending
+        paragraph.append(line.strip())
+
+    if fence is not None:
+        yield "</code></pre>\n"
+    pending = close_blocks()
+    if pending:
+        yield pending
+
+
+def iter_html_document(markdown: Union[str, Iterable[str]], chunk_size: int = 64 * 1024) -> Iterator[str]:
+    """
+    Streams a complete, styled HTML document for the given Markdown (a string
+    or any iterable of lines, e.g. an open file), in chunks of roughly
+    chunk_size characters.
+    """
+    lines = iter_lines(markdown) if isinstance(markdown, str) else markdown
+    buffer: list = [HTML_HEAD]
+    size = len(HTML_HEAD)
+    for fragment in iter_markdown_html(lines):
+        buffer.append(fragment)
+        size += len(fragment)
+        if size >= chunk_size:
+            yield "".join(buffer)
+            buffer.clear()
+            size = 0
+    buffer.append(HTML_FOOT)
+    yield "".join(buffer)
+
+
+def iter_html_bytes(markdown: Union[str, Iterable[str]], chunk_size: int = 64 * 1024) -> Iterator[bytes]:
+    """UTF-8 encoded variant of iter_html_document for writing to files or sockets."""
+    for chunk in iter_html_document(markdown, chunk_size):
+        yield chunk.encode("utf-8")
+
+
+# --- Plain-Text Blocks ---
+# The same block grammar without HTML, for renderers that lay text out
+# themselves (pdf_renderer.py). Inline markup is reduced to its text, and a
+# link keeps its URL in parentheses so it survives on paper.
+
+def render_plain_inline(text: str) -> str:
+    """Inline Markdown reduced to plain text: markers dropped, links as `text (url)`."""
+    out = []
+    pos = 0
+    for match in _INLINE.finditer(text):
+        out.append(text[pos:match.start()])
+        if match.group("code"):
+            out.append(match.group("code_text").strip())
+        elif match.group("link_text") is not None:
+            label = render_plain_inline(match.group("link_text"))
+            url = match.group("link_url")
+            out.append(label if label == url else f"{label} ({url})")
+        elif match.group("strong"):
+            out.append(render_plain_inline(match.group("strong_text")))
+        else:
+            out.append(render_plain_inline(match.group("em_text") or match.group("uem_text")))
+        pos = match.end()
+    out.append(text[pos:])
+    return "".join(out)
+
+
+def iter_markdown_blocks(lines: Iterable[str]) -> Iterator[Tuple[str, int, str]]:
+    """
+    Yields (kind, level, text) blocks in one pass: kind is "heading" (level
+    1-6), "paragraph", "bullet", "numbered" (level is the item number),
+    "quote", "code" (one block per line) or "rule". Text is plain.
+    """
+    paragraph: list = []
+    quote: list = []
+    fence: Optional[str] = None
+    number = 0
+
+    def flush():
+        blocks = []
+        if paragraph:
+            blocks.append(("paragraph", 0, render_plain_inline(" ".join(paragraph))))
+            paragraph.clear()
+        if quote:
+            blocks.append(("quote", 0, render_plain_inline(" ".join(quote))))
+            quote.clear()
+        return blocks
+
+    for raw in lines:
+        line = raw.rstrip("\r\n")
+        if fence is not None:
+            if line.strip().startswith(fence):
+                fence = None
+            else:
+                yield ("code", 0, line)
+            continue
+        fence_match = _FENCE.match(line)
+        heading = _HEADING.match(line)
+        quote_match = _QUOTE.match(line)
+        item = _BULLET.match(line) or _NUMBERED.match(line)
+        if fence_match or not line.strip() or heading or _RULE.match(line) or item or (quote_match is None and quote):
+            yield from flush()
+        if not item:
+            number = 0
+        if fence_match:
+            fence = fence_match.group(1)
+        elif not line.strip():
+            continue
+        elif heading:
+            yield ("heading", len(heading.group(1)), render_plain_inline(heading.group(2)))
+        elif _RULE.match(line):
+            yield ("rule", 0, "")
+        elif quote_match:
+            if paragraph:
+                yield from flush()
+            quote.append(quote_match.group(1).strip())
+        elif _BULLET.match(line):
+            yield ("bullet", 0, render_plain_inline(item.group(1)))
+        elif item:
+            number += 1
+            yield ("numbered", number, render_plain_inline(item.group(1)))
+        else:
+            paragraph.append(line.strip())
+    yield from flush()
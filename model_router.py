@@ -0,0 +1,354 @@
+import asyncio
+import logging
+import os
+import threading
+import time
+from contextvars import ContextVar
+from dataclasses import asdict, dataclass
+from typing import Any, AsyncGenerator, Callable, Dict, List, Optional, Tuple, Union
+
+from google.adk.agents import BaseAgent
+from google.adk.models.base_llm import BaseLlm
+from google.adk.models.llm_request import LlmRequest
+from google.adk.models.llm_response import LlmResponse
+from google.adk.models.registry import LLMRegistry
+
+from config import config
+
+# --- Per-Stage Model Routing ---
+# Every stage used to call the same worker model. Here each stage names an
+# ordered chain of model tiers (its preferred tier first, then fallbacks):
+#     NEWSLETTER_MODEL_TIERS="fast=gemini-2.5-flash-lite,standard=gemini-2.5-flash,strong=gemini-2.5-pro"
+#     NEWSLETTER_STAGE_TIERS="newsletter_planner=fast>standard,newsletter_writer=standard>fast,..."
+# Agents get a RoutedLlm as their model, which asks the ModelRouter for the
+# stage's candidates on every call:
+#   * a model that timed out or was rate-limited / unavailable (429, 5xx)
+#     cools down (doubling per consecutive failure) and is skipped meanwhile,
+#     and the call falls through to the next tier;
+#   * latency, token and cost profiles are learned per (stage, model) from
+#     observed calls; a model whose recent latency has drifted to more than
+#     DEGRADED_FACTOR x its healthy average is tried after healthy tiers,
+#     except for every PROBE_EVERY-th call of the stage, which still goes to
+#     it so that its recovery is noticed.
+# Fallback only happens before the first response of a call is yielded, so
+# a stream is never stitched together from two models. A caller with a
+# deadline for the whole call (call_policy.py) sets CALL_DEADLINE, and each
+# tier then waits at most its share of the time left, so a stalled tier still
+# falls back (and cools down) before the deadline expires.
+
+DEFAULT_TIERS = os.getenv(
+    "NEWSLETTER_MODEL_TIERS",
+    f"fast=gemini-2.5-flash-lite,standard={config.worker_model},strong=gemini-2.5-pro",
+)
+DEFAULT_STAGE_TIERS = os.getenv(
+    "NEWSLETTER_STAGE_TIERS",
+    "content_fetcher=fast>standard,topic_analyzer_agent=fast>standard,newsletter_planner=fast>standard,"
+    "rework_router=fast>standard,newsletter_writer=standard>fast,newsletter_creator_agent=standard>fast",
+)
+# The strong tier (gemini-2.5-pro, ~4x the standard tier's price) is opt-in:
+# no default chain escalates to it, since rate-limit fallbacks would send most
+# of a busy stage's calls there (e.g. "newsletter_writer=standard>strong>fast"
+# cost 2.4x single-model in bench_model_router's rate_limited scenario).
+DEFAULT_CHAIN = os.getenv("NEWSLETTER_DEFAULT_TIERS", "standard>fast")
+# Seconds to wait for a model's first response before falling back.
+DEFAULT_TIMEOUT = float(os.getenv("NEWSLETTER_MODEL_TIMEOUT", "90"))
+# Seconds a failing model is skipped after its first failure (doubles per further failure).
+DEFAULT_COOLDOWN = float(os.getenv("NEWSLETTER_MODEL_COOLDOWN", "30"))
+MAX_COOLDOWN_DOUBLINGS = 4
+
+# USD per 1M (input, output) tokens; models not listed are profiled without cost.
+MODEL_PRICES: Dict[str, Tuple[float, float]] = {
+    "gemini-2.5-flash-lite": (0.10, 0.40),
+    "gemini-2.5-flash": (0.30, 2.50),
+    "gemini-2.5-pro": (1.25, 10.00),
+}
+
+RECENT_ALPHA = 0.3
+BASELINE_ALPHA = 0.05
+DEGRADED_FACTOR = 2.0
+MIN_SAMPLES = 5
+PROBE_EVERY = 10
+
+# time.monotonic() by which the current model call must finish, if any.
+CALL_DEADLINE: ContextVar[Optional[float]] = ContextVar("newsletter_call_deadline", default=None)
+
+
+def parse_tiers(spec: str) -> Dict[str, str]:
+    """"fast=model-a,standard=model-b" -> {"fast": "model-a", "standard": "model-b"}."""
+    tiers = {}
+    for item in spec.split(","):
+        name, _, model = item.partition("=")
+        if name.strip() and model.strip():
+            tiers[name.strip()] = model.strip()
+    return tiers
+
+
+def parse_stage_tiers(spec: str) -> Dict[str, List[str]]:
+    """"planner=fast>standard,writer=standard" -> {"planner": ["fast", "standard"], "writer": ["standard"]}."""
+    stages = {}
+    for item in spec.split(","):
+        stage, _, chain = item.partition("=")
+        tiers = [tier.strip() for tier in chain.split(">") if tier.strip()]
+        if stage.strip() and tiers:
+            stages[stage.strip()] = tiers
+    return stages
+
+
+def failure_kind(error: BaseException) -> Optional[str]:
+    """"timeout", "rate_limited" or "unavailable" for errors worth another tier; None otherwise."""
+    if isinstance(error, asyncio.TimeoutError):
+        return "timeout"
+    code = getattr(error, "code", None) or getattr(error, "status_code", None)
+    text = str(error)
+    if code == 429 or "RESOURCE_EXHAUSTED" in text or text.startswith("429"):
+        return "rate_limited"
+    if isinstance(code, int) and 500 <= code < 600:
+        return "unavailable"
+    return None
+
+
+@dataclass
+class ModelProfile:
+    """What has been observed of one model serving one stage."""
+
+    stage: str
+    tier: str
+    model: str
+    calls: int = 0
+    failures: int = 0
+    # Calls this model answered after an earlier tier had failed.
+    served_as_fallback: int = 0
+    latency_s: float = 0.0
+    baseline_latency_s: float = 0.0
+    prompt_tokens: int = 0
+    output_tokens: int = 0
+    cost_usd: float = 0.0
+
+    @property
+    def degraded(self) -> bool:
+        return self.calls >= MIN_SAMPLES and self.latency_s > DEGRADED_FACTOR * self.baseline_latency_s
+
+    def observe_latency(self, seconds: float):
+        if self.calls + self.failures <= 1:
+            self.latency_s = self.baseline_latency_s = seconds
+            return
+        # The baseline only learns from healthy periods, so a slowdown cannot become the norm.
+        if not self.degraded:
+            self.baseline_latency_s += BASELINE_ALPHA * (seconds - self.baseline_latency_s)
+        self.latency_s += RECENT_ALPHA * (seconds - self.latency_s)
+
+    def as_dict(self) -> Dict[str, Any]:
+        data = asdict(self)
+        data["latency_s"] = round(self.latency_s, 3)
+        data["baseline_latency_s"] = round(self.baseline_latency_s, 3)
+        data["cost_usd"] = round(self.cost_usd, 6)
+        data["degraded"] = self.degraded
+        return data
+
+
+class ModelRouter:
+    """
+    Picks and calls the model for each stage (see the module comment). tiers
+    maps tier names to model names or BaseLlm instances (e.g. stubs with
+    latency and error injection); stage_tiers maps stage names to tier chains.
+    """
+
+    def __init__(
+        self,
+        tiers: Optional[Dict[str, Union[str, BaseLlm]]] = None,
+        stage_tiers: Optional[Dict[str, List[str]]] = None,
+        default_chain: Optional[List[str]] = None,
+        timeout: float = DEFAULT_TIMEOUT,
+        cooldown: float = DEFAULT_COOLDOWN,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.tiers = dict(tiers if tiers is not None else parse_tiers(DEFAULT_TIERS))
+        self.stage_tiers = stage_tiers if stage_tiers is not None else parse_stage_tiers(DEFAULT_STAGE_TIERS)
+        self.default_chain = default_chain or [t for t in DEFAULT_CHAIN.split(">") if t in self.tiers]
+        self.timeout = timeout
+        self.cooldown = cooldown
+        self.clock = clock
+        self._llms: Dict[str, BaseLlm] = {}
+        self._profiles: Dict[Tuple[str, str], ModelProfile] = {}
+        # model name -> (cooldown end, consecutive failures)
+        self._health: Dict[str, Tuple[float, int]] = {}
+        self._stage_calls: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    # --- Tiers and profiles ---
+    def model_name(self, tier: str) -> str:
+        model = self.tiers[tier]
+        return model if isinstance(model, str) else model.model
+
+    def _llm(self, tier: str) -> BaseLlm:
+        llm = self._llms.get(tier)
+        if llm is None:
+            model = self.tiers[tier]
+            llm = self._llms[tier] = LLMRegistry.new_llm(model) if isinstance(model, str) else model
+        return llm
+
+    def chain(self, stage: str) -> List[str]:
+        """The stage's tier chain; e.g. newsletter_writer_single uses newsletter_writer's chain."""
+        chain = self.stage_tiers.get(stage)
+        if chain is None:
+            prefixes = [name for name in self.stage_tiers if stage.startswith(name)]
+            chain = self.stage_tiers[max(prefixes, key=len)] if prefixes else self.default_chain
+        return [tier for tier in chain if tier in self.tiers] or list(self.tiers)[:1]
+
+    def profile(self, stage: str, tier: str) -> ModelProfile:
+        key = (stage, tier)
+        profile = self._profiles.get(key)
+        if profile is None:
+            with self._lock:
+                profile = self._profiles.setdefault(key, ModelProfile(stage, tier, self.model_name(tier)))
+        return profile
+
+    def available(self, tier: str) -> bool:
+        until, _ = self._health.get(self.model_name(tier), (0.0, 0))
+        return self.clock() >= until
+
+    def candidates(self, stage: str) -> List[str]:
+        """
+        Tiers to try for stage, in order: the chain without cooling-down
+        models, healthy ones before degraded ones (but in chain order on probe
+        calls). If every model is cooling down, the whole chain is tried anyway.
+        """
+        chain = self.chain(stage)
+        ready = [tier for tier in chain if self.available(tier)] or chain
+        with self._lock:
+            count = self._stage_calls[stage] = self._stage_calls.get(stage, 0) + 1
+        if count % PROBE_EVERY == 0:
+            return ready
+        return sorted(ready, key=lambda tier: self.profile(stage, tier).degraded)
+
+    # --- Observations ---
+    def _record_success(
+        self, stage: str, tier: str, seconds: float, response: Optional[LlmResponse], fallback: bool
+    ):
+        profile = self.profile(stage, tier)
+        with self._lock:
+            profile.calls += 1
+            profile.served_as_fallback += int(fallback)
+            profile.observe_latency(seconds)
+            usage = response.usage_metadata if response is not None else None
+            if usage is not None:
+                prompt, output = usage.prompt_token_count or 0, usage.candidates_token_count or 0
+                profile.prompt_tokens += prompt
+                profile.output_tokens += output
+                price_in, price_out = MODEL_PRICES.get(profile.model, (0.0, 0.0))
+                profile.cost_usd += (prompt * price_in + output * price_out) / 1e6
+            self._health.pop(profile.model, None)
+
+    def _record_failure(self, stage: str, tier: str, seconds: float, kind: str):
+        profile = self.profile(stage, tier)
+        with self._lock:
+            profile.failures += 1
+            if kind == "timeout":
+                profile.observe_latency(seconds)
+            until, failures = self._health.get(profile.model, (0.0, 0))
+            now = self.clock()
+            if now < until:
+                return  # a call that started before the model was put on cooldown
+            cooldown = self.cooldown * 2 ** min(failures, MAX_COOLDOWN_DOUBLINGS)
+            self._health[profile.model] = (now + cooldown, failures + 1)
+        logging.warning(f"[TRACE] Model {profile.model} failed for {stage} ({kind}); cooling down {cooldown:.0f}s")
+
+    # --- Calls ---
+    def first_response_timeout(self, tiers_left: int) -> float:
+        """The tier timeout, capped at an even share of the CALL_DEADLINE time left among the remaining tiers."""
+        deadline = CALL_DEADLINE.get()
+        if deadline is None:
+            return self.timeout
+        return max(0.0, min(self.timeout, (deadline - time.monotonic()) / max(1, tiers_left)))
+
+    async def generate(
+        self, stage: str, llm_request: LlmRequest, stream: bool = False
+    ) -> AsyncGenerator[LlmResponse, None]:
+        """Runs llm_request for stage on the first candidate tier that answers."""
+        candidates = self.candidates(stage)
+        last_error: Optional[BaseException] = None
+        for attempt, tier in enumerate(candidates):
+            if attempt:
+                logging.info(f"[TRACE] Falling back to {tier} ({self.model_name(tier)}) for {stage}")
+            llm_request.model = self.model_name(tier)
+            timeout = self.first_response_timeout(len(candidates) - attempt)
+            responses = self._llm(tier).generate_content_async(llm_request, stream=stream)
+            started = self.clock()
+            first = True
+            last: Optional[LlmResponse] = None
+            try:
+                while True:
+                    try:
+                        if first:
+                            response = await asyncio.wait_for(responses.__anext__(), timeout)
+                        else:
+                            response = await responses.__anext__()
+                    except StopAsyncIteration:
+                        break
+                    first = False
+                    last = response
+                    yield response
+            except Exception as error:
+                kind = failure_kind(error)
+                if not first or kind is None:
+                    raise
+                self._record_failure(stage, tier, self.clock() - started, kind)
+                last_error = error
+                continue
+            finally:
+                await responses.aclose()
+            self._record_success(stage, tier, self.clock() - started, last, fallback=attempt > 0)
+            return
+        raise last_error
+
+    def snapshot(self) -> List[Dict[str, Any]]:
+        """Learned profiles, one row per (stage, model), with each model's cooldown state."""
+        now = self.clock()
+        rows = []
+        for profile in sorted(self._profiles.values(), key=lambda p: (p.stage, p.tier)):
+            row = profile.as_dict()
+            until, _ = self._health.get(profile.model, (0.0, 0))
+            row["cooling_down_s"] = round(max(0.0, until - now), 1)
+            rows.append(row)
+        return rows
+
+
+class RoutedLlm(BaseLlm):
+    """BaseLlm for one stage that delegates every call to a ModelRouter."""
+
+    router: Any
+    stage: str
+
+    async def generate_content_async(
+        self, llm_request: LlmRequest, stream: bool = False
+    ) -> AsyncGenerator[LlmResponse, None]:
+        async for response in self.router.generate(self.stage, llm_request, stream=stream):
+            yield response
+
+
+_default_router: Optional[ModelRouter] = None
+
+
+def get_model_router() -> ModelRouter:
+    """Process-wide router configured from NEWSLETTER_MODEL_TIERS / NEWSLETTER_STAGE_TIERS."""
+    global _default_router
+    if _default_router is None:
+        _default_router = ModelRouter()
+    return _default_router
+
+
+def install_model_router(root: BaseAgent, router: Optional[ModelRouter] = None) -> BaseAgent:
+    """
+    Replaces the model of every agent under root that has one with a
+    RoutedLlm for the agent's stage. Its `model` is the stage's preferred
+    model, so stage cache keys and spans keep naming a real model.
+    """
+    router = router or get_model_router()
+    agents = [root]
+    while agents:
+        agent = agents.pop()
+        agents.extend(agent.sub_agents)
+        if hasattr(agent, "model") and not isinstance(agent.model, RoutedLlm):
+            preferred = router.chain(agent.name)[0]
+            agent.model = RoutedLlm(model=router.model_name(preferred), router=router, stage=agent.name)
+    return root
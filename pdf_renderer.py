@@ -0,0 +1,231 @@
+import functools
+import zlib
+from typing import Iterable, List, Tuple, Union
+
+from markdown_renderer import iter_lines, iter_markdown_blocks
+
+# --- Minimal PDF Renderer ---
+# Writes a PDF 1.4 document for the Markdown the writer agent produces,
+# without third-party dependencies: text is laid out with the metrics of
+# the standard 14 fonts (Helvetica, Helvetica-Bold, Helvetica-Oblique,
+# Courier), which every PDF viewer provides, so no font is embedded. Text
+# is encoded as WinAnsi (cp1252); characters outside it print as "?".
+# Output is deterministic (no timestamps), so identical Markdown gives
+# identical bytes.
+
+PAGE_WIDTH = 595.28   # A4, in points
+PAGE_HEIGHT = 841.89
+MARGIN = 56.0
+DOCUMENT_TITLE = "Weekly AI and Tech Digest"
+
+# Advance widths (1/1000 em) of ASCII 32..126 from the Adobe AFM files.
+_HELVETICA = [
+    278, 278, 355, 556, 556, 889, 667, 191, 333, 333, 389, 584, 278, 333, 278, 278,
+    556, 556, 556, 556, 556, 556, 556, 556, 556, 556, 278, 278, 584, 584, 584, 556,
+    1015, 667, 667, 722, 722, 667, 611, 778, 722, 278, 500, 667, 556, 833, 722, 778,
+    667, 778, 722, 667, 611, 722, 667, 944, 667, 667, 611, 278, 278, 278, 469, 556,
+    333, 556, 556, 500, 556, 556, 278, 556, 556, 222, 222, 500, 222, 833, 556, 556,
+    556, 556, 333, 500, 278, 556, 500, 722, 500, 500, 500, 334, 260, 334, 584,
+]
+_HELVETICA_BOLD = [
+    278, 333, 474, 556, 556, 889, 722, 238, 333, 333, 389, 584, 278, 333, 278, 278,
+    556, 556, 556, 556, 556, 556, 556, 556, 556, 556, 333, 333, 584, 584, 584, 611,
+    975, 722, 722, 722, 722, 667, 611, 778, 722, 278, 556, 722, 611, 833, 722, 778,
+    667, 778, 722, 667, 611, 722, 667, 944, 667, 667, 611, 333, 278, 333, 584, 556,
+    333, 556, 611, 556, 611, 556, 333, 611, 611, 278, 278, 556, 278, 889, 611, 611,
+    611, 611, 389, 556, 333, 611, 556, 778, 556, 556, 500, 389, 280, 389, 584,
+]
+# Resource name -> (base font, widths or None for monospaced 600).
+FONTS = {
+    "F1": ("Helvetica", _HELVETICA),
+    "F2": ("Helvetica-Bold", _HELVETICA_BOLD),
+    "F3": ("Helvetica-Oblique", _HELVETICA),
+    "F4": ("Courier", None),
+}
+# Block kind -> (font, size, leading, indent, space before).
+_STYLES = {
+    "heading1": ("F2", 20.0, 25.0, 0.0, 14.0),
+    "heading2": ("F2", 15.0, 19.0, 0.0, 12.0),
+    "heading3": ("F2", 12.5, 16.0, 0.0, 10.0),
+    "paragraph": ("F1", 10.5, 15.0, 0.0, 7.0),
+    "bullet": ("F1", 10.5, 15.0, 16.0, 3.0),
+    "numbered": ("F1", 10.5, 15.0, 16.0, 3.0),
+    "quote": ("F3", 10.5, 15.0, 16.0, 7.0),
+    "code": ("F4", 9.0, 11.5, 8.0, 0.0),
+}
+
+
+def _encode(text: str) -> bytes:
+    return text.encode("cp1252", errors="replace")
+
+
+@functools.lru_cache(maxsize=8192)
+def _units(text: str, font: str) -> int:
+    # Cached per word: newsletter text repeats a small vocabulary.
+    widths = FONTS[font][1]
+    if widths is None:
+        return len(_encode(text)) * 600
+    return sum(widths[b - 32] if 32 <= b <= 126 else 556 for b in _encode(text))
+
+
+def text_width(text: str, font: str, size: float) -> float:
+    return _units(text, font) * size / 1000
+
+
+def wrap(text: str, font: str, size: float, max_width: float) -> List[str]:
+    """Greedy word wrap; words wider than a line are split."""
+    lines: List[str] = []
+    current = ""
+    space = text_width(" ", font, size)
+    current_width = 0.0
+    for word in text.split():
+        width = text_width(word, font, size)
+        while width > max_width:
+            cut = len(word)
+            while cut > 1 and text_width(word[:cut], font, size) > max_width:
+                cut -= 1
+            if current:
+                lines.append(current)
+                current, current_width = "", 0.0
+            lines.append(word[:cut])
+            word = word[cut:]
+            width = text_width(word, font, size)
+        if current and current_width + space + width > max_width:
+            lines.append(current)
+            current, current_width = "", 0.0
+        current = f"{current} {word}" if current else word
+        current_width += (space if current_width else 0.0) + width
+    if current:
+        lines.append(current)
+    return lines
+
+
+def _pdf_string(text: str) -> bytes:
+    escaped = _encode(text).replace(b"\\", b"\\\\").replace(b"(", b"\\(").replace(b")", b"\\)")
+    return b"(" + escaped + b")"
+
+
+class _Layout:
+    """Places text lines top to bottom, starting a new page when one is full."""
+
+    def __init__(self):
+        self.pages: List[List[bytes]] = []
+        self._new_page()
+
+    def _new_page(self):
+        self.ops: List[bytes] = []
+        self.pages.append(self.ops)
+        self.y = PAGE_HEIGHT - MARGIN
+
+    def space(self, points: float):
+        if self.y < PAGE_HEIGHT - MARGIN:
+            self.y -= points
+
+    def line(self, text: str, font: str, size: float, leading: float, x: float, marker: str = ""):
+        if self.y - leading < MARGIN:
+            self._new_page()
+        self.y -= leading
+        baseline = self.y + (leading - size) / 2
+        self.ops.append(b"BT /%s %.1f Tf %.2f %.2f Td %s Tj ET" % (font.encode(), size, x, baseline, _pdf_string(text)))
+        if marker:
+            marker_x = x - text_width(marker + " ", font, size)
+            self.ops.append(b"BT /%s %.1f Tf %.2f %.2f Td %s Tj ET" % (
+                font.encode(), size, marker_x, baseline, _pdf_string(marker)
+            ))
+
+    def rule(self):
+        if self.y - 12 < MARGIN:
+            self._new_page()
+        self.y -= 6
+        self.ops.append(b"0.75 G 0.5 w %.2f %.2f m %.2f %.2f l S 0 G" % (
+            MARGIN, self.y, PAGE_WIDTH - MARGIN, self.y
+        ))
+        self.y -= 6
+
+
+def layout_blocks(blocks: Iterable[Tuple[str, int, str]], title: str = DOCUMENT_TITLE) -> List[List[bytes]]:
+    """Lays out (kind, level, text) blocks; returns the drawing operators of each page."""
+    layout = _Layout()
+    content_width = PAGE_WIDTH - 2 * MARGIN
+    if title:
+        font, size, leading = "F2", 18.0, 24.0
+        layout.line(title, font, size, leading, (PAGE_WIDTH - text_width(title, font, size)) / 2)
+        layout.space(8.0)
+    for kind, level, text in blocks:
+        if kind == "rule":
+            layout.rule()
+            continue
+        style = f"heading{min(level, 3)}" if kind == "heading" else kind
+        font, size, leading, indent, before = _STYLES[style]
+        layout.space(before)
+        if kind == "code":
+            layout.line(text.expandtabs(4), font, size, leading, MARGIN + indent)
+            continue
+        marker = "•" if kind == "bullet" else f"{level}." if kind == "numbered" else ""
+        for index, line in enumerate(wrap(text, font, size, content_width - indent) or [""]):
+            layout.line(line, font, size, leading, MARGIN + indent, marker if index == 0 else "")
+    return layout.pages
+
+
+def _page_numbers(pages: List[List[bytes]]):
+    for number, ops in enumerate(pages, start=1):
+        label = f"{number} / {len(pages)}"
+        ops.append(b"BT /F1 8.0 Tf %.2f %.2f Td %s Tj ET" % (
+            PAGE_WIDTH - MARGIN - text_width(label, "F1", 8.0), MARGIN / 2, _pdf_string(label)
+        ))
+
+
+def write_pdf(pages: List[List[bytes]], title: str = "") -> bytes:
+    """Serializes pages of drawing operators as a PDF file."""
+    objects: List[bytes] = []
+
+    def add(body: bytes) -> int:
+        objects.append(body)
+        return len(objects)
+
+    catalog = add(b"")
+    pages_obj = add(b"")
+    fonts = b" ".join(
+        b"/%s %d 0 R" % (name.encode(), add(
+            b"<< /Type /Font /Subtype /Type1 /BaseFont /%s /Encoding /WinAnsiEncoding >>" % base.encode()
+        ))
+        for name, (base, _) in FONTS.items()
+    )
+    kids = []
+    for ops in pages:
+        stream = zlib.compress(b"\n".join(ops))
+        content = add(b"<< /Length %d /Filter /FlateDecode >>\nstream\n%s\nendstream" % (len(stream), stream))
+        kids.append(add(
+            b"<< /Type /Page /Parent %d 0 R /MediaBox [0 0 %.2f %.2f] /Resources << /Font << %s >> >> /Contents %d 0 R >>"
+            % (pages_obj, PAGE_WIDTH, PAGE_HEIGHT, fonts, content)
+        ))
+    objects[catalog - 1] = b"<< /Type /Catalog /Pages %d 0 R >>" % pages_obj
+    objects[pages_obj - 1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (
+        b" ".join(b"%d 0 R" % kid for kid in kids), len(kids)
+    )
+    info = add(b"<< /Title %s /Producer (NewsletterAgent) >>" % _pdf_string(title or DOCUMENT_TITLE))
+
+    out = bytearray(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n%s\nendobj\n" % (number, body)
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    out += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    out += b"trailer\n<< /Size %d /Root %d 0 R /Info %d 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (
+        len(objects) + 1, catalog, info, xref
+    )
+    return bytes(out)
+
+
+def render_pdf(markdown: Union[str, Iterable[str]], title: str = "") -> bytes:
+    """
+    Renders Markdown (a string or an iterable of lines) as a PDF document.
+    title is the document's metadata title; the page header is DOCUMENT_TITLE
+    like the HTML export.
+    """
+    lines = iter_lines(markdown) if isinstance(markdown, str) else markdown
+    pages = layout_blocks(iter_markdown_blocks(lines))
+    _page_numbers(pages)
+    return write_pdf(pages, title)
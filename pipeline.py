@@ -0,0 +1,177 @@
+from typing import AsyncGenerator, List, Literal
+
+from google.adk.agents import Agent, BaseAgent, LlmAgent
+from google.adk.agents.invocation_context import InvocationContext
+from google.adk.agents.readonly_context import ReadonlyContext
+from google.adk.events import Event, EventActions
+from google.genai import types as genai_types
+from pydantic import BaseModel, Field
+
+from article_fetch import build_article_fetch_agent
+from config import config
+from stage_cache import STAGE_DIRECTIVES_KEY
+from sub_agents.content_fetcher_agent import build_content_fetcher_agent
+from sub_agents.topic_analyzer_agent import build_topic_analyzer_agent
+from sub_agents.newsletter_planner_agent import build_newsletter_planner_agent
+from sub_agents.newsletter_writer_agent import DRAFT_SECTIONS_KEY, SECTION_TARGETS_KEY, build_newsletter_writer_agent
+
+# --- Deterministic Pipeline Mode ---
+# Runs fetch -> article fetch -> analyze -> plan -> write as a fixed sequence,
+# passing data between stages through their output_key state entries. The only LLM call
+# outside the four stages is a small rework router that, on feedback turns,
+# picks the stage to restart from.
+
+DRAFT_KEY = "final_newsletter_draft_markdown"
+FINAL_OUTPUT_KEY = "final_content_markdown"
+REWORK_DECISION_KEY = "rework_decision"
+# Optional stage to begin a first run at, for callers that seed the upstream
+# outputs into session state themselves (e.g. batch_cli.py's shared fetches).
+START_STAGE_KEY = "pipeline_start_stage"
+# Optional stage to end a first run after, for callers that only need the
+# upstream outputs (e.g. pregenerate.py's fetch-and-analyze runs).
+STOP_STAGE_KEY = "pipeline_stop_stage"
+
+StageName = Literal["content_fetcher", "topic_analyzer_agent", "newsletter_planner", "newsletter_writer"]
+
+
+class ReworkDecision(BaseModel):
+    start_stage: StageName = Field(description="The earliest stage that must re-run to address the feedback.")
+    directive: str = Field(description="One sentence telling that stage what to change.")
+    sections: List[str] = Field(
+        default_factory=list,
+        description="When start_stage is newsletter_writer: the keys of the draft sections the feedback is about. "
+                    "Empty if it concerns the whole newsletter or you cannot tell.",
+    )
+
+
+REWORK_ROUTER_INSTRUCTION = """
+    You classify feedback on a newsletter draft. Pick the earliest stage that must re-run:
+    * `content_fetcher` - the feedback asks for different or additional articles/sources.
+    * `topic_analyzer_agent` - the feedback is about prioritization, relevance or which stories were selected.
+    * `newsletter_planner` - the feedback is about structure, ordering, theme, titles or calls-to-action.
+    * `newsletter_writer` - the feedback is about wording, tone, length or the content of specific articles
+      (the writer rewrites only the sections the feedback refers to).
+    Also write a one-sentence directive for that stage summarizing what to change.
+    """
+
+
+def rework_router_instruction(ctx: ReadonlyContext) -> str:
+    """The router instruction plus the current draft's sections, so it can name the ones the feedback is about."""
+    sections = ctx.state.get(DRAFT_SECTIONS_KEY) or {}
+    if not sections:
+        return REWORK_ROUTER_INSTRUCTION
+    listing = "\n".join(f"    * `{key}`: {entry.get('heading', '')}" for key, entry in sections.items()
+                        if isinstance(entry, dict))
+    return (
+        f"{REWORK_ROUTER_INSTRUCTION}"
+        f"For `newsletter_writer`, also list in `sections` the keys of the sections the feedback is about\n"
+        f"(leave it empty if it concerns the whole newsletter). The draft's sections are:\n{listing}\n"
+    )
+
+
+def draft_markdown(state) -> str:
+    """
+    The newsletter draft in session state. The writer sets DRAFT_KEY in both
+    execution modes; FINAL_OUTPUT_KEY is only set by the pipeline (and by
+    pre-generated drafts) and is the fallback.
+    """
+    return state.get(DRAFT_KEY) or state.get(FINAL_OUTPUT_KEY) or ""
+
+
+def build_rework_router_agent(model: str = "") -> LlmAgent:
+    """Classifies user feedback into the pipeline stage to restart from."""
+    return Agent(
+        name="rework_router",
+        model=model or config.worker_model,
+        description="Routes newsletter feedback to the pipeline stage that must re-run.",
+        # A provider function also skips {placeholder} injection for the headings.
+        instruction=rework_router_instruction,
+        include_contents="none",
+        output_schema=ReworkDecision,
+        output_key=REWORK_DECISION_KEY,
+        disallow_transfer_to_parent=True,
+        disallow_transfer_to_peers=True,
+    )
+
+
+class NewsletterPipelineAgent(BaseAgent):
+    """
+    Fixed sequential executor for the newsletter stages. On a first run every
+    stage runs in order; once a draft exists, the rework router decides where
+    to restart and the stages before it are reused from session state.
+    """
+
+    stages: List[BaseAgent]
+    rework_router: LlmAgent
+
+    def __init__(self, name: str, stages: List[BaseAgent], rework_router: LlmAgent, **kwargs):
+        super().__init__(
+            name=name,
+            stages=stages,
+            rework_router=rework_router,
+            sub_agents=[rework_router, *stages],
+            **kwargs,
+        )
+
+    def _stage_index(self, stage_name: str) -> int:
+        for index, stage in enumerate(self.stages):
+            if stage.name == stage_name:
+                return index
+        return len(self.stages) - 1
+
+    async def _run_async_impl(self, ctx: InvocationContext) -> AsyncGenerator[Event, None]:
+        start = 0
+        stop = len(self.stages) - 1
+        if ctx.session.state.get(STOP_STAGE_KEY) and not ctx.session.state.get(DRAFT_KEY):
+            stop = self._stage_index(ctx.session.state[STOP_STAGE_KEY])
+        if ctx.session.state.get(START_STAGE_KEY) and not ctx.session.state.get(DRAFT_KEY):
+            start = self._stage_index(ctx.session.state[START_STAGE_KEY])
+        elif ctx.session.state.get(DRAFT_KEY):
+            async for event in self.rework_router.run_async(ctx):
+                yield event
+            decision = ctx.session.state.get(REWORK_DECISION_KEY) or {}
+            start = self._stage_index(decision.get("start_stage", ""))
+            directive = decision.get("directive")
+            # Sections only apply to this turn; a stale choice must not steer the next rework.
+            state_delta = {SECTION_TARGETS_KEY: decision.get("sections") or None}
+            if directive:
+                directives = dict(ctx.session.state.get(STAGE_DIRECTIVES_KEY) or {})
+                directives[self.stages[start].name] = directive
+                state_delta[STAGE_DIRECTIVES_KEY] = directives
+            yield Event(
+                invocation_id=ctx.invocation_id,
+                author=self.name,
+                branch=ctx.branch,
+                actions=EventActions(state_delta=state_delta),
+            )
+
+        for stage in self.stages[start:stop + 1]:
+            async for event in stage.run_async(ctx):
+                yield event
+        if stop < len(self.stages) - 1:
+            return
+
+        draft = ctx.session.state.get(DRAFT_KEY) or ""
+        yield Event(
+            invocation_id=ctx.invocation_id,
+            author=self.name,
+            branch=ctx.branch,
+            content=genai_types.Content(role="model", parts=[genai_types.Part.from_text(text=draft)]),
+            actions=EventActions(state_delta={FINAL_OUTPUT_KEY: draft}),
+        )
+
+
+def build_pipeline_agent() -> NewsletterPipelineAgent:
+    """Builds the pipeline-mode root agent with its own sub-agent instances."""
+    return NewsletterPipelineAgent(
+        name="newsletter_pipeline_agent",
+        description="Deterministic fetch -> analyze -> plan -> write pipeline with LLM-routed rework.",
+        stages=[
+            build_content_fetcher_agent(),
+            build_article_fetch_agent(),
+            build_topic_analyzer_agent(),
+            build_newsletter_planner_agent(structured_output=True),
+            build_newsletter_writer_agent(),
+        ],
+        rework_router=build_rework_router_agent(),
+    )
@@ -0,0 +1,302 @@
+"""
+Background pre-generation of today's newsletter, so "Start Newsletter
+Creation" can serve a warm result instead of running the whole pipeline.
+
+Usage: python pregenerate.py [--analysis-only] [--force] [--every SECONDS]
+
+Run it from cron (once) or with --every to keep the result fresh; the app
+can also run it in a background thread (NEWSLETTER_PREGENERATE=1).
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import sys
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+from typing import Any, Dict, Optional
+
+from google.adk.agents import BaseAgent
+from google.adk.events import Event, EventActions
+from google.adk.runners import Runner
+from google.adk.sessions import BaseSessionService, InMemorySessionService
+from google.genai import types as genai_types
+
+from agent_registry import get_agent
+from article_fetch import ARTICLE_TEXTS_KEY
+from config import config
+from pipeline import DRAFT_KEY, FINAL_OUTPUT_KEY, START_STAGE_KEY, STOP_STAGE_KEY
+
+# --- Pre-Generation ---
+# Runs the pipeline ahead of time for the app's start prompt and keeps one
+# snapshot of its session state per prompt in SQLite, in two levels:
+#   * "analysis": fetched articles, article texts and ranked topics;
+#   * "draft": additionally the outline plan and the finished draft.
+# A snapshot is served while it is younger than `fresh_seconds` and no issue
+# was approved since it was made (approved stories must drop out of the next
+# issue, see story_index.py). serve_pregenerated() seeds a session with it:
+# a fresh draft is shown at once; fresh analysis starts the pipeline at the
+# planner, so only planning and writing run. The scheduler regenerates a
+# snapshot once it is older than `refresh_seconds`, ahead of expiry, and
+# reuses a still-fresh analysis when only the draft is missing.
+
+DEFAULT_STORE_PATH = os.getenv(
+    "NEWSLETTER_PREGEN_STORE", os.path.join(".newsletter_cache", "pregenerated.sqlite3")
+)
+DEFAULT_FRESH_SECONDS = int(os.getenv("NEWSLETTER_PREGEN_FRESH_TTL", str(6 * 3600)))
+# "0" pre-generates fetch and analysis only, leaving planning and writing to the click.
+DEFAULT_DRAFT = os.getenv("NEWSLETTER_PREGEN_DRAFT", "1") != "0"
+DEFAULT_CHECK_SECONDS = float(os.getenv("NEWSLETTER_PREGEN_CHECK_EVERY", "600"))
+# Regenerate once a snapshot has used up this share of its freshness window.
+REFRESH_AT = 0.75
+DEFAULT_PROMPT = "Create today's newsletter."
+APP_NAME = "newsletter_pregen"
+USER_ID = "pregen"
+
+ANALYSIS_KEYS = ("raw_fetched_articles", ARTICLE_TEXTS_KEY, "clustered_ranked_topics")
+DRAFT_KEYS = ("newsletter_outline_plan", DRAFT_KEY, FINAL_OUTPUT_KEY)
+LAST_ANALYSIS_STAGE = "topic_analyzer_agent"
+FIRST_DRAFT_STAGE = "newsletter_planner"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS snapshots (
+    prompt TEXT PRIMARY KEY,
+    state TEXT NOT NULL,
+    analysis_at REAL NOT NULL,
+    draft_at REAL,
+    published_issues INTEGER NOT NULL
+);
+"""
+
+
+def published_issue_count() -> int:
+    if not config.published_filter:
+        return 0
+    from story_index import get_story_index
+    return get_story_index().counts()["issues"]
+
+
+@dataclass
+class Snapshot:
+    state: Dict[str, Any]
+    analysis_at: float
+    draft_at: Optional[float]
+    published_issues: int
+
+    def level(self, max_age: float, published_issues: int, now: Optional[float] = None) -> Optional[str]:
+        """"draft", "analysis" or None: the most complete part younger than max_age."""
+        now = now or time.time()
+        if published_issues != self.published_issues or now - self.analysis_at > max_age:
+            return None
+        if self.draft_at is not None and now - self.draft_at <= max_age and self.state.get(DRAFT_KEY):
+            return "draft"
+        return "analysis"
+
+
+class PregenStore:
+    """One snapshot per prompt, in SQLite so a cron process and the app share it."""
+
+    def __init__(self, path: str = DEFAULT_STORE_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(_SCHEMA)
+
+    def load(self, prompt: str) -> Optional[Snapshot]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT state, analysis_at, draft_at, published_issues FROM snapshots WHERE prompt = ?", (prompt,)
+            ).fetchone()
+        if row is None:
+            return None
+        return Snapshot(json.loads(row[0]), row[1], row[2], row[3])
+
+    def save(self, prompt: str, snapshot: Snapshot):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO snapshots (prompt, state, analysis_at, draft_at, published_issues) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (prompt, json.dumps(snapshot.state), snapshot.analysis_at, snapshot.draft_at, snapshot.published_issues),
+            )
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM snapshots")
+
+
+_default_store: Optional[PregenStore] = None
+
+
+def get_pregen_store() -> PregenStore:
+    """Process-wide snapshot store shared by the scheduler and the app."""
+    global _default_store
+    if _default_store is None:
+        _default_store = PregenStore()
+    return _default_store
+
+
+# --- Scheduler ---
+
+class Pregenerator:
+    """
+    Keeps the snapshot for `prompt` fresh. run_once() regenerates whatever is
+    stale (or everything with force=True); start_background() calls it every
+    `check_every` seconds on a daemon thread with its own event loop.
+    """
+
+    def __init__(
+        self,
+        store: Optional[PregenStore] = None,
+        prompt: str = DEFAULT_PROMPT,
+        draft: bool = DEFAULT_DRAFT,
+        fresh_seconds: float = DEFAULT_FRESH_SECONDS,
+        pipeline_agent: Optional[BaseAgent] = None,
+    ):
+        self.store = store or get_pregen_store()
+        self.prompt = prompt
+        self.draft = draft
+        self.fresh_seconds = fresh_seconds
+        self.refresh_seconds = fresh_seconds * REFRESH_AT
+        self.session_service = InMemorySessionService()
+        # Pipeline mode can stop after the analyzer and resume at the planner.
+        self.runner = Runner(
+            agent=pipeline_agent or get_agent("pipeline"), app_name=APP_NAME, session_service=self.session_service
+        )
+        self.runs = 0
+        self.last_result: Dict[str, Any] = {}
+
+    async def run_once(self, force: bool = False) -> Dict[str, Any]:
+        started = time.perf_counter()
+        published = published_issue_count()
+        snapshot = None if force else self.store.load(self.prompt)
+        level = snapshot.level(self.refresh_seconds, published) if snapshot else None
+        if level == "draft" or (level == "analysis" and not self.draft):
+            return {"status": "fresh", "level": level, "seconds": 0.0}
+
+        state: Dict[str, Any] = {}
+        if level == "analysis":
+            state = {key: snapshot.state[key] for key in ANALYSIS_KEYS if key in snapshot.state}
+            state[START_STAGE_KEY] = FIRST_DRAFT_STAGE
+        if not self.draft:
+            state[STOP_STAGE_KEY] = LAST_ANALYSIS_STAGE
+        session = await self.session_service.create_session(
+            app_name=APP_NAME, user_id=USER_ID, session_id=f"pregen_{uuid.uuid4().hex}", state=state
+        )
+        try:
+            async for _ in self.runner.run_async(
+                user_id=USER_ID,
+                session_id=session.id,
+                new_message=genai_types.Content(role="user", parts=[genai_types.Part.from_text(text=self.prompt)]),
+            ):
+                pass
+            session = await self.session_service.get_session(app_name=APP_NAME, user_id=USER_ID, session_id=session.id)
+        finally:
+            await self.session_service.delete_session(app_name=APP_NAME, user_id=USER_ID, session_id=session.id)
+        if not session.state.get("raw_fetched_articles"):
+            raise RuntimeError("pre-generation produced no articles")
+
+        now = time.time()
+        keys = ANALYSIS_KEYS + (DRAFT_KEYS if self.draft else ())
+        snapshot = Snapshot(
+            state={key: session.state[key] for key in keys if session.state.get(key) is not None},
+            analysis_at=snapshot.analysis_at if level == "analysis" else now,
+            draft_at=now if self.draft and session.state.get(DRAFT_KEY) else None,
+            published_issues=published,
+        )
+        self.store.save(self.prompt, snapshot)
+        self.runs += 1
+        self.last_result = {
+            "status": "generated",
+            "level": "draft" if snapshot.draft_at else "analysis",
+            "reused_analysis": level == "analysis",
+            "seconds": round(time.perf_counter() - started, 3),
+        }
+        logging.info(f"[TRACE] Pre-generation: {self.last_result}")
+        return self.last_result
+
+    async def _loop(self, check_every: float):
+        while True:
+            try:
+                await self.run_once()
+            except Exception as error:
+                logging.warning(f"[TRACE] Pre-generation failed: {error}")
+            await asyncio.sleep(check_every)
+
+    def start_background(self, check_every: float = DEFAULT_CHECK_SECONDS) -> threading.Thread:
+        thread = threading.Thread(
+            target=lambda: asyncio.run(self._loop(check_every)), name="newsletter-pregen", daemon=True
+        )
+        thread.start()
+        return thread
+
+
+_default_pregenerator: Optional[Pregenerator] = None
+
+
+def get_pregenerator() -> Pregenerator:
+    global _default_pregenerator
+    if _default_pregenerator is None:
+        _default_pregenerator = Pregenerator()
+    return _default_pregenerator
+
+
+# --- Serving ---
+
+async def serve_pregenerated(
+    session_service: BaseSessionService,
+    app_name: str,
+    user_id: str,
+    session_id: str,
+    prompt: str = DEFAULT_PROMPT,
+    store: Optional[PregenStore] = None,
+    fresh_seconds: float = DEFAULT_FRESH_SECONDS,
+    seed_analysis: bool = True,
+) -> Optional[str]:
+    """
+    Seeds a session with the fresh snapshot for `prompt`, if there is one.
+    Returns "draft" (the session now holds a finished draft under
+    FINAL_OUTPUT_KEY), "analysis" (fetch and analysis are seeded and a
+    pipeline run starts at the planner) or None (nothing fresh; run cold).
+    Pass seed_analysis=False for an orchestrator root, which cannot resume
+    at a stage, to serve finished drafts only.
+    """
+    snapshot = (store or get_pregen_store()).load(prompt)
+    level = snapshot.level(fresh_seconds, published_issue_count()) if snapshot else None
+    if level is None or (level == "analysis" and not seed_analysis):
+        return None
+    keys = ANALYSIS_KEYS + (DRAFT_KEYS if level == "draft" else ())
+    delta = {key: snapshot.state[key] for key in keys if key in snapshot.state}
+    if level == "analysis":
+        delta[START_STAGE_KEY] = FIRST_DRAFT_STAGE
+    session = await session_service.get_session(app_name=app_name, user_id=user_id, session_id=session_id)
+    await session_service.append_event(session, Event(author="pregenerator", actions=EventActions(state_delta=delta)))
+    age = time.time() - (snapshot.draft_at if level == "draft" else snapshot.analysis_at)
+    logging.info(f"[TRACE] Serving pre-generated {level} ({age / 60:.0f} min old)")
+    return level
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Pre-generate today's newsletter for the app's start button.")
+    parser.add_argument("--analysis-only", action="store_true", help="Fetch and analyze only; plan and write on click.")
+    parser.add_argument("--force", action="store_true", help="Regenerate even if the stored result is fresh.")
+    parser.add_argument("--every", type=float, default=0, help="Keep running, checking every SECONDS.")
+    args = parser.parse_args(argv)
+
+    pregenerator = Pregenerator(draft=DEFAULT_DRAFT and not args.analysis_only)
+    if args.every > 0:
+        asyncio.run(pregenerator._loop(args.every))
+        return 0
+    result = asyncio.run(pregenerator.run_once(force=args.force))
+    print(f"Pre-generation: {result['status']} {result['level']} in {result['seconds']:.1f} s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,242 @@
+import asyncio
+import json
+import os
+import random
+import threading
+from typing import AsyncGenerator, Dict, List, Optional
+
+from google.adk.agents import BaseAgent
+from google.adk.models.base_llm import BaseLlm
+from google.adk.models.llm_request import LlmRequest
+from google.adk.models.llm_response import LlmResponse
+from google.adk.models.registry import LLMRegistry
+from google.genai import errors as genai_errors
+from google.genai import types as genai_types
+
+# --- Replaying Stub LLM ---
+# An offline stand-in for Gemini that plugs into any agent tree (orchestrator,
+# pipeline, sub-agents) by replacing each agent's `model`. Responses come from
+# a recording: one JSON line per step,
+#     {"agent": "content_fetcher", "step": 0, "function_call": {"name": "...", "args": {...}}}
+#     {"agent": "content_fetcher", "step": 1, "text": "[...]", "latency": 0.8, "output_tokens": 900}
+# A step with both "text" and "function_call" answers with the text followed
+# by the call (e.g. a payload handed on with transfer_to_agent).
+# The step is the number of tool-call rounds the agent has already completed
+# in the current request, so multi-turn tool use replays in order without any
+# shared cursor. Latency and token counts come from the step, else from the
+# ReplayLlm settings, else are estimated from text length (~4 chars/token).
+# For fault testing, a ReplayLlm can also fail a share of calls with an API
+# error (error_rate, error_code: 429, 503, ...), stall them (stall_rate,
+# stall_latency) or draw latencies from a heavy-tailed distribution
+# (tail_alpha).
+# RecordingLlm writes the same format from a real model.
+
+DEFAULT_RECORDING_PATH = os.getenv(
+    "NEWSLETTER_LLM_RECORDING", os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "llm_replay.jsonl")
+)
+
+
+def tool_rounds(llm_request: LlmRequest) -> int:
+    """Number of (function_call, function_response) rounds at the end of the request."""
+    rounds = 0
+    contents = llm_request.contents or []
+    index = len(contents) - 1
+    while index >= 1:
+        response, call = contents[index], contents[index - 1]
+        if not any(p.function_response for p in response.parts or []):
+            break
+        if not any(p.function_call for p in call.parts or []):
+            break
+        rounds += 1
+        index -= 2
+    return rounds
+
+
+def request_chars(llm_request: LlmRequest) -> int:
+    chars = len(str(llm_request.config.system_instruction or "")) if llm_request.config else 0
+    for content in llm_request.contents or []:
+        for part in content.parts or []:
+            if part.text:
+                chars += len(part.text)
+            elif part.function_call:
+                chars += len(json.dumps(part.function_call.args or {}, default=str))
+            elif part.function_response:
+                chars += len(json.dumps(part.function_response.response or {}, default=str))
+    return chars
+
+
+class ReplayScript:
+    """Recorded steps keyed by agent name; agents without a recording get `default_text`."""
+
+    def __init__(self, steps: Optional[Dict[str, List[Dict]]] = None, default_text: str = "OK"):
+        self.steps = steps or {}
+        self.default_text = default_text
+
+    @classmethod
+    def load(cls, path: str = DEFAULT_RECORDING_PATH) -> "ReplayScript":
+        steps: Dict[str, Dict[int, Dict]] = {}
+        with open(path, encoding="utf-8") as fh:
+            for line in fh:
+                if line.strip():
+                    record = json.loads(line)
+                    steps.setdefault(record["agent"], {})[int(record.get("step", 0))] = record
+        return cls({agent: [by_step[i] for i in sorted(by_step)] for agent, by_step in steps.items()})
+
+    def step(self, agent_name: str, index: int) -> Dict:
+        steps = self.steps.get(agent_name)
+        if not steps:
+            return {"text": self.default_text}
+        # Past the end of the recording the last step repeats (usually the final answer).
+        return steps[min(index, len(steps) - 1)]
+
+
+class ReplayLlm(BaseLlm):
+    """
+    BaseLlm that answers from a ReplayScript on behalf of one agent, after
+    `latency` (+ uniform `jitter`) seconds, all multiplied by `time_scale`.
+    With stream=True the text is yielded in `stream_chunks` partial responses
+    spread over the latency. A random error_rate share of calls raises an
+    API error with error_code, and a stall_rate share takes stall_latency.
+    With tail_alpha > 0, latency is multiplied by a Pareto(tail_alpha) draw
+    (>= 1; the smaller tail_alpha, the heavier the tail).
+    """
+
+    script: ReplayScript
+    agent_name: str
+    latency: float = 0.0
+    jitter: float = 0.0
+    time_scale: float = 1.0
+    prompt_tokens: Optional[int] = None
+    output_tokens: Optional[int] = None
+    stream_chunks: int = 4
+    error_rate: float = 0.0
+    error_code: int = 429
+    stall_rate: float = 0.0
+    stall_latency: float = 0.0
+    tail_alpha: float = 0.0
+    seed: int = 0
+    calls: int = 0
+    errors: int = 0
+
+    def model_post_init(self, __context):
+        super().model_post_init(__context)
+        self._random = random.Random(self.seed)
+        self._lock = threading.Lock()
+
+    def _delay(self, step: Dict) -> float:
+        base = step.get("latency", self.latency)
+        with self._lock:
+            self.calls += 1
+            jitter = self._random.uniform(0, self.jitter) if self.jitter else 0.0
+            if self.error_rate and self._random.random() < self.error_rate:
+                self.errors += 1
+                raise genai_errors.APIError(
+                    self.error_code, {"error": {"code": self.error_code, "message": f"Injected error from {self.model}"}}
+                )
+            if self.stall_rate and self._random.random() < self.stall_rate:
+                base = self.stall_latency
+            if self.tail_alpha:
+                base *= self._random.paretovariate(self.tail_alpha)
+        return max(0.0, (base + jitter) * self.time_scale)
+
+    def _usage(self, step: Dict, llm_request: LlmRequest, output_chars: int):
+        prompt = step.get("prompt_tokens", self.prompt_tokens)
+        output = step.get("output_tokens", self.output_tokens)
+        return genai_types.GenerateContentResponseUsageMetadata(
+            prompt_token_count=prompt if prompt is not None else request_chars(llm_request) // 4,
+            candidates_token_count=output if output is not None else max(1, output_chars // 4),
+        )
+
+    async def generate_content_async(
+        self, llm_request: LlmRequest, stream: bool = False
+    ) -> AsyncGenerator[LlmResponse, None]:
+        step = self.script.step(self.agent_name, tool_rounds(llm_request))
+        delay = self._delay(step)
+        parts = []
+        if "text" in step or "function_call" not in step:
+            parts.append(genai_types.Part(text=step.get("text", "")))
+        if "function_call" in step:
+            call = step["function_call"]
+            parts.append(genai_types.Part(function_call=genai_types.FunctionCall(name=call["name"], args=call.get("args") or {})))
+        output_chars = sum(len(part.text) if part.text is not None else len(json.dumps(step["function_call"]))
+                           for part in parts)
+        part = parts[0]
+
+        if stream and part.text and len(parts) == 1 and self.stream_chunks > 1:
+            size = max(1, -(-len(part.text) // self.stream_chunks))
+            for start in range(0, len(part.text), size):
+                await asyncio.sleep(delay / self.stream_chunks)
+                yield LlmResponse(
+                    content=genai_types.Content(role="model", parts=[genai_types.Part(text=part.text[start:start + size])]),
+                    partial=True,
+                )
+        else:
+            await asyncio.sleep(delay)
+        yield LlmResponse(
+            content=genai_types.Content(role="model", parts=parts),
+            usage_metadata=self._usage(step, llm_request, output_chars),
+        )
+
+
+class RecordingLlm(BaseLlm):
+    """Wraps a real model and appends each final response to a replay recording."""
+
+    inner: BaseLlm
+    agent_name: str
+    path: str
+
+    async def generate_content_async(
+        self, llm_request: LlmRequest, stream: bool = False
+    ) -> AsyncGenerator[LlmResponse, None]:
+        step = tool_rounds(llm_request)
+        async for response in self.inner.generate_content_async(llm_request, stream=stream):
+            if not response.partial and response.content and response.content.parts:
+                parts = response.content.parts
+                record: Dict = {"agent": self.agent_name, "step": step}
+                text = "".join(p.text or "" for p in parts)
+                call = next((p.function_call for p in parts if p.function_call), None)
+                if text or call is None:
+                    record["text"] = text
+                if call is not None:
+                    record["function_call"] = {"name": call.name, "args": call.args or {}}
+                usage = response.usage_metadata
+                if usage is not None:
+                    record["prompt_tokens"] = usage.prompt_token_count
+                    record["output_tokens"] = usage.candidates_token_count
+                with open(self.path, "a", encoding="utf-8") as fh:
+                    fh.write(json.dumps(record, ensure_ascii=False) + "\n")
+            yield response
+
+
+def _agents_with_models(root: BaseAgent):
+    agents = [root]
+    while agents:
+        agent = agents.pop()
+        agents.extend(agent.sub_agents)
+        if hasattr(agent, "model"):
+            yield agent
+
+
+def install_replay_llm(root: BaseAgent, script: Optional[ReplayScript] = None, **options) -> Dict[str, ReplayLlm]:
+    """
+    Replaces the model of every agent under root with a ReplayLlm for that
+    agent (options: latency, jitter, prompt_tokens, output_tokens, ...).
+    Returns the stub models by agent name.
+    """
+    script = script or ReplayScript.load()
+    models = {}
+    for agent in _agents_with_models(root):
+        models[agent.name] = agent.model = ReplayLlm(
+            model=f"replay/{agent.name}", script=script, agent_name=agent.name, **options
+        )
+    return models
+
+
+def install_recording_llm(root: BaseAgent, path: str) -> BaseAgent:
+    """Wraps every agent's (resolved) model in a RecordingLlm writing to path."""
+    for agent in _agents_with_models(root):
+        inner = agent.canonical_model if hasattr(agent, "canonical_model") else agent.model
+        if isinstance(inner, str):
+            inner = LLMRegistry.new_llm(inner)
+        agent.model = RecordingLlm(model=inner.model, inner=inner, agent_name=agent.name, path=path)
+    return root
@@ -0,0 +1,112 @@
+import logging
+import time
+from collections import OrderedDict
+from dataclasses import asdict, dataclass, field
+from typing import Any, Dict, Optional
+
+from google.adk.agents import BaseAgent, LlmAgent
+from google.adk.agents.callback_context import CallbackContext
+from google.adk.models.llm_request import LlmRequest
+from google.adk.models.llm_response import LlmResponse
+from google.adk.tools.base_tool import BaseTool
+from google.adk.tools.tool_context import ToolContext
+
+# --- Per-Run LLM Call Metrics ---
+# Counts model and tool calls per invocation through agent callbacks, so the
+# orchestrator and pipeline execution modes can be compared on the same UI run.
+
+_MAX_TRACKED_RUNS = 64
+
+
+@dataclass
+class RunMetrics:
+    mode: str = ""
+    llm_calls: int = 0
+    tool_calls: int = 0
+    prompt_tokens: int = 0
+    output_tokens: int = 0
+    # Estimated request tokens before/after history compaction (context_compaction.py).
+    context_tokens_before: int = 0
+    context_tokens_after: int = 0
+    llm_calls_by_agent: Dict[str, int] = field(default_factory=dict)
+    # Estimated input tokens per stage with full history vs scoped context (scoped_context.py):
+    # {agent: {"calls": n, "before": tokens, "after": tokens}}.
+    stage_input_tokens: Dict[str, Dict[str, int]] = field(default_factory=dict)
+    started_at: float = field(default_factory=time.perf_counter)
+    finished_at: Optional[float] = None
+
+    @property
+    def wall_seconds(self) -> float:
+        end = self.finished_at if self.finished_at is not None else time.perf_counter()
+        return end - self.started_at
+
+    def as_dict(self) -> Dict[str, Any]:
+        data = asdict(self)
+        data.pop("started_at")
+        data.pop("finished_at")
+        data["wall_seconds"] = round(self.wall_seconds, 3)
+        return data
+
+
+_runs: "OrderedDict[str, RunMetrics]" = OrderedDict()
+
+
+def metrics_for(invocation_id: str) -> RunMetrics:
+    """Returns (creating if needed) the metrics of one runner invocation."""
+    metrics = _runs.get(invocation_id)
+    if metrics is None:
+        metrics = _runs[invocation_id] = RunMetrics()
+        while len(_runs) > _MAX_TRACKED_RUNS:
+            _runs.popitem(last=False)
+    return metrics
+
+
+def finish_run(invocation_id: str, mode: str) -> RunMetrics:
+    """Stamps the end time of an invocation and logs its summary."""
+    metrics = metrics_for(invocation_id)
+    metrics.mode = mode
+    metrics.finished_at = time.perf_counter()
+    logging.info(f"[TRACE] Run metrics: {metrics.as_dict()}")
+    return metrics
+
+
+def _count_llm_call(callback_context: CallbackContext, llm_request: LlmRequest) -> Optional[LlmResponse]:
+    metrics = metrics_for(callback_context.invocation_id)
+    metrics.llm_calls += 1
+    agent = callback_context.agent_name
+    metrics.llm_calls_by_agent[agent] = metrics.llm_calls_by_agent.get(agent, 0) + 1
+    return None
+
+
+def _count_llm_usage(callback_context: CallbackContext, llm_response: LlmResponse) -> Optional[LlmResponse]:
+    usage = llm_response.usage_metadata
+    if usage is not None and not llm_response.partial:
+        metrics = metrics_for(callback_context.invocation_id)
+        metrics.prompt_tokens += usage.prompt_token_count or 0
+        metrics.output_tokens += usage.candidates_token_count or 0
+    return None
+
+
+def _count_tool_call(tool: BaseTool, args: Dict[str, Any], tool_context: ToolContext) -> Optional[Dict]:
+    metrics_for(tool_context.invocation_id).tool_calls += 1
+    return None
+
+
+def _prepend(callback, existing) -> list:
+    if existing is None:
+        return [callback]
+    return [callback] + (list(existing) if isinstance(existing, list) else [existing])
+
+
+def instrument_agent_tree(root: BaseAgent) -> BaseAgent:
+    """Adds the call-counting callbacks to every LlmAgent under root (once)."""
+    agents = [root]
+    while agents:
+        agent = agents.pop()
+        agents.extend(agent.sub_agents)
+        if not isinstance(agent, LlmAgent) or _count_llm_call in agent.canonical_before_model_callbacks:
+            continue
+        agent.before_model_callback = _prepend(_count_llm_call, agent.before_model_callback)
+        agent.after_model_callback = _prepend(_count_llm_usage, agent.after_model_callback)
+        agent.before_tool_callback = _prepend(_count_tool_call, agent.before_tool_callback)
+    return root
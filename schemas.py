@@ -0,0 +1,338 @@
+import json
+import logging
+import re
+from typing import Any, Callable, List, Optional, Type
+
+from google.genai import types as genai_types
+from pydantic import AliasChoices, BaseModel, ConfigDict, Field, ValidationError
+
+# --- Typed Stage Payloads ---
+# The article list, ranked topics and outline plan that the stages hand to
+# each other. Models used to emit them as pretty-printed JSON in markdown
+# fences, which the next model had to re-read and nothing validated. Here:
+#   * pydantic models for each payload (in pipeline mode the planner uses
+#     OutlinePlan as its ADK output_schema; the fetcher, analyzer and the
+#     orchestrator's planner can call tools, so they are validated after the
+#     fact);
+#   * a tolerant parser: strips fences and surrounding prose and, only if
+#     json.loads fails, repairs common model mistakes (trailing or missing
+#     commas, comments, single quotes, Python literals, unescaped quotes,
+#     truncated output);
+#   * compact serialization (no whitespace, empty fields dropped), which is
+#     what is stored in session state and shown to the next stage.
+# attach_payload_schema() rewrites a stage's final response into that
+# compact, validated form, so a sloppy answer never forces a rerun.
+
+
+class _Payload(BaseModel):
+    model_config = ConfigDict(coerce_numbers_to_str=True, populate_by_name=True)
+
+
+class Article(_Payload):
+    title: str = ""
+    summary: str = ""
+    url: str = ""
+    domain: str = ""
+    published: Optional[str] = Field(
+        default=None, validation_alias=AliasChoices("published", "published_at", "date", "publication_date")
+    )
+
+
+class RankedTopic(Article):
+    recency_and_relevance_score: float = 0.0
+
+
+class OutlineSection(_Payload):
+    type: str = ""
+    content: str = ""
+
+
+class OutlineConclusion(OutlineSection):
+    final_cta: str = ""
+
+
+class ArticleOutline(_Payload):
+    original_topic_summary: str = ""
+    editorial_title: str = ""
+    key_takeaways: List[str] = Field(default_factory=list)
+    in_article_cta: str = ""
+
+
+class OutlinePlan(_Payload):
+    newsletter_theme: str = ""
+    subject_lines: List[str] = Field(default_factory=list)
+    introduction: OutlineSection = Field(default_factory=OutlineSection)
+    articles: List[ArticleOutline] = Field(default_factory=list)
+    conclusion: OutlineConclusion = Field(default_factory=OutlineConclusion)
+
+
+# --- Tolerant parsing ---
+_FENCE_OPEN = re.compile(r'(```|""")[ \t]*[\w-]*[ \t]*\n?')
+_NUMBER = re.compile(r"-?(?:0|[1-9]\d*)(?:\.\d+)?(?:[eE][+-]?\d+)?")
+_WORD = re.compile(r"[^\s,:{}\[\]\"']+")
+_LITERALS = {"true": "true", "false": "false", "null": "null", "True": "true", "False": "false", "None": "null"}
+_ESCAPES = {"b": "\b", "f": "\f", "n": "\n", "r": "\r", "t": "\t"}
+
+
+def strip_fences(text: str) -> str:
+    """The contents of the first markdown (or triple-quote) fence in text, else text itself."""
+    text = text.strip()
+    if text.startswith(("{", "[")):
+        return text
+    match = _FENCE_OPEN.search(text)
+    if not match:
+        return text
+    end = text.find(match.group(1), match.end())
+    return text[match.end():end if end >= 0 else len(text)].strip()
+
+
+def _read_string(text: str, index: int, quote: str):
+    """Decodes the string starting at text[index] (a quote); returns (value, index after it)."""
+    chars = []
+    index += 1
+    length = len(text)
+    while index < length:
+        char = text[index]
+        if char == "\\" and index + 1 < length:
+            escaped = text[index + 1]
+            if escaped == "u" and re.fullmatch(r"[0-9a-fA-F]{4}", text[index + 2:index + 6]):
+                chars.append(chr(int(text[index + 2:index + 6], 16)))
+                index += 6
+            else:
+                chars.append(_ESCAPES.get(escaped, escaped))
+                index += 2
+            continue
+        if char == quote:
+            # A quote only closes the string if JSON structure (or a line break) follows it;
+            # otherwise it is an unescaped quote inside the text.
+            end = index + 1
+            while end < length and text[end] in " \t\r\n":
+                end += 1
+            if end >= length or text[end] in ",:}]" or "\n" in text[index + 1:end]:
+                return "".join(chars), index + 1
+        chars.append(char)
+        index += 1
+    return "".join(chars), length
+
+
+def repair_json(text: str) -> str:
+    """
+    Rewrites almost-JSON into JSON: keeps the first top-level object or list,
+    drops comments and trailing commas, inserts missing commas, quotes bare
+    words and single-quoted strings, maps Python literals and closes
+    truncated strings and brackets.
+    """
+    starts = [i for i in (text.find("{"), text.find("[")) if i >= 0]
+    if not starts:
+        return text
+    out: List[str] = []
+    closers: List[str] = []
+    previous = ""  # "value", "open", "," or ":"
+    index, length = min(starts), len(text)
+    while index < length:
+        char = text[index]
+        if char in " \t\r\n":
+            index += 1
+        elif text.startswith("//", index) or char == "#":
+            newline = text.find("\n", index)
+            index = length if newline < 0 else newline
+        elif text.startswith("/*", index):
+            end = text.find("*/", index + 2)
+            index = length if end < 0 else end + 2
+        elif char in "{[":
+            if previous == "value":
+                out.append(",")
+            out.append(char)
+            closers.append("}" if char == "{" else "]")
+            previous = "open"
+            index += 1
+        elif char in "}]":
+            if not closers:
+                break
+            if previous == ",":
+                out.pop()
+            elif previous == ":":
+                out.append("null")
+            out.append(closers.pop())
+            previous = "value"
+            index += 1
+            if not closers:
+                break  # anything after the top-level value is prose
+        elif char == ",":
+            if previous == "value":
+                out.append(",")
+                previous = ","
+            index += 1
+        elif char == ":":
+            if previous == "value":
+                out.append(":")
+                previous = ":"
+            index += 1
+        else:
+            if char in "\"'":
+                value, index = _read_string(text, index, char)
+                token = json.dumps(value, ensure_ascii=False)
+            else:
+                match = _WORD.match(text, index)
+                word = match.group(0) if match else char
+                index += len(word)
+                if _NUMBER.fullmatch(word):
+                    token = word
+                else:
+                    token = _LITERALS.get(word) or json.dumps(word, ensure_ascii=False)
+            if previous == "value":
+                out.append(",")
+            out.append(token)
+            previous = "value"
+    if previous == ",":
+        out.pop()
+    elif previous == ":":
+        out.append("null")
+    out.extend(reversed(closers))
+    return "".join(out)
+
+
+def parse_json_payload(payload: Any) -> Any:
+    """
+    Decodes a stage payload: non-strings are returned unchanged, strings are
+    unfenced and parsed, and repaired only if that fails. Returns None if
+    nothing JSON-like can be recovered.
+    """
+    if not isinstance(payload, str):
+        return payload
+    text = strip_fences(payload)
+    if not text:
+        return None
+    try:
+        return json.loads(text)
+    except json.JSONDecodeError:
+        pass
+    try:
+        return json.loads(repair_json(text))
+    except json.JSONDecodeError:
+        return None
+
+
+# --- Compact serialization ---
+def _prune(value: Any) -> Any:
+    if isinstance(value, BaseModel):
+        value = value.model_dump(exclude_none=True)
+    if isinstance(value, dict):
+        return {k: _prune(v) for k, v in value.items() if v not in (None, "", [], {})}
+    if isinstance(value, (list, tuple)):
+        return [_prune(v) for v in value]
+    return value
+
+
+def dump_payload(value: Any) -> str:
+    """Compact JSON for a payload: no indentation or spaces, empty fields dropped."""
+    if isinstance(value, str):
+        return value
+    return json.dumps(_prune(value), ensure_ascii=False, separators=(",", ":"))
+
+
+# --- Typed loading ---
+def _describe(item: dict) -> str:
+    return repr(str(item.get("title") or item.get("url") or item)[:80])
+
+
+def load_records(payload: Any, model: Type[_Payload] = Article) -> List[_Payload]:
+    """
+    Validates an article or topic list (a list, or a dict wrapping it under
+    "articles"/"topics"). Fields that do not validate (e.g. a non-numeric
+    score) fall back to their defaults, with a warning naming the item and
+    the fields; items that still do not validate are skipped with a warning.
+    """
+    payload = parse_json_payload(payload)
+    if isinstance(payload, dict):
+        payload = payload.get("articles") or payload.get("topics") or []
+    records = []
+    for item in payload if isinstance(payload, list) else []:
+        if not isinstance(item, dict):
+            continue
+        try:
+            records.append(model.model_validate(item))
+            continue
+        except ValidationError as error:
+            bad = {str(e["loc"][0]) for e in error.errors() if e["loc"]}
+        try:
+            records.append(model.model_validate({k: v for k, v in item.items() if k not in bad}))
+            logging.warning(f"[TRACE] {model.__name__} {_describe(item)}: defaulted invalid {sorted(bad)}")
+        except ValidationError as error:
+            logging.warning(f"[TRACE] {model.__name__} {_describe(item)} dropped: {error.errors()[0]['msg']}")
+    return records
+
+
+def load_outline(payload: Any) -> Optional[OutlinePlan]:
+    """Validates an outline plan, unwrapping the planner's legacy `newsletter_sections` envelope."""
+    payload = parse_json_payload(payload)
+    if not isinstance(payload, dict):
+        return None
+    payload = payload.get("newsletter_sections", payload)
+    try:
+        return OutlinePlan.model_validate(payload)
+    except ValidationError:
+        return None
+
+
+def compact_articles(payload: Any) -> Optional[str]:
+    records = load_records(payload, Article)
+    return dump_payload(records) if records else None
+
+
+def compact_topics(payload: Any) -> Optional[str]:
+    records = load_records(payload, RankedTopic)
+    return dump_payload(records) if records else None
+
+
+def compact_outline(payload: Any) -> Optional[str]:
+    plan = load_outline(payload)
+    return dump_payload(plan) if plan and plan.articles else None
+
+
+# --- Agent wiring ---
+def attach_payload_schema(agent, compact: Callable[[Any], Optional[str]]):
+    """
+    Adds an after_model_callback to `agent` that replaces its final text
+    response with compact(text) (e.g. compact_articles). Unparseable answers
+    are passed through unchanged, except for agents with an output_schema
+    (the planner): ADK validates their text with model_validate_json and
+    raises on failure, so an answer that does not validate is replaced with
+    the schema's empty default and the run continues.
+    A payload sent together with a function call (e.g. the orchestrator's
+    planner handing its outline to the writer with transfer_to_agent) is not
+    a final response, which ADK never saves under output_key; a valid one is
+    saved here instead.
+    """
+    schema = getattr(agent, "output_schema", None)
+    output_key = getattr(agent, "output_key", None)
+
+    def normalize_payload(callback_context, llm_response):
+        content = llm_response.content
+        if llm_response.partial or not content or not content.parts:
+            return None
+        text = "".join(part.text for part in content.parts if part.text and not part.thought)
+        if not text.strip():
+            return None
+        compacted = compact(text)
+        if any(part.function_call for part in content.parts):
+            if compacted is not None and output_key:
+                callback_context.state[output_key] = compacted
+            return None
+        if compacted is None:
+            logging.warning(f"[TRACE] {callback_context.agent_name} returned an unparseable payload")
+            if schema is None:
+                return None
+            try:
+                schema.model_validate_json(text)
+                return None
+            except ValidationError:
+                compacted = dump_payload(schema())
+        if compacted != text:
+            content.parts = [part for part in content.parts if part.thought] + [genai_types.Part(text=compacted)]
+        return None
+
+    existing = agent.after_model_callback
+    existing = [] if existing is None else (list(existing) if isinstance(existing, list) else [existing])
+    agent.after_model_callback = existing + [normalize_payload]
+    return agent
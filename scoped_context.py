@@ -0,0 +1,108 @@
+import logging
+from typing import Iterable, List, Optional
+
+from google.adk.agents import LlmAgent
+from google.adk.agents.callback_context import CallbackContext
+from google.adk.models.llm_request import LlmRequest
+from google.adk.models.llm_response import LlmResponse
+from google.genai import types as genai_types
+
+from config import config
+from context_compaction import STAGE_STATE_KEYS, compact_contents, estimate_tokens
+from run_metrics import metrics_for
+from stage_cache import STAGE_DIRECTIVES_KEY
+
+# --- Scoped Context Injection ---
+# With NEWSLETTER_CONTEXT_MODE=scoped, a sub-agent no longer receives the
+# conversation history (orchestrator instructions, transfers, earlier stage
+# outputs and drafts). Its request holds only:
+#   * its declared input state keys, injected into its instruction through
+#     ADK `{key?}` templates;
+#   * the user's current message and any rework directive for the stage;
+#   * its own tool calls and results from the current run.
+# Each call also estimates what the stage would have been sent in full mode
+# (history after compaction, instruction without inputs), so run metrics
+# report per-stage input tokens before and after on the same run.
+
+INPUT_TEMPLATE = "\n**Input (session state `{key}`):**\n{{{key}?}}\n"
+
+
+def _own_tool_rounds(contents: List[genai_types.Content]) -> List[genai_types.Content]:
+    """The trailing (function_call, function_response) pairs: this agent's tool use so far."""
+    index = len(contents)
+    while index >= 2:
+        response, call = contents[index - 1], contents[index - 2]
+        if not any(p.function_response for p in response.parts or []):
+            break
+        if not any(p.function_call for p in call.parts or []):
+            break
+        index -= 2
+    return contents[index:]
+
+
+def _instruction_chars(llm_request: LlmRequest) -> int:
+    instruction = llm_request.config.system_instruction if llm_request.config else None
+    return len(str(instruction or ""))
+
+
+class _ScopedContext:
+    """before_model_callback that narrows one agent's request to its inputs."""
+
+    def __init__(self, agent_name: str, input_keys: List[str]):
+        self.agent_name = agent_name
+        self.input_keys = input_keys
+
+    def _full_history_tokens(self, callback_context: CallbackContext, user_text: str) -> int:
+        # What include_contents="default" would have sent, after history compaction.
+        # Stage agents do not run on branches, so the whole event list applies.
+        from google.adk.flows.llm_flows.contents import _get_contents
+
+        history = _get_contents(None, callback_context.session.events, self.agent_name)
+        state_values = {key: callback_context.state.get(key) for key in STAGE_STATE_KEYS}
+        return estimate_tokens(compact_contents(history, user_text, state_values))
+
+    def before_model(self, callback_context: CallbackContext, llm_request: LlmRequest) -> Optional[LlmResponse]:
+        # Section writers inherit the fallback writer's callbacks but build their own requests.
+        if callback_context.agent_name != self.agent_name:
+            return None
+        user_content = callback_context.user_content
+        user_text = "".join(p.text or "" for p in user_content.parts or []) if user_content else ""
+        directive = (callback_context.state.get(STAGE_DIRECTIVES_KEY) or {}).get(self.agent_name)
+
+        parts = [genai_types.Part(text=user_text)] if user_text else []
+        if directive:
+            parts.append(genai_types.Part(text=f"Directive for this stage: {directive}"))
+        contents = [genai_types.Content(role="user", parts=parts)] if parts else []
+        contents += _own_tool_rounds(llm_request.contents or [])
+
+        instruction_chars = _instruction_chars(llm_request)
+        injected_chars = sum(len(str(callback_context.state.get(key) or "")) for key in self.input_keys)
+        before = self._full_history_tokens(callback_context, user_text) + (instruction_chars - injected_chars) // 4
+        llm_request.contents = contents
+        after = estimate_tokens(contents) + instruction_chars // 4
+
+        row = metrics_for(callback_context.invocation_id).stage_input_tokens.setdefault(
+            self.agent_name, {"calls": 0, "before": 0, "after": 0}
+        )
+        row["calls"] += 1
+        row["before"] += before
+        row["after"] += after
+        logging.info(f"[TRACE] Scoped context for {self.agent_name}: ~{before} -> ~{after} input tokens")
+        return None
+
+
+def attach_scoped_context(agent: LlmAgent, input_keys: Iterable[str] = ()) -> LlmAgent:
+    """
+    In scoped context mode (config.context_mode == "scoped"), limits `agent`
+    to its input_keys (see the module comment). A no-op in full mode.
+    """
+    if config.context_mode != "scoped":
+        return agent
+    input_keys = list(input_keys)
+    scope = _ScopedContext(agent.name, input_keys)
+    agent.include_contents = "none"
+    agent.instruction = agent.instruction + "".join(INPUT_TEMPLATE.format(key=key) for key in input_keys)
+    existing = agent.before_model_callback
+    existing = [] if existing is None else (list(existing) if isinstance(existing, list) else [existing])
+    agent.before_model_callback = existing + [scope.before_model]
+    return agent
@@ -0,0 +1,84 @@
+import asyncio
+import logging
+import os
+import time
+from typing import Dict, Iterable, List, Optional
+
+from search_backends import DEFAULT_RESULTS_PER_QUERY, SearchBackend
+from topic_engine import normalize_url
+
+# --- Concurrent Search Fan-Out ---
+# The content fetcher used to issue internet_search calls one model turn at a
+# time. fan_out_search runs every per-domain sub-query concurrently against a
+# SearchBackend (bounded by a semaphore) and merges the results by normalized
+# URL, so the model only ever sees one de-duplicated candidate list.
+
+DEFAULT_CONCURRENCY = int(os.getenv("NEWSLETTER_SEARCH_CONCURRENCY", "6"))
+
+# Sub-queries issued for each domain of the newsletter.
+DOMAIN_SUBQUERIES: Dict[str, List[str]] = {
+    "AI": ["artificial intelligence news", "AI research breakthrough", "AI industry announcement"],
+    "ML": ["machine learning research", "new machine learning model", "MLOps and ML tooling release"],
+    "LLM": ["large language model release", "LLM benchmark results", "LLM agents and reasoning"],
+}
+
+
+def build_fetch_queries(domains: Optional[Iterable[str]] = None, extra_queries: Optional[Iterable[str]] = None) -> List[Dict]:
+    """Expands domains into (domain, query) pairs, plus any free-form extra queries."""
+    queries = []
+    for domain in domains or DOMAIN_SUBQUERIES:
+        for subquery in DOMAIN_SUBQUERIES.get(domain, [f"{domain} news"]):
+            queries.append({"domain": domain, "query": subquery})
+    for query in extra_queries or []:
+        queries.append({"domain": "", "query": query})
+    return queries
+
+
+def merge_results(batches: List[List[Dict]], queries: List[Dict]) -> List[Dict]:
+    """
+    Merges per-query result lists by normalized URL, in query order. The first
+    occurrence wins; later duplicates only add their query to `matched_queries`.
+    """
+    merged: Dict[str, Dict] = {}
+    for spec, results in zip(queries, batches):
+        for result in results:
+            url = result.get("url")
+            if not url:
+                continue
+            key = normalize_url(url)
+            if key in merged:
+                merged[key]["matched_queries"].append(spec["query"])
+                continue
+            merged[key] = {**result, "domain": result.get("domain") or spec["domain"], "matched_queries": [spec["query"]]}
+    return list(merged.values())
+
+
+async def fan_out_search(
+    queries: List[Dict],
+    backend: SearchBackend,
+    concurrency: int = DEFAULT_CONCURRENCY,
+    max_results: int = DEFAULT_RESULTS_PER_QUERY,
+) -> List[Dict]:
+    """
+    Runs every query concurrently (at most `concurrency` in flight) and returns
+    the merged, URL-deduplicated candidates. A failing query contributes no
+    results instead of failing the whole fetch.
+    """
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+
+    async def run_one(spec: Dict) -> List[Dict]:
+        async with semaphore:
+            try:
+                return await backend.search(spec["query"], max_results=max_results)
+            except Exception as error:
+                logging.warning(f"[TRACE] Search failed for '{spec['query']}': {error}")
+                return []
+
+    started = time.perf_counter()
+    batches = await asyncio.gather(*(run_one(spec) for spec in queries))
+    merged = merge_results(batches, queries)
+    logging.info(
+        f"[TRACE] Search fan-out: {len(queries)} queries, {sum(map(len, batches))} results, "
+        f"{len(merged)} unique in {time.perf_counter() - started:.2f}s"
+    )
+    return merged
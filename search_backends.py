@@ -0,0 +1,295 @@
+import asyncio
+import datetime
+import hashlib
+import json
+import logging
+import os
+import random
+import re
+import threading
+from typing import Dict, List, Optional, Protocol, Tuple
+
+from schemas import parse_json_payload
+from stage_cache import StageCache, stage_key
+
+# --- Pluggable Search Backends ---
+# Every search in the pipeline (the fetcher's fan-out and the writer's
+# internet_search tool) goes through get_search_backend(). The backend is
+# chosen with NEWSLETTER_SEARCH_BACKEND:
+#   live       Gemini Google Search grounding (default)
+#   fixture    offline corpus in fixtures/search_corpus.json
+#   replay     answers recorded earlier with `record`
+#   record     live search, appending every answer to the replay file
+#   simulated  synthetic results with configurable latency (benchmarks)
+# and is wrapped in a persistent result cache keyed by normalized query and
+# date window, so identical queries across agents and same-day runs are
+# answered locally.
+
+DEFAULT_RESULTS_PER_QUERY = 5
+DEFAULT_FIXTURE_PATH = os.getenv(
+    "NEWSLETTER_SEARCH_FIXTURES",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "search_corpus.json"),
+)
+DEFAULT_REPLAY_PATH = os.getenv("NEWSLETTER_SEARCH_REPLAY", os.path.join(".newsletter_cache", "search_replay.jsonl"))
+DEFAULT_RESULT_CACHE_PATH = os.getenv(
+    "NEWSLETTER_SEARCH_CACHE", os.path.join(".newsletter_cache", "search_cache.sqlite3")
+)
+DEFAULT_RESULT_CACHE_TTL = int(os.getenv("NEWSLETTER_SEARCH_CACHE_TTL", str(24 * 3600)))
+DEFAULT_RESULT_CACHE_MAX_ENTRIES = int(os.getenv("NEWSLETTER_SEARCH_CACHE_MAX_ENTRIES", "2048"))
+# Results are shared by queries issued within the same window of days.
+DEFAULT_DATE_WINDOW_DAYS = int(os.getenv("NEWSLETTER_SEARCH_DATE_WINDOW_DAYS", "1"))
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+
+
+def normalize_query(query: str) -> str:
+    """Case-, punctuation- and word-order-insensitive form of a search query."""
+    return " ".join(sorted(set(_TOKEN.findall((query or "").lower()))))
+
+
+class SearchBackend(Protocol):
+    """Anything that can answer one search query with a list of result dicts
+    (title, summary, url, and optionally domain / published)."""
+
+    async def search(self, query: str, max_results: int = DEFAULT_RESULTS_PER_QUERY) -> List[Dict]:
+        ...
+
+
+class SimulatedSearchBackend:
+    """
+    Local stand-in for a search service, for benchmarks and offline runs.
+    Each query sleeps for `latency` seconds (+/- jitter) and returns
+    deterministic results; `overlap` controls how many URLs are shared with
+    other queries so merging and de-duplication are exercised.
+    """
+
+    def __init__(self, latency: float = 0.2, jitter: float = 0.0, overlap: float = 0.3, seed: int = 0):
+        self.latency = latency
+        self.jitter = jitter
+        self.overlap = overlap
+        self.seed = seed
+        self.calls = 0
+
+    async def search(self, query: str, max_results: int = DEFAULT_RESULTS_PER_QUERY) -> List[Dict]:
+        self.calls += 1
+        digest = int(hashlib.sha256(f"{self.seed}:{query}".encode()).hexdigest(), 16)
+        rng = random.Random(digest)
+        await asyncio.sleep(max(0.0, self.latency + rng.uniform(-self.jitter, self.jitter)))
+        results = []
+        for rank in range(max_results):
+            shared = rng.random() < self.overlap
+            slug = f"shared-{rng.randrange(20)}" if shared else f"{digest % 10**8}-{rank}"
+            results.append({
+                "title": f"{query.title()} story {slug}",
+                "summary": f"Simulated result {rank} for '{query}'.",
+                "url": f"https://www.example.com/news/{slug}?utm_source=search",
+                "published": datetime.date.today().isoformat(),
+            })
+        return results
+
+
+class GeminiSearchBackend:
+    """
+    Live search through Gemini's Google Search grounding. The model is asked
+    for a JSON list of articles; if it does not return one, the grounding
+    chunks (title + source URL) are used instead.
+    """
+
+    def __init__(self, model: str = "gemini-2.5-flash"):
+        self.model = model
+        self._client = None
+
+    def _get_client(self):
+        if self._client is None:
+            from google import genai
+            self._client = genai.Client()
+        return self._client
+
+    async def search(self, query: str, max_results: int = DEFAULT_RESULTS_PER_QUERY) -> List[Dict]:
+        from google.genai import types as genai_types
+
+        prompt = (
+            f"Search the web for the {max_results} most recent, authoritative news articles about: {query}. "
+            f"Today is {datetime.date.today().isoformat()}. Reply with only a JSON list of objects with "
+            '"title", "summary" (one sentence), "url" and "published" (ISO date) keys.'
+        )
+        response = await self._get_client().aio.models.generate_content(
+            model=self.model,
+            contents=prompt,
+            config=genai_types.GenerateContentConfig(
+                tools=[genai_types.Tool(google_search=genai_types.GoogleSearch())],
+            ),
+        )
+        results = parse_json_payload(response.text or "")
+        if isinstance(results, list):
+            return [r for r in results if isinstance(r, dict) and r.get("url")][:max_results]
+        results = []
+        candidate = response.candidates[0] if response.candidates else None
+        metadata = candidate.grounding_metadata if candidate else None
+        for chunk in (metadata.grounding_chunks or []) if metadata else []:
+            if chunk.web and chunk.web.uri:
+                results.append({"title": chunk.web.title or "", "summary": "", "url": chunk.web.uri})
+        return results[:max_results]
+
+
+class FixtureSearchBackend:
+    """
+    Offline search over a JSON corpus of articles (a list of objects with
+    title, summary, url and optional domain / published). Results are ranked
+    by how many query tokens appear in the title and summary.
+    """
+
+    def __init__(self, path: str = DEFAULT_FIXTURE_PATH):
+        with open(path, encoding="utf-8") as fh:
+            self.articles = json.load(fh)
+        self._tokens = [
+            set(_TOKEN.findall(f"{a.get('title', '')} {a.get('summary', '')} {a.get('domain', '')}".lower()))
+            for a in self.articles
+        ]
+
+    async def search(self, query: str, max_results: int = DEFAULT_RESULTS_PER_QUERY) -> List[Dict]:
+        terms = set(normalize_query(query).split())
+        scores = [len(terms & tokens) for tokens in self._tokens]
+        ranked = sorted((i for i, score in enumerate(scores) if score), key=lambda i: (-scores[i], i))
+        return [dict(self.articles[i]) for i in ranked[:max_results]]
+
+
+class ReplaySearchBackend:
+    """
+    Replays answers recorded in a JSONL file ({"query", "results"} per line,
+    matched by normalized query). With `inner` set, unknown queries are
+    forwarded to it and the answers appended to the file (record mode).
+    """
+
+    def __init__(self, path: str = DEFAULT_REPLAY_PATH, inner: Optional[SearchBackend] = None):
+        self.path = path
+        self.inner = inner
+        self._recorded: Dict[str, List[Dict]] = {}
+        self._lock = threading.Lock()
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as fh:
+                for line in fh:
+                    if line.strip():
+                        entry = json.loads(line)
+                        self._recorded[normalize_query(entry["query"])] = entry["results"]
+
+    async def search(self, query: str, max_results: int = DEFAULT_RESULTS_PER_QUERY) -> List[Dict]:
+        key = normalize_query(query)
+        if key in self._recorded:
+            return self._recorded[key][:max_results]
+        if self.inner is None:
+            logging.warning(f"[TRACE] No recorded search results for '{query}'")
+            return []
+        results = await self.inner.search(query, max_results=max_results)
+        with self._lock:
+            self._recorded[key] = results
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            with open(self.path, "a", encoding="utf-8") as fh:
+                fh.write(json.dumps({"query": query, "results": results}, ensure_ascii=False) + "\n")
+        return results
+
+
+class CachedSearchBackend:
+    """
+    Persistent result cache in front of another backend, keyed by normalized
+    query, result count and date window. TTL and size-bounded LRU eviction
+    come from the same SQLite store as the stage cache. Concurrent misses for
+    the same key on the same event loop share one in-flight backend call
+    (stampede protection). The backend is process-wide and the app runs each
+    session, and the pre-generation thread, on its own loop, so in-flight
+    calls are kept per loop under a lock. Empty result lists are not cached.
+    """
+
+    def __init__(
+        self,
+        inner: SearchBackend,
+        cache: Optional[StageCache] = None,
+        date_window_days: int = DEFAULT_DATE_WINDOW_DAYS,
+    ):
+        self.inner = inner
+        self.cache = cache or StageCache(
+            path=DEFAULT_RESULT_CACHE_PATH,
+            ttl_seconds=DEFAULT_RESULT_CACHE_TTL,
+            max_entries=DEFAULT_RESULT_CACHE_MAX_ENTRIES,
+        )
+        self.date_window_days = max(1, date_window_days)
+        # (event loop, key) -> future of the call that owns the key on that loop.
+        self._in_flight: Dict[Tuple[asyncio.AbstractEventLoop, str], asyncio.Future] = {}
+        self._lock = threading.Lock()
+
+    def key_for(self, query: str, max_results: int) -> str:
+        window = datetime.date.today().toordinal() // self.date_window_days
+        return stage_key("search", {
+            "backend": type(self.inner).__name__,
+            "query": normalize_query(query),
+            "max_results": max_results,
+            "window": window,
+        })
+
+    async def search(self, query: str, max_results: int = DEFAULT_RESULTS_PER_QUERY) -> List[Dict]:
+        key = self.key_for(query, max_results)
+        loop = asyncio.get_running_loop()
+        while True:
+            cached = self.cache.get(key, stage="search")
+            if cached is not None:
+                return json.loads(cached)
+            with self._lock:
+                in_flight = self._in_flight.get((loop, key))
+                if in_flight is None:
+                    future = self._in_flight[(loop, key)] = loop.create_future()
+            if in_flight is None:
+                break
+            results = await asyncio.shield(in_flight)
+            # None: the owning call was cancelled; retry (possibly as the new owner).
+            if results is not None:
+                return list(results)
+
+        try:
+            results = await self.inner.search(query, max_results=max_results)
+            if results:
+                self.cache.put(key, "search", json.dumps(results, ensure_ascii=False))
+            future.set_result(results)
+            return results
+        except asyncio.CancelledError:
+            # The owner's cancellation (a timeout, a lost hedge) is not the waiters' error.
+            future.set_result(None)
+            raise
+        except Exception as error:
+            future.set_exception(error)
+            # Waiters re-raise it; retrieve it here so an unawaited future does not warn.
+            future.exception()
+            raise
+        finally:
+            with self._lock:
+                del self._in_flight[(loop, key)]
+
+
+_default_backend: Optional[SearchBackend] = None
+
+
+def build_search_backend(name: str, cached: bool = True) -> SearchBackend:
+    """Creates the named backend (see module comment), optionally behind the result cache."""
+    if name == "simulated":
+        backend = SimulatedSearchBackend()
+    elif name == "fixture":
+        backend = FixtureSearchBackend()
+    elif name == "replay":
+        backend = ReplaySearchBackend()
+    elif name == "record":
+        backend = ReplaySearchBackend(inner=GeminiSearchBackend())
+    elif name == "live":
+        backend = GeminiSearchBackend()
+    else:
+        raise ValueError(f"Unknown search backend: {name}")
+    return CachedSearchBackend(backend) if cached else backend
+
+
+def get_search_backend() -> SearchBackend:
+    """Process-wide backend selected by NEWSLETTER_SEARCH_BACKEND (cache disabled with NEWSLETTER_SEARCH_CACHE_ENABLED=0)."""
+    global _default_backend
+    if _default_backend is None:
+        _default_backend = build_search_backend(
+            os.getenv("NEWSLETTER_SEARCH_BACKEND", "live"),
+            cached=os.getenv("NEWSLETTER_SEARCH_CACHE_ENABLED", "1") != "0",
+        )
+    return _default_backend
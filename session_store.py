@@ -0,0 +1,355 @@
+import asyncio
+import json
+import logging
+import os
+import queue
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Optional
+
+from google.adk.events import Event
+from google.adk.sessions import BaseSessionService, Session
+from google.adk.sessions.base_session_service import GetSessionConfig, ListSessionsResponse
+from google.adk.sessions.state import State
+
+# --- Persistent Per-User Session Store ---
+# A BaseSessionService backed by SQLite, replacing the single process-wide
+# InMemorySessionService. Sessions, their events (one row each, looked up
+# through the (session, seq) primary key and a (session, timestamp) index) and
+# app/user-scoped state survive restarts. Nothing is cached in process: a
+# session is loaded when the Runner asks for it, so memory is bounded by the
+# sessions currently running. Idle sessions (NEWSLETTER_SESSION_IDLE_TTL) and
+# the least recently used sessions beyond NEWSLETTER_SESSION_MAX are deleted.
+# Blocking SQLite calls run in worker threads over a small connection pool;
+# every write is a BEGIN IMMEDIATE transaction, so concurrent Streamlit users
+# (or processes sharing the file) never interleave partial updates.
+
+DEFAULT_SESSION_DB = os.getenv(
+    "NEWSLETTER_SESSION_DB", os.path.join(".newsletter_cache", "sessions.sqlite3")
+)
+DEFAULT_IDLE_TTL_SECONDS = int(os.getenv("NEWSLETTER_SESSION_IDLE_TTL", str(7 * 24 * 3600)))
+DEFAULT_MAX_SESSIONS = int(os.getenv("NEWSLETTER_SESSION_MAX", "1000"))
+DEFAULT_POOL_SIZE = int(os.getenv("NEWSLETTER_SESSION_POOL_SIZE", "4"))
+_APPEND_LOCK_STRIPES = 64
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    app_name TEXT NOT NULL,
+    user_id TEXT NOT NULL,
+    id TEXT NOT NULL,
+    state TEXT NOT NULL,
+    create_time REAL NOT NULL,
+    update_time REAL NOT NULL,
+    event_count INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (app_name, user_id, id)
+);
+CREATE INDEX IF NOT EXISTS idx_sessions_update_time ON sessions(update_time);
+CREATE TABLE IF NOT EXISTS events (
+    app_name TEXT NOT NULL,
+    user_id TEXT NOT NULL,
+    session_id TEXT NOT NULL,
+    seq INTEGER NOT NULL,
+    timestamp REAL NOT NULL,
+    data TEXT NOT NULL,
+    PRIMARY KEY (app_name, user_id, session_id, seq)
+);
+CREATE INDEX IF NOT EXISTS idx_events_timestamp ON events(app_name, user_id, session_id, timestamp);
+CREATE TABLE IF NOT EXISTS app_states (
+    app_name TEXT PRIMARY KEY,
+    state TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS user_states (
+    app_name TEXT NOT NULL,
+    user_id TEXT NOT NULL,
+    state TEXT NOT NULL,
+    PRIMARY KEY (app_name, user_id)
+);
+"""
+
+
+def _split_state(state: Optional[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+    """Splits a state dict into app:, user: and session-scoped parts (temp: is dropped)."""
+    deltas = {"app": {}, "user": {}, "session": {}}
+    for key, value in (state or {}).items():
+        if key.startswith(State.APP_PREFIX):
+            deltas["app"][key[len(State.APP_PREFIX):]] = value
+        elif key.startswith(State.USER_PREFIX):
+            deltas["user"][key[len(State.USER_PREFIX):]] = value
+        elif not key.startswith(State.TEMP_PREFIX):
+            deltas["session"][key] = value
+    return deltas
+
+
+class _ConnectionPool:
+    """Up to `size` SQLite connections handed out to one thread at a time."""
+
+    def __init__(self, path: str, size: int):
+        if path == ":memory:":
+            # A private shared-cache database; one connection avoids shared-cache table locks.
+            self.target, self.uri, size = f"file:sessions_{uuid.uuid4().hex}?mode=memory&cache=shared", True, 1
+        else:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            self.target, self.uri = path, False
+        self.size = max(1, size)
+        self._idle: "queue.LifoQueue[sqlite3.Connection]" = queue.LifoQueue()
+        self._created = 0
+        self._lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.target, uri=self.uri, check_same_thread=False, isolation_level=None, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    @contextmanager
+    def connection(self) -> Iterator[sqlite3.Connection]:
+        try:
+            conn = self._idle.get_nowait()
+        except queue.Empty:
+            with self._lock:
+                create = self._created < self.size
+                if create:
+                    self._created += 1
+            conn = self._connect() if create else self._idle.get()
+        try:
+            yield conn
+        finally:
+            self._idle.put(conn)
+
+
+class SqliteSessionService(BaseSessionService):
+    """
+    SQLite-backed session service; a drop-in replacement for
+    InMemorySessionService (see the module comment for the guarantees).
+    """
+
+    def __init__(
+        self,
+        path: str = DEFAULT_SESSION_DB,
+        idle_ttl_seconds: int = DEFAULT_IDLE_TTL_SECONDS,
+        max_sessions: int = DEFAULT_MAX_SESSIONS,
+        pool_size: int = DEFAULT_POOL_SIZE,
+    ):
+        self.path = path
+        self.idle_ttl_seconds = idle_ttl_seconds
+        self.max_sessions = max_sessions
+        self._pool = _ConnectionPool(path, pool_size)
+        # Appends to one session are serialized (parallel section writers share a session).
+        self._append_locks = [threading.Lock() for _ in range(_APPEND_LOCK_STRIPES)]
+        with self._pool.connection() as conn:
+            conn.executescript(_SCHEMA)
+
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        with self._pool.connection() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield conn
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            conn.execute("COMMIT")
+
+    # --- scoped state ---
+    @staticmethod
+    def _merge_scoped_state(conn: sqlite3.Connection, table: str, where: str, params: tuple, delta: Dict):
+        if not delta:
+            return
+        row = conn.execute(f"SELECT state FROM {table} WHERE {where}", params).fetchone()
+        state = json.loads(row[0]) if row else {}
+        state.update(delta)
+        columns = "app_name, state" if table == "app_states" else "app_name, user_id, state"
+        conn.execute(
+            f"INSERT OR REPLACE INTO {table} ({columns}) VALUES ({', '.join('?' * (len(params) + 1))})",
+            (*params, json.dumps(state)),
+        )
+
+    @staticmethod
+    def _with_scoped_state(conn: sqlite3.Connection, app_name: str, user_id: str, state: Dict) -> Dict:
+        merged = dict(state)
+        row = conn.execute("SELECT state FROM app_states WHERE app_name = ?", (app_name,)).fetchone()
+        for key, value in (json.loads(row[0]) if row else {}).items():
+            merged[State.APP_PREFIX + key] = value
+        row = conn.execute(
+            "SELECT state FROM user_states WHERE app_name = ? AND user_id = ?", (app_name, user_id)
+        ).fetchone()
+        for key, value in (json.loads(row[0]) if row else {}).items():
+            merged[State.USER_PREFIX + key] = value
+        return merged
+
+    # --- BaseSessionService ---
+    async def create_session(
+        self,
+        *,
+        app_name: str,
+        user_id: str,
+        state: Optional[Dict[str, Any]] = None,
+        session_id: Optional[str] = None,
+    ) -> Session:
+        return await asyncio.to_thread(self._create_session, app_name, user_id, state, session_id)
+
+    def _create_session(self, app_name, user_id, state, session_id) -> Session:
+        session_id = (session_id or "").strip() or str(uuid.uuid4())
+        deltas = _split_state(state)
+        now = time.time()
+        with self._transaction() as conn:
+            self._evict(conn, now, room=1)
+            try:
+                conn.execute(
+                    "INSERT INTO sessions (app_name, user_id, id, state, create_time, update_time) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    (app_name, user_id, session_id, json.dumps(deltas["session"]), now, now),
+                )
+            except sqlite3.IntegrityError:
+                raise ValueError(f"Session {session_id} already exists.") from None
+            self._merge_scoped_state(conn, "app_states", "app_name = ?", (app_name,), deltas["app"])
+            self._merge_scoped_state(
+                conn, "user_states", "app_name = ? AND user_id = ?", (app_name, user_id), deltas["user"]
+            )
+            merged = self._with_scoped_state(conn, app_name, user_id, deltas["session"])
+        return Session(id=session_id, app_name=app_name, user_id=user_id, state=merged, events=[], last_update_time=now)
+
+    async def get_session(
+        self,
+        *,
+        app_name: str,
+        user_id: str,
+        session_id: str,
+        config: Optional[GetSessionConfig] = None,
+    ) -> Optional[Session]:
+        return await asyncio.to_thread(self._get_session, app_name, user_id, session_id, config)
+
+    def _get_session(self, app_name, user_id, session_id, config) -> Optional[Session]:
+        key = (app_name, user_id, session_id)
+        with self._pool.connection() as conn:
+            row = conn.execute(
+                "SELECT state, update_time FROM sessions WHERE app_name = ? AND user_id = ? AND id = ?", key
+            ).fetchone()
+            if row is None:
+                return None
+            query = "SELECT data FROM events WHERE app_name = ? AND user_id = ? AND session_id = ?"
+            params: tuple = key
+            if config and config.after_timestamp:
+                query += " AND timestamp >= ?"
+                params += (config.after_timestamp,)
+            query += " ORDER BY seq DESC"
+            if config and config.num_recent_events:
+                query += " LIMIT ?"
+                params += (config.num_recent_events,)
+            rows = conn.execute(query, params).fetchall()
+            state = self._with_scoped_state(conn, app_name, user_id, json.loads(row[0]))
+        events = [Event.model_validate_json(data) for (data,) in reversed(rows)]
+        return Session(
+            id=session_id, app_name=app_name, user_id=user_id, state=state, events=events, last_update_time=row[1]
+        )
+
+    async def list_sessions(self, *, app_name: str, user_id: Optional[str] = None) -> ListSessionsResponse:
+        return await asyncio.to_thread(self._list_sessions, app_name, user_id)
+
+    def _list_sessions(self, app_name, user_id) -> ListSessionsResponse:
+        query = "SELECT user_id, id, update_time FROM sessions WHERE app_name = ?"
+        params: tuple = (app_name,)
+        if user_id is not None:
+            query += " AND user_id = ?"
+            params += (user_id,)
+        with self._pool.connection() as conn:
+            rows = conn.execute(query + " ORDER BY update_time DESC", params).fetchall()
+        return ListSessionsResponse(sessions=[
+            Session(id=sid, app_name=app_name, user_id=uid, state={}, events=[], last_update_time=updated)
+            for uid, sid, updated in rows
+        ])
+
+    async def delete_session(self, *, app_name: str, user_id: str, session_id: str) -> None:
+        await asyncio.to_thread(self._delete_session, app_name, user_id, session_id)
+
+    def _delete_session(self, app_name, user_id, session_id):
+        key = (app_name, user_id, session_id)
+        with self._transaction() as conn:
+            conn.execute("DELETE FROM events WHERE app_name = ? AND user_id = ? AND session_id = ?", key)
+            conn.execute("DELETE FROM sessions WHERE app_name = ? AND user_id = ? AND id = ?", key)
+
+    async def append_event(self, session: Session, event: Event) -> Event:
+        if event.partial:
+            return event
+        event = self._trim_temp_delta_state(event)
+        await asyncio.to_thread(self._append_event, session, event)
+        # Same in-memory bookkeeping as InMemorySessionService.
+        await super().append_event(session=session, event=event)
+        return event
+
+    def _append_event(self, session: Session, event: Event):
+        key = (session.app_name, session.user_id, session.id)
+        deltas = _split_state(event.actions.state_delta if event.actions else None)
+        lock = self._append_locks[hash(key) % _APPEND_LOCK_STRIPES]
+        with lock:
+            with self._transaction() as conn:
+                row = conn.execute(
+                    "SELECT state, update_time, event_count FROM sessions "
+                    "WHERE app_name = ? AND user_id = ? AND id = ?", key,
+                ).fetchone()
+                if row is None:
+                    raise ValueError(f"Session {session.id} not found; it may have been evicted.")
+                if row[1] > session.last_update_time + 1e-6:
+                    raise ValueError(
+                        f"Session {session.id} was modified in storage after it was loaded; reload it and retry."
+                    )
+                state = json.loads(row[0])
+                state.update(deltas["session"])
+                seq, update_time = row[2] + 1, max(event.timestamp, row[1])
+                conn.execute(
+                    "INSERT INTO events (app_name, user_id, session_id, seq, timestamp, data) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    (*key, seq, event.timestamp, event.model_dump_json(exclude_none=True)),
+                )
+                conn.execute(
+                    "UPDATE sessions SET state = ?, update_time = ?, event_count = ? "
+                    "WHERE app_name = ? AND user_id = ? AND id = ?",
+                    (json.dumps(state), update_time, seq, *key),
+                )
+                self._merge_scoped_state(conn, "app_states", "app_name = ?", (session.app_name,), deltas["app"])
+                self._merge_scoped_state(
+                    conn, "user_states", "app_name = ? AND user_id = ?", (session.app_name, session.user_id),
+                    deltas["user"],
+                )
+            session.last_update_time = update_time
+
+    # --- eviction ---
+    def _evict(self, conn: sqlite3.Connection, now: float, room: int = 0):
+        stale = (
+            "SELECT app_name, user_id, id FROM sessions WHERE update_time < ? "
+            "UNION SELECT app_name, user_id, id FROM ("
+            " SELECT app_name, user_id, id FROM sessions ORDER BY update_time DESC LIMIT -1 OFFSET ?)"
+        )
+        params = (now - self.idle_ttl_seconds, max(0, self.max_sessions - room))
+        evicted = conn.execute(
+            f"DELETE FROM events WHERE (app_name, user_id, session_id) IN ({stale})", params
+        ).rowcount
+        removed = conn.execute(f"DELETE FROM sessions WHERE (app_name, user_id, id) IN ({stale})", params).rowcount
+        if removed:
+            logging.info(f"[TRACE] Session store evicted {removed} idle sessions ({evicted} events)")
+
+    def evict_idle(self) -> None:
+        """Applies the idle TTL and session cap now (also done on every create_session)."""
+        with self._transaction() as conn:
+            self._evict(conn, time.time())
+
+    def stats(self) -> Dict[str, int]:
+        with self._pool.connection() as conn:
+            sessions, events = conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(event_count), 0) FROM sessions"
+            ).fetchone()
+        return {"sessions": sessions, "events": events}
+
+
+_default_service: Optional[SqliteSessionService] = None
+
+
+def get_session_service() -> SqliteSessionService:
+    """Process-wide session service at DEFAULT_SESSION_DB, shared by every Streamlit user."""
+    global _default_service
+    if _default_service is None:
+        _default_service = SqliteSessionService()
+    return _default_service
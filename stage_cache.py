@@ -0,0 +1,217 @@
+import datetime
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Iterable, Optional
+
+from google.adk.agents import BaseAgent
+from google.adk.agents.callback_context import CallbackContext
+from google.genai import types as genai_types
+
+from schemas import dump_payload
+
+# --- Content-Addressed Stage Cache ---
+# Persists the output of a sub-agent stage (raw_fetched_articles,
+# clustered_ranked_topics, newsletter_outline_plan) in SQLite, keyed by a hash
+# of everything the stage output depends on: agent name, model, instruction,
+# the upstream state keys it reads and any rework directive aimed at it. A
+# before_agent_callback serves hits straight into session state, so a repeat
+# or rework run with unchanged upstream inputs makes no LLM call for the stage.
+
+DEFAULT_CACHE_PATH = os.getenv(
+    "NEWSLETTER_STAGE_CACHE", os.path.join(".newsletter_cache", "stage_cache.sqlite3")
+)
+DEFAULT_TTL_SECONDS = int(os.getenv("NEWSLETTER_STAGE_CACHE_TTL", str(24 * 3600)))
+DEFAULT_MAX_ENTRIES = int(os.getenv("NEWSLETTER_STAGE_CACHE_MAX_ENTRIES", "256"))
+
+# Session state key holding {stage_name: directive} for reworks that must
+# re-run a stage with new instructions (see tools.set_stage_directive).
+STAGE_DIRECTIVES_KEY = "stage_directives"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS stage_outputs (
+    key TEXT PRIMARY KEY,
+    stage TEXT NOT NULL,
+    value TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    last_access REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_stage_outputs_last_access ON stage_outputs(last_access);
+CREATE INDEX IF NOT EXISTS idx_stage_outputs_created_at ON stage_outputs(created_at);
+"""
+
+
+def stage_key(stage: str, parts: Dict[str, Any]) -> str:
+    """Stable SHA-256 over the stage name and a JSON-serializable dict of inputs."""
+    canonical = json.dumps({"stage": stage, **parts}, sort_keys=True, default=str, ensure_ascii=False)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class StageCache:
+    """
+    SQLite-backed key/value store with a TTL and LRU eviction once more than
+    max_entries outputs are stored. Hit/miss counters are kept per stage for
+    the lifetime of the process.
+    """
+
+    def __init__(
+        self,
+        path: str = DEFAULT_CACHE_PATH,
+        ttl_seconds: int = DEFAULT_TTL_SECONDS,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+    ):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._counters: Dict[str, Dict[str, int]] = {}
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(_SCHEMA)
+
+    def _count(self, stage: str, outcome: str):
+        counters = self._counters.setdefault(stage, {"hits": 0, "misses": 0, "stores": 0})
+        counters[outcome] += 1
+
+    def get(self, key: str, stage: str = "") -> Optional[str]:
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, created_at FROM stage_outputs WHERE key = ?", (key,)
+            ).fetchone()
+            if row is not None and now - row[1] > self.ttl_seconds:
+                self._conn.execute("DELETE FROM stage_outputs WHERE key = ?", (key,))
+                row = None
+            if row is None:
+                self._count(stage, "misses")
+                return None
+            self._conn.execute("UPDATE stage_outputs SET last_access = ? WHERE key = ?", (now, key))
+            self._count(stage, "hits")
+            return row[0]
+
+    def put(self, key: str, stage: str, value: str):
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO stage_outputs (key, stage, value, created_at, last_access) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (key, stage, value, now, now),
+            )
+            self._count(stage, "stores")
+            self._evict(now)
+
+    def _evict(self, now: float):
+        self._conn.execute("DELETE FROM stage_outputs WHERE created_at < ?", (now - self.ttl_seconds,))
+        self._conn.execute(
+            "DELETE FROM stage_outputs WHERE key IN ("
+            " SELECT key FROM stage_outputs ORDER BY last_access DESC LIMIT -1 OFFSET ?)",
+            (self.max_entries,),
+        )
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM stage_outputs")
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        """Per-stage hit/miss/store counters plus the number of stored entries."""
+        with self._lock:
+            stored = dict(self._conn.execute(
+                "SELECT stage, COUNT(*) FROM stage_outputs GROUP BY stage"
+            ).fetchall())
+        stats = {stage: dict(counters) for stage, counters in self._counters.items()}
+        for stage, count in stored.items():
+            stats.setdefault(stage, {"hits": 0, "misses": 0, "stores": 0})["entries"] = count
+        return stats
+
+
+_default_cache: Optional[StageCache] = None
+
+
+def get_stage_cache() -> StageCache:
+    """Process-wide cache shared by all sub-agents."""
+    global _default_cache
+    if _default_cache is None:
+        _default_cache = StageCache()
+    return _default_cache
+
+
+def _as_callback_list(callback) -> list:
+    if callback is None:
+        return []
+    return list(callback) if isinstance(callback, list) else [callback]
+
+
+class _StageCacheCallbacks:
+    """before/after agent callbacks that serve and store one stage's output."""
+
+    def __init__(self, agent: BaseAgent, input_keys: Iterable[str], include_date: bool, cache: Optional[StageCache]):
+        self.agent = agent
+        self.input_keys = list(input_keys)
+        self.include_date = include_date
+        self._cache = cache
+        self._pending: Dict[str, tuple] = {}
+
+    @property
+    def cache(self) -> StageCache:
+        return self._cache or get_stage_cache()
+
+    def key_for(self, state) -> str:
+        agent = self.agent
+        model = getattr(agent, "model", "")
+        parts = {
+            "model": model if isinstance(model, str) else getattr(model, "model", str(model)),
+            "instruction": getattr(agent, "instruction", ""),
+            "inputs": {key: state.get(key) for key in self.input_keys},
+            "directive": (state.get(STAGE_DIRECTIVES_KEY) or {}).get(agent.name),
+        }
+        if self.include_date:
+            parts["date"] = datetime.date.today().isoformat()
+        return stage_key(agent.name, parts)
+
+    def before_agent(self, callback_context: CallbackContext) -> Optional[genai_types.Content]:
+        output_key = self.agent.output_key
+        key = self.key_for(callback_context.state)
+        cached = self.cache.get(key, stage=self.agent.name)
+        if cached is None:
+            self._pending[callback_context.invocation_id] = (key, callback_context.state.get(output_key))
+            return None
+        logging.info(f"[TRACE] Stage cache hit for {self.agent.name}; skipping model call")
+        value = json.loads(cached)
+        callback_context.state[output_key] = value
+        text = dump_payload(value)
+        return genai_types.Content(role="model", parts=[genai_types.Part.from_text(text=text)])
+
+    def after_agent(self, callback_context: CallbackContext) -> Optional[genai_types.Content]:
+        pending = self._pending.pop(callback_context.invocation_id, None)
+        if pending is None:
+            return None
+        key, previous = pending
+        value = callback_context.state.get(self.agent.output_key)
+        # Only store output this run actually produced.
+        if value is not None and value != previous:
+            self.cache.put(key, self.agent.name, json.dumps(value))
+        return None
+
+
+def attach_stage_cache(
+    agent: BaseAgent,
+    input_keys: Iterable[str] = (),
+    include_date: bool = False,
+    cache: Optional[StageCache] = None,
+) -> BaseAgent:
+    """
+    Makes `agent` check the stage cache before calling its model and store its
+    output_key value afterwards. input_keys are the session state keys the
+    stage reads; include_date scopes entries to the current day (for stages
+    whose real input is "today's news").
+    """
+    callbacks = _StageCacheCallbacks(agent, input_keys, include_date, cache)
+    agent.before_agent_callback = [callbacks.before_agent] + _as_callback_list(agent.before_agent_callback)
+    agent.after_agent_callback = _as_callback_list(agent.after_agent_callback) + [callbacks.after_agent]
+    return agent
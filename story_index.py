@@ -0,0 +1,374 @@
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import Counter
+from typing import Any, Dict, FrozenSet, Iterable, Iterator, List, Optional
+
+import numpy as np
+from google.adk.agents import BaseAgent
+from google.adk.agents.callback_context import CallbackContext
+
+from config import config
+from schemas import dump_payload
+from topic_engine import normalize_title, normalize_url, parse_article_list
+
+# --- Published-Story Index ---
+# Remembers the stories of every approved issue so later runs do not cover
+# them again. Each story is indexed three ways:
+#   * normalized URL (tracking parameters, `www.` and trailing slashes removed);
+#   * normalized title;
+#   * a 64-bit SimHash of its summary, so the same story from another source
+#     or with a reworded snippet is still recognized.
+# SQLite is the durable copy; lookups run against in-memory structures loaded
+# once per process: dicts for URLs and titles, and one uint64 array holding
+# every fingerprint. A SimHash lookup is a single vectorized XOR + popcount
+# over that array (about 10k stories for five years of daily issues), and
+# the few fingerprints within max_distance bits are confirmed by the word
+# overlap of the two summaries. Search snippets are short, so their
+# fingerprints are noisy; the confirmation step keeps unrelated stories that
+# happen to land close from being dropped. A candidate check stays well
+# under a millisecond.
+# attach_published_filter() removes published stories from
+# `raw_fetched_articles` before the article fetch and topic analyzer stages.
+# Issues also keep their markdown, which archive_export.py renders.
+
+DEFAULT_STORY_INDEX = os.getenv(
+    "NEWSLETTER_STORY_INDEX", os.path.join(".newsletter_cache", "story_index.sqlite3")
+)
+# Keep at least this many candidates after filtering, topping up with
+# published stories (in fetch order) when a fetch is mostly repeats.
+DEFAULT_MIN_CANDIDATES = int(os.getenv("NEWSLETTER_STORY_INDEX_MIN_CANDIDATES", "5"))
+DEFAULT_MAX_DISTANCE = int(os.getenv("NEWSLETTER_STORY_INDEX_MAX_DISTANCE", "14"))
+# Word-set Jaccard similarity that confirms a SimHash candidate.
+DEFAULT_MIN_SIMILARITY = float(os.getenv("NEWSLETTER_STORY_INDEX_MIN_SIMILARITY", "0.5"))
+# At most this many of the nearest fingerprints are confirmed per lookup.
+MAX_CONFIRM = 32
+SIMHASH_BITS = 64
+SHINGLE_CHARS = 4
+# Summaries with fewer words than this are too short for a reliable fingerprint.
+MIN_WORDS = 8
+FETCHED_KEY = "raw_fetched_articles"
+TOPICS_KEY = "clustered_ranked_topics"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS issues (
+    id TEXT PRIMARY KEY,
+    title TEXT NOT NULL,
+    published_at REAL NOT NULL,
+    story_count INTEGER NOT NULL,
+    markdown TEXT NOT NULL DEFAULT ''
+);
+CREATE TABLE IF NOT EXISTS stories (
+    issue_id TEXT NOT NULL,
+    url TEXT NOT NULL,
+    title TEXT NOT NULL,
+    simhash INTEGER,
+    terms TEXT NOT NULL,
+    published_at REAL NOT NULL,
+    PRIMARY KEY (issue_id, url, title)
+);
+CREATE INDEX IF NOT EXISTS idx_stories_url ON stories(url);
+CREATE INDEX IF NOT EXISTS idx_stories_title ON stories(title);
+"""
+
+
+# --- SimHash ---
+
+def summary_terms(text: str) -> FrozenSet[str]:
+    return frozenset(word for word in normalize_title(text).split() if len(word) > 2)
+
+
+def simhash(text: str) -> Optional[int]:
+    """
+    64-bit SimHash over the character 4-gram shingles of `text`, or None if
+    it is too short. Character shingles give a short snippet a hundred or so
+    features instead of a dozen words, which steadies the fingerprint.
+    """
+    normalized = normalize_title(text)
+    if len(normalized.split()) < MIN_WORDS:
+        return None
+    shingles = Counter(normalized[i:i + SHINGLE_CHARS] for i in range(len(normalized) - SHINGLE_CHARS + 1))
+    digests = b"".join(hashlib.blake2b(s.encode("utf-8"), digest_size=8).digest() for s in shingles)
+    bits = np.unpackbits(np.frombuffer(digests, dtype=np.uint8).reshape(len(shingles), 8), axis=1)
+    weights = np.fromiter(shingles.values(), dtype=np.int32, count=len(shingles)) @ (bits.astype(np.int32) * 2 - 1)
+    return int.from_bytes(np.packbits(weights > 0).tobytes(), "big")
+
+
+_BYTE_POPCOUNT = np.array([bin(n).count("1") for n in range(256)], dtype=np.uint8)
+
+
+def _popcount(values: np.ndarray) -> np.ndarray:
+    if hasattr(np, "bitwise_count"):
+        return np.bitwise_count(values)
+    return _BYTE_POPCOUNT[values.view(np.uint8)].reshape(-1, 8).sum(axis=1)
+
+
+def _to_sql(fingerprint: Optional[int]) -> Optional[int]:
+    # SQLite integers are signed 64-bit.
+    if fingerprint is None:
+        return None
+    return fingerprint - (1 << SIMHASH_BITS) if fingerprint >> (SIMHASH_BITS - 1) else fingerprint
+
+
+def _from_sql(value: Optional[int]) -> Optional[int]:
+    return None if value is None else value & ((1 << SIMHASH_BITS) - 1)
+
+
+def _jaccard(a: FrozenSet[str], b: FrozenSet[str]) -> float:
+    return len(a & b) / len(a | b) if a and b else 0.0
+
+
+def issue_id_for(markdown: str) -> str:
+    """Stable id of an issue: approving the same draft twice records it once."""
+    return hashlib.sha256((markdown or "").encode("utf-8")).hexdigest()[:16]
+
+
+# --- Index ---
+
+class StoryIndex:
+    """
+    SQLite store of published issues plus the in-memory URL/title maps and
+    fingerprint array used for lookups. Writes go to both; the in-memory
+    side is loaded from SQLite on first use.
+    """
+
+    def __init__(
+        self,
+        path: str = DEFAULT_STORY_INDEX,
+        max_distance: int = DEFAULT_MAX_DISTANCE,
+        min_similarity: float = DEFAULT_MIN_SIMILARITY,
+    ):
+        self.path = path
+        self.max_distance = max_distance
+        self.min_similarity = min_similarity
+        self._lock = threading.Lock()
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(_SCHEMA)
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(issues)")}
+        if "markdown" not in columns:
+            # Indexes created before issues kept their markdown.
+            self._conn.execute("ALTER TABLE issues ADD COLUMN markdown TEXT NOT NULL DEFAULT ''")
+        self._loaded = False
+        self._urls: Dict[str, str] = {}
+        self._titles: Dict[str, str] = {}
+        # Parallel lists, one entry per fingerprinted story; _array mirrors
+        # _fingerprints and is rebuilt after writes.
+        self._fingerprints: List[int] = []
+        self._terms: List[FrozenSet[str]] = []
+        self._fingerprint_issues: List[str] = []
+        self._array = np.empty(0, dtype=np.uint64)
+        self.counters = {"checked": 0, "url": 0, "title": 0, "simhash": 0}
+
+    def _remember(self, issue_id: str, url: str, title: str, fingerprint: Optional[int], terms: FrozenSet[str]):
+        if url:
+            self._urls.setdefault(url, issue_id)
+        if title:
+            self._titles.setdefault(title, issue_id)
+        if fingerprint is not None:
+            self._fingerprints.append(fingerprint)
+            self._terms.append(terms)
+            self._fingerprint_issues.append(issue_id)
+
+    def _ensure_loaded(self):
+        if self._loaded:
+            return
+        with self._lock:
+            if self._loaded:
+                return
+            started = time.perf_counter()
+            rows = self._conn.execute(
+                "SELECT issue_id, url, title, simhash, terms FROM stories ORDER BY published_at"
+            ).fetchall()
+            for issue_id, url, title, fingerprint, terms in rows:
+                self._remember(issue_id, url, title, _from_sql(fingerprint), frozenset(terms.split()))
+            self._array = np.array(self._fingerprints, dtype=np.uint64)
+            self._loaded = True
+            logging.info(
+                f"[TRACE] Story index: loaded {len(rows)} published stories in "
+                f"{(time.perf_counter() - started) * 1000:.1f} ms"
+            )
+
+    def add_issue(self, issue_id: str, stories: Iterable[Dict[str, Any]], title: str = "",
+                  published_at: Optional[float] = None, markdown: str = "") -> int:
+        """
+        Records an issue (with its markdown, for the archive) and its stories;
+        returns the number of stories indexed.
+        """
+        self._ensure_loaded()
+        published_at = published_at or time.time()
+        rows = []
+        for story in stories:
+            url = normalize_url(story.get("url", "")) if story.get("url") else ""
+            story_title = normalize_title(story.get("title", ""))
+            if not url and not story_title:
+                continue
+            summary = story.get("summary") or ""
+            rows.append((url, story_title, simhash(summary), summary_terms(summary)))
+        with self._lock:
+            known = {row[:2] for row in self._conn.execute(
+                "SELECT url, title FROM stories WHERE issue_id = ?", (issue_id,)
+            )}
+            rows = [row for row in rows if row[:2] not in known]
+            self._conn.execute("BEGIN")
+            self._conn.execute(
+                "INSERT OR REPLACE INTO issues (id, title, published_at, story_count, markdown) VALUES (?, ?, ?, ?, ?)",
+                (issue_id, title, published_at, len(known) + len(rows), markdown),
+            )
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO stories (issue_id, url, title, simhash, terms, published_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                [(issue_id, url, t, _to_sql(fp), " ".join(sorted(terms)), published_at) for url, t, fp, terms in rows],
+            )
+            self._conn.execute("COMMIT")
+            for url, story_title, fingerprint, terms in rows:
+                self._remember(issue_id, url, story_title, fingerprint, terms)
+            self._array = np.array(self._fingerprints, dtype=np.uint64)
+        return len(rows)
+
+    def _near_duplicate(self, summary: str) -> Optional[str]:
+        fingerprint = simhash(summary)
+        if fingerprint is None or not len(self._array):
+            return None
+        distances = _popcount(self._array ^ np.uint64(fingerprint))
+        close = np.flatnonzero(distances <= self.max_distance)
+        if len(close) > MAX_CONFIRM:
+            close = close[np.argpartition(distances[close], MAX_CONFIRM)[:MAX_CONFIRM]]
+        terms = summary_terms(summary)
+        for position in close[np.argsort(distances[close], kind="stable")].tolist():
+            if _jaccard(terms, self._terms[position]) >= self.min_similarity:
+                return self._fingerprint_issues[position]
+        return None
+
+    def match(self, article: Dict[str, Any]) -> Optional[Dict[str, str]]:
+        """
+        Returns {"issue_id", "reason"} if the article was already published
+        (reason is "url", "title" or "simhash"), else None.
+        """
+        self._ensure_loaded()
+        self.counters["checked"] += 1
+        url = normalize_url(article.get("url", "")) if article.get("url") else ""
+        if url and url in self._urls:
+            self.counters["url"] += 1
+            return {"issue_id": self._urls[url], "reason": "url"}
+        title = normalize_title(article.get("title", ""))
+        if title and title in self._titles:
+            self.counters["title"] += 1
+            return {"issue_id": self._titles[title], "reason": "title"}
+        issue_id = self._near_duplicate(article.get("summary") or "")
+        if issue_id is not None:
+            self.counters["simhash"] += 1
+            return {"issue_id": issue_id, "reason": "simhash"}
+        return None
+
+    def iter_issues(self) -> Iterator[Dict[str, Any]]:
+        """Yields every published issue, oldest first: id, title, published_at and markdown."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id, title, published_at, markdown FROM issues ORDER BY published_at, id"
+            ).fetchall()
+        for issue_id, title, published_at, markdown in rows:
+            yield {"id": issue_id, "title": title, "published_at": published_at, "markdown": markdown}
+
+    def counts(self) -> Dict[str, int]:
+        with self._lock:
+            issues = self._conn.execute("SELECT COUNT(*) FROM issues").fetchone()[0]
+            stories = self._conn.execute("SELECT COUNT(*) FROM stories").fetchone()[0]
+        return {"issues": issues, "stories": stories}
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM stories")
+            self._conn.execute("DELETE FROM issues")
+            self._urls.clear()
+            self._titles.clear()
+            self._fingerprints.clear()
+            self._terms.clear()
+            self._fingerprint_issues.clear()
+            self._array = np.empty(0, dtype=np.uint64)
+
+
+_default_index: Optional[StoryIndex] = None
+
+
+def get_story_index() -> StoryIndex:
+    """Process-wide index shared by the pipeline stages and the app."""
+    global _default_index
+    if _default_index is None:
+        _default_index = StoryIndex()
+    return _default_index
+
+
+# --- Filtering and publishing ---
+
+def filter_published(
+    articles: List[Dict[str, Any]],
+    index: Optional[StoryIndex] = None,
+    min_candidates: int = DEFAULT_MIN_CANDIDATES,
+) -> tuple:
+    """
+    Splits candidates into (kept, published). If fewer than min_candidates
+    unpublished articles remain, published ones are appended (in their
+    original order) to reach it. Applying it twice gives the same list.
+    """
+    index = index or get_story_index()
+    fresh, published = [], []
+    for article in articles:
+        (published if index.match(article) else fresh).append(article)
+    kept = fresh + published[:max(0, min_candidates - len(fresh))]
+    return kept, published
+
+
+def publish_issue(state: Dict[str, Any], markdown: str, index: Optional[StoryIndex] = None) -> int:
+    """
+    Records an approved issue: its markdown and its ranked topics
+    (clustered_ranked_topics in session state) with their URLs, titles and
+    summaries.
+    """
+    stories = parse_article_list(state.get(TOPICS_KEY))
+    title = next((line.lstrip("# ").strip() for line in (markdown or "").splitlines() if line.startswith("#")), "")
+    count = (index or get_story_index()).add_issue(issue_id_for(markdown), stories, title=title, markdown=markdown)
+    logging.info(f"[TRACE] Story index: recorded issue '{title}' with {count} stories")
+    return count
+
+
+class _PublishedFilterCallback:
+    """before_agent callback that drops published stories from raw_fetched_articles."""
+
+    def __init__(self, agent: BaseAgent, index: Optional[StoryIndex]):
+        self.agent = agent
+        self._index = index
+
+    def before_agent(self, callback_context: CallbackContext):
+        if not config.published_filter:
+            return None
+        articles = parse_article_list(callback_context.state.get(FETCHED_KEY))
+        if not articles:
+            return None
+        started = time.perf_counter()
+        kept, published = filter_published(articles, self._index)
+        if len(kept) != len(articles):
+            callback_context.state[FETCHED_KEY] = dump_payload(kept)
+            logging.info(
+                f"[TRACE] Story index: dropped {len(articles) - len(kept)}/{len(articles)} already published "
+                f"stories before {self.agent.name} in {(time.perf_counter() - started) * 1000:.2f} ms"
+            )
+        return None
+
+
+def attach_published_filter(agent: BaseAgent, index: Optional[StoryIndex] = None) -> BaseAgent:
+    """
+    Makes `agent` drop already-published stories from raw_fetched_articles
+    before it runs. Attach it after attach_stage_cache so the cache key is
+    computed over the filtered list.
+    """
+    callback = _PublishedFilterCallback(agent, index)
+    existing = agent.before_agent_callback
+    existing = [] if existing is None else (list(existing) if isinstance(existing, list) else [existing])
+    agent.before_agent_callback = [callback.before_agent] + existing
+    return agent
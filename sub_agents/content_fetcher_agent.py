@@ -1,63 +1,61 @@
 from google.adk.agents import Agent
 from google.adk.tools import FunctionTool 
-import streamlit as st
 
 # --- Import Tool Definition ---
-from tools import internet_search  
-
-# --- Configuration (Placeholder) ---
-# A simplified config might define the model used
-class Config:
-    worker_model = "gemini-2.5-flash"
-config = Config()
+from tools import fetch_candidate_articles  
+from stage_cache import attach_stage_cache
+from schemas import attach_payload_schema, compact_articles
+from scoped_context import attach_scoped_context
+from config import config
 
 # --- AGENT DEFINITION ---
 
-content_fetcher_agent = Agent(
-    name="content_fetcher",
-    model=config.worker_model,
-    description="A content retriever that uses internet search to gather recent technical articles.",
-    instruction=f"""
-    You are the Robust Content Fetcher Agent. 
-    Your sole task is to execute a comprehensive 
-    and aggressive internet search using internet_search tool and 
-    deliver a diverse, high-quality articles of current tech breakthroughs in AI, Machine Learing or LLM.    
-    Deliver a list of exactly 10 highly recent and authoritative articles 
-    that represent a balanced mix of the following domains: AI, Machine Learning, or LLM.
-    **Workflow Steps:**
-    1. search the internet usnig internet_search tool and fetch results across 
-    all the specified domains (AI, ML, and LLM). 
-    For example, target one or two results specifically for each domain. If there are no results 
-    available for a domain, then skip that domain.
-    2. Each result must include:
-        * The article's **Title**.
-        * A concise **Summary** (snippet).
-        * The **URL** to the source article.
-        * The primary Domain (e.g., AI, ML or LLM).
-    4. **Output Format:** You must compile the 10 selected articles into a JSON list
-    **Crucial Rule:** The output must be perfectly clean and ready for the 
-    `topic_analyzer_agent` to use directly for generating the prioritized list.
+def build_content_fetcher_agent() -> Agent:
+    """
+    Builds a fresh instance of the content fetcher. ADK agents can only have one parent,
+    so every agent tree (orchestrator, pipeline, ...) builds its own.
+    """
+    agent = Agent(
+        name="content_fetcher",
+        model=config.worker_model,
+        description="A content retriever that uses internet search to gather recent technical articles.",
+        instruction=f"""
+        You are the Robust Content Fetcher Agent. 
+        Your sole task is to execute a comprehensive 
+        and aggressive internet search using the fetch_candidate_articles tool and 
+        deliver a diverse, high-quality articles of current tech breakthroughs in AI, Machine Learing or LLM.    
+        Deliver a list of exactly 10 highly recent and authoritative articles 
+        that represent a balanced mix of the following domains: AI, Machine Learning, or LLM.
+        **Workflow Steps:**
+        1. Call the fetch_candidate_articles tool ONCE. It runs all per-domain searches (AI, ML, and LLM) 
+        concurrently and returns one merged, de-duplicated candidate list. Pass `extra_queries` only when 
+        the user's feedback asks for specific subjects or sources. Do not search again yourself.
+        2. Select the 10 best candidates, balancing the domains. If there are no results 
+        available for a domain, then skip that domain.
+        3. Each result must include:
+            * The article's **Title**.
+            * A concise **Summary** (snippet).
+            * The **URL** to the source article.
+            * The primary Domain (e.g., AI, ML or LLM).
+        4. **Output Format:** You must compile the 10 selected articles into a compact JSON list
+        on a single line, without markdown fences or any other text.
+        **Crucial Rule:** The output must be perfectly clean and ready for the 
+        `topic_analyzer_agent` to use directly for generating the prioritized list.
      
-     Example Output Structure  :
-    ```json
-    [
-        {{
-            "title": "...",
-            "summary": "...",
-            "url": "...",
-            "domain": "AI/ML/Data Science etc."
-        }},
-        // ... 9 more entries
-    ]
-    ```
-    """,
-    tools=[
-        # Register the internet search capability
-        FunctionTool(internet_search),
-    ],
-    # The output will be the structured list of 10 articles
-    output_key="raw_fetched_articles",
-)
-print("✅ content_fetcher_agent created.")
-
- 
+         Example Output Structure  :
+        [{{"title":"...","summary":"...","url":"...","domain":"AI"}}, ... 9 more entries]
+        """,
+        tools=[
+            # Concurrent multi-query search with URL de-duplication (see search.py)
+            FunctionTool(fetch_candidate_articles),
+        ],
+        # The output will be the structured list of 10 articles
+        output_key="raw_fetched_articles",
+    )
+    # Fenced or slightly malformed JSON is repaired and stored compactly (see schemas.py).
+    attach_payload_schema(agent, compact_articles)
+    # Only the user's request and any rework directive are needed (scoped context mode).
+    attach_scoped_context(agent)
+    # Same-day repeat runs reuse the fetched list instead of searching again.
+    attach_stage_cache(agent, include_date=True)
+    return agent
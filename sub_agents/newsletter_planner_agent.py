@@ -1,87 +1,58 @@
 
 from google.adk.agents import Agent
 from google.adk.tools import FunctionTool 
-import streamlit as st
 
 # --- Import Tool Definition ---
-# --- Configuration (Placeholder) ---
-class Config:
-    worker_model = "gemini-2.5-flash"
-config = Config()
+from stage_cache import attach_stage_cache
+from schemas import OutlinePlan, attach_payload_schema, compact_outline
+from scoped_context import attach_scoped_context
+from config import config
 
 # --- AGENT DEFINITION ---
 
-newsletter_planner_agent = Agent(
-    name="newsletter_planner",
-    model=config.worker_model,
-    description="Transforms a list of high-relevance topics into a structured, editorial-quality newsletter outline.",
-   instruction=f'''
-            You are a professional Editorial Director specializing in creating engaging, high-conversion newsletter outlines.
-            Transform the provided list of 5 high-relevance topics into a complete, structured newsletter outline.
-            your input is the List of 5 prioritized article topics and their corresponding source URLs/summaries from topic_analyzer_agent.
-            The outline must be ready for the newsletter_writer_agent and should maximize reader engagement and clarity.
-            Requirements:
-            Newsletter Theme/Topic: Determine the overarching theme that connects the 5 articles and state it clearly.
-            Subject Line: Suggest three distinct, highly clickable Subject Line options for the email.
-            Introduction (The Hook): Write a concise opening paragraph (3-4 sentences) that introduces the main theme and hooks the reader.
-            Article Outlines: For each of the 5 articles, provide a separate section with:
-            A catchy, editorial-quality Title (different from the original article title).
-            3-4 Key Takeaways or Main Points that must be included in the final write-up.
-            A suggested Call-to-Action (CTA) (e.g., "Read the full story," "Learn more," "Watch the video").
-            Conclusion & Final CTA: Write a short concluding paragraph that summarizes the content and includes a clear, overarching Final Call-to-Action (e.g., "Share this with a colleague," "Subscribe to our premium tier," "Leave a comment").
-            Format: Output the response in a structured JSON format, adhering strictly to the schema provided below.
-            Example JSON Output:
-            """json
-            {{
-            "newsletter_sections": {{
-                "newsletter_theme": "[The determined overarching theme/topic]",
-                "subject_lines": [
-                "Subject Line Option 1",
-                "Subject Line Option 2",
-                "Subject Line Option 3"
-                ],
-                "introduction": {{
-                "type": "Introduction",
-                "content": "[The 3-4 sentence introductory hook paragraph]"
-                }},
-                "articles": [
-                {{
-                    "original_topic_summary": "[Summary/URL from Agent 2]",
-                    "editorial_title": "[Catchy new title for Article 1]",
-                    "key_takeaways": [
-                    "Main Point 1",
-                    "Main Point 2",
-                    "Main Point 3"
-                    ],
-                    "in_article_cta": "[Suggested CTA for this article]"
-                }},
-                {{
-                    "original_topic_summary": "[Summary/URL from Agent 2]",
-                    "editorial_title": "[Catchy new title for Article 2]",
-                    "key_takeaways": [
-                    "Main Point 1",
-                    "Main Point 2",
-                    "Main Point 3"
-                    ],
-                    "in_article_cta": "[Suggested CTA for this article]"
-                }}
-                // ... continue for all 5 articles
-                ],
-                "conclusion": {{
-                "type": "Conclusion",
-                "content": "[The short concluding paragraph]",
-                "final_cta": "[The overarching final Call-to-Action]"
-                }}
-            }}
-            }}
-            """
-            **Crucial Rule:** The output must be an **outline only**. Do not write any of the final newsletter content. Pass the structured outline to the `newsletter_writer_agent`.
-            ''',
+def build_newsletter_planner_agent(structured_output: bool = False) -> Agent:
+    """
+    Builds a fresh instance of the newsletter planner. ADK agents can only have one parent,
+    so every agent tree (orchestrator, pipeline, ...) builds its own.
+    structured_output constrains the reply to the OutlinePlan schema. Only the pipeline
+    sets it: a schema-constrained reply cannot call transfer_to_agent, so in the
+    orchestrator the run would end at the plan instead of reaching the writer.
+    """
+    agent = Agent(
+        name="newsletter_planner",
+        model=config.worker_model,
+        description="Transforms a list of high-relevance topics into a structured, editorial-quality newsletter outline.",
+       instruction=f'''
+                You are a professional Editorial Director specializing in creating engaging, high-conversion newsletter outlines.
+                Transform the provided list of 5 high-relevance topics into a complete, structured newsletter outline.
+                your input is the List of 5 prioritized article topics and their corresponding source URLs/summaries from topic_analyzer_agent.
+                The outline must be ready for the newsletter_writer_agent and should maximize reader engagement and clarity.
+                Requirements:
+                Newsletter Theme/Topic: Determine the overarching theme that connects the 5 articles and state it clearly.
+                Subject Line: Suggest three distinct, highly clickable Subject Line options for the email.
+                Introduction (The Hook): Write a concise opening paragraph (3-4 sentences) that introduces the main theme and hooks the reader.
+                Article Outlines: For each of the 5 articles, provide a separate section with:
+                A catchy, editorial-quality Title (different from the original article title).
+                3-4 Key Takeaways or Main Points that must be included in the final write-up.
+                A suggested Call-to-Action (CTA) (e.g., "Read the full story," "Learn more," "Watch the video").
+                Conclusion & Final CTA: Write a short concluding paragraph that summarizes the content and includes a clear, overarching Final Call-to-Action (e.g., "Share this with a colleague," "Subscribe to our premium tier," "Leave a comment").
+                Format: Output a single JSON object following the response schema (newsletter_theme, subject_lines,
+                introduction {{type, content}}, articles [{{original_topic_summary, editorial_title, key_takeaways, in_article_cta}}],
+                conclusion {{type, content, final_cta}}). Keep each original_topic_summary to one sentence plus the source URL.
+                **Crucial Rule:** The output must be an **outline only**. Do not write any of the final newsletter content. Pass the structured outline to the `newsletter_writer_agent`.
+                ''',
                 
-    # This agent does not typically need external tools, as its job is purely
-    # analytical and structural, operating on the data provided by the prior agent.
-    tools=[], 
-    # The output will be the structured outline
-    output_key="newsletter_outline_plan",
-)
-print("✅ newsletter_planner_agent created.")
\ No newline at end of file
+        # This agent does not typically need external tools, as its job is purely
+        # analytical and structural, operating on the data provided by the prior agent.
+        tools=[], 
+        # Without tools the outline can be schema-constrained; the model returns plain JSON.
+        # Otherwise the outline is validated after the fact (attach_payload_schema below).
+        output_schema=OutlinePlan if structured_output else None,
+        # The output will be the structured outline
+        output_key="newsletter_outline_plan",
+    )
+    # Repairs fenced or legacy-wrapped outlines (before ADK validates them against the schema, if set).
+    attach_payload_schema(agent, compact_outline)
+    attach_scoped_context(agent, input_keys=["clustered_ranked_topics"])
+    attach_stage_cache(agent, input_keys=["clustered_ranked_topics"])
+    return agent
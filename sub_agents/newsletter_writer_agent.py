@@ -1,40 +1,463 @@
-from google.adk.agents import Agent
-import streamlit as st
+import asyncio
+import hashlib
+import logging
+import re
+from typing import AsyncGenerator, Dict, List, Optional, Set, Tuple, Union
+
+from google.adk.agents import Agent, BaseAgent
+from google.adk.agents.invocation_context import InvocationContext
+from google.adk.events import Event, EventActions
+from google.adk.models.base_llm import BaseLlm
+from google.genai import types as genai_types
 from tools import internet_search 
 from google.adk.tools import FunctionTool 
+from config import config
+from article_fetch import ARTICLE_TEXTS_KEY, excerpts, get_article_fetcher
+from topic_engine import normalize_url
+from schemas import dump_payload, load_outline
+from scoped_context import attach_scoped_context
+from stage_cache import STAGE_DIRECTIVES_KEY
 
-# --- Configuration (Placeholder) ---
-class Config:
-    worker_model = "gemini-2.5-flash"
-config = Config()
+DRAFT_KEY = "final_newsletter_draft_markdown"
+DRAFT_SECTIONS_KEY = "draft_sections"
 
 # --- AGENT DEFINITION ---
 
-newsletter_writer_agent = Agent(
-    name="newsletter_writer",
-    model=config.worker_model,
-    description="Generates the final written content (articles) for the newsletter based on the planner's outline and source materials.",
-    instruction=f"""
-    You are the **Newsletter Writer Agent**. Your task is to transform the structural plan into compelling, well-written content.
-    **Input:** The structured `newsletter_outline_plan` provided by the `newsletter_planner_agent`. This plan includes the sectional grouping, editorial headlines, source details (summaries/URLs), and paragraph length guidance.   
-    **Goal:** Produce the complete, final draft of the newsletter in a single, clean Markdown format, ready for PDF conversion.  
-    **Workflow Steps:** 
-    1. **Iterate and Write:** Go through each item in the provided plan sequentially.
-    2. **Synthesize Content:** For each planned article:
-        * **Write a short article** (strictly **2–3 paragraphs**). use 
-        * The content must be based provided in the plan. Do not introduce new facts or speculation.However you can use  internet_search tool to get more information related to the article.
-        * Maintain a **professional, technical, and engaging tone**.
-    3. **Format and Structure:**
-        * Use **Markdown** formatting.
-        * Structure the output using **Markdown Headings** (`##` for main sections, `###` for article titles) exactly as defined in the plan.
-        * Include a brief **citation or link snippet** at the end of each article paragraph grouping, referencing the source URL(s).
-    4. **Final Output:** Combine all written articles and sectional headings into **one contiguous Markdown string**. This final text is the complete newsletter draft that will be passed to the next stage for PDF conversion and user approval.
-    **Crucial Rule:** Your output is the final written product, and it must be high-quality and free of errors.
-    """,
+def build_single_pass_writer_agent(name: str = "newsletter_writer_single") -> Agent:
+    """
+    Builds the original single-call writer, which drafts the whole newsletter
+    in one generation. Used when the outline cannot be split into sections.
+    """
+    agent = Agent(
+        name=name,
+        model=config.worker_model,
+        description="Generates the final written content (articles) for the newsletter based on the planner's outline and source materials.",
+        instruction=f"""
+        You are the **Newsletter Writer Agent**. Your task is to transform the structural plan into compelling, well-written content.
+        **Input:** The structured `newsletter_outline_plan` provided by the `newsletter_planner_agent`. This plan includes the sectional grouping, editorial headlines, source details (summaries/URLs), and paragraph length guidance.   
+        **Goal:** Produce the complete, final draft of the newsletter in a single, clean Markdown format, ready for PDF conversion.  
+        **Workflow Steps:** 
+        1. **Iterate and Write:** Go through each item in the provided plan sequentially.
+        2. **Synthesize Content:** For each planned article:
+            * **Write a short article** (strictly **2–3 paragraphs**). use 
+            * The content must be based provided in the plan. Do not introduce new facts or speculation.However you can use  internet_search tool to get more information related to the article.
+            * Maintain a **professional, technical, and engaging tone**.
+        3. **Format and Structure:**
+            * Use **Markdown** formatting.
+            * Structure the output using **Markdown Headings** (`##` for main sections, `###` for article titles) exactly as defined in the plan.
+            * Include a brief **citation or link snippet** at the end of each article paragraph grouping, referencing the source URL(s).
+        4. **Final Output:** Combine all written articles and sectional headings into **one contiguous Markdown string**. This final text is the complete newsletter draft that will be passed to the next stage for PDF conversion and user approval.
+        **Crucial Rule:** Your output is the final written product, and it must be high-quality and free of errors.
+        """,
  
-    tools=[ FunctionTool(internet_search),], 
-    # The output will be the complete, final newsletter draft in Markdown
-    output_key="final_newsletter_draft_markdown",
+        tools=[ FunctionTool(internet_search),], 
+        # The output will be the complete, final newsletter draft in Markdown
+        output_key="final_newsletter_draft_markdown",
+    )
+    attach_scoped_context(agent, input_keys=["newsletter_outline_plan", ARTICLE_TEXTS_KEY])
+    return agent
+
+
+SECTION_INSTRUCTION = """
+You are the **Newsletter Writer Agent**, writing ONE section of a newsletter whose theme is: {theme}
+**Section plan (from the newsletter_planner_agent):**
+{plan}
+{source}{current}**Rules:**
+* {length}
+* The content must be based on the plan{source_rule}. Do not introduce new facts or speculation. You may use the internet_search tool to get more information related to the article.
+* Maintain a **professional, technical, and engaging tone**.
+* Output Markdown body text only. Do NOT add a heading; the section heading is added for you.
+{extra}
+"""
+
+_URL = re.compile(r"https?://[^\s\"'<>)\]]+")
+
+_SECTION_LENGTH = {
+    "introduction": "Write the opening hook: one paragraph of 3-4 sentences.",
+    "article": (
+        "Write a short article of strictly 2-3 paragraphs covering every key takeaway, then end with the "
+        "in-article call-to-action and a citation line linking the source URL(s)."
+    ),
+    "conclusion": "Write one short concluding paragraph that ends with the final call-to-action.",
+}
+
+
+def load_outline_plan(payload) -> Optional[Dict]:
+    """Decodes the planner's `newsletter_outline_plan` (dict, or possibly fenced or malformed JSON text)."""
+    plan = load_outline(payload)
+    return plan.model_dump() if plan else None
+
+
+def section_urls(section_plan: Dict) -> List[str]:
+    """Source URLs mentioned in a section plan (the planner cites them in original_topic_summary)."""
+    return [url.rstrip(".,;:") for url in _URL.findall(dump_payload(section_plan))]
+
+
+def source_block(section_plan: Dict, texts: Dict[str, Dict]) -> str:
+    """The fetched article text (article_fetch.py) for the section's source URLs, as instruction text."""
+    blocks = []
+    for url in section_urls(section_plan):
+        page = texts.get(normalize_url(url))
+        if page and page.get("text"):
+            blocks.append(f"**Source article text ({url}):**\n{page['text']}\n")
+    return "".join(blocks)
+
+
+def plan_sections(plan: Dict) -> List[Tuple[str, str, Dict]]:
+    """
+    Splits an outline into (section_key, heading, section_plan) in reading
+    order: introduction, article_1..article_n, conclusion.
+    """
+    sections = [("introduction", plan.get("newsletter_theme") or "Introduction", plan.get("introduction") or {})]
+    for index, article in enumerate(plan.get("articles") or [], start=1):
+        if isinstance(article, dict):
+            sections.append((f"article_{index}", article.get("editorial_title") or f"Article {index}", article))
+    sections.append(("conclusion", "Conclusion", plan.get("conclusion") or {}))
+    return sections
+
+
+def assemble_draft(sections: List[Tuple[str, str, Dict]], texts: Dict[str, str]) -> str:
+    """Joins section bodies in plan order under their headings."""
+    parts = []
+    stories_started = False
+    for key, heading, _ in sections:
+        body = texts.get(key, "").strip()
+        if key.startswith("article_"):
+            if not stories_started:
+                parts.append("## Top Stories")
+                stories_started = True
+            parts.append(f"### {heading}\n\n{body}")
+        else:
+            parts.append(f"## {heading}\n\n{body}")
+    return "\n\n".join(parts) + "\n"
+
+
+# --- Section-Level Rework ---
+# The writer keeps the draft as addressable sections in DRAFT_SECTIONS_KEY:
+# {section_key: {"heading", "digest", "body"}}, keyed like plan_sections()
+# (introduction, article_1..article_n, conclusion). The digest covers
+# everything a section is written from (theme, heading, section plan and
+# source text). On a rework turn only these sections are rewritten:
+#   * sections whose digest changed (the planner re-ran, new sources);
+#   * the sections the feedback is about. In pipeline mode the rework router
+#     names them (SECTION_TARGETS_KEY); otherwise, or when it names none,
+#     feedback_sections() reads them off the feedback.
+# All other sections are reused verbatim.
+# feedback_sections() is a small grammar. A reference is "the intro", "the
+# sign-off", a list of positions next to an item word ("article 3", "the
+# second and third story", "stories 1, 2 and 4", "articles 2-3") or a story
+# named by terms: a term of its title or source URL that no other title has,
+# or two terms of its plan that most other plans do not share. References
+# are taken out first, then the rest is split into clauses. Every clause must
+# contain a reference; a clause without one ("and make the tone more casual")
+# or feedback about all sections ("overall", "every article", "anywhere",
+# "everything") rewrites every section. A style, tone or length clause is
+# only scoped by a position or a story's title, not by plan terms.
+
+# Session state key for the sections the rework router picked (pipeline mode).
+SECTION_TARGETS_KEY = "rework_section_targets"
+
+_QUOTED_FEEDBACK = re.compile(r"feedback:\s*(['\"])(.*)\1", re.S)
+_GLOBAL_FEEDBACK = re.compile(
+    r"\b(whole|entire|overall|throughout|everywhere|anywhere|everything|every (?:article|story|section|item)|"
+    r"each (?:article|story|section|item)|all (?:the |of the )?(?:articles|stories|sections|items))\b",
+    re.I,
 )
-print("✅ newsletter_writer_agent created.")
- 
\ No newline at end of file
+_STYLE_FEEDBACK = re.compile(
+    r"\b(tone|voice|style|register|casual|informal|formal|professional|friendl\w*|punch\w*|conversational|"
+    r"jargon|hype\w*|sensational\w*|concise|wordy|verbose|shorter|longer|length|brief\w*)\b",
+    re.I,
+)
+_INTRO_REF = re.compile(r"\b(?:the )?(intro|introduction|opening|opener|hook|lede)\b", re.I)
+_CONCLUSION_REF = re.compile(
+    r"\b(?:the )?(conclusion|closing|outro|ending|sign-?off|final (?:cta|call[- ]to[- ]action))\b", re.I
+)
+_ITEM = r"(?:articles?|stor(?:y|ies)|sections?|items?|pieces?|headlines?)"
+_ORDINALS = {"first": 1, "second": 2, "third": 3, "fourth": 4, "fifth": 5,
+             "sixth": 6, "seventh": 7, "eighth": 8, "ninth": 9, "tenth": 10}
+# A position before an item word is an ordinal ("2nd", "second", "last"), so
+# "add 2 stories" is not a reference; after it, a plain number also counts.
+_ORDINAL = rf"(?:\d+(?:st|nd|rd|th)|{'|'.join(_ORDINALS)}|last|final)"
+_POSITION = rf"(?:{_ORDINAL}|\d+)"
+_JOIN = r"\s*(?:,\s*(?:and\s+|or\s+)?|\s(?:and|or|&|to)\s|-)\s*"
+_POSITION_REF = re.compile(
+    rf"\b(?:the\s+)?{_ITEM}\s*(?:#|no\.?\s*)?(?P<after>{_POSITION}(?:{_JOIN}{_POSITION})*)\b"
+    rf"|\b(?:the\s+)?(?P<before>{_ORDINAL}(?:{_JOIN}{_ORDINAL})*)\s+{_ITEM}\b",
+    re.I,
+)
+_POSITION_TOKEN = re.compile(rf"{_POSITION}|-|\bto\b", re.I)
+_REFERENCE = "\0"
+# Clause boundaries, once references are taken out: sentence punctuation and
+# joining conjunctions.
+_CLAUSE_SPLIT = re.compile(r"[.;,!?]+(?:\s|$)|\s+(?:and|but|also|plus)\s+", re.I)
+_TERM = re.compile(r"[a-z0-9]{3,}")
+_STOPWORDS = frozenset(
+    "the and for but not you are was its can has had our out new one two how why who all any may too off own "
+    "few get got use way see via per yet let about above after again also because been before being below "
+    "between both could does doing down during each from further have having here into itself just more most much only other over same should some such "
+    "than that their them then there these they this those through under until very what when where which while "
+    "will with would your please thanks thank great nice looks good "
+    "make less article story section newsletter draft paragraph sentence".split()
+)
+
+
+def feedback_text(message: str) -> str:
+    """The user's feedback inside a rework prompt (app.py quotes it), else the whole message."""
+    match = _QUOTED_FEEDBACK.search(message)
+    return match.group(2) if match else message
+
+
+def _terms(text: str) -> Set[str]:
+    # Light stemming so "forecasts" matches "forecast".
+    return {term[:-1] if term.endswith("s") and len(term) > 4 else term
+            for term in _TERM.findall(text.lower()) if term not in _STOPWORDS}
+
+
+def _positions(text: str, count: int) -> List[int]:
+    """Article positions (1-based) in a position list such as "2 and 3", "second, fourth" or "2-4"."""
+    positions, span = [], False
+    for token in _POSITION_TOKEN.findall(text):
+        token = token.lower()
+        if token in ("-", "to"):
+            span = bool(positions)
+            continue
+        if token in ("last", "final"):
+            index = count
+        else:
+            index = _ORDINALS.get(token) or int(re.sub(r"\D", "", token))
+        if span and positions[-1] < index:
+            positions.extend(range(positions[-1] + 1, index))
+        positions.append(index)
+        span = False
+    return [index for index in positions if 1 <= index <= count]
+
+
+def feedback_sections(feedback: str, sections: List[Tuple[str, str, Dict]]) -> Optional[List[str]]:
+    """
+    Section keys the feedback refers to, in plan order, or None when it
+    concerns the whole newsletter (or some clause of it names no section).
+    """
+    if not feedback.strip() or _GLOBAL_FEEDBACK.search(feedback):
+        return None
+    keys = [key for key, _, _ in sections]
+    articles = [key for key in keys if key.startswith("article_")]
+    targets = set()
+
+    def take(section_keys):
+        def replace(match):
+            targets.update(section_keys(match))
+            return f" {_REFERENCE} "
+        return replace
+
+    text = _INTRO_REF.sub(take(lambda match: ["introduction"]), feedback)
+    text = _CONCLUSION_REF.sub(take(lambda match: ["conclusion"]), text)
+    text = _POSITION_REF.sub(take(lambda match: [
+        articles[index - 1] for index in _positions(match.group("after") or match.group("before"), len(articles))
+    ]), text)
+
+    # A story is named by a term only its title or URL has, or by two terms of
+    # its plan found in at most half of the plans (one generic plan word such
+    # as "shorter" or "launch" matches too easily).
+    titles = {key: _terms(" ".join([heading, *section_urls(plan)]))
+              for key, heading, plan in sections if key in articles}
+    plans = {key: _terms(dump_payload(plan)) for key, _, plan in sections if key in articles}
+    limit = max(1, len(articles) // 2)
+    for clause in _CLAUSE_SPLIT.split(text):
+        wanted = _terms(clause)
+        if _REFERENCE in clause or not wanted:
+            continue
+        styled = bool(_STYLE_FEEDBACK.search(clause))
+        named = set()
+        for key in articles:
+            unique = {term for term in wanted & titles[key] if sum(term in other for other in titles.values()) == 1}
+            described = {term for term in wanted & plans[key] if sum(term in other for other in plans.values()) <= limit}
+            if unique or (len(described) >= 2 and not styled):
+                named.add(key)
+        if not named:
+            return None
+        targets |= named
+    return [key for key in keys if key in targets] or None
+
+
+def section_digest(theme: str, heading: str, section_plan: Dict, source: str) -> str:
+    """Fingerprint of what a section is written from; a reworked section is reused only while it matches."""
+    payload = "\0".join([theme, heading, dump_payload(section_plan), source])
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
+
+
+class ParallelSectionWriterAgent(BaseAgent):
+    """
+    Writes every section of `newsletter_outline_plan` as its own concurrent
+    model call (bounded by `concurrency`), retries failed sections on their
+    own, and reassembles them in plan order into `final_newsletter_draft_markdown`.
+    Only the assembled draft is yielded; section events go straight to the
+    session, so callers never see fragments of sections running in parallel.
+    On rework, only the sections the feedback touches are rewritten (see
+    feedback_sections()). Falls back to the single-call writer when the plan
+    cannot be parsed.
+    """
+
+    model: Union[str, BaseLlm]
+    concurrency: int = 4
+    max_attempts: int = 3
+    fallback_writer: BaseAgent
+
+    def __init__(self, name: str, fallback_writer: BaseAgent, **kwargs):
+        super().__init__(name=name, fallback_writer=fallback_writer, sub_agents=[fallback_writer], **kwargs)
+
+    def _section_agent(
+        self, key: str, theme: str, section_plan: Dict, source: str, brief: str, feedback: str, current: str,
+        attempt: int,
+    ) -> Agent:
+        extra = []
+        if brief:
+            extra.append(f"* Follow this brief for the newsletter (audience, focus, instructions): {brief}")
+        if feedback:
+            extra.append(f"* Apply this user feedback where it concerns this section: {feedback}")
+        instruction = SECTION_INSTRUCTION.format(
+            theme=theme,
+            plan=dump_payload(section_plan),
+            source=source,
+            current=f"**Current text of this section (revise it; keep what the feedback does not ask to change):**\n"
+                    f"{current}\n" if current else "",
+            source_rule=" and the source article text; prefer it to searching" if source else "",
+            length=_SECTION_LENGTH["article" if key.startswith("article_") else key],
+            extra="\n".join(extra),
+        )
+        return Agent(
+            name=f"section_writer_{key}" + (f"_retry{attempt}" if attempt > 1 else ""),
+            model=self.model,
+            # A provider function skips ADK's {placeholder} state injection,
+            # so braces inside plan text are passed through verbatim.
+            instruction=lambda _ctx, text=instruction: text,
+            include_contents="none",
+            tools=[FunctionTool(internet_search)],
+            # Section writers are created per run; they inherit the agent/model/tool
+            # callbacks (metrics, spans, ...) configured on the fallback writer.
+            before_agent_callback=self.fallback_writer.before_agent_callback,
+            after_agent_callback=self.fallback_writer.after_agent_callback,
+            before_model_callback=self.fallback_writer.before_model_callback,
+            after_model_callback=self.fallback_writer.after_model_callback,
+            before_tool_callback=self.fallback_writer.before_tool_callback,
+            after_tool_callback=self.fallback_writer.after_tool_callback,
+        )
+
+    async def _write_section(
+        self, ctx: InvocationContext, key: str, theme: str, section_plan: Dict, source: str, brief: str,
+        feedback: str, current: str, semaphore: asyncio.Semaphore,
+    ) -> str:
+        async with semaphore:
+            for attempt in range(1, self.max_attempts + 1):
+                agent = self._section_agent(key, theme, section_plan, source, brief, feedback, current, attempt)
+                # Each section writes on its own branch so it never sees its siblings.
+                branch = f"{ctx.branch}.{self.name}.{key}" if ctx.branch else f"{self.name}.{key}"
+                section_ctx = ctx.model_copy(update={"branch": branch})
+                text = ""
+                try:
+                    async for event in agent.run_async(section_ctx):
+                        # Recorded in the session (a section writer's tool rounds are
+                        # read back from it) but not yielded to the parent.
+                        if not event.partial:
+                            await ctx.session_service.append_event(ctx.session, event)
+                        if event.is_final_response() and event.content and event.content.parts:
+                            text = "".join(p.text for p in event.content.parts if p.text and not p.thought)
+                except Exception as error:  # retried below, like an empty answer
+                    logging.warning(f"[TRACE] Section {key} attempt {attempt} failed: {error}")
+                if text.strip():
+                    return text
+            logging.error(f"[TRACE] Section {key} failed after {self.max_attempts} attempts")
+            return "_This section could not be generated. Request a rework of this section._"
+
+    async def _run_async_impl(self, ctx: InvocationContext) -> AsyncGenerator[Event, None]:
+        plan = load_outline_plan(ctx.session.state.get("newsletter_outline_plan"))
+        if not plan or not plan.get("articles"):
+            async for event in self.fallback_writer.run_async(ctx):
+                yield event
+            return
+
+        sections = plan_sections(plan)
+        theme = plan.get("newsletter_theme", "")
+        # The section writers see no user message; a stage directive (the batch
+        # job brief) is passed to them in their instruction.
+        brief = (ctx.session.state.get(STAGE_DIRECTIVES_KEY) or {}).get(self.name) or ""
+        feedback = ""
+        if ctx.session.state.get(DRAFT_KEY) and ctx.user_content and ctx.user_content.parts:
+            feedback = feedback_text("".join(p.text or "" for p in ctx.user_content.parts))
+
+        # Article texts from the article_fetcher stage; sources it did not cover
+        # (e.g. orchestrator mode, which has no fetch stage) are fetched here.
+        texts = dict(ctx.session.state.get(ARTICLE_TEXTS_KEY) or {})
+        fetched = {}
+        missing = [url for _, _, section_plan in sections for url in section_urls(section_plan)
+                   if normalize_url(url) not in texts]
+        if missing and config.article_fetch:
+            fetched = excerpts(await get_article_fetcher().fetch_all(missing))
+            texts.update(fetched)
+
+        sources = {key: source_block(section_plan, texts) for key, _, section_plan in sections}
+        digests = {key: section_digest(theme, heading, section_plan, sources[key])
+                   for key, heading, section_plan in sections}
+        # Previous sections still written from the same inputs; they can be revised or reused.
+        previous = {}
+        if feedback:
+            for key, entry in (ctx.session.state.get(DRAFT_SECTIONS_KEY) or {}).items():
+                if isinstance(entry, dict) and entry.get("body") and entry.get("digest") == digests.get(key):
+                    previous[key] = entry["body"]
+        targets, chosen_by = None, "full rewrite"
+        if previous and config.section_rework:
+            # The rework router's choice (pipeline mode) wins; the feedback grammar is the fast path.
+            routed = ctx.session.state.get(SECTION_TARGETS_KEY) or []
+            targets = [key for key, _, _ in sections if key in routed]
+            chosen_by = "rework router"
+            if not targets:
+                targets, chosen_by = feedback_sections(feedback, sections), "feedback"
+        bodies = {key: previous[key] for key, _, _ in sections
+                  if key in previous and targets is not None and key not in targets}
+        if feedback:
+            rewritten = [key for key, _, _ in sections if key not in bodies]
+            logging.info(f"[TRACE] Section rework ({chosen_by if targets is not None else 'full rewrite'}): "
+                         f"rewriting {rewritten}, reusing {sorted(bodies)}")
+
+        semaphore = asyncio.Semaphore(max(1, self.concurrency))
+        tasks = {
+            key: asyncio.create_task(self._write_section(
+                ctx, key, theme, section_plan, sources[key], brief, feedback, previous.get(key, ""), semaphore
+            ))
+            for key, _, section_plan in sections
+            if key not in bodies
+        }
+        try:
+            await asyncio.gather(*tasks.values())
+        finally:
+            for task in tasks.values():
+                task.cancel()
+
+        bodies.update({key: task.result() for key, task in tasks.items()})
+        draft = assemble_draft(sections, bodies)
+        draft_sections = {key: {"heading": heading, "digest": digests[key], "body": bodies[key]}
+                          for key, heading, _ in sections}
+        state_delta = {DRAFT_KEY: draft, DRAFT_SECTIONS_KEY: draft_sections}
+        if fetched:
+            state_delta[ARTICLE_TEXTS_KEY] = texts
+        yield Event(
+            invocation_id=ctx.invocation_id,
+            author=self.name,
+            branch=ctx.branch,
+            content=genai_types.Content(role="model", parts=[genai_types.Part.from_text(text=draft)]),
+            actions=EventActions(state_delta=state_delta),
+        )
+
+
+def build_newsletter_writer_agent() -> BaseAgent:
+    """
+    Builds a fresh instance of the newsletter writer. ADK agents can only have one parent,
+    so every agent tree (orchestrator, pipeline, ...) builds its own.
+    """
+    return ParallelSectionWriterAgent(
+        name="newsletter_writer",
+        description="Generates the final written content (articles) for the newsletter based on the planner's outline and source materials.",
+        model=config.worker_model,
+        concurrency=config.section_concurrency,
+        max_attempts=config.section_max_attempts,
+        fallback_writer=build_single_pass_writer_agent(),
+    )
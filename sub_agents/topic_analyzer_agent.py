@@ -1,57 +1,58 @@
  
 from google.adk.agents import Agent
-import streamlit as st 
+from google.adk.tools import FunctionTool 
 
-# --- Configuration (Placeholder) ---
-class Config:
-    worker_model = "gemini-2.5-flash"
-config = Config()
+# --- Import Tool Definition ---
+from tools import analyze_fetched_articles
+from stage_cache import attach_stage_cache
+from schemas import attach_payload_schema, compact_topics
+from scoped_context import attach_scoped_context
+from story_index import attach_published_filter
+from config import config
 
 # --- AGENT DEFINITION ---
 
-topic_analyzer_agent = Agent(
-    name="topic_analyzer_agent",
-    model=config.worker_model,
-    description="Analyzes fetched content, performing duplicate removal, recency and relevance ranking, and topic clustering.",
-    instruction=f"""
-    You are the **Topic Analyzer Agent**. Your role is to refine the raw content provided by the `content_fetcher_agent` before it is passed to the planner. 
-    You must act as a content filter and curator.
-    **Input:** A structured list of raw articles, each containing a title, summary, and URL.
-    **Goal:** Produce a highly curated, small list of non-redundant, high-priority topics with 
-    their best source material attached.
-    **Workflow Steps:**  
-    1. **Duplicate & Near-Duplicate Removal:** * Thoroughly analyze the articles for **exact duplicates** and articles that cover the **exact same news event** but are from different sources (near-duplicates).
-       * **Remove all redundant entries**, keeping only the most detailed or highest-authority source for each unique topic.
-    2. **Embedding-based Clustering:** * Group the remaining unique articles into coherent **main topics** (e.g., AI, ML, LLM). This process ensures related content is bundled together for the planner.
-    3. **Recency and Relevance Ranking:** 
-       * **Recency and Relevance Ranking:** Score each topic based on its recency (within last 7 days) and its preceived impact on the industry domains (AI, ML, LLM).
-         ** consider its significance to the target domains (AI, ML, or LLM) and its perceived impact on the industry.
-         ** Prioritize articles published within the last 7 days or those discussing future trends. Deprioritize any old or non-timely content.
-    4. **Final Selection and Output:**
-       * Select the **top-tier topics** and their associated source documents based on the combined recency and relevance  scores.
-       * Output the final, refined selection as a structured list. 
-       This list must be **clean, sorted by priority**, and include the title, summary, url, domain and relevance score. 
-            Example Output Structure  :
-    ```json
-    [
-        {{
-            "title": "...",
-            "summary": "...",
-            "url": "...",
-            "domain": "AI/ML/Data Science etc."
-            "recency_and_relevance_score": "..."
-        }},
-        // ... 9 more entries
-    ]
-    ```
-    **Crucial Rule:** The output must be perfectly clean and ready for the 
-    `newsletter_planner_agent` to use directly for generating the outline sections.
-    """,
+def build_topic_analyzer_agent() -> Agent:
+    """
+    Builds a fresh instance of the topic analyzer. ADK agents can only have one parent,
+    so every agent tree (orchestrator, pipeline, ...) builds its own.
+    """
+    agent = Agent(
+        name="topic_analyzer_agent",
+        model=config.worker_model,
+        description="Analyzes fetched content, performing duplicate removal, recency and relevance ranking, and topic clustering.",
+        instruction=f"""
+        You are the **Topic Analyzer Agent**. Your role is to refine the raw content provided by the `content_fetcher_agent` before it is passed to the planner. 
+        You must act as a content filter and curator.
+        **Input:** A structured list of raw articles, each containing a title, summary, and URL.
+        **Goal:** Produce a highly curated, small list of non-redundant, high-priority topics with 
+        their best source material attached.
+        **Workflow Steps:**  
+        1. **Deterministic Reduction:** Call the `analyze_fetched_articles` tool exactly once (use `top_k=5` unless the feedback asks for a different number). 
+           It reads the articles from the `raw_fetched_articles` state key and performs exact and near-duplicate removal, topic clustering 
+           and recency/relevance ranking locally. Do NOT repeat these steps yourself and do NOT re-rank its output.
+        2. **Labelling:** For each returned topic, keep its title, summary, url and `recency_and_relevance_score` unchanged. 
+           Fill in the primary domain (AI, ML or LLM) if it is missing, using the `cluster_label` as a hint.
+        3. **Final Output:** Output the returned topics, in the order the tool returned them, as a structured list. 
+           This list must be **clean, sorted by priority**, and include the title, summary, url, domain and relevance score, 
+           as a compact JSON list on a single line, without markdown fences or any other text. 
+                Example Output Structure  :
+        [{{"title":"...","summary":"...","url":"...","domain":"AI","recency_and_relevance_score":0.82}}, ... 4 more entries]
+        **Crucial Rule:** The output must be perfectly clean and ready for the 
+        `newsletter_planner_agent` to use directly for generating the outline sections.
+        """,
     
-    tools=[], 
-    # The output will be the refined, clustered, and ranked list of topics
-    output_key="clustered_ranked_topics",
-)
- 
-print("✅ topic_analyzer_agent created.")
-
+        tools=[
+            # Local dedup / clustering / ranking engine (see topic_engine.py)
+            FunctionTool(analyze_fetched_articles),
+        ], 
+        # The output will be the refined, clustered, and ranked list of topics
+        output_key="clustered_ranked_topics",
+    )
+    attach_payload_schema(agent, compact_topics)
+    # The tool reads raw_fetched_articles from state itself; the model only needs its result.
+    attach_scoped_context(agent)
+    attach_stage_cache(agent, input_keys=["raw_fetched_articles"])
+    # Runs before the cache lookup, so the key covers the filtered article list.
+    attach_published_filter(agent)
+    return agent
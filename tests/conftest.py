@@ -0,0 +1,9 @@
+import os
+
+# Offline defaults, set before the modules under test read them: fixture
+# search, no article downloads and throwaway stage cache / story index.
+os.environ.setdefault("NEWSLETTER_SEARCH_BACKEND", "fixture")
+os.environ.setdefault("NEWSLETTER_SEARCH_CACHE_ENABLED", "0")
+os.environ.setdefault("NEWSLETTER_ARTICLE_FETCH", "0")
+os.environ.setdefault("NEWSLETTER_STAGE_CACHE", ":memory:")
+os.environ.setdefault("NEWSLETTER_STORY_INDEX", ":memory:")
@@ -0,0 +1,88 @@
+import httpx
+import pytest
+
+from article_fetch import ArticleFetcher, ArticleStore, excerpts, extract_main_text
+from topic_engine import normalize_url
+
+URL = "https://news.example.com/weather"
+
+BODY = " ".join(["The new weather model beats the ECMWF baseline on most ten-day forecasts."] * 4)
+PAGE = f"""<html><head><title>Ignored title</title>
+<meta property="og:title" content="Weather model beats baseline"></head>
+<body><nav><a href="/">Home</a> <a href="/news">News</a></nav>
+<article><h1>Weather model beats baseline</h1><p>{BODY}</p><p>{BODY}</p>
+<p><a href="/a">Related story one with a long link text</a></p></article>
+<footer>Copyright and other boilerplate that should not be extracted at all.</footer>
+<script>var tracking = "not text";</script></body></html>"""
+
+
+def test_extract_main_text_keeps_article_blocks_only():
+    page = extract_main_text(PAGE)
+    assert page["title"] == "Weather model beats baseline"
+    assert page["text"] == f"Weather model beats baseline\n\n{BODY}\n\n{BODY}"
+
+
+class Server:
+    """httpx.MockTransport handler serving PAGE with an ETag and honoring If-None-Match."""
+
+    def __init__(self):
+        self.requests = []
+
+    def __call__(self, request: httpx.Request) -> httpx.Response:
+        self.requests.append(request)
+        if request.url.path == "/missing":
+            return httpx.Response(404)
+        if request.url.path == "/feed.json":
+            return httpx.Response(200, headers={"content-type": "application/json"}, text="{}")
+        if request.headers.get("if-none-match") == '"v1"':
+            return httpx.Response(304, headers={"etag": '"v1"'})
+        return httpx.Response(200, headers={"content-type": "text/html; charset=utf-8", "etag": '"v1"'}, text=PAGE)
+
+
+@pytest.fixture
+def server():
+    return Server()
+
+
+def fetcher(server: Server, store: ArticleStore, fresh_seconds: int = 0) -> ArticleFetcher:
+    return ArticleFetcher(store=store, fresh_seconds=fresh_seconds, transport=httpx.MockTransport(server))
+
+
+@pytest.mark.asyncio
+async def test_download_then_revalidate_with_304(server):
+    store = ArticleStore(":memory:")
+    first = await fetcher(server, store).fetch_all([URL + "?utm_source=x"])
+    page = first[normalize_url(URL)]
+    assert page["title"] == "Weather model beats baseline"
+    assert page["text"].startswith("Weather model beats baseline")
+
+    again = fetcher(server, store)
+    second = await again.fetch_all([URL])
+    assert second[normalize_url(URL)]["hash"] == page["hash"]
+    assert server.requests[-1].headers["if-none-match"] == '"v1"'
+    assert again.counters["not_modified"] == 1 and again.counters["downloaded"] == 0
+
+
+@pytest.mark.asyncio
+async def test_fresh_pages_are_served_from_the_store(server):
+    store = ArticleStore(":memory:")
+    await fetcher(server, store).fetch_all([URL])
+    cached = fetcher(server, store, fresh_seconds=3600)
+    pages = await cached.fetch_all([URL, "https://www.news.example.com/weather/"])
+    assert list(pages) == [normalize_url(URL)]
+    assert len(server.requests) == 1
+    assert cached.counters["store_hits"] == 1
+
+
+@pytest.mark.asyncio
+async def test_errors_and_non_html_are_left_out(server):
+    pages = await fetcher(server, ArticleStore(":memory:")).fetch_all(
+        ["https://news.example.com/missing", "https://news.example.com/feed.json", "ftp://news.example.com/x", ""]
+    )
+    assert pages == {}
+    assert len(server.requests) == 2
+
+
+def test_excerpts_truncate_text():
+    pages = {"u": {"url": "u", "title": "t", "text": "x" * 100, "hash": "h"}}
+    assert excerpts(pages, max_chars=10) == {"u": {"url": "u", "title": "t", "text": "x" * 10, "hash": "h"}}
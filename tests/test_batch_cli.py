@@ -0,0 +1,58 @@
+import json
+
+import pytest
+
+from batch_cli import group_overlapping_jobs, job_slug, job_state, load_jobs
+from pipeline import START_STAGE_KEY
+from stage_cache import StageCache, _StageCacheCallbacks
+from sub_agents.newsletter_planner_agent import build_newsletter_planner_agent
+from sub_agents.newsletter_writer_agent import build_newsletter_writer_agent
+from sub_agents.topic_analyzer_agent import build_topic_analyzer_agent
+from topic_engine import parse_article_list
+
+FETCHED = [{"title": "A model launch", "summary": "Details.", "url": "https://a.com/1", "domain": "AI"}]
+
+
+@pytest.fixture
+def jobs(tmp_path):
+    path = tmp_path / "jobs.jsonl"
+    path.write_text("\n".join(json.dumps(job) for job in [
+        {"id": "execs", "topics": ["AI"], "audience": "executives"},
+        {"id": "engineers", "topics": ["AI"], "audience": "ML engineers"},
+    ]))
+    return load_jobs(str(path))
+
+
+@pytest.mark.parametrize("build, input_keys", [
+    (build_topic_analyzer_agent, ["raw_fetched_articles"]),
+    (build_newsletter_planner_agent, ["clustered_ranked_topics"]),
+])
+def test_jobs_differing_only_in_audience_do_not_share_cache_keys(jobs, build, input_keys):
+    callbacks = _StageCacheCallbacks(build(), input_keys, False, StageCache(":memory:"))
+    execs, engineers = (job_state(job, FETCHED) for job in jobs)
+    # Same upstream inputs, different brief.
+    assert execs["raw_fetched_articles"] == engineers["raw_fetched_articles"]
+    assert callbacks.key_for(execs) != callbacks.key_for(engineers)
+    assert callbacks.key_for(execs) == callbacks.key_for(job_state(jobs[0], FETCHED))
+
+
+def test_section_writers_get_the_job_brief(jobs):
+    writer = build_newsletter_writer_agent()
+    brief = job_state(jobs[1])["stage_directives"][writer.name]
+    agent = writer._section_agent("article_1", "Theme", {"editorial_title": "T"}, "", brief, "", "", 1)
+    assert "The audience is ML engineers." in agent.instruction(None)
+
+
+def test_job_state_resumes_after_shared_fetch(jobs):
+    assert START_STAGE_KEY not in job_state(jobs[0])
+    state = job_state(jobs[0], FETCHED)
+    assert parse_article_list(state["raw_fetched_articles"]) == FETCHED
+    assert state[START_STAGE_KEY] == "article_fetcher"
+
+
+def test_groups_and_slugs():
+    jobs = [{"id": "wide", "topics": ["AI", "ML"], "extra_queries": []},
+            {"id": "narrow", "topics": ["AI"], "extra_queries": []},
+            {"id": "other", "topics": ["Robotics"], "extra_queries": []}]
+    assert [[job["id"] for job in group] for group in group_overlapping_jobs(jobs)] == [["wide", "narrow"], ["other"]]
+    assert job_slug("../team/ai digest") == "team-ai-digest"
@@ -0,0 +1,60 @@
+import pytest
+
+from sub_agents.newsletter_writer_agent import feedback_sections, feedback_text, plan_sections
+
+PLAN = {
+    "newsletter_theme": "This week in AI",
+    "introduction": {"type": "hook", "content": "Three launches and a price cut."},
+    "articles": [
+        {"editorial_title": "OpenAI halves API prices",
+         "original_topic_summary": "OpenAI cut API prices for developers (https://openai.com/pricing-update).",
+         "key_takeaways": ["Cheaper tokens for developers", "Enterprise plans unchanged"]},
+        {"editorial_title": "Google's weather model beats the baseline",
+         "original_topic_summary": "DeepMind forecasting model beats ECMWF (https://blog.google/weather-model).",
+         "key_takeaways": ["Ten-day forecasts", "Runs on a single accelerator"]},
+        {"editorial_title": "Meta releases a multilingual speech model",
+         "original_topic_summary": "Speech recognition in 1,000 languages (https://ai.meta.com/speech).",
+         "key_takeaways": ["Open weights license", "Low-resource languages"]},
+    ],
+    "conclusion": {"type": "cta", "content": "Reply with your picks.", "final_cta": "Subscribe"},
+}
+SECTIONS = plan_sections(PLAN)
+
+
+@pytest.mark.parametrize("feedback, expected", [
+    ("The OpenAI story should mention the old price.", ["article_1"]),
+    ("Expand the first article", ["article_1"]),
+    ("Fix the second and third story", ["article_2", "article_3"]),
+    ("Tighten article 2 and 3", ["article_2", "article_3"]),
+    ("article 2 and 3 need sources", ["article_2", "article_3"]),
+    ("Stories 1, 2 and 3 are too long", ["article_1", "article_2", "article_3"]),
+    ("Shorten articles 2-3", ["article_2", "article_3"]),
+    ("The last item should name the license", ["article_3"]),
+    ("Thanks! The weather forecasting piece should say which baseline it beat.", ["article_2"]),
+    ("Make the intro shorter", ["introduction"]),
+    ("The sign-off is too pushy", ["conclusion"]),
+    ("Make the Meta story more casual", ["article_3"]),
+    ("Make the intro shorter and the second story more casual", ["introduction", "article_2"]),
+])
+def test_feedback_scoped_to_sections(feedback, expected):
+    assert feedback_sections(feedback, SECTIONS) == expected
+
+
+@pytest.mark.parametrize("feedback", [
+    "The article on OpenAI should mention pricing, and make the tone more casual",
+    "Don't say 'Google' so much anywhere",
+    "Make every article shorter and more direct.",
+    "Less hype overall",
+    "Make it shorter",
+    "Add 2 stories about robotics",
+    "Fix the OpenAI story. Also add a section on robotics.",
+    "",
+])
+def test_global_or_partly_unmatched_feedback_rewrites_everything(feedback):
+    assert feedback_sections(feedback, SECTIONS) is None
+
+
+def test_feedback_text_unwraps_the_rework_prompt():
+    prompt = "Please rework the previous newsletter draft based on the following feedback: 'Shorter intro'. Thanks"
+    assert feedback_text(prompt) == "Shorter intro"
+    assert feedback_text("Shorter intro") == "Shorter intro"
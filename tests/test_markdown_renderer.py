@@ -0,0 +1,52 @@
+from markdown_renderer import iter_html_document, iter_lines, iter_markdown_html, render_inline
+
+
+def render(markdown: str) -> str:
+    return "".join(iter_markdown_html(iter_lines(markdown)))
+
+
+def test_blocks():
+    html = render("# Title\n\nFirst line\nsecond line\n\n- a\n- b\n\n1. one\n2. two\n\n> quoted\n\n---\n")
+    assert html == (
+        "<h1>Title</h1>\n"
+        "<p>First line<br>\nsecond line</p>\n"
+        "<ul>\n<li>a</li>\n<li>b</li>\n</ul>\n"
+        "<ol>\n<li>one</li>\n<li>two</li>\n</ol>\n"
+        "<blockquote>\n<p>quoted</p>\n</blockquote>\n"
+        "<hr>\n"
+    )
+
+
+def test_inline_formatting_and_escaping():
+    assert render_inline("**bold**, *it* and `a<b>`") == "<strong>bold</strong>, <em>it</em> and <code>a&lt;b&gt;</code>"
+    assert render_inline("Tom & <Jerry>") == "Tom &amp; &lt;Jerry&gt;"
+
+
+def test_links_with_unsafe_schemes_are_neutralized():
+    assert render_inline("[ok](https://x.com/a?b=1&c=2)") == '<a href="https://x.com/a?b=1&amp;c=2">ok</a>'
+    assert render_inline("[bad](javascript:alert(1))") == '<a href="#">bad</a>'
+
+
+def test_fenced_code_is_escaped_verbatim():
+    html = render("```python\nif a < b:\n    **not bold**\n```\n")
+    assert html == '<pre><code class="language-python">if a &lt; b:\n    **not bold**\n</code></pre>\n'
+
+
+def test_unclosed_blocks_are_closed_at_end():
+    assert render("- item") == "<ul>\n<li>item</li>\n</ul>\n"
+    assert render("```\ncode") == "<pre><code>code\n</code></pre>\n"
+
+
+def test_document_wraps_body_and_handles_crlf():
+    document = "".join(iter_html_document("## Heading\r\n\r\nBody\r\n"))
+    assert document.startswith("<!DOCTYPE html>")
+    assert "<h2>Heading</h2>\n<p>Body</p>\n" in document
+    assert document.rstrip().endswith("</html>")
+
+
+def test_emphasis_next_to_strong():
+    assert render_inline("*a*") == "<em>a</em>"
+    assert render_inline("*a* **b**") == "<em>a</em> <strong>b</strong>"
+    assert render_inline("**a** *b*") == "<strong>a</strong> <em>b</em>"
+    assert render_inline("*I* think **so**") == "<em>I</em> think <strong>so</strong>"
+    assert render_inline("*a **b** c*") == "<em>a <strong>b</strong> c</em>"
@@ -0,0 +1,95 @@
+import asyncio
+import time
+
+import pytest
+from google.adk.models.llm_request import LlmRequest
+from google.genai import errors as genai_errors
+from google.genai import types as genai_types
+
+from call_policy import CallPolicy, PolicyLlm
+from model_router import ModelRouter, RoutedLlm
+from replay_llm import ReplayLlm, ReplayScript
+
+SCRIPT = ReplayScript(default_text="OK")
+
+
+def model(name: str, **faults) -> ReplayLlm:
+    return ReplayLlm(model=name, script=SCRIPT, agent_name="planner", latency=0.01, **faults)
+
+
+def request() -> LlmRequest:
+    return LlmRequest(contents=[genai_types.Content(role="user", parts=[genai_types.Part(text="plan")])])
+
+
+async def text_of(llm) -> str:
+    responses = [response async for response in llm.generate_content_async(request())]
+    return "".join(part.text for response in responses for part in response.content.parts if part.text)
+
+
+def routed(fast: ReplayLlm, standard: ReplayLlm, timeout: float = 5.0) -> RoutedLlm:
+    router = ModelRouter(tiers={"fast": fast, "standard": standard},
+                         stage_tiers={"planner": ["fast", "standard"]}, timeout=timeout, cooldown=60)
+    return RoutedLlm(model=fast.model, router=router, stage="planner")
+
+
+@pytest.mark.asyncio
+async def test_router_falls_back_on_rate_limit_and_cools_the_model_down():
+    fast, standard = model("fast-model", error_rate=1.0, error_code=429), model("standard-model")
+    llm = routed(fast, standard)
+    assert await text_of(llm) == "OK"
+    assert (fast.calls, standard.calls) == (1, 1)
+    assert not llm.router.available("fast")
+    # While fast cools down, calls go straight to standard.
+    assert await text_of(llm) == "OK"
+    assert (fast.calls, standard.calls) == (1, 2)
+
+
+@pytest.mark.asyncio
+async def test_router_falls_back_when_a_tier_stalls():
+    llm = routed(model("fast-model", stall_rate=1.0, stall_latency=30), model("standard-model"), timeout=0.2)
+    started = time.monotonic()
+    assert await text_of(llm) == "OK"
+    assert time.monotonic() - started < 2
+
+
+@pytest.mark.asyncio
+async def test_router_raises_when_every_tier_fails():
+    llm = routed(model("fast-model", error_rate=1.0, error_code=503),
+                 model("standard-model", error_rate=1.0, error_code=503))
+    with pytest.raises(genai_errors.APIError):
+        await text_of(llm)
+
+
+@pytest.mark.asyncio
+async def test_policy_retries_then_gives_up():
+    inner = model("fast-model", error_rate=1.0, error_code=429)
+    policy = CallPolicy(deadlines={"planner": 5}, max_attempts=3, backoff_base=0.01, hedge=False, seed=1)
+    llm = PolicyLlm(model=inner.model, inner=inner, stage="planner", policy=policy)
+    with pytest.raises(genai_errors.APIError):
+        await text_of(llm)
+    assert inner.calls == 3
+    assert policy.stats()["planner"]["retries"] == 2
+
+
+@pytest.mark.asyncio
+async def test_policy_deadline_abandons_a_stalled_call():
+    inner = model("fast-model", stall_rate=1.0, stall_latency=30)
+    policy = CallPolicy(deadlines={"planner": 0.2}, max_attempts=3, backoff_base=0.01, hedge=False)
+    llm = PolicyLlm(model=inner.model, inner=inner, stage="planner", policy=policy)
+    started = time.monotonic()
+    with pytest.raises(asyncio.TimeoutError):
+        await text_of(llm)
+    assert time.monotonic() - started < 2
+    assert policy.stats()["planner"]["deadline_exceeded"] == 1
+
+
+@pytest.mark.asyncio
+async def test_policy_deadline_below_tier_timeout_still_falls_back():
+    # The tier timeout (5 s) is longer than the whole call's deadline (0.5 s):
+    # the router waits only its share of the time left, so fast times out
+    # with time to spare for standard.
+    fast = model("fast-model", stall_rate=1.0, stall_latency=30)
+    llm = routed(fast, model("standard-model"), timeout=5.0)
+    policy = CallPolicy(deadlines={"planner": 0.5}, max_attempts=1, hedge=False)
+    assert await text_of(PolicyLlm(model=fast.model, inner=llm, stage="planner", policy=policy)) == "OK"
+    assert not llm.router.available("fast")
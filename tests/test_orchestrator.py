@@ -0,0 +1,48 @@
+import pytest
+from google.adk.runners import Runner
+from google.adk.sessions import InMemorySessionService
+from google.genai import types as genai_types
+
+from main_agent import build_orchestrator_agent
+from pipeline import DRAFT_KEY, build_pipeline_agent
+from replay_llm import DEFAULT_RECORDING_PATH, ReplayScript, install_replay_llm
+from schemas import OutlinePlan, load_outline
+from sub_agents.newsletter_writer_agent import DRAFT_SECTIONS_KEY
+
+
+def _transfer(agent_name):
+    return {"name": "transfer_to_agent", "args": {"agent_name": agent_name}}
+
+
+def test_only_the_pipeline_planner_is_schema_constrained():
+    planners = [agent for agent in build_orchestrator_agent().sub_agents if agent.name == "newsletter_planner"]
+    assert planners[0].output_schema is None
+    assert build_pipeline_agent().stages[3].output_schema is OutlinePlan
+
+
+@pytest.mark.asyncio
+async def test_orchestrator_planner_hands_its_outline_to_the_writer():
+    root = build_orchestrator_agent()
+    script = ReplayScript.load(DEFAULT_RECORDING_PATH)
+    outline = script.steps["newsletter_planner"][0]["text"]
+    topics = script.steps["topic_analyzer_agent"][-1]["text"]
+    script.steps["newsletter_creator_agent"] = [{"function_call": _transfer("newsletter_planner")}]
+    # The planner answers with its outline and the transfer in one response.
+    script.steps["newsletter_planner"] = [{"text": outline, "function_call": _transfer("newsletter_writer")}]
+    install_replay_llm(root, script, time_scale=0.0)
+    runner = Runner(agent=root, app_name="test", session_service=InMemorySessionService())
+    session = await runner.session_service.create_session(
+        app_name="test", user_id="u", state={"clustered_ranked_topics": topics}
+    )
+    authors = [event.author async for event in runner.run_async(
+        user_id="u", session_id=session.id,
+        new_message=genai_types.Content(role="user", parts=[genai_types.Part(text="Create today's newsletter.")]),
+    )]
+    session = await runner.session_service.get_session(app_name="test", user_id="u", session_id=session.id)
+
+    assert authors[-1] == "newsletter_writer"
+    plan = load_outline(session.state["newsletter_outline_plan"])
+    assert plan is not None and plan.articles
+    # Written section by section from the plan, not by the single-call fallback.
+    assert len(session.state[DRAFT_SECTIONS_KEY]) == len(plan.articles) + 2
+    assert session.state[DRAFT_KEY]
@@ -0,0 +1,66 @@
+import json
+
+import pytest
+from google.adk.runners import Runner
+from google.adk.sessions import InMemorySessionService
+from google.genai import types as genai_types
+
+from pipeline import DRAFT_KEY, build_pipeline_agent, draft_markdown
+from replay_llm import DEFAULT_RECORDING_PATH, ReplayScript, install_replay_llm
+from sub_agents.newsletter_writer_agent import DRAFT_SECTIONS_KEY, SECTION_TARGETS_KEY
+
+
+@pytest.mark.asyncio
+async def test_section_events_stay_out_of_the_stream():
+    root = build_pipeline_agent()
+    install_replay_llm(root, ReplayScript.load(DEFAULT_RECORDING_PATH), time_scale=0.0)
+    runner = Runner(agent=root, app_name="test", session_service=InMemorySessionService())
+    session = await runner.session_service.create_session(app_name="test", user_id="u")
+    streamed = [event async for event in runner.run_async(
+        user_id="u", session_id=session.id,
+        new_message=genai_types.Content(role="user", parts=[genai_types.Part(text="Create today's newsletter.")]),
+    )]
+    session = await runner.session_service.get_session(app_name="test", user_id="u", session_id=session.id)
+
+    assert not [event for event in streamed if event.author.startswith("section_writer_")]
+    writer_events = [event for event in streamed if event.author == "newsletter_writer"]
+    assert len(writer_events) == 1
+    draft = session.state[DRAFT_KEY]
+    assert writer_events[0].content.parts[0].text == draft
+    assert draft_markdown(session.state) == draft
+    # Every section was written, and its events were still recorded in the session.
+    recorded = {event.author for event in session.events}
+    assert {f"section_writer_{key}" for key in session.state[DRAFT_SECTIONS_KEY]} <= recorded
+
+
+@pytest.mark.asyncio
+async def test_rework_router_picks_the_sections_to_rewrite():
+    root = build_pipeline_agent()
+    script = ReplayScript.load(DEFAULT_RECORDING_PATH)
+    # Feedback the grammar cannot place; the router names the section.
+    script.steps["rework_router"] = [{"text": json.dumps({
+        "start_stage": "newsletter_writer", "directive": "Cite a source.", "sections": ["article_2", "bogus"],
+    })}]
+    install_replay_llm(root, script, time_scale=0.0)
+    runner = Runner(agent=root, app_name="test", session_service=InMemorySessionService())
+    session = await runner.session_service.create_session(app_name="test", user_id="u")
+
+    async def turn(text):
+        async for _ in runner.run_async(
+            user_id="u", session_id=session.id,
+            new_message=genai_types.Content(role="user", parts=[genai_types.Part(text=text)]),
+        ):
+            pass
+        return await runner.session_service.get_session(app_name="test", user_id="u", session_id=session.id)
+
+    first = await turn("Create today's newsletter.")
+    seen = len(first.events)
+    reworked = await turn("Please rework the previous newsletter draft based on the following feedback: "
+                          "'That one needs a source.'")
+
+    assert reworked.state[SECTION_TARGETS_KEY] == ["article_2", "bogus"]
+    rewritten = {event.author for event in reworked.events[seen:] if event.author.startswith("section_writer_")}
+    assert rewritten == {"section_writer_article_2"}
+    for key, entry in first.state[DRAFT_SECTIONS_KEY].items():
+        if key != "article_2":
+            assert reworked.state[DRAFT_SECTIONS_KEY][key]["body"] == entry["body"]
@@ -0,0 +1,63 @@
+import pytest
+from google.adk.events import Event, EventActions
+
+from session_store import SqliteSessionService
+
+
+@pytest.fixture
+def service(tmp_path):
+    return SqliteSessionService(str(tmp_path / "sessions.db"), pool_size=2)
+
+
+@pytest.mark.asyncio
+async def test_session_state_is_isolated_per_session_and_user(service):
+    first = await service.create_session(app_name="app", user_id="alice", state={"draft": "one"})
+    second = await service.create_session(app_name="app", user_id="alice", state={"draft": "two"})
+    other = await service.create_session(app_name="app", user_id="bob")
+
+    await service.append_event(first, Event(author="writer", actions=EventActions(state_delta={"draft": "edited"})))
+
+    assert (await service.get_session(app_name="app", user_id="alice", session_id=first.id)).state["draft"] == "edited"
+    assert (await service.get_session(app_name="app", user_id="alice", session_id=second.id)).state["draft"] == "two"
+    assert "draft" not in (await service.get_session(app_name="app", user_id="bob", session_id=other.id)).state
+    # A session is only visible to its own user and app.
+    assert await service.get_session(app_name="app", user_id="bob", session_id=first.id) is None
+    assert await service.get_session(app_name="other", user_id="alice", session_id=first.id) is None
+
+
+@pytest.mark.asyncio
+async def test_user_and_app_state_are_shared_and_temp_state_is_dropped(service):
+    first = await service.create_session(app_name="app", user_id="alice")
+    await service.append_event(first, Event(author="app", actions=EventActions(state_delta={
+        "user:tone": "casual", "app:issue": 7, "temp:scratch": "x"})))
+    second = await service.create_session(app_name="app", user_id="alice")
+    other = await service.create_session(app_name="app", user_id="bob")
+
+    assert second.state["user:tone"] == "casual"
+    assert second.state["app:issue"] == 7
+    assert "user:tone" not in other.state and other.state["app:issue"] == 7
+    stored = await service.get_session(app_name="app", user_id="alice", session_id=first.id)
+    assert "temp:scratch" not in stored.state
+
+
+@pytest.mark.asyncio
+async def test_events_persist_across_service_instances(service, tmp_path):
+    session = await service.create_session(app_name="app", user_id="alice", session_id="s1")
+    await service.append_event(session, Event(author="writer", actions=EventActions(state_delta={"n": 1})))
+    await service.append_event(session, Event(author="writer", actions=EventActions(state_delta={"n": 2})))
+
+    reopened = SqliteSessionService(service.path)
+    stored = await reopened.get_session(app_name="app", user_id="alice", session_id="s1")
+    assert stored.state["n"] == 2
+    assert [event.actions.state_delta["n"] for event in stored.events] == [1, 2]
+    with pytest.raises(ValueError):
+        await reopened.create_session(app_name="app", user_id="alice", session_id="s1")
+
+
+@pytest.mark.asyncio
+async def test_stale_session_cannot_append(service):
+    session = await service.create_session(app_name="app", user_id="alice")
+    stale = await service.get_session(app_name="app", user_id="alice", session_id=session.id)
+    await service.append_event(session, Event(author="writer", actions=EventActions(state_delta={"n": 1})))
+    with pytest.raises(ValueError):
+        await service.append_event(stale, Event(author="writer", actions=EventActions(state_delta={"n": 2})))
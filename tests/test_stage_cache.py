@@ -0,0 +1,54 @@
+import pytest
+
+import stage_cache
+from stage_cache import StageCache, stage_key
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(stage_cache.time, "time", lambda: now[0])
+    return now
+
+
+def test_stage_key_is_order_independent():
+    assert stage_key("planner", {"a": 1, "b": [2]}) == stage_key("planner", {"b": [2], "a": 1})
+    assert stage_key("planner", {"a": 1}) != stage_key("writer", {"a": 1})
+
+
+def test_hit_miss_and_counters(clock):
+    cache = StageCache(":memory:", ttl_seconds=60, max_entries=10)
+    assert cache.get("k", "planner") is None
+    cache.put("k", "planner", "plan")
+    assert cache.get("k", "planner") == "plan"
+    assert cache.stats() == {"planner": {"hits": 1, "misses": 1, "stores": 1, "entries": 1}}
+
+
+def test_entries_expire_after_ttl(clock):
+    cache = StageCache(":memory:", ttl_seconds=60, max_entries=10)
+    cache.put("k", "planner", "plan")
+    clock[0] += 60
+    assert cache.get("k", "planner") == "plan"
+    clock[0] += 1
+    assert cache.get("k", "planner") is None
+    assert "entries" not in cache.stats()["planner"]
+
+
+def test_least_recently_used_entry_is_evicted(clock):
+    cache = StageCache(":memory:", ttl_seconds=3600, max_entries=2)
+    cache.put("a", "s", "A")
+    clock[0] += 1
+    cache.put("b", "s", "B")
+    clock[0] += 1
+    assert cache.get("a", "s") == "A"  # "b" is now the least recently used
+    clock[0] += 1
+    cache.put("c", "s", "C")
+    assert cache.get("b", "s") is None
+    assert cache.get("a", "s") == "A"
+    assert cache.get("c", "s") == "C"
+
+
+def test_zero_max_entries_stores_nothing(clock):
+    cache = StageCache(":memory:", ttl_seconds=60, max_entries=0)
+    cache.put("k", "s", "v")
+    assert cache.get("k", "s") is None
@@ -0,0 +1,65 @@
+import pytest
+
+from story_index import StoryIndex, filter_published
+
+SUMMARY = ("Google DeepMind released a weather forecasting model that beats the ECMWF baseline "
+           "on most ten-day forecasts and runs in under a minute on a single accelerator.")
+STORIES = [
+    {"url": "https://www.blog.google/weather-model/?utm_source=rss", "title": "Google's new weather model",
+     "summary": SUMMARY},
+    {"url": "https://openai.com/pricing-update", "title": "OpenAI cuts API prices",
+     "summary": "OpenAI cut the price of its flagship API model by half for developers and enterprise customers."},
+]
+
+
+@pytest.fixture
+def index():
+    index = StoryIndex(":memory:")
+    index.add_issue("issue-1", STORIES, title="Issue 1", markdown="# Issue 1")
+    return index
+
+
+def test_match_by_normalized_url(index):
+    assert index.match({"url": "https://blog.google/weather-model", "title": "Something else"}) == {
+        "issue_id": "issue-1", "reason": "url"}
+
+
+def test_match_by_normalized_title(index):
+    assert index.match({"url": "https://other.example.com/x", "title": "OPENAI cuts API prices!"}) == {
+        "issue_id": "issue-1", "reason": "title"}
+
+
+def test_match_by_reworded_summary(index):
+    reworded = {"url": "https://news.example.com/w", "title": "DeepMind forecasting beats ECMWF",
+                "summary": "Google DeepMind released a weather forecasting model that beats the ECMWF baseline "
+                           "on most ten-day forecasts and runs in about a minute on one accelerator."}
+    assert index.match(reworded) == {"issue_id": "issue-1", "reason": "simhash"}
+
+
+def test_unrelated_and_short_articles_do_not_match(index):
+    unrelated = {"url": "https://news.example.com/chips", "title": "Nvidia ships a new chip",
+                 "summary": "Nvidia shipped a data center chip with twice the memory bandwidth of its predecessor "
+                            "and lower power draw per token served."}
+    assert index.match(unrelated) is None
+    assert index.match({"url": "https://news.example.com/s", "title": "Short", "summary": "Google weather model"}) is None
+    assert index.counters["checked"] == 2
+
+
+def test_adding_an_issue_twice_is_idempotent(index):
+    assert index.add_issue("issue-1", STORIES, title="Issue 1") == 0
+    assert index.counts() == {"issues": 1, "stories": 2}
+
+
+def test_index_is_reloaded_from_disk(tmp_path):
+    path = str(tmp_path / "stories.db")
+    StoryIndex(path).add_issue("issue-1", STORIES, title="Issue 1", markdown="# Issue 1")
+    reopened = StoryIndex(path)
+    assert reopened.match({"url": "https://openai.com/pricing-update/"})["reason"] == "url"
+    assert [issue["markdown"] for issue in reopened.iter_issues()] == ["# Issue 1"]
+
+
+def test_filter_published_tops_up_to_min_candidates(index):
+    fresh = {"url": "https://news.example.com/fresh", "title": "A fresh story"}
+    kept, published = filter_published([STORIES[0], fresh, STORIES[1]], index=index, min_candidates=2)
+    assert published == [STORIES[0], STORIES[1]]
+    assert kept == [fresh, STORIES[0]]
@@ -0,0 +1,86 @@
+import datetime
+import math
+
+import numpy as np
+from scipy import sparse
+
+from topic_engine import _near_duplicate_groups, analyze_articles, exact_dedup, normalize_url
+
+NOW = datetime.datetime(2026, 10, 1, 12, tzinfo=datetime.timezone.utc)
+
+
+def article(title, summary, url, hours_old=1):
+    return {"title": title, "summary": summary, "url": url,
+            "published": (NOW - datetime.timedelta(hours=hours_old)).isoformat()}
+
+
+def unit(degrees):
+    return [math.cos(math.radians(degrees)), math.sin(math.radians(degrees))]
+
+
+def test_normalize_url_drops_tracking_and_www():
+    assert normalize_url("https://www.Example.com/a/?utm_source=x&id=3") == normalize_url("https://example.com/a?id=3")
+
+
+def test_exact_dedup_by_url_and_title_keeps_longest_summary():
+    articles = [
+        article("OpenAI ships a model", "short", "https://a.com/1"),
+        article("Other story", "the longest summary", "https://www.a.com/1/?utm_medium=rss"),
+        article("openai ships a model!", "a bit longer", "https://b.com/9"),
+        article("Unrelated", "fourth", "https://c.com/2"),
+    ]
+    assert [a["summary"] for a in exact_dedup(articles)] == ["the longest summary", "fourth"]
+
+
+def test_near_duplicate_groups_do_not_chain():
+    # A~B and B~C (cos 40 deg = 0.77) but A and C are unrelated (cos 80 deg).
+    matrix = sparse.csr_matrix(np.array([unit(0), unit(40), unit(80)], dtype=np.float32))
+    labels = _near_duplicate_groups(matrix, 0.75).tolist()
+    assert labels[0] == labels[1]
+    assert labels[2] != labels[0]
+
+
+def test_near_duplicate_groups_join_most_similar_group():
+    matrix = sparse.csr_matrix(np.array([unit(0), unit(90), unit(88), unit(2)], dtype=np.float32))
+    assert _near_duplicate_groups(matrix, 0.75, block_size=2).tolist() == [0, 1, 1, 0]
+
+
+def test_analyze_articles_collapses_reworded_coverage_and_keeps_top_k():
+    articles = [
+        article("Nvidia unveils new AI chip for data centers",
+                "Nvidia unveils a new AI chip for data centers with faster training and inference.",
+                "https://one.example.com/nvidia"),
+        article("Nvidia announces new AI chip for data centers",
+                "Nvidia unveils a new AI chip for data centers with faster training and inference, analysts say.",
+                "https://two.example.com/nvidia"),
+        article("Google releases weather forecasting model",
+                "Google DeepMind releases a weather forecasting model that beats the ECMWF baseline.",
+                "https://three.example.com/weather"),
+        article("Meta open-sources a speech model",
+                "Meta open-sources a speech recognition model covering a thousand languages.",
+                "https://four.example.com/speech"),
+        article("Hospital robots get a language model upgrade",
+                "A robotics startup adds a language model to hospital delivery robots.",
+                "https://five.example.com/robots", hours_old=200),
+    ]
+    result = analyze_articles(articles, top_k=3, now=NOW)
+    topics = result["topics"]
+    assert result["stats"]["after_near_dedup"] == 4
+    assert len(topics) == 3
+    assert len({topic["url"] for topic in topics}) == 3
+    # The longer of the two Nvidia reports represents the group.
+    nvidia = [topic for topic in topics if "nvidia" in topic["url"]]
+    assert nvidia and nvidia[0]["url"] == "https://two.example.com/nvidia"
+    scores = [topic["recency_and_relevance_score"] for topic in topics]
+    assert scores == sorted(scores, reverse=True)
+
+
+def test_analyze_articles_accepts_naive_now():
+    articles = [article("A story about models", "Some summary about a model release.", "https://a.com/x")]
+    naive = NOW.astimezone().replace(tzinfo=None)
+    assert analyze_articles(articles, now=naive)["topics"][0]["url"] == "https://a.com/x"
+
+
+def test_analyze_articles_empty():
+    assert analyze_articles([], now=NOW) == {"topics": [], "stats": {
+        "input": 0, "after_exact_dedup": 0, "after_near_dedup": 0, "clusters": 0}}
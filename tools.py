@@ -1,40 +1,26 @@
 import time
 import random
 from typing import List, Dict, Optional
+from google.adk.tools import ToolContext
+from stage_cache import STAGE_DIRECTIVES_KEY
+from search import build_fetch_queries, fan_out_search
+from search_backends import get_search_backend
+from topic_engine import analyze_articles, parse_article_list
+from markdown_renderer import iter_html_bytes, iter_html_document
 
-# NOTE: The execution logic for internet_search will be moved into app.py
-# as part of the _call_gemini_api function using the 'tools' parameter. 
-# This file now only contains the utility function for PDF (HTML) output 
+# NOTE: internet_search and fetch_candidate_articles run against the pluggable
+# backend from search_backends.get_search_backend() (live, fixture, replay...).
+# This file also contains the utility function for PDF (HTML) output 
 # and the conceptual approval router.
 
 # --- Implementation for Document Conversion (Simulated HTML) ---
 def markdown_to_html(markdown_content: str) -> str:
     """
     Converts Markdown content into a simple, styled HTML document for display.
+    Use iter_html_document / iter_html_bytes from markdown_renderer to stream
+    large documents instead of materializing them.
     """
-    # Simple Markdown to HTML conversion for demonstration
-    html_body_content = markdown_content.replace('###', '<h3>').replace('##', '<h2>').replace('\n\n', '<p>').replace('\n', '<br>')
-    
-    html_template = f"""
-    <!DOCTYPE html>
-    <html>
-    <head>
-        <title>AI Newsletter Draft</title>
-        <style>
-            body {{ font-family: Arial, sans-serif; line-height: 1.6; padding: 30px; margin: 0; }}
-            h1, h2, h3 {{ color: #2C3E50; border-bottom: 2px solid #ECF0F1; padding-bottom: 5px; }}
-            .article {{ margin-bottom: 25px; padding-bottom: 15px; border-bottom: 1px dashed #BDC3C7; }}
-            .source {{ font-size: 0.8em; color: #7F8C8D; margin-top: 20px; display: block; }}
-        </style>
-    </head>
-    <body>
-        <h1 style="text-align: center;">Weekly AI and Tech Digest</h1>
-        {html_body_content}
-        <span class="source">Note: This is simulated document content generated by the agent pipeline.</span>
-    </body>
-    </html>
-    """
-    return html_template
+    return "".join(iter_html_document(markdown_content))
 
 def save_draft_as_pdf(final_content_markdown: str, filename: str = "newsletter_draft.html") -> Dict[str, bytes]:
     """
@@ -42,8 +28,8 @@ def save_draft_as_pdf(final_content_markdown: str, filename: str = "newsletter_d
     """
     print(f"Tool executed: Converting content to simulated document: {filename}")
     
-    html_content = markdown_to_html(final_content_markdown)
-    document_bytes = html_content.encode('utf-8')
+    # Encoded chunk by chunk; the only full-size copy is the returned bytes.
+    document_bytes = b"".join(iter_html_bytes(final_content_markdown))
     
     return {
         "filename": filename,
@@ -61,10 +47,58 @@ def approval_router_tool(pdf_file_data: Dict[str, bytes]) -> str:
     
     return "AWAITING_USER_APPROVAL"
 
-# --- Placeholder function for tool-calling simplicity in the LLM ---
-def internet_search(query: str) -> str:
+# --- Internet Search Tool ---
+async def internet_search(query: str) -> dict:
+    """
+    Searches the internet for recent articles about query and returns up to 5
+    results, each with title, summary and url. Identical queries are served
+    from a local result cache for the rest of the day.
+    """
+    results = await get_search_backend().search(query)
+    return {"status": "success", "query": query, "results": results}
+
+# --- Deterministic Topic Analysis Tool ---
+def analyze_fetched_articles(tool_context: ToolContext, top_k: int = 5) -> dict:
+    """
+    Removes exact and near-duplicate articles, clusters the rest into topics and
+    ranks them by relevance and recency. Reads the fetched articles from the
+    `raw_fetched_articles` session state key and returns the top_k topics, each
+    with title, summary, url, domain, recency_and_relevance_score and its
+    cluster label.
+    """
+    articles = parse_article_list(tool_context.state.get("raw_fetched_articles"))
+    result = analyze_articles(articles, top_k=top_k)
+    print(f"Tool executed: Topic analysis reduced {len(articles)} articles to {len(result['topics'])} topics")
+    return {"status": "success", **result}
+
+# --- Rework Directive Tool ---
+def set_stage_directive(tool_context: ToolContext, stage: str, directive: str) -> str:
+    """
+    Records the feedback-derived instructions a sub-agent stage must follow on
+    its next run. Call this before re-running a stage because of user feedback,
+    so the stage is regenerated instead of served from the stage cache.
+    stage is the sub-agent name: content_fetcher, topic_analyzer_agent or
+    newsletter_planner.
+    """
+    directives = dict(tool_context.state.get(STAGE_DIRECTIVES_KEY) or {})
+    directives[stage] = directive
+    tool_context.state[STAGE_DIRECTIVES_KEY] = directives
+    return f"Directive recorded for {stage}"
+
+# --- Concurrent Search Fan-Out Tool ---
+async def fetch_candidate_articles(
+    tool_context: ToolContext,
+    domains: Optional[List[str]] = None,
+    extra_queries: Optional[List[str]] = None,
+) -> dict:
     """
-    Use this function description to instruct the LLM to perform a web search.
-    The actual search is handled by the API's search grounding tool.
+    Searches the internet for recent articles across the newsletter domains in
+    one call. Every per-domain sub-query (and any extra_queries) runs
+    concurrently; results are merged and de-duplicated by URL. domains defaults
+    to AI, ML and LLM. Returns the candidate articles with title, summary, url,
+    domain and the queries that matched them.
     """
-    return f"Performing a Google search for: {query}"
\ No newline at end of file
+    queries = build_fetch_queries(domains, extra_queries)
+    articles = await fan_out_search(queries, get_search_backend())
+    print(f"Tool executed: Search fan-out over {len(queries)} queries returned {len(articles)} candidates")
+    return {"status": "success", "count": len(articles), "articles": articles}
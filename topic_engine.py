@@ -0,0 +1,264 @@
+import datetime
+import math
+import re
+from typing import Dict, List, Optional
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+import numpy as np
+
+from schemas import parse_json_payload
+# scipy / scikit-learn are imported inside the functions that use them: they
+# account for most of the agent layer's import time, and the URL/title helpers
+# here are imported on every start (search.py, tools.py).
+
+# --- Deterministic Topic Engine ---
+# Local replacement for the dedup / clustering / ranking steps that the
+# topic_analyzer_agent used to perform inside its prompt. Everything here is
+# vectorized over a sparse TF-IDF matrix and seeded, so the same fetched
+# articles always reduce to the same ranked topics.
+
+DOMAIN_QUERY = (
+    "artificial intelligence AI machine learning ML deep learning "
+    "large language model LLM generative AI neural network model training"
+)
+
+NEAR_DUPLICATE_THRESHOLD = 0.75
+RECENCY_HALF_LIFE_DAYS = 3.5
+# Recency factor used when an article carries no parseable publication date.
+UNKNOWN_RECENCY = 0.5
+
+_TRACKING_PARAMS = ("utm_", "fbclid", "gclid", "mc_cid", "mc_eid", "ref")
+_NON_WORD = re.compile(r"[^a-z0-9]+")
+_DATE_FIELDS = ("published", "published_at", "date", "publication_date")
+
+
+def normalize_url(url: str) -> str:
+    """
+    Canonical form of an article URL: lower-cased host without `www.`, no
+    fragment, no tracking parameters and no trailing slash.
+    """
+    parts = urlsplit((url or "").strip())
+    host = parts.netloc.lower()
+    if host.startswith("www."):
+        host = host[4:]
+    query = urlencode(sorted(
+        (k, v) for k, v in parse_qsl(parts.query)
+        if not k.lower().startswith(_TRACKING_PARAMS)
+    ))
+    path = parts.path.rstrip("/")
+    return urlunsplit(("", host, path, query, "")).lstrip("/")
+
+
+def normalize_title(title: str) -> str:
+    """Lower-cases a title and collapses punctuation/whitespace runs."""
+    return _NON_WORD.sub(" ", (title or "").lower()).strip()
+
+
+def parse_article_list(payload) -> List[Dict]:
+    """
+    Reads the article list an upstream agent stored in session state. Accepts
+    an already-decoded list/dict or JSON text, fenced or slightly malformed.
+    """
+    payload = parse_json_payload(payload)
+    if isinstance(payload, dict):
+        payload = payload.get("articles") or payload.get("topics") or []
+    return [a for a in payload or [] if isinstance(a, dict)]
+
+
+def _parse_date(article: Dict) -> Optional[datetime.datetime]:
+    for field in _DATE_FIELDS:
+        value = article.get(field)
+        if not value:
+            continue
+        try:
+            parsed = datetime.datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+        except ValueError:
+            continue
+        if parsed.tzinfo is None:
+            parsed = parsed.replace(tzinfo=datetime.timezone.utc)
+        return parsed
+    return None
+
+
+def exact_dedup(articles: List[Dict]) -> List[Dict]:
+    """
+    Drops exact duplicates by normalized URL or normalized title, keeping the
+    entry with the longest summary. Input order is otherwise preserved.
+    """
+    kept: List[Dict] = []
+    index_by_key: Dict[str, int] = {}
+    for article in articles:
+        keys = [k for k in (
+            "u:" + normalize_url(article.get("url", "")) if article.get("url") else "",
+            "t:" + normalize_title(article.get("title", "")) if article.get("title") else "",
+        ) if k]
+        slot = next((index_by_key[k] for k in keys if k in index_by_key), None)
+        if slot is None:
+            slot = len(kept)
+            kept.append(article)
+        elif len(article.get("summary") or "") > len(kept[slot].get("summary") or ""):
+            kept[slot] = article
+        for k in keys:
+            index_by_key[k] = slot
+    return kept
+
+
+def _near_duplicate_groups(matrix, threshold: float, block_size: int = 1024) -> np.ndarray:
+    """
+    Labels rows of an L2-normalized TF-IDF matrix so that rows sharing a label
+    are all pairwise near-duplicates (cosine similarity >= threshold).
+    Grouping is complete-link: a row joins an earlier group only if it is
+    similar to every member, so chains A~B~C of distinct stories do not merge.
+    Similarities are computed in row blocks to keep memory bounded for large
+    fetches.
+    """
+    n = matrix.shape[0]
+    # neighbors[j]: earlier rows i < j similar to j, with their similarity.
+    neighbors: List[Dict[int, float]] = [{} for _ in range(n)]
+    transposed = matrix.T.tocsc()
+    for start in range(0, n, block_size):
+        block = (matrix[start:start + block_size] @ transposed).tocoo()
+        mask = (block.data >= threshold) & (block.row + start < block.col)
+        for i, j, similarity in zip((block.row[mask] + start).tolist(), block.col[mask].tolist(),
+                                    block.data[mask].tolist()):
+            neighbors[j][i] = similarity
+
+    labels = np.empty(n, dtype=np.int64)
+    members: List[List[int]] = []
+    for j in range(n):
+        similar = neighbors[j]
+        label = -1
+        # Most similar candidate group first; ties keep the earliest group.
+        for candidate in sorted({int(labels[i]) for i in similar},
+                                key=lambda g: (-max(similar.get(i, 0.0) for i in members[g]), g)):
+            if all(i in similar for i in members[candidate]):
+                label = candidate
+                break
+        if label < 0:
+            label = len(members)
+            members.append([])
+        members[label].append(j)
+        labels[j] = label
+    return labels
+
+
+def _cluster_labels(matrix, n_clusters: int) -> np.ndarray:
+    from sklearn.cluster import MiniBatchKMeans
+
+    n = matrix.shape[0]
+    if n_clusters >= n:
+        return np.arange(n)
+    model = MiniBatchKMeans(
+        n_clusters=n_clusters, random_state=0, n_init=1,
+        batch_size=min(1024, n),
+    )
+    return model.fit_predict(matrix)
+
+
+def analyze_articles(
+    articles: List[Dict],
+    top_k: int = 5,
+    now: Optional[datetime.datetime] = None,
+    near_duplicate_threshold: float = NEAR_DUPLICATE_THRESHOLD,
+    half_life_days: float = RECENCY_HALF_LIFE_DAYS,
+    max_clusters: Optional[int] = None,
+) -> Dict:
+    """
+    Reduces a raw article list to the top_k ranked, non-redundant topics.
+
+    Steps: exact dedup -> TF-IDF -> near-duplicate collapse -> k-means topic
+    clustering -> score = (relevance + cluster weight) * recency decay ->
+    diversity-aware top-k selection (best article of each cluster first).
+    """
+    # Publication dates are tz-aware (UTC when unspecified); a naive `now` is taken as local time.
+    now = (now or datetime.datetime.now()).astimezone(datetime.timezone.utc)
+    stats = {"input": len(articles)}
+
+    unique = exact_dedup(articles)
+    stats["after_exact_dedup"] = len(unique)
+    if not unique:
+        stats.update(after_near_dedup=0, clusters=0)
+        return {"topics": [], "stats": stats}
+
+    from sklearn.feature_extraction.text import TfidfVectorizer
+
+    texts = [f"{a.get('title', '')}. {a.get('summary', '')}" for a in unique]
+    vectorizer = TfidfVectorizer(
+        stop_words="english", sublinear_tf=True,
+        max_features=50000, dtype=np.float32,
+    )
+    # The domain query is appended as the last row so its vocabulary is always
+    # present and relevance is a single sparse dot product.
+    matrix = vectorizer.fit_transform(texts + [DOMAIN_QUERY])
+    doc_matrix, query = matrix[:-1], matrix[-1]
+
+    groups = _near_duplicate_groups(doc_matrix, near_duplicate_threshold)
+    summary_len = np.array([len(a.get("summary") or "") for a in unique])
+    # Most detailed source per near-duplicate group; ties keep the earliest.
+    order = np.lexsort((np.arange(len(unique)), -summary_len, groups))
+    first = np.ones(len(order), dtype=bool)
+    first[1:] = groups[order][1:] != groups[order][:-1]
+    representatives = sorted(order[first].tolist())
+    duplicate_counts = np.bincount(groups)[groups[representatives]].tolist()
+    doc_matrix = doc_matrix[representatives]
+    relevance = np.asarray((doc_matrix @ query.T).todense()).ravel()
+
+    n_clusters = max_clusters or max(1, int(round(math.sqrt(len(representatives) / 2))))
+    n_clusters = max(n_clusters, min(top_k, len(representatives)))
+    clusters = _cluster_labels(doc_matrix, n_clusters)
+    feature_names = vectorizer.get_feature_names_out()
+
+    kept = [unique[i] for i in representatives]
+    stats["after_near_dedup"] = len(kept)
+    stats["clusters"] = int(len(set(clusters.tolist())))
+
+    cluster_sizes = np.bincount(clusters)
+    cluster_weight = np.log1p(cluster_sizes[clusters]) / math.log1p(cluster_sizes.max())
+    if relevance.max() > 0:
+        relevance = relevance / relevance.max()
+
+    recency = np.empty(len(kept), dtype=np.float32)
+    for i, article in enumerate(kept):
+        published = _parse_date(article)
+        if published is None:
+            recency[i] = UNKNOWN_RECENCY
+        else:
+            age_days = max((now - published).total_seconds() / 86400.0, 0.0)
+            recency[i] = 0.5 ** (age_days / half_life_days)
+
+    scores = (0.6 * relevance + 0.4 * cluster_weight) * recency
+
+    cluster_labels = {}
+    for cluster_id in set(clusters.tolist()):
+        centroid = np.asarray(doc_matrix[clusters == cluster_id].mean(axis=0)).ravel()
+        top_terms = [feature_names[j] for j in np.argsort(-centroid)[:3] if centroid[j] > 0]
+        cluster_labels[cluster_id] = ", ".join(top_terms)
+
+    # Round-robin over clusters (best first) so the top-k covers distinct topics.
+    ranked = np.lexsort((np.arange(len(kept)), -scores))
+    per_cluster: Dict[int, List[int]] = {}
+    for i in ranked.tolist():
+        per_cluster.setdefault(int(clusters[i]), []).append(i)
+    selected: List[int] = []
+    queues = sorted(per_cluster.values(), key=lambda q: -scores[q[0]])
+    while len(selected) < min(top_k, len(kept)):
+        for q in queues:
+            if q and len(selected) < top_k:
+                selected.append(q.pop(0))
+        queues = [q for q in queues if q]
+    selected.sort(key=lambda i: (-scores[i], i))
+
+    topics = []
+    for i in selected:
+        article = kept[i]
+        topics.append({
+            "title": article.get("title", ""),
+            "summary": article.get("summary", ""),
+            "url": article.get("url", ""),
+            "domain": article.get("domain", ""),
+            "recency_and_relevance_score": round(float(scores[i]), 4),
+            "cluster_id": int(clusters[i]),
+            "cluster_label": cluster_labels[int(clusters[i])],
+            "duplicate_count": int(duplicate_counts[i]),
+        })
+    return {"topics": topics, "stats": stats}
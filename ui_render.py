@@ -0,0 +1,141 @@
+import os
+import time
+from collections import deque
+from typing import Callable, List
+
+# --- Rate-Limited Incremental Rendering ---
+# Streamlit re-sends an element's whole body every time it is updated, so
+# calling placeholder.markdown(full_text) per event is quadratic in both work
+# and websocket traffic for a long draft. The helpers below buffer incoming
+# text and redraw at most `fps` times per second:
+#   * BufferedMarkdownRenderer freezes every completed markdown block in its
+#     own element and only ever redraws the unfinished tail block;
+#   * TraceRingBuffer keeps the last `capacity` trace lines, so a redraw of the
+#     trace panel costs the same however long the run is.
+# Both work against any object with Streamlit's placeholder methods
+# (`markdown`, `code`, `empty`), which is what the benchmark relies on.
+
+DEFAULT_FPS = float(os.getenv("NEWSLETTER_UI_FPS", "8"))
+DEFAULT_TRACE_LINES = int(os.getenv("NEWSLETTER_TRACE_LINES", "200"))
+
+
+class FrameLimiter:
+    """Allows at most `fps` frames per second; fps <= 0 allows every frame."""
+
+    def __init__(self, fps: float = DEFAULT_FPS, clock: Callable[[], float] = time.perf_counter):
+        self.interval = 1.0 / fps if fps > 0 else 0.0
+        self.clock = clock
+        self._last_frame = None
+
+    def ready(self) -> bool:
+        now = self.clock()
+        if self._last_frame is not None and now - self._last_frame < self.interval:
+            return False
+        self._last_frame = now
+        return True
+
+
+def split_completed_blocks(text: str):
+    """
+    Splits markdown into (completed, tail) at the last blank line that is not
+    inside a fenced code block. `completed` will render the same however the
+    text continues; `tail` may still change.
+    """
+    cut = 0
+    in_fence = False
+    position = 0
+    for line in text.splitlines(keepends=True):
+        position += len(line)
+        stripped = line.strip()
+        if stripped.startswith("```"):
+            in_fence = not in_fence
+        elif not stripped and not in_fence and line.endswith("\n"):
+            cut = position
+    return text[:cut], text[cut:]
+
+
+class BufferedMarkdownRenderer:
+    """
+    Accumulates streamed markdown and renders it into `container` at a bounded
+    frame rate. Completed blocks are written once into the current placeholder,
+    which is then left alone; a fresh placeholder below it holds the tail.
+    """
+
+    def __init__(self, container, fps: float = DEFAULT_FPS, clock: Callable[[], float] = time.perf_counter):
+        self.container = container
+        self.limiter = FrameLimiter(fps, clock)
+        self._pending: List[str] = []
+        self._tail = ""
+        self._placeholder = container.empty()
+        self._chunks: List[str] = []
+        self.frames = 0
+        self.chars_sent = 0
+
+    def append(self, text: str):
+        if not text:
+            return
+        self._pending.append(text)
+        self._chunks.append(text)
+        if self.limiter.ready():
+            self.flush()
+
+    @property
+    def text(self) -> str:
+        """Everything appended so far."""
+        return "".join(self._chunks)
+
+    def flush(self):
+        """Renders buffered text now, regardless of the frame rate."""
+        if not self._pending:
+            return
+        tail = self._tail + "".join(self._pending)
+        self._pending.clear()
+        completed, self._tail = split_completed_blocks(tail)
+        if completed:
+            # Freeze the finished blocks in the current element and move on.
+            self._render(completed)
+            self._placeholder = self.container.empty()
+        if self._tail:
+            self._render(self._tail)
+
+    def _render(self, markdown: str):
+        self._placeholder.markdown(markdown)
+        self.frames += 1
+        self.chars_sent += len(markdown)
+
+
+class TraceRingBuffer:
+    """Bounded trace log rendered as one code block at a bounded frame rate."""
+
+    def __init__(
+        self,
+        placeholder,
+        capacity: int = DEFAULT_TRACE_LINES,
+        fps: float = DEFAULT_FPS,
+        clock: Callable[[], float] = time.perf_counter,
+    ):
+        self.placeholder = placeholder
+        self.lines = deque(maxlen=max(1, capacity))
+        self.limiter = FrameLimiter(fps, clock)
+        self.total = 0
+        self._dirty = False
+        self.frames = 0
+        self.chars_sent = 0
+
+    def append(self, line: str):
+        self.lines.append(line.rstrip("\n"))
+        self.total += 1
+        self._dirty = True
+        if self.limiter.ready():
+            self.flush()
+
+    def flush(self):
+        if not self._dirty:
+            return
+        dropped = self.total - len(self.lines)
+        header = [f"... {dropped} earlier trace lines dropped"] if dropped else []
+        body = "\n".join(header + list(self.lines))
+        self.placeholder.code(body, language=None)
+        self._dirty = False
+        self.frames += 1
+        self.chars_sent += len(body)